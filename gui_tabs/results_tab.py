@@ -105,17 +105,32 @@ class ResultsTab:
             self.results_tree.insert("", "end", values=("ベストスコア", f"{result.best_score:.2f}"))
             self.results_tree.insert("", "end", values=("未割り当て学生数", len(result.unassigned_students)))
 
-            # セミナーごとの割り当て数を計算して表示
-            seminar_counts: Dict[str, int] = {sem_id: 0 for sem_id in result.seminar_capacities.keys()}
-            for assigned_seminar_id in result.best_assignment.values():
-                if assigned_seminar_id in seminar_counts:
-                    seminar_counts[assigned_seminar_id] += 1
-            
+            # 品質指標 (OptimizerService が metrics モジュールで計算したもの) を表示する
+            metrics: Dict[str, Any] = result.details.get("metrics", {})
+            if metrics:
+                self.results_tree.insert("", "end", values=("", "")) # 区切り
+                self.results_tree.insert("", "end", values=("希望順位ごとの割り当て数", ""))
+                for rank, count in enumerate(metrics["rank_counts"], start=1):
+                    self.results_tree.insert("", "end", values=(f"  第{rank}希望", f"{count}人"))
+                self.results_tree.insert("", "end", values=("  希望外", f"{metrics['unpreferred_count']}人"))
+                self.results_tree.insert("", "end", values=("セミナー人数の標準偏差", f"{metrics['load_std']:.2f}"))
+                self.results_tree.insert("", "end", values=("学生の最小満足度", f"{metrics['min_satisfaction']:.2f}"))
+                seminar_counts = metrics["seminar_loads"]
+                seminar_fill = metrics["seminar_fill"]
+            else:
+                # 品質指標がない場合は割り当てから人数だけを数える
+                seminar_counts = {sem_id: 0 for sem_id in result.seminar_capacities.keys()}
+                for assigned_seminar_id in result.best_assignment.values():
+                    if assigned_seminar_id in seminar_counts:
+                        seminar_counts[assigned_seminar_id] += 1
+                seminar_fill = {}
+
             self.results_tree.insert("", "end", values=("", "")) # 区切り
             self.results_tree.insert("", "end", values=("セミナー割り当て概要", ""))
             for sem_id, count in seminar_counts.items():
                 capacity = result.seminar_capacities.get(sem_id, "N/A")
-                self.results_tree.insert("", "end", values=(f"  {sem_id} (定員 {capacity})", f"{count}人"))
+                fill = f" (充足率 {seminar_fill[sem_id]:.0%})" if sem_id in seminar_fill else ""
+                self.results_tree.insert("", "end", values=(f"  {sem_id} (定員 {capacity})", f"{count}人{fill}"))
         else:
             self.results_text.insert(tk.END, "最適化結果がありません。\n")
 
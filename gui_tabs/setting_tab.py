@@ -44,7 +44,7 @@ class SettingTab:
     """
     
     # クラス定数として定義
-    OPTIMIZATION_STRATEGIES = ["Greedy_LS", "GA_LS", "ILP", "CP", "Multilevel", "Adaptive", "TSL"]
+    OPTIMIZATION_STRATEGIES = ["Greedy_LS", "GA_LS", "ILP", "CP", "Multilevel", "Adaptive", "TSL", "Flow", "Auto"]
     
     OBJECTIVE_PRESETS = {
         "希望優先": {
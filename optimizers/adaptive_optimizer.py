@@ -3,13 +3,22 @@ import random
 import time
 import logging
 import threading
+import queue
+import sqlite3
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from typing import Dict, List, Tuple, Any, Callable, Optional
 from collections import deque
 
 # BaseOptimizerとOptimizationResultをutilsからインポート
 from seminar_optimization.utils import BaseOptimizer, OptimizationResult
+from seminar_optimization.problem_data import ProblemData
 # ロギングは logger_config.py で一元的に設定されるため、ここではロガーの取得のみ
 from seminar_optimization.logger_config import logger
+from seminar_optimization.strategy_store import StrategyStore, instance_bucket
+from seminar_optimization.instance_features import extract_features
+from seminar_optimization.cost_model import StrategyCostModel, TimeBudget, budgeted_config
+from seminar_optimization.metrics import compute_metrics, satisfaction_by_rank
 
 # 各最適化アルゴリズムをインポート
 from optimizers.greedy_ls_optimizer import GreedyLSOptimizer
@@ -17,6 +26,7 @@ from optimizers.genetic_algorithm_optimizer import GeneticAlgorithmOptimizer
 from optimizers.ilp_optimizer import ILPOptimizer
 from optimizers.cp_sat_optimizer import CPSATOptimizer
 from optimizers.multilevel_optimizer import MultilevelOptimizer
+from optimizers.flow_optimizer import FlowOptimizer
 
 # オプティマイザのマッピングを定義
 OPTIMIZER_MAP = {
@@ -24,22 +34,111 @@ OPTIMIZER_MAP = {
     "GA_LS": GeneticAlgorithmOptimizer,
     "ILP": ILPOptimizer,
     "CP": CPSATOptimizer,
-    "Multilevel": MultilevelOptimizer
+    "Multilevel": MultilevelOptimizer,
+    "Flow": FlowOptimizer
 }
 
+# ステータス OPTIMAL が最適性の証明を意味する厳密解法 (レースではその時点で勝者とする)
+EXACT_STRATEGIES = ("ILP", "CP", "Flow")
+
+# レースのワーカーが最良スコアをコーディネータへ送る最小間隔 (秒)
+_SCORE_STREAM_INTERVAL = 0.2
+
+class _ScoreStreamer:
+    """
+    レースのワーカー内で最良スコアの更新を score_queue へ送る。
+    送信は _SCORE_STREAM_INTERVAL 秒に1回までに間引くが、間隔内の更新は捨てずに最新の値を保留し、
+    間隔が空いた時点 (タイマー) か close() で必ず送る。目標に達したスコアが届かずに取り残されることはない。
+    """
+
+    def __init__(self, strategy_name: str, score_queue: Any, interval: float = _SCORE_STREAM_INTERVAL):
+        self.strategy_name = strategy_name
+        self.score_queue = score_queue
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._pending: Optional[float] = None
+        self._last_sent = -float('inf')
+        self._timer: Optional[threading.Timer] = None
+
+    def __call__(self, score: float):
+        with self._lock:
+            self._pending = score
+            if self._timer is not None:
+                return # 送信は予約済み (その時点の最新の値を送る)
+            delay = self._last_sent + self.interval - time.time()
+            if delay <= 0:
+                self._send_locked()
+                return
+            self._timer = threading.Timer(delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """保留中のスコアがあれば送る。"""
+        with self._lock:
+            self._timer = None
+            self._send_locked()
+
+    def close(self):
+        """予約済みの送信を取り消し、保留中のスコアをすぐに送る。"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._send_locked()
+
+    def _send_locked(self):
+        if self._pending is None:
+            return
+        self.score_queue.put((self.strategy_name, self._pending))
+        self._pending = None
+        self._last_sent = time.time()
+
+def _race_strategy(strategy_name: str,
+                   seminars: List[Dict[str, Any]],
+                   students: List[Dict[str, Any]],
+                   config: Dict[str, Any],
+                   score_queue: Any,
+                   cancel_event: Optional[Any] = None,
+                   initial_assignment: Optional[Dict[str, str]] = None,
+                   problem_data: Optional[ProblemData] = None) -> Tuple[OptimizationResult, float]:
+    """
+    レースの1戦略を実行する (プロセスプールのワーカーで実行される)。
+    initial_assignment が与えられた場合は、それをウォームスタートの開始点として戦略に渡す。
+    problem_data は呼び出し側で構築済みの問題表現で、戦略ごとに作り直さずに使う。
+    最良スコアが更新されるたびに (戦略名, スコア) を score_queue へ送る
+    (送信は _SCORE_STREAM_INTERVAL 秒に1回までに間引き、間隔内の最新の値は後から送る)。
+    結果と実行時間を返す。
+    """
+    start_time = time.time()
+    optimizer = OPTIMIZER_MAP[strategy_name](seminars, students, config, progress_callback=lambda message: None,
+                                             initial_assignment=initial_assignment, problem_data=problem_data)
+    streamer = _ScoreStreamer(strategy_name, score_queue)
+    optimizer.best_score_callback = streamer
+    try:
+        result = optimizer.optimize(cancel_event=cancel_event)
+    finally:
+        streamer.close()
+    return result, time.time() - start_time
+
 class AdaptiveOptimizer(BaseOptimizer):
     """
     適応型最適化アルゴリズム。
-    複数の最適化戦略（Greedy_LS, GA_LS, ILP, CP, Multilevel）を組み合わせ、
+    複数の最適化戦略（Greedy_LS, GA_LS, ILP, CP, Multilevel, Flow）を組み合わせ、
     問題の特性や過去のパフォーマンスに基づいて最適な戦略を動的に選択または切り替える。
+    adaptive_mode = "race" では、複数の戦略を別プロセスで同時に走らせ、
+    目標スコア (または上界とのギャップ) に最初に達した戦略を勝者として残りを打ち切る。
+    逐次モードでは、それまでの最良の割り当てを次の戦略のウォームスタートの開始点として渡す。
     """
 
     def __init__(self,
                  seminars: List[Dict[str, Any]],
                  students: List[Dict[str, Any]],
                  config: Dict[str, Any],
-                 progress_callback: Optional[Callable[[str], None]] = None):
-        super().__init__(seminars, students, config, progress_callback)
+                 progress_callback: Optional[Callable[[str], None]] = None,
+                 initial_assignment: Optional[Dict[str, str]] = None, # 最初の戦略のウォームスタートに使う割り当て
+                 problem_data: Optional[ProblemData] = None): # 構築済みの問題表現 (共有する場合)
+        super().__init__(seminars, students, config, progress_callback, initial_assignment, problem_data)
         self._log("AdaptiveOptimizer: 初期化を開始します。", level=logging.DEBUG)
 
         # 適応型最適化固有のパラメータ
@@ -66,18 +165,68 @@ class AdaptiveOptimizer(BaseOptimizer):
         self.max_time_for_normalization = config.get("adaptive_max_time_for_normalization", 600) # 時間正規化のための最大時間 (秒)
         self.max_iterations = config.get("adaptive_max_iterations", 5) # 適応型最適化の最大イテレーション数
         self.max_total_time = config.get("adaptive_max_total_time", 600) # 適応型最適化の総時間制限 (秒)
+        self.warm_start_chaining = config.get("adaptive_warm_start", True) # 最良の割り当てを次の戦略の開始点として渡す
+
+        # レース: 同時に走らせる戦略と、勝者を決める目標 (スコア、または上界との相対ギャップ)
+        self.mode = config.get("adaptive_mode", "sequential")
+        self.race_strategies = config.get("adaptive_race_strategies", list(OPTIMIZER_MAP.keys()))
+        self.race_target_score = config.get("adaptive_race_target_score")
+        self.race_target_gap = config.get("adaptive_race_target_gap")
 
         self.strategy_scores: Dict[str, float] = {name: 0.0 for name in OPTIMIZER_MAP.keys()} # 各戦略の累積スコア
         self.current_strategy_name: Optional[str] = None
         
         # preference_weightsをインスタンス変数として保持
         self.preference_weights = {k: float(v) for k, v in config.get("preference_weights", {}).items()}
+        # 希望順位ごとの満足度 (報酬の希望満足度・最小満足度の計算に使う)
+        self.satisfaction_weights = satisfaction_by_rank(self.preference_weights, self.problem_data.preference_matrix.shape[1])
+
+        # 実行をまたいだ戦略ごとの報酬の履歴 (adaptive_history_db を指定した場合のみ SQLite に保存する)
+        # 履歴がある場合は、特徴量から戦略ごとの実行時間とスコアを予測するモデルも学習する
+        self.instance_features = extract_features(self.problem_data)
+        self.instance_bucket = instance_bucket(self.instance_features)
+        self.strategy_store: Optional[StrategyStore] = None
+        self.cost_model: Optional[StrategyCostModel] = None
+        history_db = config.get("adaptive_history_db")
+        if history_db:
+            try:
+                self.strategy_store = StrategyStore(history_db)
+                self._load_prior()
+                self.cost_model = StrategyCostModel.from_rows(self.strategy_store.training_rows(),
+                                                              config.get("cost_model_min_samples", 5),
+                                                              config.get("random_seed"))
+            except sqlite3.Error as e:
+                self._log(f"AdaptiveOptimizer: 戦略の履歴 {history_db} を使用できません: {e}", level=logging.WARNING)
+                self.strategy_store = None
 
         self._log("AdaptiveOptimizer: 適応型最適化の初期化が完了しました。", level=logging.INFO)
         self._log(f"AdaptiveOptimizer: 探索率={self.exploration_epsilon}, 学習率={self.learning_rate}", level=logging.DEBUG)
         self._log(f"AdaptiveOptimizer: 評価重み: スコア={self.score_weight}, 未割り当て={self.unassigned_weight}, 時間={self.time_weight}, 希望満足度={self.preference_satisfaction_weight}, 負荷分散={self.load_balance_weight}, 最小満足度={self.min_satisfaction_weight}", level=logging.DEBUG)
 
 
+    def _load_prior(self):
+        """
+        現在のインスタンスに最も近いバケットの過去の報酬を、戦略ごとの履歴と累積スコアの初期値として読み込む。
+        """
+        nearest, rewards = self.strategy_store.prior(self.instance_bucket, self.config.get("adaptive_history_size", 5))
+        for strategy_name, values in rewards.items():
+            if strategy_name not in OPTIMIZER_MAP:
+                continue
+            self.strategy_history[strategy_name].extend(values)
+            self.strategy_scores[strategy_name] = sum(values) / len(values)
+        if rewards:
+            prior_summary = ", ".join(f"{name}={score:.2f}" for name, score in self.strategy_scores.items() if self.strategy_history[name])
+            self._log(f"AdaptiveOptimizer: バケット {nearest} (現在のインスタンス: {self.instance_bucket}) の履歴を事前分布として読み込みました: {prior_summary}", level=logging.INFO)
+
+    def _record_reward(self, strategy_name: str, reward: float, result: OptimizationResult, duration: float):
+        """戦略の報酬を、実行をまたいだ履歴に記録する (adaptive_history_db を指定した場合のみ)。"""
+        if self.strategy_store is None:
+            return
+        try:
+            self.strategy_store.record(self.instance_bucket, strategy_name, reward, result.best_score, duration, self.instance_features)
+        except sqlite3.Error as e:
+            self._log(f"AdaptiveOptimizer: 戦略の履歴への記録に失敗しました: {e}", level=logging.WARNING)
+
     def _normalize_score(self, score: float, min_score: float, max_score: float) -> float:
         """スコアを0-1の範囲に正規化する"""
         if max_score <= min_score:
@@ -96,29 +245,6 @@ class AdaptiveOptimizer(BaseOptimizer):
         normalized_time = min(duration, self.max_time_for_normalization) / self.max_time_for_normalization
         return 1.0 - normalized_time
 
-    def _calculate_preference_satisfaction_score(self, assignment: Dict[str, str]) -> float:
-        """
-        学生の希望順位に応じた満足度スコアを合計して計算する。
-        preference_weights (例: {"1st": 5.0, "2nd": 2.0, "3rd": 1.0}) を参照。
-        """
-        total_satisfaction_score = 0.0
-        for student_id, assigned_seminar_id in assignment.items():
-            student_info = next((s for s in self.students if s['id'] == student_id), None)
-            if student_info and student_info.get('preferences'):
-                for i, pref in enumerate(student_info['preferences']):
-                    if pref['seminar_id'] == assigned_seminar_id:
-                        rank_key = ""
-                        if i == 0: rank_key = "1st"
-                        elif i == 1: rank_key = "2nd"
-                        elif i == 2: rank_key = "3rd"
-                        # 必要に応じて4th, 5thなどを追加
-                        # preferencesはconfigでnum_preferences_to_considerが設定されているはず
-                        else: rank_key = f"{i+1}th" # その他のランク
-                        
-                        total_satisfaction_score += self.preference_weights.get(rank_key, 0.0)
-                        break # この学生は割り当てが見つかったので次の学生へ
-        return total_satisfaction_score
-
     def _normalize_preference_satisfaction_score(self, current_sat_score: float) -> float:
         """希望順位満足度スコアを0-1の範囲に正規化する"""
         # 全ての学生が第一希望に割り当てられた場合の最大スコア
@@ -130,20 +256,6 @@ class AdaptiveOptimizer(BaseOptimizer):
         return current_sat_score / max_possible_sat_score
 
 
-    def _calculate_seminar_load_balance(self, assignment: Dict[str, str]) -> float:
-        """セミナーの負荷分散を計算する (標準偏差が小さいほど良い)"""
-        seminar_counts: Dict[str, int] = {s['id']: 0 for s in self.seminars}
-        for seminar_id in assignment.values():
-            seminar_counts[seminar_id] += 1
-        
-        # 割り当てられた学生がいるセミナーのみを考慮
-        active_seminar_counts = [count for count in seminar_counts.values() if count > 0]
-        
-        if not active_seminar_counts:
-            return 0.0 # 全員未割り当ての場合など、負荷分散の評価ができない
-        
-        return float(np.std(active_seminar_counts)) # 標準偏差を返す
-
     def _normalize_load_balance(self, std_dev: float) -> float:
         """セミナー負荷分散の標準偏差を0-1の範囲に正規化する (小さいほど良いので1-x)"""
         # 経験的に、または問題の規模に応じて最大標準偏差を設定
@@ -155,30 +267,6 @@ class AdaptiveOptimizer(BaseOptimizer):
         normalized_std_dev = min(std_dev, max_possible_std_dev) / max_possible_std_dev
         return 1.0 - normalized_std_dev
 
-    def _calculate_min_student_satisfaction(self, assignment: Dict[str, str]) -> float:
-        """学生ごとの最小満足度スコアを計算する"""
-        min_satisfaction = float('inf')
-        
-        for student_id in self.student_ids:
-            assigned_seminar_id = assignment.get(student_id)
-            current_student_score = 0.0
-            
-            if assigned_seminar_id:
-                student_info = next((s for s in self.students if s['id'] == student_id), None)
-                if student_info and student_info.get('preferences'):
-                    for i, pref in enumerate(student_info['preferences']):
-                        if pref['seminar_id'] == assigned_seminar_id:
-                            rank_key = ""
-                            if i == 0: rank_key = "1st"
-                            elif i == 1: rank_key = "2nd"
-                            elif i == 2: rank_key = "3rd"
-                            else: rank_key = f"{i+1}th"
-                            current_student_score = self.preference_weights.get(rank_key, 0.0)
-                            break
-            min_satisfaction = min(min_satisfaction, current_student_score)
-        
-        return min_satisfaction if min_satisfaction != float('inf') else 0.0
-
     def _normalize_min_satisfaction(self, min_sat_score: float) -> float:
         """最小学生満足度を0-1の範囲に正規化する"""
         # 最大可能スコアは、preference_weightsで定義された第一希望の重み
@@ -210,17 +298,11 @@ class AdaptiveOptimizer(BaseOptimizer):
             # 時間の正規化
             normalized_time = self._normalize_time(duration)
 
-            # --- 希望順位満足度の計算と正規化 (新規/変更) ---
-            current_preference_satisfaction_score = self._calculate_preference_satisfaction_score(result.best_assignment)
-            normalized_preference_satisfaction = self._normalize_preference_satisfaction_score(current_preference_satisfaction_score)
-
-            # セミナー負荷分散
-            load_balance_std_dev = self._calculate_seminar_load_balance(result.best_assignment)
-            normalized_load_balance = self._normalize_load_balance(load_balance_std_dev)
-
-            # 学生ごとの最小満足度
-            min_student_satisfaction = self._calculate_min_student_satisfaction(result.best_assignment)
-            normalized_min_satisfaction = self._normalize_min_satisfaction(min_student_satisfaction)
+            # 希望順位満足度・セミナー負荷分散・学生ごとの最小満足度は、品質指標として1回でまとめて計算する
+            metrics = compute_metrics(self.problem_data, self.problem_data.encode(result.best_assignment), self.satisfaction_weights)
+            normalized_preference_satisfaction = self._normalize_preference_satisfaction_score(metrics.total_satisfaction)
+            normalized_load_balance = self._normalize_load_balance(metrics.load_std)
+            normalized_min_satisfaction = self._normalize_min_satisfaction(metrics.min_satisfaction)
             
             # 総合パフォーマンススコアを計算
             performance_score = (
@@ -233,6 +315,7 @@ class AdaptiveOptimizer(BaseOptimizer):
             )
             
             self.strategy_history[strategy_name].append(performance_score)
+            self._record_reward(strategy_name, performance_score, result, duration)
             
             if self.strategy_history[strategy_name]:
                 avg_performance = sum(self.strategy_history[strategy_name]) / len(self.strategy_history[strategy_name])
@@ -244,6 +327,7 @@ class AdaptiveOptimizer(BaseOptimizer):
             self._log(f"AdaptiveOptimizer: 戦略 '{strategy_name}' のパフォーマンスを更新しました。正規化スコア: {normalized_score:.2f}, 未割り当て: {normalized_unassigned:.2f}, 時間: {normalized_time:.2f}, 希望満足度: {normalized_preference_satisfaction:.2f}, 負荷分散: {normalized_load_balance:.2f}, 最小満足度: {normalized_min_satisfaction:.2f}, 総合パフォーマンス: {performance_score:.2f}, 累積スコア: {self.strategy_scores[strategy_name]:.2f}")
         else:
             self.strategy_scores[strategy_name] = max(0.0, self.strategy_scores[strategy_name] * 0.8 - 0.1)
+            self._record_reward(strategy_name, 0.0, result, duration)
             self._log(f"AdaptiveOptimizer: 戦略 '{strategy_name}' が失敗しました。累積スコアを調整: {self.strategy_scores[strategy_name]:.2f}", level=logging.INFO)
 
 
@@ -266,12 +350,203 @@ class AdaptiveOptimizer(BaseOptimizer):
         self.current_strategy_name = selected_strategy
         return selected_strategy
 
+    def _score_upper_bound(self, iterations: int = 50) -> float:
+        """
+        スコアの上界を、定員制約をラグランジュ緩和した双対問題から求める。
+        セミナーごとの価格 u (>= 0) に対して、定員×価格の合計と、各学生の (重み - 価格) の最大値 (負なら0) の合計は
+        どの割り当てのスコアよりも大きい。劣勾配法で価格を iterations 回更新し、得られた最小の値を返す。
+        """
+        problem = self.problem_data
+        weights = problem.preference_weights
+        valid = problem.preference_matrix >= 0
+        columns = np.where(valid, problem.preference_matrix, 0)
+        capacities = problem.capacities.astype(np.float64)
+        prices = np.zeros(problem.num_seminars, dtype=np.float64)
+        # 価格が0のときの上界: 全学生がそれぞれ最も重みの大きい希望に割り当てられた場合のスコア
+        upper_bound = float(weights.max(axis=1, initial=0.0).sum())
+        initial_step = float(weights.max(initial=0.0))
+        for k in range(iterations):
+            reduced = np.where(valid, weights - prices[columns], 0.0)
+            choice = reduced.argmax(axis=1)
+            value = reduced[np.arange(problem.num_students), choice]
+            upper_bound = min(upper_bound, float(capacities @ prices + np.maximum(value, 0.0).sum()))
+            # 劣勾配: 定員 - (価格のもとで各学生が最も望むセミナーの人数)
+            chosen = value > 0
+            subgradient = capacities - np.bincount(columns[chosen, choice[chosen]], minlength=problem.num_seminars)
+            scale = np.abs(subgradient).max(initial=0.0)
+            if scale == 0:
+                break
+            prices = np.maximum(0.0, prices - initial_step / np.sqrt(k + 1) * subgradient / scale)
+        return upper_bound
+
+    def _reaches_target(self, strategy_name: str, status: Optional[str], score: float, upper_bound: float) -> bool:
+        """
+        レースの勝者の条件を満たすかを判定する。
+        厳密解法が最適性を証明した場合、adaptive_race_target_score 以上の場合、
+        上界との相対ギャップが adaptive_race_target_gap 以下の場合に True を返す。
+        """
+        if status == "OPTIMAL" and strategy_name in EXACT_STRATEGIES:
+            return True
+        if self.race_target_score is not None and score >= self.race_target_score:
+            return True
+        if self.race_target_gap is not None and upper_bound > 0 and (upper_bound - score) / upper_bound <= self.race_target_gap:
+            return True
+        return False
+
+    def _plan(self) -> Optional[Tuple[str, float]]:
+        """
+        予測モデルがある場合、最初に実行する戦略と時間予算 (秒) を返す (なければ None)。
+        """
+        if self.cost_model is None:
+            return None
+        plan = self.cost_model.plan(self.instance_features, self.max_total_time, OPTIMIZER_MAP.keys(),
+                                   self.config.get("cost_model_quality_tolerance", 0.005),
+                                   self.config.get("cost_model_budget_factor", 2.0))
+        if plan is None:
+            return None
+        strategy_name, budget, predictions = plan
+        prediction_summary = ", ".join(f"{name}=({runtime:.1f}秒, {score:.1f})" for name, (runtime, score) in sorted(predictions.items()))
+        self._log(f"AdaptiveOptimizer: 予測モデルにより戦略 '{strategy_name}' (時間予算 {budget:.1f}秒) を選択しました。予測: {prediction_summary}", level=logging.INFO)
+        return strategy_name, budget
+
+    def _optimize_race(self, cancel_event: Optional[threading.Event] = None) -> OptimizationResult:
+        """
+        adaptive_race_strategies の戦略を別プロセスで同時に実行する (ポートフォリオ・レース)。
+        各ワーカーは最良スコアの更新をキューでコーディネータへ送り、コーディネータは
+        いずれかの戦略が目標に達した時点で他の戦略をキャンセルし、勝者の終了を待つ。
+        締め切り (adaptive_max_total_time) を過ぎた場合やキャンセルが要求された場合は全戦略を停止する。
+        各戦略の要約 (ステータス、スコア、途中経過の最良スコア、実行時間、打ち切りの有無) を details["race"] に格納する。
+        """
+        start_time = time.time()
+        strategies = [name for name in self.race_strategies if name in OPTIMIZER_MAP]
+        upper_bound = self._score_upper_bound()
+        race_config = budgeted_config(self.config, self.max_total_time)
+        self._log(f"AdaptiveOptimizer: {len(strategies)} 個の戦略でレースを開始します: {strategies} (スコアの上界: {upper_bound:.2f})", level=logging.INFO)
+
+        race_results: Dict[str, Tuple[OptimizationResult, float]] = {}
+        streamed_scores: Dict[str, float] = {}
+        winner: Optional[str] = None
+        stopped = False
+        with multiprocessing.Manager() as manager:
+            score_queue = manager.Queue()
+            cancel_events = {name: manager.Event() for name in strategies}
+            with ProcessPoolExecutor(max_workers=max(1, len(strategies))) as executor:
+                pending = {
+                    executor.submit(_race_strategy, name, self.seminars, self.students, race_config, score_queue, cancel_events[name],
+                                    self.initial_assignment, self.problem_data): name
+                    for name in strategies
+                }
+                futures = dict(pending)
+                try:
+                    while pending:
+                        done, pending = wait(pending, timeout=_SCORE_STREAM_INTERVAL, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            name = futures[future]
+                            race_results[name] = future.result()
+                            result = race_results[name][0]
+                            self._log(f"AdaptiveOptimizer: 戦略 '{name}' が完了しました。ステータス: {result.status}, スコア: {result.best_score:.2f}", level=logging.INFO)
+                            if winner is None and result.status in ["OPTIMAL", "FEASIBLE"] and self._reaches_target(name, result.status, result.best_score, upper_bound):
+                                winner = name
+                        while True:
+                            try:
+                                name, score = score_queue.get_nowait()
+                            except queue.Empty:
+                                break
+                            streamed_scores[name] = max(score, streamed_scores.get(name, -float('inf')))
+                            if winner is None and self._reaches_target(name, None, score, upper_bound):
+                                winner = name
+
+                        if not stopped and ((cancel_event and cancel_event.is_set()) or time.time() - start_time > self.max_total_time):
+                            stopped = True
+                            self._log("AdaptiveOptimizer: キャンセルまたは締め切りのため、全戦略を停止します。", level=logging.INFO)
+                        for name in strategies:
+                            if (stopped or (winner is not None and name != winner)) and not cancel_events[name].is_set():
+                                cancel_events[name].set()
+                                if not stopped:
+                                    self._log(f"AdaptiveOptimizer: 戦略 '{winner}' が目標に達したため、戦略 '{name}' を打ち切ります。", level=logging.INFO)
+                finally:
+                    # 例外で抜ける場合も、未完了の戦略を止めてからプールの終了を待つ
+                    for name in strategies:
+                        if name not in race_results:
+                            cancel_events[name].set()
+
+                # 打ち切られる前に届かなかったスコアも取り込む
+                while True:
+                    try:
+                        name, score = score_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    streamed_scores[name] = max(score, streamed_scores.get(name, -float('inf')))
+
+            race_summaries = [
+                {
+                    "strategy": name,
+                    "status": race_results[name][0].status,
+                    "score": race_results[name][0].best_score,
+                    "streamed_score": streamed_scores.get(name, -float('inf')),
+                    "duration": race_results[name][1],
+                    "cancelled": cancel_events[name].is_set()
+                }
+                for name in strategies if name in race_results
+            ]
+
+        # 完走した戦略だけを学習に使う (打ち切られた戦略の結果は性能を表さないため)
+        for summary in race_summaries:
+            if not summary["cancelled"]:
+                result, duration = race_results[summary["strategy"]]
+                self._update_strategy_performance(summary["strategy"], result, duration)
+
+        # 同点の場合は完了順ではなく adaptive_race_strategies の順で選び、結果を再現可能にする
+        successful = [name for name in strategies if name in race_results and race_results[name][0].status in ["OPTIMAL", "FEASIBLE"]]
+        details = {"mode": "race", "upper_bound": upper_bound, "winner": winner, "race": race_summaries}
+        self._log(f"AdaptiveOptimizer: レースが完了しました。勝者: {winner}, 実行時間: {time.time() - start_time:.2f}秒", level=logging.INFO)
+
+        if cancel_event and cancel_event.is_set():
+            return OptimizationResult(
+                status="CANCELLED",
+                message="最適化がユーザーによってキャンセルされました。",
+                best_score=-float('inf'),
+                best_assignment={},
+                seminar_capacities=self.seminar_capacities,
+                unassigned_students=self.student_ids,
+                optimization_strategy="Adaptive",
+                details=details
+            )
+        if not successful:
+            self._log("AdaptiveOptimizer: いずれの戦略からも有効な結果が得られませんでした。", level=logging.WARNING)
+            return OptimizationResult(
+                status="NO_SOLUTION_FOUND",
+                message="いずれの戦略からも有効な解が見つかりませんでした。",
+                best_score=-float('inf'),
+                best_assignment={},
+                seminar_capacities=self.seminar_capacities,
+                unassigned_students=self.student_ids,
+                optimization_strategy="Adaptive",
+                details=details
+            )
+
+        best_strategy = max(successful, key=lambda name: race_results[name][0].best_score)
+        best_result = race_results[best_strategy][0]
+        return OptimizationResult(
+            status=best_result.status,
+            message=f"最適化が成功しました (レースの最良戦略: {best_strategy})",
+            best_score=best_result.best_score,
+            best_assignment=best_result.best_assignment,
+            seminar_capacities=self.seminar_capacities,
+            unassigned_students=self._get_unassigned_students(best_result.best_assignment),
+            optimization_strategy=best_strategy,
+            details=details
+        )
+
     def optimize(self, cancel_event: Optional[threading.Event] = None) -> OptimizationResult:
         """
         適応型最適化プロセスを実行する。
         各イテレーションで最適な戦略を選択し、実行する。
         所定のイテレーション数または時間制限まで繰り返す。
         """
+        if self.mode == "race":
+            return self._optimize_race(cancel_event)
+
         start_overall_time = time.time()
         self._log("AdaptiveOptimizer: 適応型最適化を開始します...", level=logging.INFO)
 
@@ -281,6 +556,7 @@ class AdaptiveOptimizer(BaseOptimizer):
         final_message = "適応型最適化で有効な解が見つかりませんでした。"
         final_strategy_used = "N/A"
 
+        plan = self._plan()
         for i in range(self.max_iterations):
             if cancel_event and cancel_event.is_set():
                 self._log("AdaptiveOptimizer: 全体最適化がキャンセルされました。", level=logging.INFO)
@@ -294,7 +570,16 @@ class AdaptiveOptimizer(BaseOptimizer):
                 final_message = "最適化が時間制限により終了しました。"
                 break
 
-            self.current_strategy_name = self._select_strategy()
+            strategy_config = self.config
+            strategy_cancel_event = cancel_event
+            if i == 0 and plan is not None:
+                # 最初のイテレーションは、予測モデルが選んだ戦略を予測に基づく時間予算で実行する
+                # (ILP/CP はソルバーの時間制限、それ以外は予算切れのキャンセルで予算を守らせる)
+                self.current_strategy_name, budget = plan
+                strategy_config = budgeted_config(self.config, budget)
+                strategy_cancel_event = TimeBudget(budget, cancel_event)
+            else:
+                self.current_strategy_name = self._select_strategy()
             self._log(f"AdaptiveOptimizer: イテレーション {i+1}/{self.max_iterations}: 戦略 '{self.current_strategy_name}' を試行します。", level=logging.INFO)
 
             optimizer_class = OPTIMIZER_MAP.get(self.current_strategy_name)
@@ -302,15 +587,21 @@ class AdaptiveOptimizer(BaseOptimizer):
                 self._log(f"AdaptiveOptimizer: 未知の最適化戦略: {self.current_strategy_name}。スキップします。", level=logging.ERROR)
                 continue
 
+            # ウォームスタート: それまでの最良の割り当て (まだなければ呼び出し側の割り当て) から始めさせる
+            incumbent = best_overall_assignment or self.initial_assignment
             optimizer_instance = optimizer_class(
                 seminars=self.seminars,
                 students=self.students,
-                config=self.config,
-                progress_callback=self.progress_callback
+                config=strategy_config,
+                progress_callback=self.progress_callback,
+                initial_assignment=incumbent if self.warm_start_chaining else None,
+                problem_data=self.problem_data # 問題表現はイテレーションをまたいで共有する
             )
 
             strategy_start_time = time.time()
-            current_result = optimizer_instance.optimize(cancel_event)
+            current_result = optimizer_instance.optimize(strategy_cancel_event)
+            if isinstance(strategy_cancel_event, TimeBudget):
+                current_result = strategy_cancel_event.finish(current_result, self.problem_data)
             strategy_end_time = time.time()
             duration = strategy_end_time - strategy_start_time
 
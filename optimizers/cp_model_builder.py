@@ -0,0 +1,317 @@
+from ortools.sat.python import cp_model
+import time
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional, Tuple
+import numpy as np
+
+from seminar_optimization.problem_data import ProblemData, UNASSIGNED
+# ロギングは logger_config.py で一元的に設定されるため、ここではロガーの取得のみ
+from seminar_optimization.logger_config import logger
+
+@contextmanager
+def stop_on_cancel(solver: cp_model.CpSolver, cancel_event: Optional[Any], poll_interval: float = 0.1) -> Iterator[None]:
+    """
+    with ブロックの間、cancel_event を poll_interval 秒ごとに確認し、設定されたらソルバーを停止する。
+    SolutionCallback は新しい解が見つかったときにしか呼ばれないため、解が見つからない間もキャンセルに応答させる。
+    """
+    if cancel_event is None:
+        yield
+        return
+    finished = threading.Event()
+
+    def watch():
+        logged = False
+        while not finished.wait(poll_interval):
+            if cancel_event.is_set():
+                # fix-and-polish では求解が複数回行われるため、終了するまで停止を要求し続ける
+                if not logged:
+                    logger.info("stop_on_cancel: キャンセルイベントが検出されました。ソルバーを停止します。")
+                    logged = True
+                solver.stop_search()
+
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+    try:
+        yield
+    finally:
+        finished.set()
+        watcher.join()
+
+class AssignmentModel:
+    """
+    割り当て問題の CP-SAT モデルの基底クラス。
+    サブクラスは model を構築し、extract_vector / add_hint / add_fixing を実装する。
+    ウォームスタートと fix-and-polish を含む求解手順 (solve) は共通。
+    """
+    problem_data: ProblemData
+    model: cp_model.CpModel
+
+    def extract_vector(self, solver: cp_model.CpSolver) -> np.ndarray:
+        raise NotImplementedError("このメソッドは各モデルで実装する必要があります。")
+
+    def add_hint(self, vector: np.ndarray):
+        raise NotImplementedError("このメソッドは各モデルで実装する必要があります。")
+
+    def add_fixing(self, vector: np.ndarray, students: np.ndarray) -> cp_model.IntVar:
+        raise NotImplementedError("このメソッドは各モデルで実装する必要があります。")
+
+    def solve(self,
+              solver: cp_model.CpSolver,
+              solution_callback: Optional[cp_model.CpSolverSolutionCallback] = None,
+              warm_start_vector: Optional[np.ndarray] = None,
+              use_hint: bool = False,
+              fix_and_polish: bool = False,
+              polish_fix_ratio: float = 0.8,
+              polish_time_ratio: float = 0.3,
+              rng: Optional[np.random.Generator] = None) -> Tuple[int, Optional[np.ndarray]]:
+        """
+        モデルを解き、(ソルバーのステータス, 最良の割り当てベクトル) を返す。解がない場合のベクトルは None。
+
+        warm_start_vector (貪欲法などの暫定解) を渡すと:
+            - use_hint が真なら解のヒント (AddHint) として与える。
+            - fix_and_polish が真なら、まず学生の polish_fix_ratio の割合を暫定解の値に固定した小さな問題を
+              制限時間の polish_time_ratio の割合で解き (fix)、その解で暫定解を更新してから、
+              残りの時間で固定なしの問題を解く (polish)。固定する学生は rng (省略時はシードなしの乱数生成器) で選ぶ。
+            - ソルバーが暫定解より良い解を見つけられなかった場合は、暫定解 (実行可能な場合) を返す。
+              このときステータスは FEASIBLE とする。
+        """
+        if warm_start_vector is None:
+            status = solver.Solve(self.model, solution_callback)
+            return status, self.extract_vector(solver) if status in (cp_model.OPTIMAL, cp_model.FEASIBLE) else None
+
+        problem = self.problem_data
+        incumbent: Optional[np.ndarray] = np.asarray(warm_start_vector, dtype=np.int32)
+        if not problem.is_feasible(incumbent):
+            logger.warning("SparseAssignmentModel: 暫定解が定員制約を満たしていないため、ヒントとしてのみ使用します。")
+            incumbent_score = -float('inf')
+        else:
+            incumbent_score = problem.score(incumbent)
+        if use_hint:
+            self.add_hint(warm_start_vector)
+
+        time_limit = solver.parameters.max_time_in_seconds
+        start_time = time.time()
+        if fix_and_polish:
+            num_students = problem.num_students
+            if rng is None:
+                rng = np.random.default_rng()
+            fixed_students = rng.choice(num_students, size=int(num_students * polish_fix_ratio), replace=False).astype(np.int64)
+            fix_literal = self.add_fixing(warm_start_vector, fixed_students)
+            self.model.AddAssumptions([fix_literal])
+            solver.parameters.max_time_in_seconds = time_limit * polish_time_ratio
+            status = solver.Solve(self.model, solution_callback)
+            logger.info(f"SparseAssignmentModel: 固定フェーズ ({len(fixed_students)} 人を固定) のステータス: {solver.StatusName(status)}")
+            if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                fixed_vector = self.extract_vector(solver)
+                fixed_score = problem.score(fixed_vector)
+                if fixed_score > incumbent_score:
+                    incumbent, incumbent_score = fixed_vector, fixed_score
+                    if use_hint:
+                        self.add_hint(incumbent)
+            self.model.ClearAssumptions()
+            solver.parameters.max_time_in_seconds = max(time_limit - (time.time() - start_time), 1e-3)
+
+        try:
+            status = solver.Solve(self.model, solution_callback)
+        finally:
+            solver.parameters.max_time_in_seconds = time_limit
+
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            vector = self.extract_vector(solver)
+            if status == cp_model.OPTIMAL or problem.score(vector) >= incumbent_score:
+                return status, vector
+        if incumbent_score > -float('inf'):
+            logger.info(f"SparseAssignmentModel: ソルバーの解が暫定解 (スコア: {incumbent_score:.2f}) を上回らなかったため、暫定解を返します。")
+            return cp_model.FEASIBLE, incumbent
+        return status, None
+
+class SparseAssignmentModel(AssignmentModel):
+    """
+    ILPOptimizer と CPSATOptimizer が共有する疎な CP-SAT モデル。
+
+    目的関数に寄与するのは希望したセミナーだけなので、変数は (学生, 希望セミナー) の
+    組に対してのみ作成する。希望外のセミナーへの割り当ては常にスコアを下げないため、
+    希望外の変数を除いても最適値は変わらない。
+    定員制約と目的関数は LinearExpr.Sum / LinearExpr.WeightedSum で組み立てる。
+    """
+    def __init__(self, problem_data: ProblemData):
+        self.problem_data = problem_data
+        self.model = cp_model.CpModel()
+
+        # (学生, 希望セミナー) の組。存在しないセミナーの希望は -1 で除外される
+        student_rows, rank_cols = np.nonzero(problem_data.preference_matrix >= 0)
+        self.pair_students: np.ndarray = student_rows.astype(np.int64)
+        self.pair_seminars: np.ndarray = problem_data.preference_matrix[student_rows, rank_cols].astype(np.int64)
+        # 重み (希望順位の重み × 倍率) は ProblemData で事前計算済み
+        self.pair_weights: np.ndarray = problem_data.preference_weights[student_rows, rank_cols]
+
+        # 変数の定義: variables[k] = 1 なら学生 pair_students[k] がセミナー pair_seminars[k] に割り当てられる
+        self.variables: List[cp_model.IntVar] = [
+            self.model.NewBoolVar(f'x_{i}_{s}')
+            for i, s in zip(self.pair_students.tolist(), self.pair_seminars.tolist())
+        ]
+        logger.debug(f"SparseAssignmentModel: 割り当て変数を {len(self.variables)} 個定義しました (密なモデルでは {problem_data.num_students * problem_data.num_seminars} 個)。")
+
+        # 制約1: 各学生は最大で1つのセミナーに割り当てられる
+        # np.nonzero は行優先で返すため、組は学生順に並んでいる
+        student_starts = np.searchsorted(self.pair_students, np.arange(problem_data.num_students + 1))
+        for start, end in zip(student_starts[:-1].tolist(), student_starts[1:].tolist()):
+            if end - start > 1:
+                self.model.AddAtMostOne(self.variables[start:end])
+        logger.debug("SparseAssignmentModel: 各学生は最大1つのセミナーに割り当てられる制約を追加しました。")
+
+        # 制約2: 各セミナーの定員制約 (希望者数が定員以下のセミナーは制約不要)
+        by_seminar = np.argsort(self.pair_seminars, kind='stable')
+        seminar_starts = np.searchsorted(self.pair_seminars[by_seminar], np.arange(problem_data.num_seminars + 1))
+        for s in range(problem_data.num_seminars):
+            members = by_seminar[seminar_starts[s]:seminar_starts[s + 1]].tolist()
+            capacity = int(problem_data.capacities[s])
+            if len(members) > capacity:
+                self.model.Add(cp_model.LinearExpr.Sum([self.variables[k] for k in members]) <= capacity)
+        logger.debug("SparseAssignmentModel: 各セミナーの定員制約を追加しました。")
+
+        # 目的関数の定義: 希望順位に基づいてスコアを最大化
+        self.model.Maximize(cp_model.LinearExpr.WeightedSum(self.variables, self.pair_weights.tolist()))
+        logger.debug("SparseAssignmentModel: 目的関数を定義しました。")
+
+    def extract_vector(self, solver: cp_model.CpSolver) -> np.ndarray:
+        """
+        解から割り当てベクトル (値はセミナーのインデックス、-1 は未割り当て) を作成する。
+        作成済みの変数のみを走査する。
+        """
+        vector = np.full(self.problem_data.num_students, UNASSIGNED, dtype=np.int32)
+        chosen = [k for k, var in enumerate(self.variables) if solver.BooleanValue(var)]
+        vector[self.pair_students[chosen]] = self.pair_seminars[chosen]
+        return vector
+
+    def add_hint(self, vector: np.ndarray):
+        """
+        割り当てベクトルを解のヒント (AddHint) として設定する。既存のヒントは置き換える。
+        ヒントの割り当ては実行可能でなくてもよい (ソルバーが修復を試みる)。
+        """
+        self.model.ClearHints()
+        hinted = np.asarray(vector)[self.pair_students] == self.pair_seminars
+        for var, value in zip(self.variables, hinted.tolist()):
+            self.model.AddHint(var, value)
+        logger.debug(f"SparseAssignmentModel: ヒントを設定しました。ヒント中の割り当て数: {int(hinted.sum())}")
+
+    def add_fixing(self, vector: np.ndarray, students: np.ndarray) -> cp_model.IntVar:
+        """
+        指定した学生の変数を割り当てベクトルの値に固定する制約を追加する。
+        制約は返されるリテラルが真のときだけ有効になるため、仮定 (AddAssumptions) で
+        一時的に固定し、ClearAssumptions で固定を解除できる。
+        """
+        fix_literal = self.model.NewBoolVar('fix_to_incumbent')
+        hinted = np.asarray(vector)[self.pair_students] == self.pair_seminars
+        for k in np.flatnonzero(np.isin(self.pair_students, students)).tolist():
+            self.model.Add(self.variables[k] == int(hinted[k])).OnlyEnforceIf(fix_literal)
+        return fix_literal
+
+class AggregatedAssignmentModel(AssignmentModel):
+    """
+    希望リストが同一の学生をまとめた集約モデル。
+
+    同じ希望リスト (プロファイル) を持つ学生は、どのセミナーに対しても同じ重みを持つため、
+    学生ごとの 0-1 変数の代わりに (プロファイル, 希望セミナー) ごとの人数を整数変数とする。
+    集約前のモデルの解と集約後のモデルの解は人数を通じて1対1に対応するため、最適値は変わらない。
+    求解後は、各プロファイルの学生に人数分ずつセミナーを割り当てて学生ごとの割り当てに戻す。
+    """
+    def __init__(self, problem_data: ProblemData):
+        self.problem_data = problem_data
+        self.model = cp_model.CpModel()
+
+        # 希望リスト (順位の位置を含む) が同一の学生をまとめる
+        profiles, representatives, inverse, counts = np.unique(
+            problem_data.preference_matrix, axis=0, return_index=True, return_inverse=True, return_counts=True
+        )
+        self.student_profiles: np.ndarray = inverse.reshape(-1).astype(np.int64)
+        self.profile_counts: np.ndarray = counts.astype(np.int64)
+        num_profiles = len(counts)
+
+        # プロファイルごとの学生 (プロファイル順に並べたインデックスと各プロファイルの開始位置)
+        self._members_order = np.argsort(self.student_profiles, kind='stable')
+        self._member_starts = np.concatenate([[0], np.cumsum(self.profile_counts)])
+
+        # (プロファイル, 希望セミナー) の組。重みは代表の学生の重みと同じ
+        profile_rows, rank_cols = np.nonzero(profiles >= 0)
+        self.pair_profiles: np.ndarray = profile_rows.astype(np.int64)
+        self.pair_seminars: np.ndarray = profiles[profile_rows, rank_cols].astype(np.int64)
+        self.pair_weights: np.ndarray = problem_data.preference_weights[representatives[profile_rows], rank_cols]
+
+        # 変数の定義: variables[k] = プロファイル pair_profiles[k] の学生のうちセミナー pair_seminars[k] に割り当てる人数
+        upper_bounds = np.minimum(self.profile_counts[self.pair_profiles], problem_data.capacities[self.pair_seminars])
+        self.variables: List[cp_model.IntVar] = [
+            self.model.NewIntVar(0, int(ub), f'y_{p}_{s}')
+            for p, s, ub in zip(self.pair_profiles.tolist(), self.pair_seminars.tolist(), upper_bounds.tolist())
+        ]
+        logger.info(f"AggregatedAssignmentModel: 学生 {problem_data.num_students} 人を {num_profiles} 個のプロファイルに集約しました。変数数: {len(self.variables)}")
+
+        # 制約1: 各プロファイルで割り当てる人数の合計はプロファイルの人数以下
+        profile_starts = np.searchsorted(self.pair_profiles, np.arange(num_profiles + 1))
+        for p in range(num_profiles):
+            start, end = int(profile_starts[p]), int(profile_starts[p + 1])
+            if int(upper_bounds[start:end].sum()) > int(self.profile_counts[p]):
+                self.model.Add(cp_model.LinearExpr.Sum(self.variables[start:end]) <= int(self.profile_counts[p]))
+        logger.debug("AggregatedAssignmentModel: 各プロファイルの人数制約を追加しました。")
+
+        # 制約2: 各セミナーの定員制約
+        by_seminar = np.argsort(self.pair_seminars, kind='stable')
+        seminar_starts = np.searchsorted(self.pair_seminars[by_seminar], np.arange(problem_data.num_seminars + 1))
+        for s in range(problem_data.num_seminars):
+            members = by_seminar[seminar_starts[s]:seminar_starts[s + 1]]
+            capacity = int(problem_data.capacities[s])
+            if int(upper_bounds[members].sum()) > capacity:
+                self.model.Add(cp_model.LinearExpr.Sum([self.variables[k] for k in members.tolist()]) <= capacity)
+        logger.debug("AggregatedAssignmentModel: 各セミナーの定員制約を追加しました。")
+
+        # 目的関数の定義: 希望順位に基づいてスコアを最大化
+        self.model.Maximize(cp_model.LinearExpr.WeightedSum(self.variables, self.pair_weights.tolist()))
+        logger.debug("AggregatedAssignmentModel: 目的関数を定義しました。")
+
+    def _pair_counts(self, vector: np.ndarray, students: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        割り当てベクトルから (プロファイル, 希望セミナー) の組ごとの人数を数える。
+        students を渡すとその学生のみを数える。希望外のセミナーへの割り当ては無視する。
+        """
+        vector = np.asarray(vector)
+        selected = np.arange(len(vector)) if students is None else np.asarray(students, dtype=np.int64)
+        selected = selected[vector[selected] >= 0]
+        num_keys = len(self.profile_counts) * (self.problem_data.num_seminars + 1)
+        keys = self.student_profiles[selected] * (self.problem_data.num_seminars + 1) + vector[selected]
+        key_counts = np.bincount(keys, minlength=num_keys)
+        return key_counts[self.pair_profiles * (self.problem_data.num_seminars + 1) + self.pair_seminars]
+
+    def extract_vector(self, solver: cp_model.CpSolver) -> np.ndarray:
+        """
+        解の人数を学生ごとの割り当てベクトルに戻す。
+        各プロファイルの学生に、組の順に人数分ずつセミナーを割り当てる。
+        """
+        vector = np.full(self.problem_data.num_students, UNASSIGNED, dtype=np.int32)
+        next_member = self._member_starts[:-1].copy()
+        for k, var in enumerate(self.variables):
+            amount = solver.Value(var)
+            if amount <= 0:
+                continue
+            p = int(self.pair_profiles[k])
+            start = int(next_member[p])
+            vector[self._members_order[start:start + amount]] = self.pair_seminars[k]
+            next_member[p] = start + amount
+        return vector
+
+    def add_hint(self, vector: np.ndarray):
+        """割り当てベクトルの組ごとの人数を解のヒント (AddHint) として設定する。"""
+        self.model.ClearHints()
+        for var, value in zip(self.variables, self._pair_counts(vector).tolist()):
+            self.model.AddHint(var, value)
+
+    def add_fixing(self, vector: np.ndarray, students: np.ndarray) -> cp_model.IntVar:
+        """
+        指定した学生の割り当てを保つ制約を、組ごとの人数の下限として追加する。
+        返されるリテラルが真のときだけ有効になる。
+        """
+        fix_literal = self.model.NewBoolVar('fix_to_incumbent')
+        for k, amount in enumerate(self._pair_counts(vector, students).tolist()):
+            if amount > 0:
+                self.model.Add(self.variables[k] >= amount).OnlyEnforceIf(fix_literal)
+        return fix_literal
@@ -0,0 +1,187 @@
+from ortools.graph.python import min_cost_flow # 最小費用流ソルバー
+import time
+import logging
+import threading
+from typing import Dict, List, Any, Callable, Optional
+import numpy as np
+
+# BaseOptimizerとOptimizationResultをutilsからインポート
+from seminar_optimization.utils import BaseOptimizer, OptimizationResult
+from seminar_optimization.problem_data import ProblemData
+# ロギングは logger_config.py で一元的に設定されるため、ここではロガーの取得のみ
+from seminar_optimization.logger_config import logger
+
+def solve_transportation(pair_nodes: np.ndarray,
+                         pair_seminars: np.ndarray,
+                         pair_weights: np.ndarray,
+                         node_counts: np.ndarray,
+                         capacities: np.ndarray,
+                         weight_scale: int = 1000) -> Optional[np.ndarray]:
+    """
+    ノード (学生、または同じ重みを持つ学生の集まり) をセミナーに割り当てる輸送問題を最小費用流で厳密に解く。
+    ノード n は node_counts[n] 人を表し、(ノード, セミナー) の組 k に1人割り当てるごとに pair_weights[k] のスコアを得る。
+    組ごとの割り当て人数 (整数) を返す。ソルバーが最適解を返さなかった場合は None。
+
+    ネットワーク:
+        ソース -> ノード (容量=人数, 費用0)
+        ノード -> 希望セミナー (容量=人数, 費用 -重み×スケール)
+        ノード -> シンク (容量=人数, 費用0)  ... 未割り当てを表す枝
+        セミナー -> シンク (容量=定員, 費用0)
+    """
+    num_nodes = len(node_counts)
+    num_seminars = len(capacities)
+    node_counts = np.asarray(node_counts, dtype=np.int64)
+
+    # ノード番号: ソース=0, ノード=1..M, セミナー=M+1..M+S, シンク=M+S+1
+    source = 0
+    node_ids = np.arange(1, num_nodes + 1, dtype=np.int64)
+    seminar_offset = num_nodes + 1
+    sink = num_nodes + num_seminars + 1
+    pair_nodes = np.asarray(pair_nodes, dtype=np.int64)
+    pair_costs = -np.rint(np.asarray(pair_weights) * weight_scale).astype(np.int64)
+
+    start_nodes = np.concatenate([
+        np.full(num_nodes, source, dtype=np.int64), # ソース -> ノード
+        node_ids[pair_nodes], # ノード -> 希望セミナー
+        node_ids, # ノード -> シンク (未割り当て)
+        seminar_offset + np.arange(num_seminars, dtype=np.int64), # セミナー -> シンク
+    ])
+    end_nodes = np.concatenate([
+        node_ids,
+        seminar_offset + np.asarray(pair_seminars, dtype=np.int64),
+        np.full(num_nodes, sink, dtype=np.int64),
+        np.full(num_seminars, sink, dtype=np.int64),
+    ])
+    arc_capacities = np.concatenate([
+        node_counts,
+        node_counts[pair_nodes],
+        node_counts,
+        np.asarray(capacities, dtype=np.int64),
+    ])
+    unit_costs = np.concatenate([
+        np.zeros(num_nodes, dtype=np.int64),
+        pair_costs,
+        np.zeros(num_nodes, dtype=np.int64),
+        np.zeros(num_seminars, dtype=np.int64),
+    ])
+
+    smcf = min_cost_flow.SimpleMinCostFlow()
+    smcf.add_arcs_with_capacity_and_unit_cost(start_nodes, end_nodes, arc_capacities, unit_costs)
+    # 全員分の流量をソースからシンクへ流す (未割り当ての枝があるため常に実行可能)
+    total = int(node_counts.sum())
+    smcf.set_node_supply(source, total)
+    smcf.set_node_supply(sink, -total)
+    logger.debug(f"solve_transportation: ネットワークを構築しました。ノード数: {sink + 1}, 枝数: {len(start_nodes)}")
+
+    status = smcf.solve()
+    if status != smcf.OPTIMAL:
+        logger.error(f"solve_transportation: 解が見つからないステータスです: {status.name}")
+        return None
+    logger.debug(f"solve_transportation: 最小費用: {smcf.optimal_cost()} (スケール {weight_scale})")
+    pair_arcs = np.arange(num_nodes, num_nodes + len(pair_nodes), dtype=np.int64)
+    return smcf.flows(pair_arcs).astype(np.int64)
+
+class FlowOptimizer(BaseOptimizer): # BaseOptimizerを継承
+    """
+    最小費用流 (Min-Cost Flow) を用いたセミナー割り当て最適化アルゴリズム。
+    制約が定員のみで、スコアが (学生, セミナー) ごとの重みの和であるため、
+    割り当て問題は輸送問題として多項式時間で厳密に解ける。
+    Google OR-Tools の SimpleMinCostFlow を使用する。
+
+    ネットワーク:
+        ソース -> 学生 (容量1, 費用0)
+        学生 -> 希望セミナー (容量1, 費用 -重み×スケール)
+        学生 -> シンク (容量1, 費用0)  ... 未割り当てを表す枝
+        セミナー -> シンク (容量=定員, 費用0)
+    """
+    def __init__(self,
+                 seminars: List[Dict[str, Any]],
+                 students: List[Dict[str, Any]],
+                 config: Dict[str, Any],
+                 progress_callback: Optional[Callable[[str], None]] = None,
+                 initial_assignment: Optional[Dict[str, str]] = None, # 厳密解法のため開始点は不要 (API をそろえるために受け取る)
+                 problem_data: Optional[ProblemData] = None): # 構築済みの問題表現 (共有する場合)
+        # BaseOptimizerの__init__を呼び出す
+        super().__init__(seminars, students, config, progress_callback, initial_assignment, problem_data)
+        logger.debug("FlowOptimizer: 初期化を開始します。")
+
+        # 重み (希望順位の重み × 倍率) を整数の費用に変換するときの倍率
+        self.weight_scale = config.get("flow_weight_scale", 1000)
+        logger.debug(f"FlowOptimizer: 重みのスケール: {self.weight_scale}")
+
+    def optimize(self, cancel_event: Optional[threading.Event] = None) -> OptimizationResult:
+        """
+        最小費用流ネットワークを構築し、SimpleMinCostFlow で最適化を実行する。
+        """
+        start_time = time.time()
+        self._log("Flow 最適化を開始します...")
+
+        problem = self.problem_data
+        num_students = problem.num_students
+        num_seminars = problem.num_seminars
+
+        # 学生 -> 希望セミナーの枝。存在しないセミナーの希望は -1 で除外される
+        student_rows, rank_cols = np.nonzero(problem.preference_matrix >= 0)
+        pair_seminars = problem.preference_matrix[student_rows, rank_cols].astype(np.int64)
+        pair_weights = problem.preference_weights[student_rows, rank_cols]
+        self._log(f"Flow: ネットワークを構築します。学生数: {num_students}, セミナー数: {num_seminars}, 希望の枝数: {len(student_rows)}")
+
+        if cancel_event and cancel_event.is_set():
+            self._log("Flow 最適化がキャンセルされました。")
+            return OptimizationResult(
+                status="CANCELLED",
+                message="最適化がユーザーによってキャンセルされました。",
+                best_score=-float('inf'),
+                best_assignment={},
+                seminar_capacities=self.seminar_capacities,
+                unassigned_students=self.student_ids,
+                optimization_strategy="Flow"
+            )
+
+        # 各学生を人数1のノードとする輸送問題として解く
+        flows = solve_transportation(student_rows, pair_seminars, pair_weights,
+                                     np.ones(num_students, dtype=np.int64), problem.capacities, self.weight_scale)
+
+        final_assignment: Dict[str, str] = {}
+        final_score = -float('inf')
+
+        if flows is not None:
+            # 流量が1の学生 -> セミナーの枝が割り当てを表す
+            chosen = np.flatnonzero(flows > 0)
+            vector = np.full(num_students, -1, dtype=np.int32)
+            vector[student_rows[chosen]] = pair_seminars[chosen]
+            final_assignment = problem.decode(vector)
+            # スケール後の整数費用ではなく、元の重みで最終スコアを計算する
+            final_score = problem.score(vector)
+
+            if self._is_feasible_assignment(final_assignment):
+                status_str = "OPTIMAL"
+                message = "Flow最適化が成功しました。"
+                self._log(f"FlowOptimizer: 最適解が見つかりました。スコア: {final_score:.2f}")
+                self._report_best_score(final_score)
+            else:
+                status_str = "INFEASIBLE"
+                message = "Flowソルバーが実行不可能な解を返しました。定員制約を満たしていません。"
+                final_assignment = {} # 無効な割り当てはクリア
+                final_score = -float('inf')
+                self._log("FlowOptimizer: ソルバーが返した解が実行不可能です。", level=logging.ERROR)
+        else:
+            status_str = "FAILED"
+            message = "Flowソルバーで解が見つかりませんでした。"
+            self._log(message, level=logging.ERROR)
+
+        end_time = time.time()
+        duration = end_time - start_time
+        self._log(f"Flow 最適化完了。実行時間: {duration:.2f}秒")
+
+        unassigned_students = self._get_unassigned_students(final_assignment)
+
+        return OptimizationResult(
+            status=status_str,
+            message=message,
+            best_score=final_score,
+            best_assignment=final_assignment,
+            seminar_capacities=self.seminar_capacities,
+            unassigned_students=unassigned_students,
+            optimization_strategy="Flow"
+        )
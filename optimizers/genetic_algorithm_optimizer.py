@@ -1,13 +1,87 @@
 import random
 import copy
+import logging
+import queue
 import threading
 import time
+import multiprocessing
 from typing import Dict, List, Any, Callable, Optional, Tuple
+import numpy as np
 
 # BaseOptimizerとOptimizationResultをutilsからインポート
 from seminar_optimization.utils import BaseOptimizer, OptimizationResult # <-- 修正: 相対インポート
 # ロギングは logger_config.py で一元的に設定されるため、ここではロガーの取得のみ
 from seminar_optimization.logger_config import logger # <-- 修正: 相対インポート
+from seminar_optimization.delta_evaluator import DeltaEvaluator
+from seminar_optimization.capacity_ledger import CapacityLedger
+from seminar_optimization.problem_data import ProblemData, UNASSIGNED
+from seminar_optimization.assignment_operators import AssignmentOperators
+
+class _IslandMigration:
+    """
+    島モデルの移住処理。自分の上位個体を次の島の受信キューへ送り、前の島から届いた個体で
+    自分の最も悪い個体を置き換える。前の島が終了した (None を受信した) 後は送信のみ行う。
+    """
+    def __init__(self, inbox: Any, outbox: Any, migration_size: int, cancel_event: Optional[Any] = None):
+        self.inbox = inbox
+        self.outbox = outbox
+        self.migration_size = migration_size
+        self.cancel_event = cancel_event
+        self.predecessor_done = False
+        self.received = 0
+
+    def __call__(self, population: np.ndarray, fitnesses: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        emigrants = np.argsort(-fitnesses, kind='stable')[:self.migration_size]
+        self.outbox.put((population[emigrants].copy(), fitnesses[emigrants].copy()))
+        while not self.predecessor_done:
+            if self.cancel_event and self.cancel_event.is_set():
+                break
+            try:
+                message = self.inbox.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            if message is None:
+                self.predecessor_done = True
+                break
+            immigrants, immigrant_fitnesses = message
+            worst = np.argsort(fitnesses, kind='stable')[:len(immigrants)]
+            population[worst] = immigrants
+            fitnesses[worst] = immigrant_fitnesses
+            self.received += len(immigrants)
+            break
+        return population, fitnesses
+
+def _run_island(seminars: List[Dict[str, Any]],
+                students: List[Dict[str, Any]],
+                config: Dict[str, Any],
+                island_idx: int,
+                island_seed: int,
+                inbox: Any,
+                outbox: Any,
+                result_queue: Any,
+                cancel_event: Optional[Any] = None,
+                initial_assignment: Optional[Dict[str, str]] = None,
+                problem_data: Optional[ProblemData] = None):
+    """
+    島モデルの1つの島 (部分個体群) を別プロセスで進化させ、結果を result_queue に送る。
+    initial_assignment が与えられた場合は、それを初期個体群の1個体とする。
+    problem_data は呼び出し側で構築済みの問題表現で、島ごとに作り直さずに使う。
+    """
+    # 後続の島が先に終了しても、未読の移住個体を残したままこのプロセスが終了できるようにする
+    outbox.cancel_join_thread()
+    try:
+        optimizer = GeneticAlgorithmOptimizer(seminars, students, dict(config, random_seed=island_seed, ga_islands=1),
+                                              progress_callback=lambda message: None, initial_assignment=initial_assignment,
+                                              problem_data=problem_data)
+        migration = _IslandMigration(inbox, outbox, optimizer.migration_size, cancel_event)
+        best_vector, best_score, generations = optimizer._evolve(cancel_event, migration)
+        result = (island_idx, best_vector, best_score, generations, migration.received, optimizer.fitness_cache.hit_rate, None)
+    except Exception as e:
+        # 構築や進化に失敗した島も結果を返し、呼び出し側が全ての島を待ち終えられるようにする
+        result = (island_idx, None, -float('inf'), 0, 0, 0.0, f"{type(e).__name__}: {e}")
+    finally:
+        outbox.put(None) # 終了したことを後続の島に伝える
+    result_queue.put(result)
 
 class GeneticAlgorithmOptimizer(BaseOptimizer): # BaseOptimizerを継承
     """
@@ -17,10 +91,12 @@ class GeneticAlgorithmOptimizer(BaseOptimizer): # BaseOptimizerを継承
                  seminars: List[Dict[str, Any]], 
                  students: List[Dict[str, Any]], 
                  config: Dict[str, Any],
-                 progress_callback: Optional[Callable[[str], None]] = None # progress_callbackを追加
+                 progress_callback: Optional[Callable[[str], None]] = None, # progress_callbackを追加
+                 initial_assignment: Optional[Dict[str, str]] = None, # ウォームスタートに使う割り当て
+                 problem_data: Optional[ProblemData] = None # 構築済みの問題表現 (共有する場合)
                  ):
         # BaseOptimizerの__init__を呼び出す
-        super().__init__(seminars, students, config, progress_callback) 
+        super().__init__(seminars, students, config, progress_callback, initial_assignment, problem_data) 
         logger.debug("GeneticAlgorithmOptimizer: 初期化を開始します。")
         
         # 固有のパラメータはconfigから取得
@@ -31,37 +107,43 @@ class GeneticAlgorithmOptimizer(BaseOptimizer): # BaseOptimizerを継承
         self.no_improvement_limit = config.get("ga_no_improvement_limit", 50) # 改善がない場合に早期停止する世代数
         logger.debug(f"GA_LS: 個体群サイズ={self.population_size}, 世代数={self.generations}, 変異率={self.mutation_rate}, 交叉率={self.crossover_rate}, 改善停止世代={self.no_improvement_limit}")
 
+        # 個体群を P×N の int32 行列として扱うベクトル化エンジン ("vectorized") か、辞書ベースの従来エンジン ("legacy") か
+        self.engine = config.get("ga_engine", "vectorized")
+        self.selection_method = config.get("ga_selection", "tournament") # "tournament" または "sus"
+        self.crossover_method = config.get("ga_crossover", "uniform") # "uniform" または "one_point"
+        self.tournament_size = config.get("ga_tournament_size", 3)
+        self.local_search_iterations = config.get("local_search_iterations", 100)
+        self.np_rng = np.random.default_rng(config.get("random_seed"))
+        # 交叉・突然変異の後に定員超過を修復し、実行可能な個体だけを探索する
+        self.repair = config.get("ga_repair", True)
+        logger.debug(f"GA_LS: 定員修復: {self.repair}")
+        # 島モデル: ga_islands 個の部分個体群を別プロセスで進化させ、ga_migration_interval 世代ごとに
+        # 上位 ga_migration_size 個体をリング状に隣の島へ移住させる
+        self.num_islands = config.get("ga_islands", 1)
+        self.migration_interval = config.get("ga_migration_interval", 10)
+        self.migration_size = config.get("ga_migration_size", 2)
+        self.random_seed = config.get("random_seed")
+        # 辞書ベースのエンジンと局所探索の乱数も、グローバルな状態ではなくこの最適化専用のストリームから取り出す
+        self.rng = random.Random(self.random_seed)
+        logger.debug(f"GA_LS: 島の数={self.num_islands}, 移住間隔={self.migration_interval}, 移住数={self.migration_size}")
+        logger.debug(f"GA_LS: エンジン={self.engine}, 選択={self.selection_method}, 交叉={self.crossover_method}, トーナメントサイズ={self.tournament_size}")
+
+        # 突然変異・定員修復に使う、定員を考慮した割り当て演算子 (乱数は self.np_rng を共有する)
+        self.operators = AssignmentOperators(self.problem_data, self.np_rng)
+
     def _generate_initial_population(self) -> List[Dict[str, str]]:
         """
         初期個体群を生成する。
         各個体は、学生の希望に基づいたランダムな割り当て（定員制約を考慮）となる。
+        ウォームスタート用の割り当てが与えられた場合は、それを最初の個体とする。
         """
         logger.debug("GeneticAlgorithmOptimizer: 初期個体群の生成を開始します。")
-        population = []
-        for _ in range(self.population_size):
-            assignment: Dict[str, str] = {}
-            seminar_current_counts = {s_id: 0 for s_id in self.seminar_ids}
-            
-            # 学生をランダムな順序で処理
-            shuffled_students = list(self.student_ids)
-            random.shuffle(shuffled_students)
-
-            for student_id in shuffled_students:
-                preferences = self.student_preferences.get(student_id, [])
-                assigned = False
-                # 希望順に割り当てを試みる
-                for preferred_seminar_id in preferences:
-                    capacity = self.seminar_capacities.get(preferred_seminar_id)
-                    if capacity is not None and seminar_current_counts[preferred_seminar_id] < capacity:
-                        assignment[student_id] = preferred_seminar_id
-                        seminar_current_counts[preferred_seminar_id] += 1
-                        assigned = True
-                        break
-                # 希望するセミナーに割り当てられなかった場合、ランダムな空きセミナーに割り当てる
-                # または未割り当てのままにする（ここでは未割り当てのまま）
-                if not assigned:
-                    pass # 未割り当てのままにする
-            population.append(assignment)
+        # 学生をランダムな順序で処理し、希望順に定員の空きがあるセミナーへ割り当てる
+        # 希望するセミナーに割り当てられなかった学生は未割り当てのままにする
+        population = [self.problem_data.decode(self._greedy_assignment_vector(self.np_rng.permutation(self.problem_data.num_students))) for _ in range(self.population_size)]
+        warm_start_vector = self._initial_assignment_vector()
+        if warm_start_vector is not None and population:
+            population[0] = self.problem_data.decode(warm_start_vector)
         logger.info(f"GeneticAlgorithmOptimizer: {len(population)} 個の初期個体群を生成しました。")
         return population
 
@@ -70,26 +152,29 @@ class GeneticAlgorithmOptimizer(BaseOptimizer): # BaseOptimizerを継承
         割り当ての適応度（スコア）を計算する。
         定員制約を満たさない場合はペナルティを与える。
         """
-        score = self._calculate_score(assignment)
-        if not self._is_feasible_assignment(assignment):
-            # 定員オーバーのセミナーがある場合、大きなペナルティ
-            # 未割り当て学生がいる場合もペナルティ
-            penalty = 0.0
-            seminar_counts = {s_id: 0 for s_id in self.seminar_ids}
-            for assigned_seminar_id in assignment.values():
-                seminar_counts[assigned_seminar_id] = seminar_counts.get(assigned_seminar_id, 0) + 1
-            
-            for seminar_id, count in seminar_counts.items():
-                capacity = self.seminar_capacities.get(seminar_id, 0)
-                if count > capacity:
-                    penalty += (count - capacity) * 100.0 # 定員オーバー1人あたり100点のペナルティ
-            
-            unassigned_students_count = len(self._get_unassigned_students(assignment))
-            penalty += unassigned_students_count * 50.0 # 未割り当て1人あたり50点のペナルティ
+        fitness = float(self._evaluate_population([assignment])[0])
+        logger.debug(f"GA_LS: 個体の適応度: {fitness:.2f}")
+        return fitness
+
+    def _evaluate_population(self, population: List[Dict[str, str]]) -> np.ndarray:
+        """
+        個体群全体の適応度を P×N の割り当て行列としてまとめて計算する。
+        """
+        matrix = np.stack([self.problem_data.encode(individual) for individual in population]) \
+            if population else np.empty((0, self.problem_data.num_students), dtype=np.int32)
+        return self._evaluate_matrix(matrix)
 
-            score -= penalty
-            logger.debug(f"GA_LS: 不適合な割り当てにペナルティ {penalty:.2f} を適用しました。調整後スコア: {score:.2f}")
-        return score
+    def _penalized_fitness(self, score, overload, unassigned_count):
+        """
+        スコア・定員超過人数・未割り当て学生数から適応度を計算する。
+        定員を超えるセミナーがある場合のみペナルティを与える。
+        スカラーでも、個体群ごとの配列でも計算できる。
+        """
+        # 定員オーバー1人あたり100点、未割り当て1人あたり50点のペナルティ
+        penalized = score - overload * 100.0 - unassigned_count * 50.0
+        if np.ndim(score) == 0:
+            return penalized if overload > 0 else score
+        return np.where(overload > 0, penalized, score)
 
     def _selection(self, population: List[Dict[str, str]], fitnesses: List[float]) -> List[Dict[str, str]]:
         """
@@ -104,10 +189,10 @@ class GeneticAlgorithmOptimizer(BaseOptimizer): # BaseOptimizerを継承
 
         if total_adjusted_fitness == 0: # 全ての個体が同じ（低い）適応度の場合
             logger.warning("GA_LS: 全ての個体の適応度が同じか非常に低いため、ランダム選択にフォールバックします。")
-            return random.sample(population, self.population_size)
+            return self.rng.sample(population, self.population_size)
 
         for _ in range(self.population_size):
-            pick = random.uniform(0, total_adjusted_fitness)
+            pick = self.rng.uniform(0, total_adjusted_fitness)
             current = 0
             for i, individual in enumerate(population):
                 current += adjusted_fitnesses[i]
@@ -130,7 +215,7 @@ class GeneticAlgorithmOptimizer(BaseOptimizer): # BaseOptimizerを継承
         if not student_ids: # 学生がいない場合は空の割り当てを返す
             return {}, {}
 
-        crossover_point = random.randint(1, len(student_ids) - 1)
+        crossover_point = self.rng.randint(1, len(student_ids) - 1)
 
         for i, student_id in enumerate(student_ids):
             if i < crossover_point:
@@ -153,45 +238,41 @@ class GeneticAlgorithmOptimizer(BaseOptimizer): # BaseOptimizerを継承
         ランダムな学生の割り当てを変更するか、未割り当てにする。
         """
         logger.debug("GeneticAlgorithmOptimizer: 突然変異を適用します。")
-        mutated_assignment = assignment.copy()
-        for student_id in self.student_ids:
-            if random.random() < self.mutation_rate:
+        problem = self.problem_data
+        vector = problem.encode(assignment)
+        # セミナーの人数は台帳で管理し、定員チェックを割り当て全体の走査なしで行う
+        ledger = CapacityLedger(problem.capacities, vector)
+        for student_idx in range(problem.num_students):
+            if self.rng.random() < self.mutation_rate:
                 # 突然変異の種類を選択:
                 # 1. 未割り当ての学生を割り当てる
                 # 2. 割り当て済みの学生のセミナーを変更する
                 # 3. 割り当て済みの学生を未割り当てにする
+                current_seminar = int(vector[student_idx])
                 
-                if student_id not in mutated_assignment: # 未割り当ての場合
-                    preferences = self.student_preferences.get(student_id, [])
-                    if preferences:
-                        # 希望の中からランダムに選択し、定員に空きがあれば割り当てる
-                        random.shuffle(preferences)
-                        for preferred_seminar_id in preferences:
-                            if preferred_seminar_id in self.seminar_capacities and \
-                               list(mutated_assignment.values()).count(preferred_seminar_id) < self.seminar_capacities[preferred_seminar_id]:
-                                mutated_assignment[student_id] = preferred_seminar_id
-                                logger.debug(f"GA_LS: 学生 {student_id} を未割り当てから {preferred_seminar_id} に変異させました。")
-                                break
+                if current_seminar == UNASSIGNED: # 未割り当ての場合
+                    preferences = problem.preference_lists[student_idx]
+                    # 希望の中からランダムな順に、定員に空きがあれば割り当てる
+                    for preferred_seminar in self.rng.sample(preferences, len(preferences)):
+                        if ledger.has_room(preferred_seminar):
+                            ledger.add(student_idx, preferred_seminar)
+                            vector[student_idx] = preferred_seminar
+                            logger.debug(f"GA_LS: 学生 {problem.student_ids[student_idx]} を未割り当てから {problem.seminar_ids[preferred_seminar]} に変異させました。")
+                            break
                 else: # 割り当て済みの場合
-                    current_seminar = mutated_assignment[student_id]
                     # 50%の確率で別のセミナーへ移動、50%の確率で未割り当てにする
-                    if random.random() < 0.5 and len(self.seminar_ids) > 1:
-                        available_seminars = [s for s in self.seminar_ids if s != current_seminar]
-                        if available_seminars:
-                            new_seminar = random.choice(available_seminars)
-                            if list(mutated_assignment.values()).count(new_seminar) < self.seminar_capacities[new_seminar]:
-                                mutated_assignment[student_id] = new_seminar
-                                logger.debug(f"GA_LS: 学生 {student_id} を {current_seminar} から {new_seminar} に変異させました。")
-                            else: # 新しいセミナーの定員が満杯なら未割り当てにする
-                                del mutated_assignment[student_id]
-                                logger.debug(f"GA_LS: 学生 {student_id} を {current_seminar} から未割り当てに変異させました (移動失敗)。")
-                        else: # 他にセミナーがない場合、未割り当てにする
-                            del mutated_assignment[student_id]
-                            logger.debug(f"GA_LS: 学生 {student_id} を {current_seminar} から未割り当てに変異させました (移動先なし)。")
-                    else:
-                        del mutated_assignment[student_id] # 未割り当てにする
-                        logger.debug(f"GA_LS: 学生 {student_id} を {current_seminar} から未割り当てに変異させました。")
-        return mutated_assignment
+                    new_seminar = UNASSIGNED
+                    if self.rng.random() < 0.5 and problem.num_seminars > 1:
+                        candidate = self.rng.randrange(problem.num_seminars - 1)
+                        if candidate >= current_seminar:
+                            candidate += 1
+                        if ledger.has_room(candidate):
+                            new_seminar = candidate
+                        # 新しいセミナーの定員が満杯なら未割り当てにする
+                    ledger.move(student_idx, current_seminar, new_seminar)
+                    vector[student_idx] = new_seminar
+                    logger.debug(f"GA_LS: 学生 {problem.student_ids[student_idx]} を {problem.seminar_ids[current_seminar]} から {problem.seminar_ids[new_seminar] if new_seminar >= 0 else '未割り当て'} に変異させました。")
+        return problem.decode(vector)
 
     def _apply_local_search(self, assignment: Dict[str, str], iterations: int = 100) -> Dict[str, str]:
         """
@@ -199,51 +280,370 @@ class GeneticAlgorithmOptimizer(BaseOptimizer): # BaseOptimizerを継承
         これは GreedyLSOptimizer の _local_search の簡易版。
         """
         logger.debug("GeneticAlgorithmOptimizer: 局所探索を個体に適用します。")
-        current_assignment = assignment.copy()
-        current_score = self._evaluate_fitness(current_assignment)
+        problem = self.problem_data
+        return problem.decode(self._local_search_vector(problem.encode(assignment), iterations)[0])
+
+    def _local_search_vector(self, vector: np.ndarray, iterations: int = 100) -> Tuple[np.ndarray, int]:
+        """
+        割り当てベクトルに局所探索を適用し、改善後のベクトルとその Zobrist ハッシュを返す。
+        """
+        problem = self.problem_data
+        # 割り当てのコピーを作らず、差分評価器で各候補の適応度変化を O(1) で求める
+        # ハッシュも移動のたびに差分更新し、改善後の個体をキャッシュで引くときに再計算しない
+        evaluator = DeltaEvaluator(problem, vector, self.fitness_cache.hasher)
+        current_score = self._penalized_fitness(evaluator.score, evaluator.overload, evaluator.unassigned_count)
+        # 未割り当てにするオプションと、別のセミナーへの移動オプション
+        move_targets = [UNASSIGNED] + list(range(problem.num_seminars))
 
         for _ in range(iterations):
-            if not current_assignment:
+            student_idx = evaluator.random_assigned_student(self.rng)
+            if student_idx is None:
                 break # 割り当てがない場合は終了
+            original_seminar = evaluator.seminar_of(student_idx)
 
-            student_id = random.choice(list(current_assignment.keys()))
-            original_seminar = current_assignment[student_id]
-
-            # 別のセミナーに移動を試みる
-            possible_moves = []
-            # 未割り当てにするオプション
-            temp_assignment_unassigned = current_assignment.copy()
-            del temp_assignment_unassigned[student_id]
-            if self._is_feasible_assignment(temp_assignment_unassigned):
-                possible_moves.append((temp_assignment_unassigned, self._evaluate_fitness(temp_assignment_unassigned)))
-
-            # 別のセミナーへの移動オプション
-            for target_seminar in self.seminar_ids:
-                if target_seminar == original_seminar:
+            best_target = None
+            best_move_score = current_score
+            for target_seminar in move_targets:
+                if target_seminar == original_seminar or not evaluator.has_room(target_seminar):
                     continue
-                temp_assignment_move = current_assignment.copy()
-                # 元のセミナーの定員を一旦解放
-                temp_assignment_move[student_id] = target_seminar # 新しいセミナーに割り当て
-
-                if self._is_feasible_assignment(temp_assignment_move):
-                    possible_moves.append((temp_assignment_move, self._evaluate_fitness(temp_assignment_move)))
+                score_delta, overload_delta, unassigned_delta = evaluator.move_effect(student_idx, target_seminar)
+                move_score = self._penalized_fitness(evaluator.score + score_delta,
+                                                     evaluator.overload + overload_delta,
+                                                     evaluator.unassigned_count + unassigned_delta)
+                if move_score > best_move_score:
+                    best_target = target_seminar
+                    best_move_score = move_score
             
-            if possible_moves:
-                best_move_assignment, best_move_score = max(possible_moves, key=lambda x: x[1])
-                if best_move_score > current_score:
-                    current_assignment = best_move_assignment
-                    current_score = best_move_score
-                    logger.debug(f"GA_LS: 個体への局所探索でスコア改善: {current_score:.2f}")
+            if best_target is not None:
+                evaluator.apply_move(student_idx, best_target)
+                current_score = best_move_score
+                logger.debug(f"GA_LS: 個体への局所探索でスコア改善: {current_score:.2f}")
             
-        return current_assignment
+        return evaluator.vector(), evaluator.hash
+
+    def _repair(self, assignment: Dict[str, str]) -> Dict[str, str]:
+        """
+        1つの割り当ての定員超過を修復する (_repair_matrix の1行版)。
+        """
+        problem = self.problem_data
+        return problem.decode(self._repair_matrix(problem.encode(assignment)[np.newaxis, :])[0])
+
+    def _repair_matrix(self, population: np.ndarray) -> np.ndarray:
+        """
+        個体群行列の定員超過をその場で修復する (AssignmentOperators.repair を参照)。
+        定員を超えたセミナーから重みの低い学生を追い出し、希望順に空き枠のあるセミナーへ入れ直す。
+        """
+        repaired, evicted, reinserted = self.operators.repair(population)
+        if evicted:
+            logger.debug(f"GA_LS: 定員修復: {evicted} 人を追い出し、{reinserted} 人を再割り当てしました。")
+        return repaired
+
+    # --- ベクトル化エンジン (個体群は P×N の int32 行列) ---
+
+    def _initial_population_matrix(self) -> np.ndarray:
+        """
+        学生の処理順序をランダムに変えた貪欲法で、P×N の初期個体群行列を生成する。
+        ウォームスタート用の割り当てが与えられた場合は、それを最初の個体 (行 0) とする。
+        """
+        num_students = self.problem_data.num_students
+        if self.population_size <= 0:
+            return np.empty((0, num_students), dtype=np.int32)
+        population = np.stack([
+            self._greedy_assignment_vector(self.np_rng.permutation(num_students))
+            for _ in range(self.population_size)
+        ])
+        warm_start_vector = self._initial_assignment_vector()
+        if warm_start_vector is not None:
+            population[0] = warm_start_vector
+        return population
+
+    def _evaluate_matrix(self, population: np.ndarray, keys: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        個体群行列の各行の適応度を計算する。
+        評価済みの割り当ては適応度キャッシュから取り出し、同じ個体 (エリートや変化しなかった子) を再評価しない。
+        keys に差分更新済みのハッシュ値を渡すと、ハッシュの再計算を省略する。
+        """
+        scores, overloads, unassigned_counts = self.fitness_cache.evaluate_batch(population, keys)
+        penalized_count = int(np.count_nonzero(overloads > 0))
+        if penalized_count:
+            logger.debug(f"GA_LS: 不適合な割り当て {penalized_count} 個にペナルティを適用しました。")
+        return self._penalized_fitness(scores, overloads, unassigned_counts)
+
+    def _select_indices(self, fitnesses: np.ndarray, count: int) -> np.ndarray:
+        """
+        親として選ぶ個体のインデックスを count 個返す。
+        トーナメント選択、または確率的普遍抽出 (SUS) を NumPy でまとめて行う。
+        """
+        population_size = len(fitnesses)
+        if self.selection_method == "sus":
+            # 適応度が負の値になる可能性を考慮し、最小値が1になるようにシフトする
+            adjusted = fitnesses - fitnesses.min() + 1.0
+            cumulative = np.cumsum(adjusted)
+            step = cumulative[-1] / count
+            pointers = self.np_rng.uniform(0, step) + step * np.arange(count)
+            selected = np.searchsorted(cumulative, pointers, side='right')
+            # 等間隔のポインタで選ぶと並びが偏るため、親の組をシャッフルする
+            return self.np_rng.permutation(np.minimum(selected, population_size - 1))
+        # トーナメント選択: count 組の候補をまとめて引き、各組で最も適応度の高い個体を選ぶ
+        contenders = self.np_rng.integers(0, population_size, size=(count, max(1, self.tournament_size)))
+        winners = np.argmax(fitnesses[contenders], axis=1)
+        return contenders[np.arange(count), winners]
+
+    def _crossover_matrix(self, parents1: np.ndarray, parents2: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        親の組 (それぞれ K×N) から子を生成する。
+        一様交叉または一点交叉の遺伝子の入れ替えをブールマスクで表し、np.where でまとめて行う。
+        交叉しない組 (確率 1 - 交叉率) はマスクが全て False になり、親がそのまま子になる。
+        """
+        num_pairs, num_students = parents1.shape
+        if self.crossover_method == "one_point" and num_students > 1:
+            points = self.np_rng.integers(1, num_students, size=num_pairs)
+            swap_mask = np.arange(num_students)[np.newaxis, :] >= points[:, np.newaxis]
+        else:
+            swap_mask = self.np_rng.random((num_pairs, num_students)) < 0.5
+        swap_mask &= (self.np_rng.random(num_pairs) < self.crossover_rate)[:, np.newaxis]
+        child1 = np.where(swap_mask, parents2, parents1)
+        child2 = np.where(swap_mask, parents1, parents2)
+        return child1, child2
+
+    def _mutate_matrix(self, population: np.ndarray) -> np.ndarray:
+        """
+        1つの乱数行列で変異する遺伝子をまとめて選び、その場で書き換える。
+        変異した学生は、自分の希望セミナーのいずれか、または未割り当てに一様に割り当て直される
+        (希望外のセミナーはスコアが 0 で定員だけを消費するため候補にしない)。
+        """
+        mutate_rows, mutate_cols = np.nonzero(self.np_rng.random(population.shape) < self.mutation_rate)
+        if len(mutate_cols) == 0:
+            return population
+        population[mutate_rows, mutate_cols] = self.operators.draw_preference_or_unassigned(mutate_cols)
+        logger.debug(f"GA_LS: {len(mutate_cols)} 個の遺伝子を変異させました。")
+        return population
+
+    def _next_generation(self,
+                         population: np.ndarray,
+                         fitnesses: np.ndarray,
+                         elite: np.ndarray,
+                         keys: np.ndarray,
+                         elite_key: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        選択・交叉・突然変異 (・定員修復) で次世代の個体群行列を作る。エリート個体は先頭の行にそのまま引き継ぐ。
+        各行の Zobrist ハッシュ値 (keys) も変化した遺伝子の分だけ差分更新し、次世代の行列とハッシュ値を返す。
+        """
+        hasher = self.fitness_cache.hasher
+        population_size = len(population)
+        num_pairs = (population_size + 1) // 2
+        parent_indices = self._select_indices(fitnesses, 2 * num_pairs)
+        indices1, indices2 = parent_indices[:num_pairs], parent_indices[num_pairs:]
+        parents1 = population[indices1]
+        child1, child2 = self._crossover_matrix(parents1, population[indices2])
+        child1_keys = hasher.update_matrix(keys[indices1], parents1, child1)
+        # 各位置で2つの子の遺伝子は2つの親の遺伝子の入れ替えなので、H(子1) ^ H(子2) = H(親1) ^ H(親2)
+        child2_keys = keys[indices1] ^ keys[indices2] ^ child1_keys
+        offspring = np.concatenate([child1, child2])[:population_size]
+        offspring_keys = np.concatenate([child1_keys, child2_keys])[:population_size]
+
+        before = offspring.copy()
+        offspring = self._mutate_matrix(offspring)
+        if self.repair:
+            offspring = self._repair_matrix(offspring)
+        offspring_keys = hasher.update_matrix(offspring_keys, before, offspring)
+        offspring[0] = elite
+        offspring_keys[0] = elite_key
+        return offspring, offspring_keys
+
+    def _optimize_vectorized(self, cancel_event: Optional[threading.Event] = None) -> Tuple[Dict[str, str], float]:
+        """
+        ベクトル化エンジンで GA を実行し、ベストの割り当てとスコアを返す。
+        """
+        best_vector, best_score, _ = self._evolve(cancel_event)
+        return (self.problem_data.decode(best_vector) if best_vector is not None else {}), best_score
+
+    def _evolve(self,
+                cancel_event: Optional[threading.Event] = None,
+                migration: Optional[Callable[[np.ndarray, np.ndarray], Tuple[np.ndarray, np.ndarray]]] = None) -> Tuple[Optional[np.ndarray], float, int]:
+        """
+        個体群行列を進化させ、ベストの割り当てベクトル・スコア・実行した世代数を返す。
+        個体ごとの局所探索は行わず、各世代の最良個体にのみ局所探索を適用する。
+        migration を渡すと、ga_migration_interval 世代ごとに評価後の個体群と適応度を渡して入れ替えさせる (島モデル)。
+        """
+        population = self._initial_population_matrix()
+        if len(population) == 0:
+            return None, -float('inf'), 0
+        hasher = self.fitness_cache.hasher
+        # 各行のハッシュ値は最初の1回だけ計算し、以降は世代ごとに変化した遺伝子の分だけ差分更新する
+        keys = hasher.hash_matrix(population)
+        best_vector = population[0].copy()
+        best_key = int(keys[0])
+        best_score = -float('inf')
+        no_improvement_count = 0
+        generation = 0
+
+        for generation in range(self.generations):
+            if cancel_event and cancel_event.is_set():
+                self._log(f"GA_LS: 最適化が世代 {generation} でキャンセルされました。")
+                break
+
+            fitnesses = self._evaluate_matrix(population, keys)
+            if migration is not None and generation > 0 and generation % self.migration_interval == 0:
+                before = population.copy()
+                population, fitnesses = migration(population, fitnesses)
+                keys = hasher.update_matrix(keys, before, population)
+
+            current_best_idx = int(np.argmax(fitnesses))
+            if fitnesses[current_best_idx] > best_score:
+                # 世代の最良個体を局所探索で強化し、個体群にも書き戻す
+                improved, improved_key = self._local_search_vector(population[current_best_idx], self.local_search_iterations)
+                improved_score = float(self._evaluate_matrix(improved[np.newaxis, :], np.array([improved_key], dtype=np.uint64))[0])
+                if improved_score >= fitnesses[current_best_idx]:
+                    population[current_best_idx] = improved
+                    fitnesses[current_best_idx] = improved_score
+                    keys[current_best_idx] = improved_key
+                best_vector = population[current_best_idx].copy()
+                best_key = int(keys[current_best_idx])
+                best_score = float(fitnesses[current_best_idx])
+                no_improvement_count = 0
+                self._report_best_score(best_score)
+                self._log(f"GA_LS: 世代 {generation+1} でベストスコアを更新: {best_score:.2f}")
+            else:
+                no_improvement_count += 1
+                logger.debug(f"GA_LS: 世代 {generation+1} で改善なし。連続改善なし: {no_improvement_count} 世代。")
+
+            if no_improvement_count >= self.no_improvement_limit:
+                self._log(f"GA_LS: {self.no_improvement_limit} 世代の間改善がなかったため、早期停止します。")
+                break
+
+            population, keys = self._next_generation(population, fitnesses, best_vector, keys, best_key)
+
+        return best_vector, best_score, generation + 1
+
+    def _optimize_islands(self, cancel_event: Optional[threading.Event] = None) -> Tuple[Dict[str, str], float, Dict[str, Any]]:
+        """
+        島モデルで GA を実行する。各島は random_seed から導出した独自の乱数ストリームを持つ別プロセスで、
+        リング状に並んだ隣の島と multiprocessing.Queue を介して上位個体を交換する。
+        ウォームスタート用の割り当ては島 0 の初期個体群にだけ入れ、移住によって他の島へ広げる。
+        最良の島の割り当てとスコア、各島の要約を返す。
+        """
+        seed_sequence = np.random.SeedSequence(self.random_seed)
+        island_seeds = [int(child.generate_state(1)[0]) for child in seed_sequence.spawn(self.num_islands)]
+        inboxes = [multiprocessing.Queue() for _ in range(self.num_islands)]
+        result_queue = multiprocessing.Queue()
+        stop_event = multiprocessing.Event()
+        processes = [
+            multiprocessing.Process(
+                target=_run_island,
+                args=(self.seminars, self.students, self.config, island_idx, island_seeds[island_idx],
+                      inboxes[island_idx], inboxes[(island_idx + 1) % self.num_islands], result_queue, stop_event,
+                      self.initial_assignment if island_idx == 0 else None, self.problem_data)
+            )
+            for island_idx in range(self.num_islands)
+        ]
+        for process in processes:
+            process.start()
+        self._log(f"GA_LS: {self.num_islands} 個の島で島モデル GA を開始しました。")
+
+        island_results: Dict[int, Tuple[Optional[np.ndarray], float, int, int, float]] = {}
+        island_errors: Dict[int, str] = {}
+        while len(island_results) < self.num_islands:
+            if cancel_event and cancel_event.is_set() and not stop_event.is_set():
+                self._log("GA_LS: キャンセルが要求されたため、全ての島を停止します。")
+                stop_event.set()
+            try:
+                island_idx, best_vector, best_score, generations, received, cache_hit_rate, error = result_queue.get(timeout=0.5)
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes) and result_queue.empty():
+                    self._log("GA_LS: 結果を返さずに終了した島があります。", level=logging.ERROR)
+                    break
+                continue
+            island_results[island_idx] = (best_vector, best_score, generations, received, cache_hit_rate)
+            if error is not None:
+                island_errors[island_idx] = error
+                self._log(f"GA_LS: 島 {island_idx} でエラーが発生しました: {error}", level=logging.ERROR)
+                continue
+            self._log(f"GA_LS: 島 {island_idx} が完了しました。スコア: {best_score:.2f}, 世代数: {generations}")
+        for process in processes:
+            process.join()
+
+        island_summaries = [
+            {"island": island_idx, "seed": island_seeds[island_idx], "score": best_score,
+             "generations": generations, "immigrants_received": received, "cache_hit_rate": cache_hit_rate}
+            for island_idx, (_, best_score, generations, received, cache_hit_rate) in sorted(island_results.items())
+        ]
+        for summary in island_summaries:
+            if summary["island"] in island_errors:
+                summary["error"] = island_errors[summary["island"]]
+        details = {"islands": island_summaries}
+        candidates = [island_idx for island_idx in sorted(island_results) if island_results[island_idx][0] is not None]
+        if not candidates:
+            return {}, -float('inf'), details
+        # 同点の場合は島番号の小さいものを選び、結果を再現可能にする
+        best_island = max(candidates, key=lambda island_idx: island_results[island_idx][1])
+        details["best_island"] = best_island
+        best_vector, best_score = island_results[best_island][:2]
+        return self.problem_data.decode(best_vector), best_score, details
 
     def optimize(self, cancel_event: Optional[threading.Event] = None) -> OptimizationResult:
         """
         最適化プロセスを実行する。
         """
         start_time = time.time()
-        self._log("GA_LS 最適化を開始します...")
+        self._log(f"GA_LS 最適化を開始します... (エンジン: {self.engine})")
 
+        details: Dict[str, Any] = {}
+        if self.engine == "legacy":
+            best_overall_assignment, best_overall_score = self._optimize_legacy(cancel_event)
+        elif self.num_islands > 1:
+            best_overall_assignment, best_overall_score, details = self._optimize_islands(cancel_event)
+        else:
+            best_overall_assignment, best_overall_score = self._optimize_vectorized(cancel_event)
+
+        end_time = time.time()
+        duration = end_time - start_time
+        self._log(f"GA_LS 最適化完了。実行時間: {duration:.2f}秒")
+        logger.info(f"GA_LS: 最終ベストスコア: {best_overall_score:.2f}")
+        if self.num_islands <= 1 or self.engine == "legacy":
+            details["fitness_cache"] = self.fitness_cache.stats()
+            logger.info(f"GA_LS: 適応度キャッシュのヒット率: {self.fitness_cache.hit_rate:.1%} ({self.fitness_cache.hits}/{self.fitness_cache.hits + self.fitness_cache.misses})")
+
+        status_str = "NO_SOLUTION_FOUND"
+        message_str = "GA最適化で有効な解が見つかりませんでした。"
+        unassigned_students: List[str] = []
+
+        if best_overall_assignment:
+            # 最終的なベスト割り当てが実行可能か再確認
+            if self._is_feasible_assignment(best_overall_assignment):
+                status_str = "OPTIMAL" # GAは厳密な最適解を保証しないが、ここではベストとみなす
+                message_str = "GA最適化が成功しました。"
+                unassigned_students = self._get_unassigned_students(best_overall_assignment)
+                logger.info(f"GA_LS: 最終割り当ては実行可能です。未割り当て学生数: {len(unassigned_students)}")
+            else:
+                status_str = "INFEASIBLE"
+                message_str = "GA最適化は実行不可能な解を返しました。定員制約を満たしていません。"
+                logger.error(f"GA_LS: 最終割り当てが実行不可能です。割り当て: {best_overall_assignment}")
+                unassigned_students = self.student_ids # 全員未割り当てとみなす
+                best_overall_score = -float('inf') # 不可能な解はスコアを最低にする
+
+        if cancel_event and cancel_event.is_set():
+            status_str = "CANCELLED"
+            message_str = "最適化がユーザーによってキャンセルされました。"
+            best_overall_score = -float('inf') # キャンセルされた場合はスコアを無効にする
+            unassigned_students = self.student_ids # 全員未割り当てとみなす
+
+        return OptimizationResult(
+            status=status_str,
+            message=message_str,
+            best_score=best_overall_score,
+            best_assignment=best_overall_assignment,
+            seminar_capacities=self.seminar_capacities,
+            unassigned_students=unassigned_students,
+            optimization_strategy="GA_LS",
+            details=details
+        )
+
+    def _optimize_legacy(self, cancel_event: Optional[threading.Event] = None) -> Tuple[Dict[str, str], float]:
+        """
+        辞書ベースの従来エンジンで GA を実行し、ベストの割り当てとスコアを返す。
+        各子個体に局所探索を適用する。
+        """
         population = self._generate_initial_population()
         best_overall_assignment: Dict[str, str] = {}
         best_overall_score = -float('inf')
@@ -256,8 +656,8 @@ class GeneticAlgorithmOptimizer(BaseOptimizer): # BaseOptimizerを継承
 
             self._log(f"GA_LS: 世代 {generation+1}/{self.generations} を処理中...")
 
-            # 適応度の評価
-            fitnesses = [self._evaluate_fitness(individual) for individual in population]
+            # 適応度の評価 (個体群全体を一度に評価する)
+            fitnesses = self._evaluate_population(population).tolist()
 
             # 現在の世代のベスト個体を追跡
             current_best_idx = fitnesses.index(max(fitnesses))
@@ -268,6 +668,7 @@ class GeneticAlgorithmOptimizer(BaseOptimizer): # BaseOptimizerを継承
                 best_overall_score = current_best_score
                 best_overall_assignment = current_best_assignment.copy()
                 no_improvement_count = 0
+                self._report_best_score(best_overall_score)
                 self._log(f"GA_LS: 世代 {generation+1} でベストスコアを更新: {best_overall_score:.2f}")
             else:
                 no_improvement_count += 1
@@ -287,16 +688,19 @@ class GeneticAlgorithmOptimizer(BaseOptimizer): # BaseOptimizerを継承
                 next_population.append(best_overall_assignment)
 
             while len(next_population) < self.population_size:
-                parent1 = random.choice(parents)
-                parent2 = random.choice(parents)
+                parent1 = self.rng.choice(parents)
+                parent2 = self.rng.choice(parents)
 
-                if random.random() < self.crossover_rate:
+                if self.rng.random() < self.crossover_rate:
                     child1, child2 = self._crossover(parent1, parent2)
                 else:
                     child1, child2 = parent1.copy(), parent2.copy() # 交叉しない場合は親をそのままコピー
 
                 mutated_child1 = self._mutate(child1)
                 mutated_child2 = self._mutate(child2)
+                if self.repair:
+                    mutated_child1 = self._repair(mutated_child1)
+                    mutated_child2 = self._repair(mutated_child2)
 
                 # 局所探索を適用して個体を強化
                 next_population.append(self._apply_local_search(mutated_child1, iterations=self.config.get("local_search_iterations", 100)))
@@ -306,41 +710,4 @@ class GeneticAlgorithmOptimizer(BaseOptimizer): # BaseOptimizerを継承
             population = next_population[:self.population_size] # サイズ調整
             logger.debug(f"GA_LS: 世代 {generation+1}: 次の世代の個体群が設定されました。")
 
-        end_time = time.time()
-        duration = end_time - start_time
-        self._log(f"GA_LS 最適化完了。実行時間: {duration:.2f}秒")
-        logger.info(f"GA_LS: 最終ベストスコア: {best_overall_score:.2f}")
-
-        status_str = "NO_SOLUTION_FOUND"
-        message_str = "GA最適化で有効な解が見つかりませんでした。"
-        unassigned_students: List[str] = []
-
-        if best_overall_assignment:
-            # 最終的なベスト割り当てが実行可能か再確認
-            if self._is_feasible_assignment(best_overall_assignment):
-                status_str = "OPTIMAL" # GAは厳密な最適解を保証しないが、ここではベストとみなす
-                message_str = "GA最適化が成功しました。"
-                unassigned_students = self._get_unassigned_students(best_overall_assignment)
-                logger.info(f"GA_LS: 最終割り当ては実行可能です。未割り当て学生数: {len(unassigned_students)}")
-            else:
-                status_str = "INFEASIBLE"
-                message_str = "GA最適化は実行不可能な解を返しました。定員制約を満たしていません。"
-                logger.error(f"GA_LS: 最終割り当てが実行不可能です。割り当て: {best_overall_assignment}")
-                unassigned_students = self.student_ids # 全員未割り当てとみなす
-                best_overall_score = -float('inf') # 不可能な解はスコアを最低にする
-
-        if cancel_event and cancel_event.is_set():
-            status_str = "CANCELLED"
-            message_str = "最適化がユーザーによってキャンセルされました。"
-            best_overall_score = -float('inf') # キャンセルされた場合はスコアを無効にする
-            unassigned_students = self.student_ids # 全員未割り当てとみなす
-
-        return OptimizationResult(
-            status=status_str,
-            message=message_str,
-            best_score=best_overall_score,
-            best_assignment=best_overall_assignment,
-            seminar_capacities=self.seminar_capacities,
-            unassigned_students=unassigned_students,
-            optimization_strategy="GA_LS"
-        )
+        return best_overall_assignment, best_overall_score
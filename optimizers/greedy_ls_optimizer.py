@@ -1,12 +1,37 @@
 import random
 import time
 import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from typing import Dict, List, Any, Callable, Optional, Tuple
+import numpy as np
 
 # BaseOptimizerとOptimizationResultをutilsからインポート
 from seminar_optimization.utils import BaseOptimizer, OptimizationResult # <-- 修正: 相対インポート
+from seminar_optimization.problem_data import ProblemData
 # ロギングは logger_config.py で一元的に設定されるため、ここではロガーの取得のみ
 from seminar_optimization.logger_config import logger # <-- 修正: 相対インポート
+from seminar_optimization.delta_evaluator import DeltaEvaluator
+
+def _run_chain(seminars: List[Dict[str, Any]],
+               students: List[Dict[str, Any]],
+               config: Dict[str, Any],
+               chain_seed: int,
+               cancel_event: Optional[Any] = None,
+               initial_assignment: Optional[Dict[str, str]] = None,
+               problem_data: Optional[ProblemData] = None) -> Tuple[OptimizationResult, float]:
+    """
+    マルチスタートの1チェーン (貪欲法＋局所探索) を指定のシードで実行する (プロセスプールのワーカーで実行される)。
+    initial_assignment が与えられた場合は、貪欲法の代わりにそれを局所探索の開始点とする。
+    problem_data は呼び出し側で構築済みの問題表現で、チェーンごとに作り直さずに使う。
+    結果と実行時間を返す。
+    """
+    start_time = time.time()
+    chain_config = dict(config, random_seed=chain_seed, greedy_ls_multi_start=False)
+    optimizer = GreedyLSOptimizer(seminars, students, chain_config, progress_callback=lambda message: None,
+                                  initial_assignment=initial_assignment, problem_data=problem_data)
+    result = optimizer.optimize(cancel_event=cancel_event)
+    return result, time.time() - start_time
 
 class GreedyLSOptimizer(BaseOptimizer): # BaseOptimizerを継承
     """
@@ -16,9 +41,11 @@ class GreedyLSOptimizer(BaseOptimizer): # BaseOptimizerを継承
                  seminars: List[Dict[str, Any]],
                  students: List[Dict[str, Any]],
                  config: Dict[str, Any],
-                 progress_callback: Optional[Callable[[str], None]] = None): # progress_callbackを追加
+                 progress_callback: Optional[Callable[[str], None]] = None, # progress_callbackを追加
+                 initial_assignment: Optional[Dict[str, str]] = None, # ウォームスタートに使う割り当て
+                 problem_data: Optional[ProblemData] = None): # 構築済みの問題表現 (共有する場合)
         # BaseOptimizerの__init__を呼び出す
-        super().__init__(seminars, students, config, progress_callback)
+        super().__init__(seminars, students, config, progress_callback, initial_assignment, problem_data)
         logger.debug("GreedyLSOptimizer: 初期化を開始します。")
 
         # 固有のパラメータはconfigから取得
@@ -26,32 +53,30 @@ class GreedyLSOptimizer(BaseOptimizer): # BaseOptimizerを継承
         self.early_stop_no_improvement_limit = config.get("early_stop_no_improvement_limit", 5000)
         logger.debug(f"GreedyLSOptimizer: イテレーション数: {self.iterations}, 早期停止リミット: {self.early_stop_no_improvement_limit}")
 
+        # 乱数はグローバルな状態ではなく、この最適化専用のストリームから取り出す
+        self.random_seed = config.get("random_seed")
+        self.rng = random.Random(self.random_seed)
+        self.np_rng = np.random.default_rng(self.random_seed)
+
+        # マルチスタート: max_workers 個の独立なチェーンをプロセスプールで並列に実行する
+        self.multi_start = config.get("greedy_ls_multi_start", False)
+        self.num_chains = config.get("max_workers", 1)
+        logger.debug(f"GreedyLSOptimizer: マルチスタート: {self.multi_start}, チェーン数: {self.num_chains}")
+
     def _initial_assignment(self) -> Dict[str, str]:
         """
         学生の希望に基づいて初期割り当てを生成する（貪欲法）。
         各学生は、まだ定員に空きがある中で最も希望順位の高いセミナーに割り当てられる。
+        ウォームスタート用の割り当て (initial_assignment) が与えられた場合は、貪欲法の代わりにそれを使う。
         """
+        warm_start_vector = self._initial_assignment_vector()
+        if warm_start_vector is not None:
+            logger.info(f"GreedyLSOptimizer: 与えられた割り当て (スコア: {self.problem_data.score(warm_start_vector):.2f}) を初期割り当てとして使用します。")
+            return self.problem_data.decode(warm_start_vector)
         logger.debug("GreedyLSOptimizer: 初期割り当て（貪欲法）を開始します。")
-        assignment: Dict[str, str] = {}
-        seminar_current_counts = {s_id: 0 for s_id in self.seminar_ids}
-
         # 学生をランダムな順序で処理することで、異なる初期解を生成する可能性を高める
-        shuffled_students = list(self.student_ids)
-        random.shuffle(shuffled_students)
-
-        for student_id in shuffled_students:
-            preferences = self.student_preferences.get(student_id, [])
-            assigned = False
-            for preferred_seminar_id in preferences:
-                capacity = self.seminar_capacities.get(preferred_seminar_id)
-                if capacity is not None and seminar_current_counts[preferred_seminar_id] < capacity:
-                    assignment[student_id] = preferred_seminar_id
-                    seminar_current_counts[preferred_seminar_id] += 1
-                    assigned = True
-                    logger.debug(f"学生 {student_id} をセミナー {preferred_seminar_id} に初期割り当てしました。")
-                    break
-            if not assigned:
-                logger.debug(f"学生 {student_id} は初期割り当てで希望するセミナーに割り当てられませんでした。")
+        student_order = self.np_rng.permutation(self.problem_data.num_students)
+        assignment = self.problem_data.decode(self._greedy_assignment_vector(student_order))
         
         logger.info(f"GreedyLSOptimizer: 初期割り当てが完了しました。割り当てられた学生数: {len(assignment)}")
         return assignment
@@ -62,14 +87,16 @@ class GreedyLSOptimizer(BaseOptimizer): # BaseOptimizerを継承
         現在の割り当てから近傍解を生成し、スコアが改善すれば更新する。
         """
         logger.debug("GreedyLSOptimizer: 局所探索を開始します。")
-        current_assignment = initial_assignment.copy()
-        current_score = self._calculate_score(current_assignment)
-        best_assignment = current_assignment.copy()
-        best_score = current_score
+        problem = self.problem_data
+        # 割り当て・セミナーごとの人数・スコアを保持し、近傍の差分を O(1) で評価する
+        evaluator = DeltaEvaluator(problem, problem.encode(initial_assignment))
+        best_vector = evaluator.vector()
+        best_score = evaluator.score
         
         no_improvement_count = 0
 
-        self._log(f"Greedy_LS: 局所探索開始。初期スコア: {current_score:.2f}")
+        self._log(f"Greedy_LS: 局所探索開始。初期スコア: {evaluator.score:.2f}")
+        self._report_best_score(best_score)
 
         for i in range(self.iterations):
             if cancel_event and cancel_event.is_set():
@@ -81,76 +108,52 @@ class GreedyLSOptimizer(BaseOptimizer): # BaseOptimizerを継承
                 self._log(f"Greedy_LS: 局所探索イテレーション {i+1}/{self.iterations}。現在のベストスコア: {best_score:.2f}")
 
             # 1. 未割り当て学生の割り当てを試みる
-            unassigned_students = self._get_unassigned_students(current_assignment)
-            if unassigned_students:
-                student_to_assign = random.choice(unassigned_students)
-                preferences = self.student_preferences.get(student_to_assign, [])
-                random.shuffle(preferences) # 希望順をランダムに試す
+            # 未割り当て学生は台帳の集合から O(1) で選ぶ
+            student_to_assign = evaluator.random_unassigned_student(self.rng)
+            if student_to_assign is not None:
+                preferences = problem.preference_lists[student_to_assign]
                 
                 found_slot = False
-                for seminar_id in preferences:
-                    if seminar_id in self.seminar_capacities and \
-                       list(current_assignment.values()).count(seminar_id) < self.seminar_capacities[seminar_id]:
-                        
-                        new_assignment = current_assignment.copy()
-                        new_assignment[student_to_assign] = seminar_id
-                        
-                        if self._is_feasible_assignment(new_assignment):
-                            new_score = self._calculate_score(new_assignment)
-                            if new_score > current_score:
-                                current_assignment = new_assignment
-                                current_score = new_score
-                                if current_score > best_score:
-                                    best_score = current_score
-                                    best_assignment = current_assignment.copy()
-                                    no_improvement_count = 0
-                                    logger.debug(f"GreedyLSOptimizer: 未割り当て学生 {student_to_assign} を割り当て、スコア改善: {best_score:.2f}")
-                                found_slot = True
-                                break # この学生の割り当て成功
+                for seminar_idx in self.rng.sample(preferences, len(preferences)): # 希望順をランダムに試す
+                    if evaluator.has_room(seminar_idx):
+                        delta = evaluator.delta_move(student_to_assign, seminar_idx)
+                        if delta > 0:
+                            evaluator.apply_move(student_to_assign, seminar_idx, delta)
+                            if evaluator.score > best_score:
+                                best_score = evaluator.score
+                                best_vector = evaluator.vector()
+                                no_improvement_count = 0
+                                self._report_best_score(best_score)
+                                logger.debug(f"GreedyLSOptimizer: 未割り当て学生 {self.student_ids[student_to_assign]} を割り当て、スコア改善: {best_score:.2f}")
+                            found_slot = True
+                            break # この学生の割り当て成功
                 if found_slot:
                     continue # 次のイテレーションへ
 
-            # 2. 既存の割り当てを交換または再割り当てを試みる
-            if current_assignment:
-                student_id = random.choice(list(current_assignment.keys()))
-                original_seminar = current_assignment[student_id]
+            # 2. 既存の割り当ての再割り当てを試みる
+            # 割り当て済みの学生をランダムに選ぶ
+            student_idx = evaluator.random_assigned_student(self.rng)
+            if student_idx is not None:
+                original_seminar = evaluator.seminar_of(student_idx)
                 
-                # 選択肢: 別のセミナーに移動するか、未割り当てにする
-                possible_seminars = list(self.seminar_ids)
-                if len(possible_seminars) > 1: # 少なくとも2つセミナーがないと交換できない
+                if problem.num_seminars > 1: # 少なくとも2つセミナーがないと移動できない
                     # 元のセミナーを除外し、別のセミナーを選択
-                    possible_seminars.remove(original_seminar) 
-                    target_seminar = random.choice(possible_seminars)
-                else: # セミナーが1つしかない場合は、未割り当てを試みる
-                    target_seminar = None # 未割り当てを意味する
-
-                new_assignment = current_assignment.copy()
-                del new_assignment[student_id] # 一旦学生を未割り当てにする
-
-                if target_seminar:
-                    # 新しいセミナーに割り当てを試みる
-                    if list(new_assignment.values()).count(target_seminar) < self.seminar_capacities[target_seminar]:
-                        new_assignment[student_id] = target_seminar
-                        
-                        if self._is_feasible_assignment(new_assignment):
-                            new_score = self._calculate_score(new_assignment)
-                            if new_score > current_score:
-                                current_assignment = new_assignment
-                                current_score = new_score
-                                if current_score > best_score:
-                                    best_score = current_score
-                                    best_assignment = current_assignment.copy()
-                                    no_improvement_count = 0
-                                    logger.debug(f"GreedyLSOptimizer: 学生 {student_id} を {original_seminar} から {target_seminar} へ移動し、スコア改善: {best_score:.2f}")
-                                continue # 改善があったので次のイテレーションへ
-                
-                # 移動で改善がなかった、または移動先がない場合、元の割り当てに戻すか、未割り当てのままにする
-                # ここでは、改善がなければ元の割り当てに戻す
-                if student_id not in new_assignment: # 移動が試行されなかったか、失敗した場合
-                    new_assignment[student_id] = original_seminar # 元に戻す
-                
-                # 元に戻した割り当てのスコアを再計算（これは通常不要だが、念のため）
-                # current_score = self._calculate_score(current_assignment)
+                    target_seminar = self.rng.randrange(problem.num_seminars - 1)
+                    if target_seminar >= original_seminar:
+                        target_seminar += 1
+
+                    # 新しいセミナーに空きがあり、スコアが改善する場合のみ移動する
+                    if evaluator.has_room(target_seminar):
+                        delta = evaluator.delta_move(student_idx, target_seminar)
+                        if delta > 0:
+                            evaluator.apply_move(student_idx, target_seminar, delta)
+                            if evaluator.score > best_score:
+                                best_score = evaluator.score
+                                best_vector = evaluator.vector()
+                                no_improvement_count = 0
+                                self._report_best_score(best_score)
+                                logger.debug(f"GreedyLSOptimizer: 学生 {self.student_ids[student_idx]} を {self.seminar_ids[original_seminar]} から {self.seminar_ids[target_seminar]} へ移動し、スコア改善: {best_score:.2f}")
+                            continue # 改善があったので次のイテレーションへ
 
             # 改善がなかった場合
             no_improvement_count += 1
@@ -159,12 +162,15 @@ class GreedyLSOptimizer(BaseOptimizer): # BaseOptimizerを継承
                 break
 
         logger.info(f"GreedyLSOptimizer: 局所探索が完了しました。最終ベストスコア: {best_score:.2f}")
-        return best_assignment, best_score
+        return problem.decode(best_vector), best_score
 
     def optimize(self, cancel_event: Optional[threading.Event] = None) -> OptimizationResult:
         """
         最適化プロセスを実行する。
         """
+        if self.multi_start and self.num_chains > 1:
+            return self._optimize_multi_start(cancel_event)
+
         start_time = time.time()
         self._log("Greedy_LS 最適化を開始します...")
 
@@ -213,3 +219,94 @@ class GreedyLSOptimizer(BaseOptimizer): # BaseOptimizerを継承
             unassigned_students=unassigned_students,
             optimization_strategy="Greedy_LS"
         )
+
+    def _chain_seeds(self) -> List[int]:
+        """
+        random_seed から各チェーンのシードを導出する。
+        SeedSequence.spawn により、チェーン同士の乱数ストリームが重ならず、同じ random_seed なら再現できる。
+        """
+        seed_sequence = np.random.SeedSequence(self.random_seed)
+        return [int(child.generate_state(1)[0]) for child in seed_sequence.spawn(self.num_chains)]
+
+    def _optimize_multi_start(self, cancel_event: Optional[threading.Event] = None) -> OptimizationResult:
+        """
+        独立な貪欲法＋局所探索のチェーンをプロセスプールで並列に実行し、最良の結果を返す。
+        ウォームスタート用の割り当てが与えられた場合はチェーン 0 だけがそこから始め、残りのチェーンは多様性のため貪欲法から始める。
+        各チェーンの要約 (シード、ステータス、スコア、未割り当て数、実行時間) を details["chains"] に格納する。
+        """
+        start_time = time.time()
+        chain_seeds = self._chain_seeds()
+        self._log(f"Greedy_LS: {self.num_chains} 個のチェーンでマルチスタート最適化を開始します...")
+
+        chain_results: Dict[int, Tuple[OptimizationResult, float]] = {}
+        with multiprocessing.Manager() as manager:
+            shared_cancel_event = manager.Event()
+            with ProcessPoolExecutor(max_workers=self.num_chains) as executor:
+                pending = {
+                    executor.submit(_run_chain, self.seminars, self.students, self.config, seed, shared_cancel_event,
+                                    self.initial_assignment if chain == 0 else None, self.problem_data): chain
+                    for chain, seed in enumerate(chain_seeds)
+                }
+                futures = dict(pending)
+                while pending:
+                    done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        chain = futures[future]
+                        chain_results[chain] = future.result()
+                        self._log(f"Greedy_LS: チェーン {chain} が完了しました。スコア: {chain_results[chain][0].best_score:.2f}")
+                    if cancel_event and cancel_event.is_set() and not shared_cancel_event.is_set():
+                        self._log("Greedy_LS: キャンセルが要求されたため、全チェーンを停止します。")
+                        shared_cancel_event.set()
+
+        # キャンセル (時間予算切れを含む) で止まったチェーンはスコアが -inf で返るため、
+        # 途中までの最良の割り当てを評価し直してチェーンを比べる
+        chain_scores: Dict[int, float] = {}
+        chain_unassigned: Dict[int, int] = {}
+        for chain, (result, _) in chain_results.items():
+            chain_scores[chain], chain_unassigned[chain] = result.best_score, len(result.unassigned_students)
+            if result.status == "CANCELLED" and result.best_assignment:
+                vector = self.problem_data.encode(result.best_assignment)
+                if self.problem_data.is_feasible(vector):
+                    chain_scores[chain] = self.problem_data.score(vector)
+                    chain_unassigned[chain] = len(self.problem_data.unassigned_indices(vector))
+        chain_summaries = [
+            {
+                "chain": chain,
+                "seed": chain_seeds[chain],
+                "status": result.status,
+                "score": chain_scores[chain],
+                "unassigned": chain_unassigned[chain],
+                "duration": duration
+            }
+            for chain, (result, duration) in sorted(chain_results.items())
+        ]
+        for summary in chain_summaries:
+            logger.info(f"Greedy_LS: チェーン {summary['chain']} (シード {summary['seed']}): {summary['status']}, スコア {summary['score']:.2f}, 未割り当て {summary['unassigned']}, {summary['duration']:.2f}秒")
+
+        # 同点の場合は完了順ではなくチェーン番号の小さいものを選び、結果を再現可能にする
+        best_chain = max(sorted(chain_results), key=lambda chain: chain_scores[chain])
+        best_result = chain_results[best_chain][0]
+        self._log(f"Greedy_LS マルチスタート完了。最良チェーン: {best_chain}, スコア: {chain_scores[best_chain]:.2f}, 実行時間: {time.time() - start_time:.2f}秒")
+
+        if cancel_event and cancel_event.is_set():
+            return OptimizationResult(
+                status="CANCELLED",
+                message="最適化がユーザーによってキャンセルされました。",
+                best_score=-float('inf'),
+                best_assignment=best_result.best_assignment,
+                seminar_capacities=self.seminar_capacities,
+                unassigned_students=self.student_ids,
+                optimization_strategy="Greedy_LS",
+                details={"best_chain": best_chain, "chains": chain_summaries}
+            )
+
+        return OptimizationResult(
+            status=best_result.status,
+            message=f"Greedy_LS マルチスタート ({self.num_chains} チェーン) の最良解です。" if best_result.status == "OPTIMAL" else best_result.message,
+            best_score=best_result.best_score,
+            best_assignment=best_result.best_assignment,
+            seminar_capacities=self.seminar_capacities,
+            unassigned_students=best_result.unassigned_students,
+            optimization_strategy="Greedy_LS",
+            details={"best_chain": best_chain, "chains": chain_summaries}
+        )
@@ -3,11 +3,14 @@ import time
 import logging # ロギングを追加
 import threading
 from typing import Dict, List, Any, Callable, Optional, Tuple
+import numpy as np
 
 # BaseOptimizerとOptimizationResultをutilsからインポート
 from seminar_optimization.utils import BaseOptimizer, OptimizationResult # <-- 修正: 相対インポート
+from seminar_optimization.problem_data import ProblemData
 # ロギングは logger_config.py で一元的に設定されるため、ここではロガーの取得のみ
 from seminar_optimization.logger_config import logger # <-- 修正: 相対インポート
+from optimizers.cp_model_builder import SparseAssignmentModel, AggregatedAssignmentModel, stop_on_cancel
 
 class ILPOptimizer(BaseOptimizer): # BaseOptimizerを継承
     """
@@ -18,9 +21,11 @@ class ILPOptimizer(BaseOptimizer): # BaseOptimizerを継承
                  seminars: List[Dict[str, Any]],
                  students: List[Dict[str, Any]],
                  config: Dict[str, Any],
-                 progress_callback: Optional[Callable[[str], None]] = None): # progress_callbackを追加
+                 progress_callback: Optional[Callable[[str], None]] = None, # progress_callbackを追加
+                 initial_assignment: Optional[Dict[str, str]] = None, # ウォームスタートに使う割り当て
+                 problem_data: Optional[ProblemData] = None): # 構築済みの問題表現 (共有する場合)
         # BaseOptimizerの__init__を呼び出す
-        super().__init__(seminars, students, config, progress_callback)
+        super().__init__(seminars, students, config, progress_callback, initial_assignment, problem_data)
         logger.debug("ILPOptimizer: 初期化を開始します。")
 
         # 固有のパラメータはconfigから取得
@@ -30,6 +35,33 @@ class ILPOptimizer(BaseOptimizer): # BaseOptimizerを継承
         self.solver.parameters.num_workers = config.get("max_workers", 8) # 並列処理ワーカー数
         logger.debug(f"ILPOptimizer: タイムリミット: {self.time_limit}秒, ワーカー数: {self.solver.parameters.num_workers}")
 
+        # ウォームスタート: 呼び出し側の割り当て (initial_assignment)、なければ貪欲法の解を暫定解として使う
+        # 暫定解はソルバーがそれ以上の解を見つけられなかったときの結果になる。呼び出し側の割り当ては常に、
+        # 貪欲法の解は warm_start_hint が真のときだけ解のヒントにもなる
+        self.warm_start = config.get("warm_start", True)
+        self.warm_start_hint = config.get("warm_start_hint", False)
+        self.fix_and_polish = config.get("fix_and_polish", False)
+        self.polish_fix_ratio = config.get("polish_fix_ratio", 0.8)
+        self.polish_time_ratio = config.get("polish_time_ratio", 0.3)
+        self.np_rng = np.random.default_rng(config.get("random_seed")) # 貪欲法の学生の処理順と、fix-and-polish で固定する学生の選択に使う
+        self.aggregate_profiles = config.get("aggregate_profiles", False) # 希望リストが同一の学生を集約する
+        logger.debug(f"ILPOptimizer: ウォームスタート: {self.warm_start}, fix-and-polish: {self.fix_and_polish}")
+
+    def _warm_start_vector(self) -> Optional[np.ndarray]:
+        """
+        暫定解として使う割り当てベクトルを返す。ウォームスタートが無効な場合は None。
+        呼び出し側から割り当てが与えられた場合は、ウォームスタートの設定によらず使用する。
+        """
+        vector = self._initial_assignment_vector()
+        if vector is not None:
+            self._log(f"ILP: 与えられた割り当て (スコア: {self.problem_data.score(vector):.2f}) を暫定解として使用します。")
+            return vector
+        if not self.warm_start:
+            return None
+        vector = self._greedy_assignment_vector(self.np_rng.permutation(self.problem_data.num_students))
+        self._log(f"ILP: 貪欲法の解 (スコア: {self.problem_data.score(vector):.2f}) を暫定解として使用します。")
+        return vector
+
     def optimize(self, cancel_event: Optional[threading.Event] = None) -> OptimizationResult:
         """
         ILPモデルを構築し、CP-SATソルバーで最適化を実行する。
@@ -37,65 +69,22 @@ class ILPOptimizer(BaseOptimizer): # BaseOptimizerを継承
         start_time = time.time()
         self._log("ILP 最適化を開始します...")
 
-        model = cp_model.CpModel()
-
-        # 変数の定義: x[s][j] = 1 なら学生jがセミナーsに割り当てられる
-        # student_id -> student_idx, seminar_id -> seminar_idx のマッピングを作成
-        student_to_idx = {student_id: i for i, student_id in enumerate(self.student_ids)}
-        seminar_to_idx = {seminar_id: i for i, seminar_id in enumerate(self.seminar_ids)}
-
-        x = {}
-        for student_id in self.student_ids:
-            for seminar_id in self.seminar_ids:
-                x[(student_id, seminar_id)] = model.NewBoolVar(f'x_{student_id}_{seminar_id}')
-        logger.debug("ILPOptimizer: 割り当て変数を定義しました。")
-
-        # 制約1: 各学生は最大で1つのセミナーに割り当てられる
-        for student_id in self.student_ids:
-            model.AddAtMostOne([x[(student_id, seminar_id)] for seminar_id in self.seminar_ids])
-        logger.debug("ILPOptimizer: 各学生は最大1つのセミナーに割り当てられる制約を追加しました。")
-
-        # 制約2: 各セミナーの定員制約
-        for seminar_id in self.seminar_ids:
-            capacity = self.seminar_capacities[seminar_id]
-            model.Add(sum(x[(student_id, seminar_id)] for student_id in self.student_ids) <= capacity)
-        logger.debug("ILPOptimizer: 各セミナーの定員制約を追加しました。")
-
-        # 目的関数の定義: 希望順位に基づいてスコアを最大化
-        obj_terms = []
-        score_weights = self.config.get("score_weights", {
-            "1st_choice": 3.0, "2nd_choice": 2.0, "3rd_choice": 1.0, "other_preference": 0.5
-        })
-        
-        for student_id in self.student_ids:
-            preferences = self.student_preferences.get(student_id, [])
-            for i, preferred_seminar_id in enumerate(preferences):
-                if preferred_seminar_id not in self.seminar_ids:
-                    logger.warning(f"ILPOptimizer: 学生 {student_id} の希望セミナー '{preferred_seminar_id}' が存在しません。スキップします。")
-                    continue # 存在しないセミナーはスキップ
-
-                weight = 0.0
-                if i == 0: # 1st choice
-                    weight = score_weights["1st_choice"]
-                elif i == 1: # 2nd choice
-                    weight = score_weights["2nd_choice"]
-                elif i == 2: # 3rd choice
-                    weight = score_weights["3rd_choice"]
-                else: # Other preferences
-                    weight = score_weights["other_preference"]
-                
-                magnification = self.seminar_magnifications.get(preferred_seminar_id, 1.0)
-                obj_terms.append(x[(student_id, preferred_seminar_id)] * weight * magnification)
-        
-        model.Maximize(sum(obj_terms))
-        self._log("ILPOptimizer: 目的関数を定義しました。")
+        # (学生, 希望セミナー) の組に対してのみ変数を作成する疎なモデル
+        # aggregate_profiles が真なら、希望リストが同一の学生をまとめた集約モデルを使う
+        if self.aggregate_profiles:
+            sparse_model = AggregatedAssignmentModel(self.problem_data)
+        else:
+            sparse_model = SparseAssignmentModel(self.problem_data)
+        self._log(f"ILPOptimizer: モデルを構築しました。変数数: {len(sparse_model.variables)}")
 
         # キャンセルイベントが設定された場合、ソルバーを停止するコールバック
         class SolutionCallback(cp_model.CpSolverSolutionCallback):
-            def __init__(self, cancel_event: threading.Event, progress_callback: Callable[[str], None], solver_instance):
+            def __init__(self, cancel_event: threading.Event, progress_callback: Callable[[str], None], solver_instance,
+                         score_callback: Callable[[float], None]):
                 cp_model.CpSolverSolutionCallback.__init__(self)
                 self._cancel_event = cancel_event
                 self._progress_callback = progress_callback
+                self._score_callback = score_callback
                 self._solver = solver_instance
                 self._start_time = time.time()
                 self._last_log_time = time.time()
@@ -106,15 +95,26 @@ class ILPOptimizer(BaseOptimizer): # BaseOptimizerを継承
                     logger.info("ILPOptimizer: キャンセルイベントが検出されました。ソルバーを停止します。")
                     self.StopSearch()
                     return
-                
+                self._score_callback(self.ObjectiveValue()) # 見つかった解はそれまでで最良 (目的関数は単調に改善する)
+
                 current_time = time.time()
                 if current_time - self._last_log_time > 5: # 5秒ごとに進捗を報告
                     self._progress_callback(f"ILP: 実行中... 経過時間: {current_time - self._start_time:.1f}秒, 現在のベストスコア: {self.ObjectiveValue():.2f}")
                     self._last_log_time = current_time
 
         # ソルバーの実行
-        solution_callback = SolutionCallback(cancel_event, self.progress_callback, self.solver)
-        status = self.solver.Solve(model, solution_callback)
+        solution_callback = SolutionCallback(cancel_event, self.progress_callback, self.solver, self._report_best_score)
+        with stop_on_cancel(self.solver, cancel_event):
+            status, best_vector = sparse_model.solve(
+                self.solver,
+                solution_callback,
+                warm_start_vector=self._warm_start_vector(),
+                use_hint=self.warm_start_hint or self._initial_assignment_vector() is not None,
+                fix_and_polish=self.fix_and_polish,
+                polish_fix_ratio=self.polish_fix_ratio,
+                polish_time_ratio=self.polish_time_ratio,
+                rng=self.np_rng
+            )
         self._log(f"ILP: ソルバーのステータス: {self.solver.StatusName(status)}")
 
         final_assignment: Dict[str, str] = {}
@@ -123,11 +123,8 @@ class ILPOptimizer(BaseOptimizer): # BaseOptimizerを継承
         message = "ILP最適化が失敗しました。"
 
         if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
-            final_score = self.solver.ObjectiveValue()
-            for student_id in self.student_ids:
-                for seminar_id in self.seminar_ids:
-                    if self.solver.Value(x[(student_id, seminar_id)]) == 1:
-                        final_assignment[student_id] = seminar_id
+            final_score = self.problem_data.score(best_vector)
+            final_assignment = self.problem_data.decode(best_vector)
             
             if self._is_feasible_assignment(final_assignment):
                 status_str = "OPTIMAL" if status == cp_model.OPTIMAL else "FEASIBLE"
@@ -1,29 +1,59 @@
+import math
 import random
-import copy
+import logging
 import threading
 import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from typing import Dict, List, Any, Callable, Optional, Tuple
-from sklearn.cluster import KMeans # クラスタリング用
-import numpy as np # KMeansの入力用
+from sklearn.cluster import MiniBatchKMeans # クラスタリング用
+from scipy.sparse import csr_matrix # 希望の疎行列 (MiniBatchKMeansの入力用)
+import numpy as np
 
 # BaseOptimizerとOptimizationResultをutilsからインポート
 from seminar_optimization.utils import BaseOptimizer, OptimizationResult # <-- 修正: 相対インポート
 # ロギングは logger_config.py で一元的に設定されるため、ここではロガーの取得のみ
 from seminar_optimization.logger_config import logger # <-- 修正: 相対インポート
+from seminar_optimization.delta_evaluator import DeltaEvaluator
+from seminar_optimization.problem_data import ProblemData, UNASSIGNED
+from seminar_optimization.capacity_ledger import IndexedPool
+from seminar_optimization.coarsening import build_hierarchy, project, refine, expand
+from seminar_optimization.decomposition import cluster_demand, split_capacities
+from optimizers.flow_optimizer import solve_transportation
+
+def _solve_cluster(seminars: List[Dict[str, Any]],
+                   students: List[Dict[str, Any]],
+                   config: Dict[str, Any],
+                   cluster_seed: int,
+                   cancel_event: Optional[Any] = None) -> OptimizationResult:
+    """
+    1クラスタの部分問題 (セミナーの定員はクラスタへの配分量) を V サイクル＋焼きなまし法で解く
+    (プロセスプールのワーカーで実行される)。
+    """
+    cluster_config = dict(config, random_seed=cluster_seed, multilevel_mode="vcycle")
+    optimizer = MultilevelOptimizer(seminars, students, cluster_config, progress_callback=lambda message: None)
+    return optimizer.optimize(cancel_event=cancel_event)
 
 class MultilevelOptimizer(BaseOptimizer): # BaseOptimizerを継承
     """
     多段階最適化アルゴリズム。
-    学生をクラスタリングし、各クラスタ内で最適化を行った後、
-    全体で局所探索を行う。
+    既定 (multilevel_mode = "vcycle") では V サイクルで初期解を作る:
+    学生を希望の類似度で重み付きのノードに段階的に粗視化し、最も粗い段を最小費用流で厳密に解いてから、
+    1段ずつ細かい段へ射影して各段で安価な改善を行う。
+    "cluster" では学生をクラスタリングし、定員をクラスタの希望人数に比例して配分した部分問題を
+    ワーカープロセスで並列に解いてから、結果をまとめて初期解を作る。
+    いずれも最後に全体で局所探索（焼きなまし法）を行う。
+    ウォームスタート用の割り当て (initial_assignment) が与えられた場合は、初期解の作成を省いてそこから焼きなまし法を始める。
     """
     def __init__(self,
                  seminars: List[Dict[str, Any]],
                  students: List[Dict[str, Any]],
                  config: Dict[str, Any],
-                 progress_callback: Optional[Callable[[str], None]] = None): # progress_callbackを追加
+                 progress_callback: Optional[Callable[[str], None]] = None, # progress_callbackを追加
+                 initial_assignment: Optional[Dict[str, str]] = None, # ウォームスタートに使う割り当て
+                 problem_data: Optional[ProblemData] = None): # 構築済みの問題表現 (共有する場合)
         # BaseOptimizerの__init__を呼び出す
-        super().__init__(seminars, students, config, progress_callback)
+        super().__init__(seminars, students, config, progress_callback, initial_assignment, problem_data)
         logger.debug("MultilevelOptimizer: 初期化を開始します。")
 
         # 固有のパラメータはconfigから取得
@@ -32,69 +62,163 @@ class MultilevelOptimizer(BaseOptimizer): # BaseOptimizerを継承
         self.no_improvement_limit = config.get("early_stop_no_improvement_limit", 500) # 局所探索の早期停止リミット
         logger.debug(f"MultilevelOptimizer: クラスタ数: {self.num_clusters}, 局所探索イテレーション: {self.local_search_iterations}, 改善停止リミット: {self.no_improvement_limit}")
 
-    def _cluster_students(self) -> Dict[int, List[str]]:
+        # 焼きなまし法: 初期温度は既定ではサンプルした悪化量から自動で決める
+        # (multilevel_auto_temperature が false の場合は initial_temperature を使う)
+        self.auto_temperature = config.get("multilevel_auto_temperature", True)
+        self.initial_acceptance = config.get("multilevel_initial_acceptance", 0.8)
+
+        # 乱数はグローバルな状態ではなく、この最適化専用のストリームから取り出す
+        self.random_seed = config.get("random_seed")
+        self.rng = random.Random(self.random_seed)
+
+        # V サイクル: 最も粗い段のノード数の目安と、最小費用流の重みのスケール
+        self.mode = config.get("multilevel_mode", "vcycle")
+        self.coarse_size = config.get("multilevel_coarse_size", 20000)
+        self.refine_passes = config.get("multilevel_refine_passes", 5)
+        self.weight_scale = config.get("flow_weight_scale", 1000)
+        logger.debug(f"MultilevelOptimizer: モード: {self.mode}, 最も粗い段のノード数の目安: {self.coarse_size}")
+
+        # "cluster" モード: クラスタごとの部分問題を max_workers 個のプロセスで並列に解く
+        self.max_workers = config.get("max_workers", 1)
+
+    def _cluster_labels(self) -> np.ndarray:
         """
-        学生の希望に基づいて学生をクラスタリングする。
-        各学生の希望セミナーをone-hotエンコーディングし、KMeansを使用する。
+        学生の希望に基づいて学生をクラスタリングし、学生ごとのクラスタ番号を返す。
+        希望セミナーの列に1を立てた行列を疎行列 (CSR) で作り、MiniBatchKMeans を使用する
+        (密な学生数×セミナー数の行列を作らないため、学生数・セミナー数が大きくてもメモリを消費しない)。
         """
         logger.debug("MultilevelOptimizer: 学生のクラスタリングを開始します。")
+        problem = self.problem_data
+        # クラスタ数が学生数を超える場合は、学生数に合わせる
+        n_clusters = min(self.num_clusters, problem.num_students)
+        if n_clusters <= 1 or problem.num_seminars == 0:
+            logger.info("MultilevelOptimizer: クラスタ数が1以下のため、クラスタリングを行わず全員を単一クラスタとします。")
+            return np.zeros(problem.num_students, dtype=np.int64)
+
+        # ProblemData の希望行列から、希望するセミナーの列に1を立てる
+        student_rows, rank_cols = np.nonzero(problem.preference_matrix >= 0)
+        X = csr_matrix(
+            (np.ones(len(student_rows), dtype=np.float32), (student_rows, problem.preference_matrix[student_rows, rank_cols])),
+            shape=(problem.num_students, problem.num_seminars)
+        )
+        kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=self.random_seed, n_init='auto')
+        labels = kmeans.fit_predict(X).astype(np.int64)
+        logger.info(f"MultilevelOptimizer: 学生を {n_clusters} 個のクラスタにクラスタリングしました。")
+        for cluster_id, size in enumerate(np.bincount(labels, minlength=n_clusters).tolist()):
+            logger.debug(f"  クラスタ {cluster_id}: {size} 人の学生")
+        return labels
+
+    def _cluster_students(self) -> Dict[int, List[str]]:
+        """
+        学生の希望に基づいて学生をクラスタリングし、クラスタ番号ごとの学生IDのリストを返す。
+        """
         if not self.student_ids or not self.seminar_ids:
             logger.warning("MultilevelOptimizer: 学生またはセミナーのデータがないため、クラスタリングをスキップします。")
             return {0: list(self.student_ids)} # 全員を単一クラスタに
+        labels = self._cluster_labels()
+        clusters: Dict[int, List[str]] = {i: [] for i in range(int(labels.max()) + 1)}
+        for student_id, label in zip(self.student_ids, labels.tolist()):
+            clusters[label].append(student_id)
+        return clusters
 
-        # 学生の希望をベクトル化（one-hotエンコーディング）
-        student_vectors = []
-        seminar_id_to_idx = {s_id: i for i, s_id in enumerate(self.seminar_ids)}
-        
-        for student_id in self.student_ids:
-            vector = [0] * len(self.seminar_ids)
-            preferences = self.student_preferences.get(student_id, [])
-            for pref_seminar_id in preferences:
-                if pref_seminar_id in seminar_id_to_idx:
-                    vector[seminar_id_to_idx[pref_seminar_id]] = 1 # 希望するセミナーに1を設定
-            student_vectors.append(vector)
-        
-        if not student_vectors:
-            logger.warning("MultilevelOptimizer: 学生ベクトルが生成されませんでした。クラスタリングをスキップします。")
-            return {0: list(self.student_ids)} # 全員を単一クラスタに
+    def _propose(self, evaluator: DeltaEvaluator, members: List[IndexedPool]) -> Optional[Tuple[int, int, float]]:
+        """
+        近傍解を1つ提案し、(学生a, 相手, スコア差分) を返す (有効な近傍解がない場合は None)。
+        学生 a と、その希望セミナーまたは未割り当てのいずれかをランダムに選ぶ。
+        - 移動先に空きがあれば移動 (相手はセミナーのインデックス、-1 は未割り当て)
+        - 満員なら、移動先の学生 b を1人選び交換する (相手は -(b+2) で表す)。
+          交換は a の現在の割り当て先が b の希望セミナーまたは未割り当ての場合に限る
+        いずれも割り当てをコピーせず、差分評価で O(1) で求める。
+        """
+        rng = self.rng
+        preference_lists = self.problem_data.preference_lists
+        student_a = rng.randrange(self.problem_data.num_students)
+        preferences = preference_lists[student_a]
+        choice = rng.randrange(len(preferences) + 1)
+        target = preferences[choice] if choice < len(preferences) else UNASSIGNED
+        current = evaluator.seminar_of(student_a)
+        if target == current:
+            return None
+        if evaluator.has_room(target):
+            return student_a, target, evaluator.delta_move(student_a, target)
+        student_b = members[target].choice(rng)
+        if student_b is None or (current != UNASSIGNED and current not in preference_lists[student_b]):
+            return None
+        return student_a, -(student_b + 2), evaluator.delta_swap(student_a, student_b)
 
-        X = np.array(student_vectors)
+    def _apply(self, evaluator: DeltaEvaluator, members: List[IndexedPool], student_a: int, other: int, delta: float):
+        """_propose で提案された近傍解を反映し、セミナーごとの学生の集合も更新する。"""
+        seminar_a = evaluator.seminar_of(student_a)
+        if other >= UNASSIGNED: # 移動
+            if seminar_a >= 0:
+                members[seminar_a].remove(student_a)
+            if other >= 0:
+                members[other].add(student_a)
+            evaluator.apply_move(student_a, other, delta)
+            return
+        student_b = -other - 2 # 交換
+        seminar_b = evaluator.seminar_of(student_b)
+        members[seminar_b].remove(student_b)
+        members[seminar_b].add(student_a)
+        if seminar_a >= 0:
+            members[seminar_a].remove(student_a)
+            members[seminar_a].add(student_b)
+        evaluator.apply_swap(student_a, student_b, delta)
 
-        # クラスタ数が学生数を超える場合は、学生数に合わせる
-        n_clusters = min(self.num_clusters, len(self.student_ids))
-        if n_clusters <= 1:
-            logger.info("MultilevelOptimizer: クラスタ数が1以下または学生数以下のため、クラスタリングを行わず全員を単一クラスタとします。")
-            return {0: list(self.student_ids)}
-
-        kmeans = KMeans(n_clusters=n_clusters, random_state=self.config.get("random_seed"), n_init='auto')
-        kmeans.fit(X)
-        
-        clusters: Dict[int, List[str]] = {i: [] for i in range(n_clusters)}
-        for i, student_id in enumerate(self.student_ids):
-            clusters[kmeans.labels_[i]].append(student_id)
-        
-        logger.info(f"MultilevelOptimizer: 学生を {n_clusters} 個のクラスタにクラスタリングしました。")
-        for cluster_id, students_in_cluster in clusters.items():
-            logger.debug(f"  クラスタ {cluster_id}: {len(students_in_cluster)} 人の学生")
-        return clusters
+    def _calibrate_temperature(self, evaluator: DeltaEvaluator, members: List[IndexedPool], samples: int = 200) -> float:
+        """
+        近傍解を samples 回提案して (反映はしない) 悪化量の平均を求め、
+        平均的な悪化が確率 multilevel_initial_acceptance で受け入れられる初期温度を返す。
+        悪化する近傍解が見つからない場合は initial_temperature を返す。
+        """
+        worsening = []
+        for _ in range(samples):
+            proposal = self._propose(evaluator, members)
+            if proposal is not None and proposal[2] < 0:
+                worsening.append(-proposal[2])
+        fallback = self.config.get("initial_temperature", 1.0)
+        if not worsening or not 0 < self.initial_acceptance < 1:
+            return fallback
+        temperature = (sum(worsening) / len(worsening)) / -math.log(self.initial_acceptance)
+        logger.debug(f"MultilevelOptimizer: 初期温度を {len(worsening)} 件の悪化量から {temperature:.4f} に設定しました。")
+        return temperature
 
     def _local_search_multilevel(self, initial_assignment: Dict[str, str], progress_callback: Optional[Callable[[str], None]] = None, cancel_event: Optional[threading.Event] = None) -> Tuple[Dict[str, str], float]:
         """
         多段階最適化の最終段階で行う局所探索。
-        焼きなまし法を適用して、より広範囲の探索を可能にする。
+        焼きなまし法 (メトロポリス法) を適用して、より広範囲の探索を可能にする。
+        各ステップでは近傍解 (希望セミナーへの移動または交換) を1つだけ提案し、
+        差分評価で O(1) で受理・棄却を判定する。割り当てのコピーは最良解から悪化方向へ離れるときのみ行う。
         """
         logger.debug("MultilevelOptimizer: 多段階局所探索（焼きなまし法）を開始します。")
-        current_assignment = initial_assignment.copy()
-        current_score = self._calculate_score(current_assignment)
-        best_assignment = current_assignment.copy()
+        problem = self.problem_data
+        # 近傍解ごとに割り当てをコピーせず、差分評価器でスコア差分を求める
+        initial_vector = problem.encode(initial_assignment)
+        evaluator = DeltaEvaluator(problem, initial_vector)
+        current_score = evaluator.score
+        best_vector = evaluator.vector()
         best_score = current_score
+        best_is_current = True # 現在の割り当てが最良解か (True の間は best_vector を更新しない)
+        if problem.num_students == 0: # 学生がいない場合
+            return problem.decode(best_vector), best_score
 
-        temperature = self.config.get("initial_temperature", 1.0)
+        # セミナーごとの学生の集合 (交換相手を O(1) で選ぶため)
+        members = [IndexedPool() for _ in range(problem.num_seminars)]
+        for student_idx, seminar_idx in enumerate(initial_vector.tolist()):
+            if seminar_idx >= 0:
+                members[seminar_idx].add(student_idx)
+
+        if self.auto_temperature:
+            temperature = self._calibrate_temperature(evaluator, members)
+        else:
+            temperature = self.config.get("initial_temperature", 1.0)
         cooling_rate = self.config.get("cooling_rate", 0.995)
+        rng = self.rng
         
         no_improvement_count = 0
 
-        self._log(f"Multilevel: 最終局所探索（焼きなまし法）開始。初期スコア: {current_score:.2f}")
+        self._log(f"Multilevel: 最終局所探索（焼きなまし法）開始。初期スコア: {current_score:.2f}, 初期温度: {temperature:.4f}")
+        self._report_best_score(best_score)
 
         for i in range(self.local_search_iterations):
             if cancel_event and cancel_event.is_set():
@@ -104,59 +228,32 @@ class MultilevelOptimizer(BaseOptimizer): # BaseOptimizerを継承
             if (i + 1) % 1000 == 0:
                 self._log(f"Multilevel: 局所探索イテレーション {i+1}/{self.local_search_iterations}。現在のベストスコア: {best_score:.2f}, 温度: {temperature:.4f}")
 
-            # 近傍解の生成 (ランダムな学生の割り当てを変更)
-            if not self.student_ids: # 学生がいない場合
-                break
-            student_id = random.choice(self.student_ids)
-            
-            # 割り当て変更の候補を生成
-            # 1. 現在の割り当てを解除（未割り当てにする）
-            # 2. 別のセミナーに移動
-            
-            original_seminar = current_assignment.get(student_id)
-            
-            candidate_assignments = []
-
-            # オプション1: 未割り当てにする
-            temp_assignment_unassigned = current_assignment.copy()
-            if student_id in temp_assignment_unassigned:
-                del temp_assignment_unassigned[student_id]
-            if self._is_feasible_assignment(temp_assignment_unassigned):
-                candidate_assignments.append(temp_assignment_unassigned)
-
-            # オプション2: 別のセミナーに割り当てる
-            for seminar_id in self.seminar_ids:
-                if seminar_id == original_seminar: # 同じセミナーはスキップ
-                    continue
-                temp_assignment_move = current_assignment.copy()
-                temp_assignment_move[student_id] = seminar_id
-                
-                if self._is_feasible_assignment(temp_assignment_move):
-                    candidate_assignments.append(temp_assignment_move)
-            
-            if not candidate_assignments:
-                continue # 有効な近傍解がない場合
-
-            # ランダムに近傍解を一つ選択
-            next_assignment = random.choice(candidate_assignments)
-            next_score = self._calculate_score(next_assignment)
-
-            # 焼きなまし法の判定基準
-            # (next_score - current_score) > 0 はスコア改善
-            # exp((next_score - current_score) / temperature) は悪化を受け入れる確率
-            if next_score > current_score or \
-               random.random() < np.exp((next_score - current_score) / temperature):
-                current_assignment = next_assignment
-                current_score = next_score
-                logger.debug(f"Multilevel: 割り当てを更新。現在のスコア: {current_score:.2f}")
-
-                if current_score > best_score:
-                    best_score = current_score
-                    best_assignment = current_assignment.copy()
-                    no_improvement_count = 0
-                    logger.debug(f"Multilevel: ベストスコアを更新: {best_score:.2f}")
-                else:
-                    no_improvement_count += 1
+            improved = False
+            proposal = self._propose(evaluator, members)
+            if proposal is not None:
+                student_a, other, delta = proposal
+                # 焼きなまし法の判定基準
+                # delta >= 0 はスコア改善 (または同点)
+                # exp(delta / temperature) は悪化を受け入れる確率
+                if delta >= 0 or (temperature > 0 and rng.random() < math.exp(delta / temperature)):
+                    if delta < 0 and best_is_current:
+                        # 最良解から離れる直前にだけ割り当てをコピーする
+                        best_vector = evaluator.vector()
+                        best_is_current = False
+                    self._apply(evaluator, members, student_a, other, delta)
+                    current_score = evaluator.score
+                    if delta > 0:
+                        improved = True
+
+            if current_score > best_score:
+                best_score = current_score
+                best_is_current = True
+                logger.debug(f"Multilevel: ベストスコアを更新: {best_score:.2f}")
+                self._report_best_score(best_score)
+            # 高温のうちは最良解を更新しなくても改善方向の移動が続くため、
+            # 改善する移動が受理されなくなった (冷え切った) 時点から早期停止の判定を行う
+            if improved:
+                no_improvement_count = 0
             else:
                 no_improvement_count += 1
 
@@ -168,8 +265,133 @@ class MultilevelOptimizer(BaseOptimizer): # BaseOptimizerを継承
                 self._log(f"Multilevel: {self.no_improvement_limit} イテレーションの間改善がなかったため、早期停止します。")
                 break
 
+        if best_is_current:
+            best_vector = evaluator.vector()
         logger.info(f"MultilevelOptimizer: 多段階局所探索が完了しました。最終ベストスコア: {best_score:.2f}")
-        return best_assignment, best_score
+        return problem.decode(best_vector), best_score
+
+    def _cluster_greedy_vector(self) -> np.ndarray:
+        """
+        学生をクラスタリングし、クラスタ順 (クラスタ内はランダムな順) の貪欲法で初期割り当てを作る。
+        """
+        clusters = self._cluster_students()
+        student_order: List[int] = []
+        for cluster_id, student_ids_in_cluster in clusters.items():
+            self._log(f"Multilevel: クラスタ {cluster_id} の学生を初期割り当て中...")
+            self.rng.shuffle(student_ids_in_cluster) # クラスタ内の学生もシャッフル
+            student_order.extend(self.problem_data.student_index[student_id] for student_id in student_ids_in_cluster)
+
+        # クラスタ順に、定員に空きがある中で最も希望順位の高いセミナーへ割り当てる（割り当てられない学生は未割り当て）
+        return self._greedy_assignment_vector(np.array(student_order, dtype=np.int64))
+
+    def _cluster_parallel_vector(self, cancel_event: Optional[threading.Event] = None) -> Tuple[Optional[np.ndarray], List[Dict[str, Any]]]:
+        """
+        学生をクラスタリングし、各クラスタの部分問題を max_workers 個のワーカープロセスで並列に解いて初期割り当てベクトルを作る。
+        各セミナーの定員は、そのセミナーを希望する学生数の比でクラスタへ配分する。
+        部分問題の割り当てをまとめた後、配分の端数などで残った空き枠へ未割り当ての学生を貪欲法で割り当てる。
+        クラスタごとの要約 (学生数、ステータス、スコア) を併せて返す。キャンセルされた場合はベクトルの代わりに None を返す。
+        """
+        problem = self.problem_data
+        labels = self._cluster_labels()
+        num_clusters = int(labels.max()) + 1 if len(labels) else 0
+        quotas = split_capacities(problem.capacities, cluster_demand(problem, labels, num_clusters))
+        seed_sequence = np.random.SeedSequence(self.random_seed)
+        cluster_seeds = [int(child.generate_state(1)[0]) for child in seed_sequence.spawn(num_clusters)]
+
+        # 部分問題: クラスタの学生と、定員をクラスタへの配分量に置き換えた全セミナー
+        # (配分が0のセミナーも残すことで、希望順位とスコアの重みが元の問題と一致する)
+        subproblems: Dict[int, Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]] = {}
+        for cluster in range(num_clusters):
+            members = np.flatnonzero(labels == cluster)
+            if len(members) == 0:
+                continue
+            sub_seminars = [dict(seminar, capacity=quota) for seminar, quota in zip(self.seminars, quotas[cluster].tolist())]
+            subproblems[cluster] = (sub_seminars, [self.students[i] for i in members.tolist()])
+        self._log(f"Multilevel: {len(subproblems)} 個のクラスタの部分問題を {min(self.max_workers, len(subproblems))} プロセスで解きます...")
+
+        cluster_results: Dict[int, OptimizationResult] = {}
+        if self.max_workers <= 1 or len(subproblems) <= 1:
+            for cluster, (sub_seminars, sub_students) in subproblems.items():
+                cluster_results[cluster] = _solve_cluster(sub_seminars, sub_students, self.config, cluster_seeds[cluster], cancel_event)
+        else:
+            with multiprocessing.Manager() as manager:
+                shared_cancel_event = manager.Event()
+                with ProcessPoolExecutor(max_workers=min(self.max_workers, len(subproblems))) as executor:
+                    pending = {
+                        executor.submit(_solve_cluster, sub_seminars, sub_students, self.config, cluster_seeds[cluster], shared_cancel_event): cluster
+                        for cluster, (sub_seminars, sub_students) in subproblems.items()
+                    }
+                    futures = dict(pending)
+                    while pending:
+                        done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            cluster = futures[future]
+                            cluster_results[cluster] = future.result()
+                            self._log(f"Multilevel: クラスタ {cluster} が完了しました。スコア: {cluster_results[cluster].best_score:.2f}")
+                        if cancel_event and cancel_event.is_set() and not shared_cancel_event.is_set():
+                            self._log("Multilevel: キャンセルが要求されたため、全クラスタの求解を停止します。")
+                            shared_cancel_event.set()
+
+        cluster_summaries = [
+            {
+                "cluster": cluster,
+                "students": len(subproblems[cluster][1]),
+                "status": result.status,
+                "score": result.best_score
+            }
+            for cluster, result in sorted(cluster_results.items())
+        ]
+        if (cancel_event and cancel_event.is_set()) or any(result.status == "CANCELLED" for result in cluster_results.values()):
+            return None, cluster_summaries
+
+        # 部分問題の割り当てをまとめる (クラスタの学生は互いに重ならず、各クラスタは配分量の定員を守る)
+        vector = np.full(problem.num_students, UNASSIGNED, dtype=np.int32)
+        for result in cluster_results.values():
+            sub_vector = problem.encode(result.best_assignment)
+            vector = np.where(sub_vector >= 0, sub_vector, vector)
+
+        # 残った空き枠へ、未割り当ての学生をランダムな順に最も希望順位の高いセミナーへ割り当てる
+        remaining = (problem.capacities - problem.seminar_loads(vector)).tolist()
+        unassigned = problem.unassigned_indices(vector).tolist()
+        self.rng.shuffle(unassigned)
+        preference_lists = problem.preference_lists
+        for student_idx in unassigned:
+            for seminar_idx in preference_lists[student_idx]:
+                if remaining[seminar_idx] > 0:
+                    vector[student_idx] = seminar_idx
+                    remaining[seminar_idx] -= 1
+                    break
+        return vector, cluster_summaries
+
+    def _v_cycle(self, cancel_event: Optional[threading.Event] = None) -> Tuple[Optional[np.ndarray], List[int]]:
+        """
+        V サイクルで初期割り当てベクトルを作り、各段のノード数 (細かい順) とともに返す。
+        1. 粗視化: 希望リストが同一の学生をまとめ、さらに希望リストの先頭が一致するノードを段階的にまとめる
+        2. 求解: 最も粗い段の輸送問題を最小費用流で厳密に解く
+        3. 射影: 1段ずつ細かい段へ人数を配分し、各段で空き枠の充填と上位希望への移動を行う
+        最も粗い段を解けなかった場合やキャンセルされた場合はベクトルの代わりに None を返す。
+        """
+        problem = self.problem_data
+        if problem.num_students == 0:
+            return np.full(0, UNASSIGNED, dtype=np.int32), []
+        student_nodes, levels = build_hierarchy(problem, self.coarse_size)
+        level_sizes = [level.num_nodes for level in levels]
+
+        coarsest = levels[-1]
+        amounts = solve_transportation(coarsest.pair_nodes, coarsest.pair_seminars, coarsest.pair_weights,
+                                       coarsest.node_counts, problem.capacities, self.weight_scale)
+        if amounts is None:
+            self._log("Multilevel: 最も粗い段を解けなかったため、クラスタリングによる初期解を使います。", level=logging.WARNING)
+            return None, level_sizes
+        self._log(f"Multilevel: 最も粗い段 (ノード数 {coarsest.num_nodes}) を最小費用流で解きました。")
+
+        for k in range(len(levels) - 2, -1, -1):
+            if cancel_event and cancel_event.is_set():
+                return None, level_sizes
+            amounts = refine(levels[k], project(levels[k], levels[k + 1], amounts), problem.capacities, self.refine_passes)
+            level_score = float(np.dot(levels[k].pair_weights, amounts))
+            self._log(f"Multilevel: 段 {k} (ノード数 {levels[k].num_nodes}) へ射影しました。スコア: {level_score:.2f}")
+        return expand(levels[0], amounts, student_nodes), level_sizes
 
     def optimize(self, cancel_event: Optional[threading.Event] = None) -> OptimizationResult:
         """
@@ -178,36 +400,24 @@ class MultilevelOptimizer(BaseOptimizer): # BaseOptimizerを継承
         start_time = time.time()
         self._log("Multilevel 最適化を開始します...")
 
-        # 1. 学生のクラスタリング
-        clusters = self._cluster_students()
-        
-        # 2. 各クラスタ内で初期割り当てを生成（簡易的な貪欲法）
-        # ここでは、各クラスタの学生をランダムな順序で、利用可能なセミナーに割り当てる
-        # クラスタ内での最適化は、より洗練されたアルゴリズム（例: Greedy_LS）を呼び出すことも可能だが、
-        # シンプルさのためここでは簡易的な割り当てを行う
-        initial_assignment: Dict[str, str] = {}
-        seminar_current_counts = {s_id: 0 for s_id in self.seminar_ids}
-
-        for cluster_id, student_ids_in_cluster in clusters.items():
-            self._log(f"Multilevel: クラスタ {cluster_id} の学生を初期割り当て中...")
-            random.shuffle(student_ids_in_cluster) # クラスタ内の学生もシャッフル
-
-            for student_id in student_ids_in_cluster:
-                preferences = self.student_preferences.get(student_id, [])
-                assigned = False
-                for preferred_seminar_id in preferences:
-                    capacity = self.seminar_capacities.get(preferred_seminar_id)
-                    if capacity is not None and seminar_current_counts[preferred_seminar_id] < capacity:
-                        initial_assignment[student_id] = preferred_seminar_id
-                        seminar_current_counts[preferred_seminar_id] += 1
-                        assigned = True
-                        break
-                if not assigned:
-                    pass # 未割り当てのままにする
-
-        self._log(f"Multilevel: 全クラスタの初期割り当てが完了しました。割り当てられた学生数: {len(initial_assignment)}")
+        # 1. 初期解の作成 (ウォームスタート用の割り当て、V サイクル、またはクラスタリング＋貪欲法)
+        details: Dict[str, Any] = {"mode": self.mode}
+        initial_vector = self._initial_assignment_vector()
+        if initial_vector is not None:
+            details["warm_start"] = True
+        elif self.mode == "vcycle":
+            initial_vector, level_sizes = self._v_cycle(cancel_event)
+            details["level_sizes"] = level_sizes
+        elif self.mode == "cluster":
+            initial_vector, cluster_summaries = self._cluster_parallel_vector(cancel_event)
+            details["clusters"] = cluster_summaries
+        if initial_vector is None:
+            initial_vector = self._cluster_greedy_vector()
+        initial_assignment = self.problem_data.decode(initial_vector)
+        details["initial_score"] = self.problem_data.score(initial_vector)
+        self._log(f"Multilevel: 初期割り当てが完了しました。割り当てられた学生数: {len(initial_assignment)}, スコア: {details['initial_score']:.2f}")
         
-        # 3. 全体で局所探索（焼きなまし法）
+        # 2. 全体で局所探索（焼きなまし法）
         final_assignment, final_score = self._local_search_multilevel(initial_assignment, self.progress_callback, cancel_event)
 
         if cancel_event and cancel_event.is_set():
@@ -216,7 +426,7 @@ class MultilevelOptimizer(BaseOptimizer): # BaseOptimizerを継承
                 status="CANCELLED",
                 message="最適化がユーザーによってキャンセルされました。",
                 best_score=-float('inf'),
-                best_assignment={},
+                best_assignment=final_assignment, # 時間予算による打ち切りでは呼び出し側がこの解を使う
                 seminar_capacities=self.seminar_capacities,
                 unassigned_students=self.student_ids,
                 optimization_strategy="Multilevel"
@@ -239,5 +449,6 @@ class MultilevelOptimizer(BaseOptimizer): # BaseOptimizerを継承
             best_assignment=final_assignment,
             seminar_capacities=self.seminar_capacities,
             unassigned_students=unassigned_students_list,
-            optimization_strategy="Multilevel"
+            optimization_strategy="Multilevel",
+            details=details
         )
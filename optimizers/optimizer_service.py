@@ -6,6 +6,9 @@ import numpy as np
 import csv
 import time
 import threading
+import multiprocessing
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from typing import Dict, List, Any, Optional, Callable, Tuple
 import jsonschema # データスキーマ検証用
 
@@ -20,6 +23,12 @@ from seminar_optimization.utils import (
 from seminar_optimization.logger_config import logger
 # スキーマ定義は schemas.py からインポート
 from seminar_optimization.schemas import SEMINARS_SCHEMA, STUDENTS_SCHEMA, CONFIG_SCHEMA
+from seminar_optimization.problem_data import ProblemData
+from seminar_optimization.decomposition import find_components, group_components, build_subproblem, merge_results
+from seminar_optimization.instance_features import extract_features
+from seminar_optimization.metrics import compute_metrics
+from seminar_optimization.strategy_store import StrategyStore
+from seminar_optimization.cost_model import StrategyCostModel, TimeBudget, budgeted_config
 
 # 各最適化アルゴリズムをインポート（同じ optimizers パッケージ内なので相対インポートを使用）
 from optimizers.greedy_ls_optimizer import GreedyLSOptimizer
@@ -29,6 +38,7 @@ from optimizers.cp_sat_optimizer import CPSATOptimizer
 from optimizers.multilevel_optimizer import MultilevelOptimizer
 from optimizers.adaptive_optimizer import AdaptiveOptimizer
 from optimizers.tsl_optimizer import TSLOptimizer
+from optimizers.flow_optimizer import FlowOptimizer
 
 # オプティマイザのマッピングを定義
 OPTIMIZER_MAP = {
@@ -38,9 +48,31 @@ OPTIMIZER_MAP = {
     "CP": CPSATOptimizer,
     "Multilevel": MultilevelOptimizer,
     "Adaptive": AdaptiveOptimizer,
-    "TSL": TSLOptimizer # TSLOptimizerを追加
+    "TSL": TSLOptimizer, # TSLOptimizerを追加
+    "Flow": FlowOptimizer # 最小費用流による厳密解法
 }
 
+# 連結成分への分解を行う最小の学生数の既定値。
+# 部分問題はプロセスプールで解くため、小さい問題では分解せずに解く方が速い
+DECOMPOSE_MIN_STUDENTS = 5000
+
+def _solve_subproblem(strategy_name: str,
+                      seminars: List[Dict[str, Any]],
+                      students: List[Dict[str, Any]],
+                      config: Dict[str, Any],
+                      cancel_event: Optional[Any] = None) -> OptimizationResult:
+    """
+    部分問題を指定された戦略で解く (プロセスプールのワーカーで実行される)。
+    cancel_event は multiprocessing.Manager の Event で、プロセスをまたいでキャンセルを伝える。
+    """
+    optimizer = OPTIMIZER_MAP[strategy_name](
+        seminars=seminars,
+        students=students,
+        config=config,
+        progress_callback=lambda message: None # 進捗はメインプロセスで報告する
+    )
+    return optimizer.optimize(cancel_event=cancel_event)
+
 class OptimizerService:
     """
     最適化アルゴリズムの実行を管理するサービス層。
@@ -55,6 +87,8 @@ class OptimizerService:
         """
         self.progress_callback = progress_callback
         self.logger = logger_instance if logger_instance else logging.getLogger(__name__)
+        # 直前に構築した問題表現 (入力のハッシュ値, ProblemData)。同じデータで繰り返し呼ばれたときに再利用する
+        self._problem_cache: Optional[Tuple[int, ProblemData]] = None
         self.logger.debug("OptimizerService: 初期化を開始します。")
 
     def _validate_data(self, seminars: List[Dict[str, Any]], students: List[Dict[str, Any]], config: Dict[str, Any]):
@@ -77,6 +111,18 @@ class OptimizerService:
             raise RuntimeError(f"データ検証中に予期せぬエラーが発生しました: {e}")
         self.logger.info("OptimizerService: 入力データのスキーマ検証が完了しました。")
 
+    def _problem_data(self, seminars: List[Dict[str, Any]], students: List[Dict[str, Any]], config: Dict[str, Any]) -> ProblemData:
+        """
+        入力に対応する ProblemData を返す。直前の呼び出しと同じ入力 (ProblemData.fingerprint が一致) なら構築済みのものを再利用する。
+        """
+        key = ProblemData.fingerprint(seminars, students, config)
+        if self._problem_cache is not None and self._problem_cache[0] == key:
+            self.logger.debug("OptimizerService: 構築済みの問題表現を再利用します。")
+            return self._problem_cache[1]
+        problem_data = ProblemData.from_lists(seminars, students, config)
+        self._problem_cache = (key, problem_data)
+        return problem_data
+
     def optimize(self, seminars: List[Dict[str, Any]], students: List[Dict[str, Any]], config: Dict[str, Any], cancel_event: Optional[threading.Event] = None) -> OptimizationResult:
         """
         指定された最適化戦略に基づいてセミナー割り当て最適化を実行する。
@@ -105,6 +151,11 @@ class OptimizerService:
             )
 
         strategy_name = config.get("optimization_strategy", "Greedy_LS")
+        if strategy_name == "Auto":
+            strategy_name, config, budget = self._plan_strategy(seminars, students, config)
+            if budget is not None:
+                # 予測モデルが決めた時間予算を、どの戦略でも予算切れのキャンセルで守らせる
+                cancel_event = TimeBudget(budget, cancel_event)
         OptimizerClass = OPTIMIZER_MAP.get(strategy_name)
 
         if not OptimizerClass:
@@ -122,17 +173,30 @@ class OptimizerService:
         self.logger.info(f"OptimizerService: 選択された最適化戦略: {strategy_name}")
         self.logger.debug(f"OptimizerService: config: {config}")
 
-        optimizer = OptimizerClass(
-            seminars=seminars,
-            students=students,
-            config=config,
-            progress_callback=self.progress_callback
-        )
-
         try:
-            result = optimizer.optimize(cancel_event=cancel_event)
+            # 希望グラフが独立な連結成分に分かれる場合は、成分ごとに並列に解く
+            subproblems = self._find_subproblems(seminars, students, config)
+            if len(subproblems) > 1:
+                result = self._optimize_decomposed(strategy_name, subproblems, seminars, students, config, cancel_event)
+            else:
+                optimizer = OptimizerClass(
+                    seminars=seminars,
+                    students=students,
+                    config=config,
+                    progress_callback=self.progress_callback,
+                    problem_data=self._problem_data(seminars, students, config)
+                )
+                result = optimizer.optimize(cancel_event=cancel_event)
+                if isinstance(cancel_event, TimeBudget):
+                    result = cancel_event.finish(result, optimizer.problem_data)
             self.logger.info(f"OptimizerService: 最適化が完了しました。ステータス: {result.status}, スコア: {result.best_score:.2f}")
 
+            # 品質指標 (希望順位ごとの人数、負荷の標準偏差など) を結果に付け、GUI の表示に使う
+            if result.best_assignment:
+                problem_data = self._problem_data(seminars, students, config)
+                metrics = compute_metrics(problem_data, problem_data.encode(result.best_assignment))
+                result.details["metrics"] = metrics.to_dict(problem_data)
+
             # レポート生成をここで行う
             self._generate_reports(result.best_assignment, result.optimization_strategy, seminars, students, config, result.seminar_capacities)
 
@@ -149,6 +213,94 @@ class OptimizerService:
                 optimization_strategy=strategy_name
             )
 
+    def _plan_strategy(self, seminars: List[Dict[str, Any]], students: List[Dict[str, Any]], config: Dict[str, Any]) -> Tuple[str, Dict[str, Any], Optional[float]]:
+        """
+        optimization_strategy が "Auto" の場合に、adaptive_history_db の履歴から学習した予測モデルで
+        戦略と時間予算を決め、(戦略名, 時間制限を予算内に収めた設定, 時間予算の秒数) を返す。
+        予測モデルを作れない (履歴の指定がない、または履歴が足りない) 場合は Adaptive を使う (時間予算は None)。
+        """
+        model: Optional[StrategyCostModel] = None
+        history_db = config.get("adaptive_history_db")
+        if history_db:
+            try:
+                model = StrategyCostModel.from_rows(StrategyStore(history_db).training_rows(),
+                                                    config.get("cost_model_min_samples", 5), config.get("random_seed"))
+            except sqlite3.Error as e:
+                self.logger.warning(f"OptimizerService: 戦略の履歴 {history_db} を使用できません: {e}")
+        plan = None
+        if model is not None:
+            features = extract_features(self._problem_data(seminars, students, config))
+            plan = model.plan(features, config.get("adaptive_max_total_time", 600),
+                              [name for name in OPTIMIZER_MAP if name != "Adaptive"],
+                              config.get("cost_model_quality_tolerance", 0.005),
+                              config.get("cost_model_budget_factor", 2.0))
+        if plan is None:
+            self.logger.info("OptimizerService: 予測モデルがないため、Adaptive で最適化します。")
+            return "Adaptive", config, None
+        strategy_name, budget, predictions = plan
+        self.logger.info(f"OptimizerService: 予測モデルにより戦略 '{strategy_name}' (時間予算 {budget:.1f}秒) を選択しました。予測: {predictions}")
+        if self.progress_callback:
+            self.progress_callback(f"予測モデルにより戦略 '{strategy_name}' (時間予算 {budget:.1f}秒) を選択しました。")
+        return strategy_name, budgeted_config(config, budget), budget
+
+    def _find_subproblems(self, seminars: List[Dict[str, Any]], students: List[Dict[str, Any]], config: Dict[str, Any]) -> List[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]:
+        """
+        希望グラフの連結成分から、独立に解ける部分問題 (セミナー, 学生) のリストを作成する。
+        分解が無効な場合、学生数が decompose_min_students 未満の場合 (プロセスの起動の方が高くつくため)、
+        成分が1つしかない場合は空のリストを返す。
+        """
+        if not config.get("decompose_components", True):
+            return []
+        min_students = config.get("decompose_min_students", DECOMPOSE_MIN_STUDENTS)
+        if len(students) < min_students:
+            self.logger.debug(f"OptimizerService: 学生数 {len(students)} が {min_students} 未満のため、連結成分への分解は行いません。")
+            return []
+        components = find_components(self._problem_data(seminars, students, config))
+        if len(components) <= 1:
+            return []
+        groups = group_components(components, config.get("max_workers", 8))
+        self.logger.info(f"OptimizerService: {len(components)} 個の連結成分を {len(groups)} 個の部分問題にまとめました。")
+        return [build_subproblem(seminars, students, group) for group in groups]
+
+    def _optimize_decomposed(self,
+                             strategy_name: str,
+                             subproblems: List[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]],
+                             seminars: List[Dict[str, Any]],
+                             students: List[Dict[str, Any]],
+                             config: Dict[str, Any],
+                             cancel_event: Optional[threading.Event] = None) -> OptimizationResult:
+        """
+        部分問題をプロセスプールで並列に解き、結果を統合する。
+        """
+        if self.progress_callback:
+            self.progress_callback(f"問題を {len(subproblems)} 個の独立な部分問題に分解して並列に最適化します...")
+        max_workers = min(config.get("max_workers", 8), len(subproblems))
+        with multiprocessing.Manager() as manager:
+            shared_cancel_event = manager.Event()
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                index_of = {
+                    executor.submit(_solve_subproblem, strategy_name, sub_seminars, sub_students, config, shared_cancel_event): index
+                    for index, (sub_seminars, sub_students) in enumerate(subproblems)
+                }
+                pending = set(index_of)
+                results: Dict[int, OptimizationResult] = {}
+                while pending:
+                    done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        index = index_of[future]
+                        result = future.result()
+                        if isinstance(cancel_event, TimeBudget) and cancel_event.expired:
+                            # 時間予算で打ち切られた部分問題は、その時点の解を部分問題の問題表現で評価し直す
+                            result = cancel_event.finish(result, ProblemData.from_lists(*subproblems[index], config))
+                        results[index] = result
+                        if self.progress_callback:
+                            self.progress_callback(f"部分問題 {len(results)}/{len(subproblems)} の最適化が完了しました。")
+                    if cancel_event and cancel_event.is_set() and not shared_cancel_event.is_set():
+                        self.logger.info("OptimizerService: キャンセルが要求されたため、部分問題の最適化を停止します。")
+                        shared_cancel_event.set()
+        # 完了順ではなく部分問題の順に統合し、details の部分問題の番号を再現可能にする
+        return merge_results([results[index] for index in sorted(results)], seminars, students, strategy_name)
+
     def _generate_reports(self, assignment: Dict[str, str], optimization_strategy: str, seminars: List[Dict[str, Any]], students: List[Dict[str, Any]], config: Dict[str, Any], seminar_capacities: Dict[str, int]):
         """
         最適化結果に基づいてレポートを生成する。
@@ -171,7 +323,8 @@ class OptimizerService:
                     config=report_config,
                     final_assignment=assignment,
                     optimization_strategy=optimization_strategy,
-                    is_intermediate=False
+                    is_intermediate=False,
+                    problem_data=self._problem_data(seminars, students, config)
                 )
                 self.logger.debug("OptimizerService: PDFレポート生成関数を呼び出しました。")
 
@@ -181,7 +334,8 @@ class OptimizerService:
                     config=report_config,
                     final_assignment=assignment,
                     optimization_strategy=optimization_strategy,
-                    is_intermediate=False
+                    is_intermediate=False,
+                    problem_data=self._problem_data(seminars, students, config)
                 )
                 self.logger.debug("OptimizerService: CSVレポート生成関数を呼び出しました。")
             self.logger.info("OptimizerService: レポート生成処理が完了しました。")
@@ -1,13 +1,17 @@
-import random
 import math
 import logging
 import threading
 import time # timeモジュールをインポート
-from typing import List, Tuple, Dict, Any, Optional, Callable
+from typing import List, Tuple, Dict, Any, Optional, Callable, Set
+import numpy as np
 
 # BaseOptimizerとOptimizationResultをutilsからインポート
 # プロジェクトの構造に合わせてパスを修正
 from seminar_optimization.utils import BaseOptimizer, OptimizationResult
+from seminar_optimization.problem_data import ProblemData, UNASSIGNED
+from seminar_optimization.fitness_cache import FitnessCache
+from seminar_optimization.assignment_operators import AssignmentOperators
+from seminar_optimization.delta_evaluator import DeltaEvaluator
 # ロギングは logger_config.py で一元的に設定されるため、ここではロガーの取得のみ
 from seminar_optimization.logger_config import logger
 
@@ -16,93 +20,99 @@ class SeminarProblem:
     セミナー割り当て問題を定義するクラス。
     セミナーデータと学生データを基に、初期割り当ての生成、割り当ての評価、制約チェックを行う。
     """
-    def __init__(self, seminars_data: List[Dict[str, Any]], students_data: List[Dict[str, Any]], config: Dict[str, Any]):
+    def __init__(self, seminars_data: List[Dict[str, Any]], students_data: List[Dict[str, Any]], config: Dict[str, Any], problem_data: Optional[ProblemData] = None, fitness_cache: Optional[FitnessCache] = None):
         self.seminars = {s['id']: s for s in seminars_data}
         self.students = {st['id']: st for st in students_data}
         self.seminar_ids = list(self.seminars.keys())
         self.student_ids = list(self.students.keys())
         self.config = config # スコア重みなどの設定を保持
+        # 整数インデックス化された問題表現 (スコア重み × 倍率の重みテーブルを含む)
+        self.problem_data = problem_data if problem_data is not None else ProblemData.from_lists(seminars_data, students_data, config)
+        # 評価済みの割り当てを再評価しないための適応度キャッシュ (オプティマイザと共有できる)
+        self.fitness_cache = fitness_cache if fitness_cache is not None else FitnessCache(self.problem_data, config.get("fitness_cache_size", 10000))
+        # 乱数生成器と、定員を考慮した割り当て演算子 (初期解の生成と摂動に使う)
+        self.rng = np.random.default_rng(config.get("random_seed"))
+        self.operators = AssignmentOperators(self.problem_data, self.rng)
         logger.debug(f"SeminarProblem初期化: セミナー数={len(self.seminars)}, 学生数={len(self.students)}")
 
-        # スコア重みを設定から取得
-        self.score_weights = self.config.get("score_weights", {
-            "1st_choice": 5.0,
-            "2nd_choice": 2.0,
-            "3rd_choice": 1.0,
-            "other_preference": 0.5
-        })
-        logger.debug(f"SeminarProblem: スコア重み: {self.score_weights}")
-
     def evaluate(self, assignment: Dict[str, str]) -> float:
         """
         与えられた割り当てのフィットネス（コスト）を評価する。
         フィットネスは最小化されるべき値（低いほど良い）。
         ここでは、BaseOptimizerのスコア（高いほど良い）の負の値を返す。
         """
-        if not self._is_feasible_assignment(assignment):
-            # 制約違反の割り当てには非常に大きなペナルティを与える
-            return float('inf') 
+        for seminar_id in assignment.values():
+            if seminar_id not in self.problem_data.seminar_index:
+                logger.warning(f"SeminarProblem: 無効なセミナーID '{seminar_id}' が割り当てに含まれています。")
+                return float('inf') # 存在しないセミナーへの割り当ては無効
 
-        total_score = 0.0
-        for student_id, assigned_seminar_id in assignment.items():
-            student_prefs = self.students.get(student_id, {}).get('preferences', [])
-            
-            # 希望順位に基づいたスコア加算
-            try:
-                rank = student_prefs.index(assigned_seminar_id) + 1
-                if rank == 1:
-                    total_score += self.score_weights.get("1st_choice", 5.0)
-                elif rank == 2:
-                    total_score += self.score_weights.get("2nd_choice", 2.0)
-                elif rank == 3:
-                    total_score += self.score_weights.get("3rd_choice", 1.0)
-                else:
-                    total_score += self.score_weights.get("other_preference", 0.5)
-            except ValueError:
-                # 希望リストにないセミナーに割り当てられた場合
-                total_score += self.score_weights.get("other_preference", 0.5) # あるいは0点など、ペナルティを課す
+        # 希望順位に基づいたスコア (BaseOptimizer._calculate_score と同じ重みテーブルを使用)。評価済みならキャッシュから取り出す
+        total_score, overload, unassigned_students_count = self.fitness_cache.evaluate(self.problem_data.encode(assignment))
+        if overload > 0:
+            # 制約違反の割り当てには非常に大きなペナルティを与える
+            return float('inf')
 
         # 未割り当て学生に対するペナルティ（フィットネスを増加させる）
-        assigned_students = set(assignment.keys())
-        unassigned_students_count = len(self.student_ids) - len(assigned_students)
         total_score -= unassigned_students_count * 100.0 # 未割り当ては大きなペナルティ
 
         # TSLは最小化問題として設計されているため、スコアの負の値を返す
         return -total_score
 
+    def evaluate_batch(self, assignments: List[Dict[str, str]]) -> np.ndarray:
+        """
+        複数の割り当てのフィットネスをまとめて評価する (evaluate と同じ定義)。
+        """
+        if not assignments:
+            return np.empty(0, dtype=np.float64)
+        return self.evaluate_vectors(np.stack([self.problem_data.encode(assignment) for assignment in assignments]))
+
+    def evaluate_vectors(self, matrix: np.ndarray) -> np.ndarray:
+        """
+        P×N の割り当て行列の各行のフィットネスをまとめて評価する (evaluate と同じ定義)。
+        キャッシュにないものだけを ProblemData.evaluate_batch で一度に計算する。
+        """
+        if len(matrix) == 0:
+            return np.empty(0, dtype=np.float64)
+        scores, overloads, unassigned_counts = self.fitness_cache.evaluate_batch(matrix)
+        fitnesses = -(scores - unassigned_counts * 100.0)
+        # 制約違反の割り当てには非常に大きなペナルティを与える
+        return np.where(overloads == 0, fitnesses, np.inf)
+
+    def evaluate_vector(self, vector: np.ndarray) -> float:
+        """1つの割り当てベクトルのフィットネスを返す。"""
+        return float(self.evaluate_vectors(np.asarray(vector)[np.newaxis, :])[0])
+
+    def get_initial_vector(self) -> np.ndarray:
+        """
+        定員を守ったランダムな初期割り当てベクトルを生成する。
+        各学生は自分の希望をランダムな順に試し、空きがあるセミナーに割り当てられる (なければ未割り当て)。
+        """
+        vector = self.operators.random_feasible_vector()
+        logger.debug(f"SeminarProblem: ランダムな初期割り当てを生成しました。割り当て数: {int(np.count_nonzero(vector >= 0))}")
+        return vector
+
     def get_initial_random_assignment(self) -> Dict[str, str]:
         """
-        ランダムな初期割り当てを生成する。
-        各学生をランダムなセミナーに割り当てるが、定員制約は考慮しない（後で修正が必要になる可能性あり）。
+        定員を守ったランダムな初期割り当てを辞書で返す (get_initial_vector を参照)。
         """
-        assignment = {}
-        # セミナーIDが空の場合のハンドリング
         if not self.seminar_ids:
             logger.warning("SeminarProblem: セミナーIDが定義されていません。初期割り当てを生成できません。")
             return {}
-
-        for student_id in self.student_ids:
-            assignment[student_id] = random.choice(self.seminar_ids)
-        logger.debug(f"SeminarProblem: ランダムな初期割り当てを生成しました。学生数: {len(assignment)}")
-        return assignment
+        return self.problem_data.decode(self.get_initial_vector())
 
     def _is_feasible_assignment(self, assignment: Dict[str, str]) -> bool:
         """
         現在の割り当てが制約を満たしているかチェックする。
         ここでは、セミナーの最大定員制約をチェックする。
         """
-        seminar_counts = {s_id: 0 for s_id in self.seminar_ids}
-        for student_id, seminar_id in assignment.items():
-            if seminar_id not in self.seminar_ids:
+        for seminar_id in assignment.values():
+            if seminar_id not in self.problem_data.seminar_index:
                 logger.warning(f"SeminarProblem: 無効なセミナーID '{seminar_id}' が割り当てに含まれています。")
                 return False # 存在しないセミナーへの割り当ては無効
-            seminar_counts[seminar_id] += 1
 
-        for seminar_id, count in seminar_counts.items():
-            capacity = self.seminars.get(seminar_id, {}).get('capacity', float('inf')) # 定義されていない場合は無限大
-            if count > capacity:
-                logger.warning(f"SeminarProblem: 制約違反: セミナー '{seminar_id}' の定員 ({capacity}) を超えています ({count}人割り当て)。")
-                return False
+        if not self.problem_data.is_feasible(self.problem_data.encode(assignment)):
+            logger.warning("SeminarProblem: 制約違反: 定員を超えているセミナーがあります。")
+            return False
         logger.debug("SeminarProblem: すべての定員制約を満たしています。割り当ては実行可能です。")
         return True
 
@@ -111,6 +121,7 @@ class SeminarProblem:
         return {s_id: self.seminars[s_id]['capacity'] for s_id in self.seminar_ids}
 
 # 各学生は自身の割り当てと個人的な最良割り当てを持ち、教師や他の学生から学習します。
+# 割り当ては学生インデックス -> セミナーインデックス (未割り当ては -1) の int32 ベクトルで保持します。
 class Student:
     """
     学習アルゴリズムにおける生徒の基底クラス。
@@ -119,25 +130,44 @@ class Student:
     def __init__(self, problem: SeminarProblem, student_id_alias: str):
         self.problem = problem
         self.id = student_id_alias # アルゴリズム内で使用する生徒のエイリアス（例: 探索型_1）
-        self.current_assignment = self.problem.get_initial_random_assignment()
-        self.current_fitness = self.problem.evaluate(self.current_assignment)
-        self.personal_best_assignment = dict(self.current_assignment) # 個人的な最良割り当て
+        self.current_vector = self.problem.get_initial_vector()
+        self.current_fitness = self.problem.evaluate_vector(self.current_vector)
+        self.personal_best_vector = self.current_vector.copy() # 個人的な最良割り当て
         self.personal_best_fitness = self.current_fitness # 個人的な最良フィットネス
         logger.debug(f"Student {self.id} 初期化: 初期フィットネス={self.current_fitness:.2f}")
 
+    @property
+    def current_assignment(self) -> Dict[str, str]:
+        """現在の割り当てを学生ID -> セミナーID の辞書で返す。"""
+        return self.problem.problem_data.decode(self.current_vector)
+
+    @property
+    def personal_best_assignment(self) -> Dict[str, str]:
+        """個人的な最良割り当てを学生ID -> セミナーID の辞書で返す。"""
+        return self.problem.problem_data.decode(self.personal_best_vector)
+
+    def update_fitness(self, fitness: float):
+        """
+        learn で更新された現在の割り当てのフィットネスを設定し、個人的な最良割り当てを更新します。
+        フィットネスはオプティマイザが全生徒分をまとめて評価して渡します。
+        """
+        self.current_fitness = float(fitness)
+        self._update_personal_best()
+
     def _update_personal_best(self):
         """
         現在の割り当てが個人的な最良割り当てよりも良い場合（フィットネスが低い場合）、更新します。
         """
         if self.current_fitness < self.personal_best_fitness:
-            self.personal_best_assignment = dict(self.current_assignment)
+            self.personal_best_vector = self.current_vector.copy()
             self.personal_best_fitness = self.current_fitness
             logger.debug(f"Student {self.id}: 個人最良フィットネスを更新: {self.personal_best_fitness:.2f}")
 
-    def learn(self, global_best_assignment: Dict[str, str], iteration: int, total_iterations: int, phase: str, teacher_memory: List[Dict[str, Any]] = None):
+    def learn(self, global_best_vector: np.ndarray, iteration: int, total_iterations: int, phase: str, teacher_memory: List[Dict[str, Any]] = None):
         """
         学習ロジック（各生徒タイプでオーバーライドされます）。
-        global_best_assignment: 教師が持つ現在の全体最良割り当て。
+        current_vector のみを更新し、フィットネスの評価は update_fitness で行います。
+        global_best_vector: 教師が持つ現在の全体最良割り当て。
         iteration: 現在の反復回数。
         total_iterations: 総反復回数。
         phase: 現在の学習フェーズ ('Preparation', 'Execution', 'Review')。
@@ -145,167 +175,326 @@ class Student:
         """
         raise NotImplementedError("このメソッドは各生徒タイプで実装する必要があります。")
 
-    def _perturb_assignment(self, assignment: Dict[str, str], perturbation_strength: float) -> Dict[str, str]:
+    def _perturb_vector(self, vector: np.ndarray, perturbation_strength: float) -> np.ndarray:
         """
         割り当てを微調整（摂動）するヘルパーメソッド。
-        離散的な割り当てに対して、ランダムな学生のセミナーを変更するなどの操作を行います。
-        perturbation_strength: 摂動の強さ (0.0から1.0)
+        ランダムに選んだ学生を、自分の希望セミナーのいずれか（空き枠がある場合）または未割り当てに割り当て直す。
+        元の割り当てが定員を守っていれば、摂動後も定員を守る。
+        perturbation_strength: 摂動する学生の割合 (0.0から1.0)
         """
-        new_assignment = dict(assignment)
-        student_ids = list(new_assignment.keys())
-        
-        if not student_ids:
-            return new_assignment # 学生がいない場合は何もしない
-
-        num_students_to_perturb = max(1, int(len(student_ids) * perturbation_strength))
-        
-        # 摂動する学生をランダムに選択
-        students_to_perturb = random.sample(student_ids, min(num_students_to_perturb, len(student_ids)))
-        
-        available_seminars = self.problem.seminar_ids
-        if not available_seminars:
-            logger.warning("Student: 利用可能なセミナーがありません。摂動できません。")
-            return new_assignment # セミナーがない場合は何もしない
-
-        for s_id in students_to_perturb:
-            # ランダムなセミナーに再割り当て
-            new_assignment[s_id] = random.choice(available_seminars)
-        
-        # TODO: ここに学生の希望やセミナー定員などの制約を考慮した、よりインテリジェントな摂動ロジックを追加する
-        # 例: 優先度の高いセミナーが空いていればそちらに移動、定員オーバーを解消するなど
+        perturbed = self.problem.operators.perturb(vector, perturbation_strength)
         logger.debug(f"Student {self.id}: 割り当てを摂動しました。摂動強度: {perturbation_strength:.2f}")
-        return new_assignment
+        return perturbed
 
 class ExploratoryStudent(Student):
     """
     探索型の生徒。広範囲を探索し、局所最適解に陥るのを防ぎます。
     """
-    def learn(self, global_best_assignment: Dict[str, str], iteration: int, total_iterations: int, phase: str, teacher_memory: List[Dict[str, Any]] = None):
+    def learn(self, global_best_vector: np.ndarray, iteration: int, total_iterations: int, phase: str, teacher_memory: List[Dict[str, Any]] = None):
         # 探索ステップのサイズは、反復が進むにつれて減少します。
         step_factor = 1.0 - (iteration / total_iterations) # 1.0 -> 0.0
         current_perturb_strength = 0.3 * step_factor + 0.05 # 最小5%は摂動
 
-        if random.random() < 0.7:
+        if self.problem.rng.random() < 0.7:
             # 高い確率で自身の現在地から大きくランダムジャンプ
-            self.current_assignment = self._perturb_assignment(self.current_assignment, current_perturb_strength)
+            self.current_vector = self._perturb_vector(self.current_vector, current_perturb_strength)
             logger.debug(f"ExploratoryStudent {self.id}: 大規模な探索を行いました。")
         else:
             # グローバル最良割り当ての方向へ少し移動しつつ、探索も行う
-            # ここでは「方向へ移動」を、グローバル最良割り当ての一部をコピーし、残りを摂動する、と解釈
-            temp_assignment = dict(global_best_assignment)
-            # グローバル最良割り当ての80%を維持し、20%をランダムに摂動するイメージ
-            self.current_assignment = self._perturb_assignment(temp_assignment, 0.2) 
+            # ここでは「方向へ移動」を、グローバル最良割り当ての80%を維持し、20%を摂動する、と解釈
+            self.current_vector = self._perturb_vector(global_best_vector, 0.2)
             logger.debug(f"ExploratoryStudent {self.id}: グローバル最良解の方向へ摂動しました。")
-            
-        self.current_fitness = self.problem.evaluate(self.current_assignment)
-        self._update_personal_best()
 
 class LocalStudent(Student):
     """
     局所型の生徒。現在の最良割り当ての周辺を重点的に探索し、改善を目指します。
     """
-    def learn(self, global_best_assignment: Dict[str, str], iteration: int, total_iterations: int, phase: str, teacher_memory: List[Dict[str, Any]] = None):
+    def learn(self, global_best_vector: np.ndarray, iteration: int, total_iterations: int, phase: str, teacher_memory: List[Dict[str, Any]] = None):
         # ステップサイズは、反復が進むにつれてグローバル最良割り当てへの集中度が高まります。
         step_factor = iteration / total_iterations # 0.0 -> 1.0
         current_perturb_strength = 0.1 * (1 - step_factor) + 0.01 # 全体的な摂動サイズは減少、最小1%
 
-        target_assignment = global_best_assignment if random.random() < 0.8 else self.personal_best_assignment
-        self.current_assignment = self._perturb_assignment(target_assignment, current_perturb_strength)
+        target_vector = global_best_vector if self.problem.rng.random() < 0.8 else self.personal_best_vector
+        self.current_vector = self._perturb_vector(target_vector, current_perturb_strength)
         logger.debug(f"LocalStudent {self.id}: 局所探索を行いました。")
-        
-        self.current_fitness = self.problem.evaluate(self.current_assignment)
-        self._update_personal_best()
 
 class BalancedStudent(Student):
     """
     バランス型の生徒。探索と活用のバランスを取りながら学習します。
     """
-    def learn(self, global_best_assignment: Dict[str, str], iteration: int, total_iterations: int, phase: str, teacher_memory: List[Dict[str, Any]] = None):
+    def learn(self, global_best_vector: np.ndarray, iteration: int, total_iterations: int, phase: str, teacher_memory: List[Dict[str, Any]] = None):
         # 探索と活用の重みは、反復とフェーズに応じて適応的に変化します。
         exploration_weight = 0.5 * (1 - iteration / total_iterations) # 時間とともに減少
         exploitation_weight = 0.5 * (iteration / total_iterations) # 時間とともに増加
         base_perturb_strength = 0.05
 
-        new_assignment = dict(self.current_assignment)
-        student_ids = list(new_assignment.keys())
-        
-        if not student_ids:
+        rng = self.problem.rng
+        operators = self.problem.operators
+        num_students = len(self.current_vector)
+        if num_students == 0:
             return # 学生がいない場合は何もしない
 
-        # 個人最良解、全体最良解、ランダム探索の影響を合成
-        for s_id in student_ids:
-            if random.random() < exploitation_weight:
-                # 活用フェーズ：個人最良解または全体最良解から学生の割り当てをコピー
-                if random.random() < 0.5:
-                    new_assignment[s_id] = self.personal_best_assignment.get(s_id, new_assignment[s_id])
-                else:
-                    new_assignment[s_id] = global_best_assignment.get(s_id, new_assignment[s_id])
-            elif random.random() < exploration_weight:
-                # 探索フェーズ：ランダムなセミナーに割り当て
-                available_seminars = self.problem.seminar_ids
-                if available_seminars:
-                    new_assignment[s_id] = random.choice(available_seminars)
-        
+        # 個人最良解、全体最良解、ランダム探索の影響を学生ごとのマスクで合成
+        exploit = rng.random(num_students) < exploitation_weight
+        from_personal_best = rng.random(num_students) < 0.5
+        explore = ~exploit & (rng.random(num_students) < exploration_weight)
+
+        new_vector = self.current_vector.copy()
+        # 活用：個人最良解または全体最良解から学生の割り当てをコピー
+        new_vector[exploit & from_personal_best] = self.personal_best_vector[exploit & from_personal_best]
+        new_vector[exploit & ~from_personal_best] = global_best_vector[exploit & ~from_personal_best]
+        # 別々の解から割り当てを混ぜると定員を超えることがあるため修復する
+        new_vector = operators.repair_vector(new_vector)
+        # 探索：希望セミナーの空き枠または未割り当てへ割り当て直す
+        new_vector = operators.reassign(new_vector, np.flatnonzero(explore))
+
         # 最後に全体的な微摂動を適用して多様性を確保
-        self.current_assignment = self._perturb_assignment(new_assignment, base_perturb_strength)
+        self.current_vector = self._perturb_vector(new_vector, base_perturb_strength)
         logger.debug(f"BalancedStudent {self.id}: 探索と活用のバランスを取りながら学習しました。")
 
-        self.current_fitness = self.problem.evaluate(self.current_assignment)
-        self._update_personal_best()
-
 # --- 3. 教師クラス (Teacher Class) ---
-# 教師は生徒たちの学習を監督し、全体的な最良割り当てと過去の優良割り当てを管理します。
+# 教師は生徒たちの学習を監督し、全体的な最良割り当てと過去の優良割り当て (エリートアーカイブ) を管理します。
+class EliteArchive:
+    """
+    多様性を保った優良割り当ての集合。
+    割り当ての Zobrist ハッシュで索引付けして同一解を O(1) で除外し、
+    既存の解とのハミング距離 (割り当て先が異なる学生の数) が min_distance 未満の解は、
+    その近い解より良い場合にだけ置き換えとして受け入れます。
+    """
+    def __init__(self, problem: SeminarProblem, max_size: int = 10, min_distance: int = 1):
+        self.problem = problem
+        self.max_size = max_size
+        self.min_distance = max(1, min_distance)
+        self.entries: List[Dict[str, Any]] = [] # {'vector', 'fitness', 'hash'} をフィットネスが小さい順に保持
+        self._hashes: Dict[int, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _distances(self, vector: np.ndarray) -> np.ndarray:
+        """アーカイブ内の各解とのハミング距離を返す。"""
+        return np.count_nonzero(np.stack([entry['vector'] for entry in self.entries]) != vector[np.newaxis, :], axis=1)
+
+    def _remove(self, index: int):
+        entry = self.entries.pop(index)
+        del self._hashes[entry['hash']]
+
+    def add(self, vector: np.ndarray, fitness: float) -> bool:
+        """
+        解をアーカイブに追加する。受け入れた場合は True を返す。
+        - 同じ解 (ハッシュが一致) は追加しない
+        - 既存の解に近すぎる (距離 < min_distance) 場合は、最も近い解より良いときだけそれと置き換える
+        - アーカイブが満杯の場合は、最も悪い解より良いときだけそれと置き換える
+        """
+        if not np.isfinite(fitness):
+            return False
+        hash_value = self.problem.fitness_cache.hasher.hash_vector(vector)
+        if hash_value in self._hashes:
+            return False
+        if self.entries:
+            distances = self._distances(vector)
+            nearest = int(np.argmin(distances))
+            if distances[nearest] < self.min_distance:
+                if fitness >= self.entries[nearest]['fitness']:
+                    return False
+                self._remove(nearest)
+            elif len(self.entries) >= self.max_size:
+                if fitness >= self.entries[-1]['fitness']:
+                    return False
+                self._remove(len(self.entries) - 1)
+        entry = {'vector': np.array(vector, dtype=np.int32), 'fitness': fitness, 'hash': hash_value}
+        self.entries.append(entry)
+        self.entries.sort(key=lambda x: x['fitness']) # フィットネスが小さい順にソート
+        self._hashes[hash_value] = entry
+        return True
+
+    def best(self) -> Optional[Dict[str, Any]]:
+        """最もフィットネスの良い解を返す。"""
+        return self.entries[0] if self.entries else None
+
+
 class Teacher:
     """
-    生徒の学習を監督し、全体最良割り当てと過去の優良割り当て（メモリ）を管理するクラス。
+    生徒の学習を監督し、全体最良割り当てと過去の優良割り当て（エリートアーカイブ）を管理するクラス。
     """
-    def __init__(self, problem: SeminarProblem):
+    def __init__(self, problem: SeminarProblem, max_memory_size: int = 10, min_distance: int = 1, relink_sample: int = 16):
         self.problem = problem
-        self.global_best_assignment: Optional[Dict[str, str]] = None # 全体最良割り当て
+        self.relink_sample = max(1, relink_sample) # パスリリンキングの各ステップで評価する移動候補の数
+        self.global_best_vector: Optional[np.ndarray] = None # 全体最良割り当て
         self.global_best_fitness: float = float('inf') # 全体最良フィットネス (低いほど良い)
-        self.memory: List[Dict[str, Any]] = [] # 過去の優良割り当てを保存するメモリ
+        self.archive = EliteArchive(problem, max_memory_size, min_distance) # 過去の優良割り当てを保存するアーカイブ
         logger.debug("Teacher: 初期化を開始しました。")
 
+    @property
+    def memory(self) -> List[Dict[str, Any]]:
+        """アーカイブ内の優良割り当て ({'vector', 'fitness', 'hash'}) のリスト (フィットネスが小さい順)。"""
+        return self.archive.entries
+
+    @property
+    def global_best_assignment(self) -> Optional[Dict[str, str]]:
+        """全体最良割り当てを学生ID -> セミナーID の辞書で返す (未設定なら None)。"""
+        if self.global_best_vector is None:
+            return None
+        return self.problem.problem_data.decode(self.global_best_vector)
+
     def update_global_best(self, students: List[Student]):
         """
         現在の生徒たちの個人的最良割り当てから、全体最良割り当てを更新します。
         フィットネスが低いほど良い解とみなします。
+        生徒の個人的最良割り当てはアーカイブの候補にもなります (多様性の条件を満たすものだけが残る)。
         """
-        updated = False
         for student in students:
             if student.personal_best_fitness < self.global_best_fitness:
-                self.global_best_fitness = student.personal_best_fitness
-                self.global_best_assignment = dict(student.personal_best_assignment)
-                updated = True
-        
-        # 現在の全体最良割り当てもメモリに追加します。
-        if updated and self.global_best_assignment and self.global_best_fitness != float('inf'):
-            self.add_to_memory(self.global_best_assignment, self.global_best_fitness)
-            logger.debug(f"Teacher: 全体最良フィットネスを更新: {self.global_best_fitness:.2f}")
+                self._set_global_best(student.personal_best_vector, student.personal_best_fitness)
+            self.add_to_memory(student.personal_best_vector, student.personal_best_fitness)
+
+    def _set_global_best(self, vector: np.ndarray, fitness: float):
+        self.global_best_fitness = fitness
+        self.global_best_vector = np.array(vector, dtype=np.int32)
+        self.add_to_memory(self.global_best_vector, fitness)
+        logger.debug(f"Teacher: 全体最良フィットネスを更新: {self.global_best_fitness:.2f}")
 
-    def add_to_memory(self, assignment: Dict[str, str], fitness: float, max_memory_size: int = 10):
+    def add_to_memory(self, vector: np.ndarray, fitness: float) -> bool:
         """
-        優良割り当てをメモリに追加し、フィットネスでソートして、最大サイズを維持します。
+        優良割り当てをアーカイブに追加します (EliteArchive.add を参照)。
         """
-        # 同じ解が既にメモリにある場合は追加しない
-        # ここではシンプルに、同じフィットネス値の割り当ては追加しない
-        # より厳密な重複チェックが必要な場合は、割り当て内容も比較する
-        if not any(m['fitness'] == fitness for m in self.memory):
-            self.memory.append({'assignment': dict(assignment), 'fitness': fitness})
-            self.memory.sort(key=lambda x: x['fitness']) # フィットネスが小さい順にソート
-            self.memory = self.memory[:max_memory_size] # メモリサイズを制限
-            logger.debug(f"Teacher: メモリに割り当てを追加しました。現在のメモリサイズ: {len(self.memory)}")
+        added = self.archive.add(vector, fitness)
+        if added:
+            logger.debug(f"Teacher: アーカイブに割り当てを追加しました。現在のサイズ: {len(self.archive)}")
+        return added
 
-    def get_best_from_memory(self) -> Optional[Dict[str, str]]:
+    def get_best_from_memory(self) -> Optional[np.ndarray]:
         """
-        メモリから最も良い割り当てを返します。
+        アーカイブから最も良い割り当てを返します。
         """
-        if self.memory:
-            logger.debug(f"Teacher: メモリから最良割り当てを取得しました (フィットネス: {self.memory[0]['fitness']:.2f})")
-            return self.memory[0]['assignment']
-        logger.debug("Teacher: メモリが空です。")
+        best = self.archive.best()
+        if best is not None:
+            logger.debug(f"Teacher: アーカイブから最良割り当てを取得しました (フィットネス: {best['fitness']:.2f})")
+            return best['vector']
+        logger.debug("Teacher: アーカイブが空です。")
         return None
 
+    def path_relink(self, initiating_vector: np.ndarray, guiding_vector: np.ndarray) -> Tuple[np.ndarray, float]:
+        """
+        パスリリンキング: 開始解から誘導解へ、割り当て先が異なる学生を1人ずつ誘導解の割り当てに移していく。
+        各ステップでは、残りの学生から relink_sample 人を (重複を許して) 抽出し、定員を超えない移動のうち
+        フィットネスが最も良くなるものを差分評価で選ぶ。抽出した中に移動できる学生がいなければ、
+        移動先 (誘導解のセミナー) ごとの索引から、空きのあるセミナーへ移る学生だけを調べる。
+        どの移動も定員で塞がれている場合は、塞がれたセミナーに座っている残りの学生 (最大 relink_sample 人) から
+        1人を未割り当てにして席を空けてから進む。
+        経路上で最も良い中間解 (両端を除く) とそのフィットネスを返す。中間解がない場合は開始解を返す。
+        中間解は手順の記録から最後に1回だけ復元する。
+        """
+        evaluator = DeltaEvaluator(self.problem.problem_data, initiating_vector)
+        rng = self.problem.rng
+        remaining = np.flatnonzero(initiating_vector != guiding_vector).tolist()
+        position_of = {student_idx: position for position, student_idx in enumerate(remaining)}
+        guiding = guiding_vector.tolist()
+        # 残りの学生の索引: 移動先 (誘導解のセミナー) ごと、今座っているセミナーごと
+        by_target: Dict[int, Set[int]] = {}
+        by_seat: Dict[int, Set[int]] = {}
+        for student_idx in remaining:
+            by_target.setdefault(guiding[student_idx], set()).add(student_idx)
+            by_seat.setdefault(evaluator.seminar_of(student_idx), set()).add(student_idx)
+        fitness = -(evaluator.score - evaluator.unassigned_count * 100.0)
+        moves: List[Tuple[int, int]] = []
+        best_step, best_fitness = 0, float('inf')
+
+        def best_move_among(students) -> Tuple[Optional[int], float]:
+            best_student, best_move_fitness = None, float('inf')
+            for student_idx in students:
+                target = guiding[student_idx]
+                if not evaluator.has_room(target):
+                    continue
+                score_delta, _, unassigned_delta = evaluator.move_effect(student_idx, target)
+                move_fitness = fitness - (score_delta - unassigned_delta * 100.0)
+                if move_fitness < best_move_fitness:
+                    best_student, best_move_fitness = student_idx, move_fitness
+            return best_student, best_move_fitness
+
+        def movable_students():
+            for target, students in by_target.items():
+                if evaluator.has_room(target):
+                    yield from students
+
+        def best_unassignment() -> Tuple[Optional[int], float]:
+            # 席を空ける意味があるのは、残りの学生の移動先になっている満員のセミナーだけ
+            candidates: List[int] = []
+            for target in by_target:
+                if evaluator.has_room(target):
+                    continue
+                candidates.extend(by_seat.get(target, ()))
+                if len(candidates) >= self.relink_sample:
+                    break
+            best_student, best_move_fitness = None, float('inf')
+            for student_idx in candidates[:self.relink_sample]:
+                score_delta, _, unassigned_delta = evaluator.move_effect(student_idx, UNASSIGNED)
+                move_fitness = fitness - (score_delta - unassigned_delta * 100.0)
+                if move_fitness < best_move_fitness:
+                    best_student, best_move_fitness = student_idx, move_fitness
+            return best_student, best_move_fitness
+
+        def discard(index: Dict[int, Set[int]], key: int, student_idx: int):
+            students = index[key]
+            students.discard(student_idx)
+            if not students:
+                del index[key]
+
+        while len(remaining) > 1: # 最後の1手で誘導解そのものになるため、その手前まで進む
+            if len(remaining) > self.relink_sample:
+                sample = rng.integers(0, len(remaining), size=self.relink_sample).tolist()
+                student_idx, move_fitness = best_move_among(remaining[position] for position in sample)
+                if student_idx is None:
+                    student_idx, move_fitness = best_move_among(movable_students())
+            else:
+                student_idx, move_fitness = best_move_among(remaining)
+            if student_idx is None:
+                # 定員が埋まっていて誘導解の割り当てへ移せない場合は、いずれ今の席を離れる学生を一時的に未割り当てにして席を空ける
+                student_idx, move_fitness = best_unassignment()
+                if student_idx is None:
+                    break # これ以上誘導解に近づけない
+                discard(by_seat, evaluator.seminar_of(student_idx), student_idx)
+                by_seat.setdefault(UNASSIGNED, set()).add(student_idx)
+                evaluator.apply_move(student_idx, UNASSIGNED)
+                moves.append((student_idx, UNASSIGNED))
+            else:
+                discard(by_target, guiding[student_idx], student_idx)
+                discard(by_seat, evaluator.seminar_of(student_idx), student_idx)
+                evaluator.apply_move(student_idx, guiding[student_idx])
+                moves.append((student_idx, guiding[student_idx]))
+                # 末尾と入れ替えて O(1) で取り除く
+                position = position_of.pop(student_idx)
+                last = remaining.pop()
+                if last != student_idx:
+                    remaining[position] = last
+                    position_of[last] = position
+            fitness = move_fitness
+            if fitness < best_fitness:
+                best_step, best_fitness = len(moves), fitness
+
+        best_vector = np.array(initiating_vector, dtype=np.int32)
+        if not np.isfinite(best_fitness):
+            return best_vector, self.problem.evaluate_vector(initiating_vector)
+        for student_idx, seminar_idx in moves[:best_step]:
+            best_vector[student_idx] = seminar_idx
+        return best_vector, best_fitness
+
+    def relink_target(self) -> Optional[np.ndarray]:
+        """
+        アーカイブからランダムに選んだ2つのエリート解の間をパスリリンキングし、経路上の最良解を学習目標として返す。
+        それが全体最良解より良ければ全体最良解も更新する。エリート解が2つ未満の場合はアーカイブの最良解を返す。
+        """
+        if len(self.archive) < 2:
+            return self.get_best_from_memory()
+        first, second = self.problem.rng.choice(len(self.archive), size=2, replace=False).tolist()
+        vector, fitness = self.path_relink(self.archive.entries[first]['vector'], self.archive.entries[second]['vector'])
+        logger.debug(f"Teacher: パスリリンキングで学習目標を生成しました (フィットネス: {fitness:.2f})")
+        if fitness < self.global_best_fitness:
+            self._set_global_best(vector, fitness)
+        else:
+            self.add_to_memory(vector, fitness)
+        return vector
+
 # --- 4. TSLOptimizer クラス (BaseOptimizerを継承) ---
 class TSLOptimizer(BaseOptimizer):
     """
@@ -315,12 +504,17 @@ class TSLOptimizer(BaseOptimizer):
                  seminars: List[Dict[str, Any]],
                  students: List[Dict[str, Any]],
                  config: Dict[str, Any],
-                 progress_callback: Optional[Callable[[str], None]] = None):
-        super().__init__(seminars, students, config, progress_callback)
+                 progress_callback: Optional[Callable[[str], None]] = None,
+                 initial_assignment: Optional[Dict[str, str]] = None, # ウォームスタートに使う割り当て
+                 problem_data: Optional[ProblemData] = None): # 構築済みの問題表現 (共有する場合)
+        super().__init__(seminars, students, config, progress_callback, initial_assignment, problem_data)
         logger.debug("TSLOptimizer: 初期化を開始します。")
 
-        self.problem = SeminarProblem(seminars, students, config) # SeminarProblemを初期化
-        self.teacher = Teacher(self.problem)
+        self.problem = SeminarProblem(seminars, students, config, self.problem_data, self.fitness_cache) # SeminarProblemを初期化 (ProblemData と適応度キャッシュを共有)
+        # 教師のエリートアーカイブ: 最大サイズと、受け入れる解同士の最小ハミング距離 (学生数に対する割合)
+        memory_size = config.get("tsl_memory_size", 10)
+        min_distance = int(len(students) * config.get("tsl_memory_min_distance_ratio", 0.01))
+        self.teacher = Teacher(self.problem, memory_size, min_distance, config.get("tsl_relink_sample", 16))
         self.students: List[Student] = []
 
         # 生徒の数を設定から取得、またはデフォルト値を設定
@@ -334,15 +528,23 @@ class TSLOptimizer(BaseOptimizer):
             self.students.append(LocalStudent(self.problem, f"局所型_{i+1}"))
         for i in range(num_balanced):
             self.students.append(BalancedStudent(self.problem, f"バランス型_{i+1}"))
-        random.shuffle(self.students) # 生徒の順序をランダム化
+        self.students = [self.students[k] for k in self.problem.rng.permutation(len(self.students)).tolist()] # 生徒の順序をランダム化
         logger.debug(f"TSLOptimizer: {len(self.students)}人の生徒を生成しました。")
 
-        # 全体最良割り当てを初期化します（最初の生徒の割り当てから）。
+        # 全体最良割り当てを初期化します（ランダムに選んだ生徒の割り当てから）。
         if self.students:
-            initial_student = random.choice(self.students)
-            self.teacher.global_best_assignment = dict(initial_student.current_assignment)
+            initial_student = self.students[int(self.problem.rng.integers(len(self.students)))]
+            self.teacher.global_best_vector = initial_student.current_vector.copy()
             self.teacher.global_best_fitness = initial_student.current_fitness
-            self.teacher.add_to_memory(self.teacher.global_best_assignment, self.teacher.global_best_fitness)
+            self.teacher.add_to_memory(self.teacher.global_best_vector, self.teacher.global_best_fitness)
+            # ウォームスタート用の割り当てが与えられた場合は、それの方が良ければ教師の全体最良とする (アーカイブにも入る)
+            warm_start_vector = self._initial_assignment_vector()
+            if warm_start_vector is not None:
+                warm_start_fitness = self.problem.evaluate_vector(warm_start_vector)
+                if warm_start_fitness < self.teacher.global_best_fitness:
+                    self.teacher._set_global_best(warm_start_vector, warm_start_fitness)
+                else:
+                    self.teacher.add_to_memory(warm_start_vector, warm_start_fitness)
             logger.info(f"TSLOptimizer: 初期全体最良フィットネス: {self.teacher.global_best_fitness:.2f}")
         else:
             logger.warning("TSLOptimizer: 生徒がいないため、全体最良割り当てを初期化できません。")
@@ -373,6 +575,7 @@ class TSLOptimizer(BaseOptimizer):
         self._log(f"復習フェーズ: {review_iterations} 反復", level=logging.INFO)
         self._log("-" * 30, level=logging.INFO)
 
+        reported_fitness = float('inf') # 最後に best_score_callback へ通知した全体最良フィットネス
         for i in range(max_iterations):
             if cancel_event and cancel_event.is_set():
                 self._log("TSLOptimizer: 最適化がユーザーによってキャンセルされました。", level=logging.INFO)
@@ -380,7 +583,7 @@ class TSLOptimizer(BaseOptimizer):
                     status="CANCELLED",
                     message="最適化がユーザーによってキャンセルされました。",
                     best_score=-float('inf'), # キャンセルされた場合はスコアを無効にする
-                    best_assignment={},
+                    best_assignment=self.teacher.global_best_assignment or {}, # 時間予算による打ち切りでは呼び出し側がこの解を使う
                     seminar_capacities=self.problem.get_seminar_capacities(),
                     unassigned_students=self.student_ids,
                     optimization_strategy="TSL"
@@ -401,21 +604,35 @@ class TSLOptimizer(BaseOptimizer):
             # 教師は現在の生徒のパフォーマンスに基づいて全体最良割り当てを更新します。
             self.teacher.update_global_best(self.students)
 
-            # 生徒は全体最良割り当て（および場合によっては教師のメモリ）から学習します。
+            # 生徒は全体最良割り当て（および場合によっては教師のアーカイブ）から学習します。
+            relinked_target = None
             for student in self.students:
-                learning_target = self.teacher.global_best_assignment
+                learning_target = self.teacher.global_best_vector
                 
-                # 復習フェーズでは、生徒は低い確率で教師のメモリから学習することもあります。
-                if current_phase == "Review" and random.random() < self.config.get("tsl_memory_learn_prob", 0.1): # 10%の確率
-                    mem_best = self.teacher.get_best_from_memory()
-                    if mem_best:
-                        learning_target = mem_best # メモリの最良解を学習ターゲットにする
+                # 復習フェーズでは、生徒は低い確率で、アーカイブのエリート解の間をパスリリンキングした解から学習します。
+                # パスリリンキングは反復ごとに1回だけ行い、その反復でアーカイブから学ぶ生徒が共有します。
+                if current_phase == "Review" and self.problem.rng.random() < self.config.get("tsl_memory_learn_prob", 0.1): # 10%の確率
+                    if relinked_target is None:
+                        relinked_target = self.teacher.relink_target()
+                    if relinked_target is not None:
+                        learning_target = relinked_target # パスリリンキングの最良解を学習ターゲットにする
                 
-                if learning_target: # learning_targetがNoneでないことを確認
+                if learning_target is not None: # learning_targetがNoneでないことを確認
                     student.learn(learning_target, i, max_iterations, current_phase, self.teacher.memory)
                 else:
                     # 初期化に失敗した場合のフォールバック (ありえないはずだが安全のため)
-                    student.learn(student.current_assignment, i, max_iterations, current_phase, self.teacher.memory)
+                    student.learn(student.current_vector, i, max_iterations, current_phase, self.teacher.memory)
+
+            # 全生徒の新しい割り当てを P×N 行列として一度にまとめて評価します。
+            if not self.students:
+                break
+            fitnesses = self.problem.evaluate_vectors(np.stack([student.current_vector for student in self.students]))
+            for student, fitness in zip(self.students, fitnesses.tolist()):
+                student.update_fitness(fitness)
+
+            if self.teacher.global_best_fitness < reported_fitness:
+                reported_fitness = self.teacher.global_best_fitness
+                self._report_best_score(self.problem_data.score(self.teacher.global_best_vector))
 
             # 進捗を記録します。
             history.append({
@@ -435,6 +652,7 @@ class TSLOptimizer(BaseOptimizer):
         self._log("-" * 30, level=logging.INFO)
         self._log(f"--- TSL アルゴリズム終了 ---", level=logging.INFO)
         self._log(f"最終最良フィットネス: {self.teacher.global_best_fitness:.4f}", level=logging.INFO)
+        self._log(f"適応度キャッシュのヒット率: {self.fitness_cache.hit_rate:.1%}", level=logging.INFO)
 
         final_assignments = self.teacher.global_best_assignment if self.teacher.global_best_assignment else {}
         
@@ -452,7 +670,8 @@ class TSLOptimizer(BaseOptimizer):
             best_assignment=final_assignments,
             seminar_capacities=self.problem.get_seminar_capacities(),
             unassigned_students=unassigned_students,
-            optimization_strategy="TSL"
+            optimization_strategy="TSL",
+            details={"fitness_cache": self.fitness_cache.stats()}
         )
 
     # BaseOptimizerの _calculate_score をSeminarProblemから利用できるようにする
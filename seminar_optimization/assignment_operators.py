@@ -0,0 +1,163 @@
+# seminar_optimization/assignment_operators.py
+"""
+割り当てベクトル (および P×N の割り当て行列) に対する、定員を考慮した NumPy 演算子を定義します。
+
+- random_feasible_vector: 学生ごとに希望をランダムな順に試し、定員内で割り当てた実行可能な解を作る
+- draw_preference_or_unassigned: 学生の希望セミナーのいずれか、または未割り当てを一様に引く
+- reassign: 指定した学生を、空き枠を奪い合う形で希望セミナーか未割り当てへ割り当て直す
+- perturb: ランダムに選んだ一定割合の学生を reassign する (実行可能性を保つ摂動)
+- repair: 定員超過セミナーから重みの低い学生を追い出し、希望順に空き枠へ入れ直す
+
+GA と TSL の両方から使われます。いずれも乱数は渡された numpy の Generator から取り出します。
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+# ロギングは logger_config.py で一元的に設定されるため、ここではロガーの取得のみ
+from seminar_optimization.logger_config import logger
+from seminar_optimization.problem_data import ProblemData, UNASSIGNED
+
+
+def rank_within_groups(group_keys: np.ndarray, priorities: np.ndarray, tie_breakers: np.ndarray) -> np.ndarray:
+    """
+    各要素の、同じグループ内での順位 (0始まり、priorities の降順、同値は tie_breakers の昇順) を返す。
+    """
+    order = np.lexsort((tie_breakers, -priorities, group_keys))
+    sorted_keys = group_keys[order]
+    is_group_start = np.ones(len(order), dtype=bool)
+    is_group_start[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    group_starts = np.flatnonzero(is_group_start)
+    group_lengths = np.diff(np.append(group_starts, len(order)))
+    ranks = np.empty(len(order), dtype=np.int64)
+    ranks[order] = np.arange(len(order)) - np.repeat(group_starts, group_lengths)
+    return ranks
+
+
+class AssignmentOperators:
+    """
+    問題データと乱数生成器を保持し、定員を考慮した割り当て演算子を提供するクラス。
+    """
+    def __init__(self, problem_data: ProblemData, rng: Optional[np.random.Generator] = None):
+        self.problem_data = problem_data
+        self.rng = rng if rng is not None else np.random.default_rng()
+        # 各学生の有効な希望を左詰めにした行列と希望数 (存在しないセミナーの希望は除く)
+        preference_matrix = problem_data.preference_matrix
+        left_aligned = np.argsort(preference_matrix < 0, axis=1, kind='stable')
+        self.compact_preferences = np.take_along_axis(preference_matrix, left_aligned, axis=1)
+        self.num_preferences = np.count_nonzero(preference_matrix >= 0, axis=1)
+
+    def random_feasible_vector(self) -> np.ndarray:
+        """
+        学生をランダムな順に処理し、各学生の希望をランダムな順に試して、定員に空きがあれば割り当てる。
+        どの希望にも空きがない学生は未割り当てのままにする。
+        """
+        problem = self.problem_data
+        vector = np.full(problem.num_students, UNASSIGNED, dtype=np.int32)
+        remaining = problem.capacities.tolist()
+        preference_lists = problem.preference_lists
+        for student_idx in self.rng.permutation(problem.num_students).tolist():
+            preferences = preference_lists[student_idx]
+            for k in self.rng.permutation(len(preferences)).tolist():
+                seminar_idx = preferences[k]
+                if remaining[seminar_idx] > 0:
+                    vector[student_idx] = seminar_idx
+                    remaining[seminar_idx] -= 1
+                    break
+        return vector
+
+    def draw_preference_or_unassigned(self, students: np.ndarray) -> np.ndarray:
+        """
+        各学生について、希望セミナーのいずれか、または未割り当て (-1) を一様に引いて返す。
+        希望外のセミナーはスコアが 0 で定員だけを消費するため候補にしない。
+        """
+        num_choices = self.num_preferences[students] + 1 # 希望数 + 未割り当て
+        choice = (self.rng.random(len(students)) * num_choices).astype(np.int64)
+        is_preference = choice < self.num_preferences[students]
+        drawn = np.full(len(students), UNASSIGNED, dtype=np.int32)
+        drawn[is_preference] = self.compact_preferences[students[is_preference], choice[is_preference]]
+        return drawn
+
+    def reassign(self, vector: np.ndarray, students: np.ndarray) -> np.ndarray:
+        """
+        students を一度未割り当てにし、それぞれが引いた希望セミナー (または未割り当て) に割り当て直す。
+        同じセミナーの空き枠を争う場合はランダムな順に空き枠の数だけ認め、あふれた学生は未割り当てにする。
+        vector が実行可能なら結果も実行可能。vector をその場で書き換えて返す。
+        """
+        problem = self.problem_data
+        vector[students] = UNASSIGNED
+        drawn = self.draw_preference_or_unassigned(students)
+        wants_seat = drawn >= 0
+        students, drawn = students[wants_seat], drawn[wants_seat]
+        if len(students) == 0:
+            return vector
+        free_slots = problem.capacities - problem.seminar_loads(vector)
+        order_in_seminar = rank_within_groups(drawn.astype(np.int64), np.zeros(len(drawn)), self.rng.random(len(drawn)))
+        granted = order_in_seminar < free_slots[drawn]
+        vector[students[granted]] = drawn[granted]
+        return vector
+
+    def perturb(self, vector: np.ndarray, strength: float) -> np.ndarray:
+        """
+        学生のうち strength の割合 (最低1人) をランダムに選び、reassign で割り当て直した新しいベクトルを返す。
+        """
+        num_students = self.problem_data.num_students
+        perturbed = np.array(vector, dtype=np.int32)
+        if num_students == 0:
+            return perturbed
+        count = min(num_students, max(1, int(num_students * strength)))
+        return self.reassign(perturbed, self.rng.choice(num_students, size=count, replace=False))
+
+    def repair(self, population: np.ndarray) -> Tuple[np.ndarray, int, int]:
+        """
+        割り当て行列 (P×N) の定員超過をその場で修復する。
+        1. 定員を超えたセミナーから、そのセミナーでの重みが最も低い学生を定員まで追い出す。
+        2. 追い出した学生を希望順に、空き枠のあるセミナーへ入れ直す
+           (同じ枠を争う場合は重みの高い学生を優先する)。どこにも入れない学生は未割り当てにする。
+        全行をまとめて処理し、Python のループは希望順位の数だけで済む。
+        修復後の行列と、追い出した人数・入れ直した人数を返す。
+        """
+        problem = self.problem_data
+        num_seminars = problem.num_seminars
+        capacities = problem.capacities
+        evaluation = problem.evaluate_batch(population)
+        overloaded = evaluation.overloads > 0
+        if not overloaded.any():
+            return population, 0, 0
+
+        rows, students = np.nonzero(population >= 0)
+        seminars = population[rows, students]
+        in_overloaded = overloaded[rows, seminars]
+        rows, students, seminars = rows[in_overloaded], students[in_overloaded], seminars[in_overloaded]
+        ranks = rank_within_groups(rows.astype(np.int64) * num_seminars + seminars,
+                                   problem.weights_of(students, seminars),
+                                   self.rng.random(len(rows)))
+        evicted = ranks >= capacities[seminars]
+        evicted_rows, evicted_students = rows[evicted], students[evicted]
+        population[evicted_rows, evicted_students] = UNASSIGNED
+
+        # 追い出し後、超過していたセミナーはちょうど満員になる
+        free_slots = (capacities[np.newaxis, :] - np.minimum(evaluation.loads, capacities[np.newaxis, :])).ravel()
+        pending = np.ones(len(evicted_students), dtype=bool)
+        for rank in range(self.compact_preferences.shape[1]):
+            candidates = np.flatnonzero(pending & (rank < self.num_preferences[evicted_students]))
+            if len(candidates) == 0:
+                break
+            candidate_seminars = self.compact_preferences[evicted_students[candidates], rank]
+            slot_keys = evicted_rows[candidates].astype(np.int64) * num_seminars + candidate_seminars
+            has_room = free_slots[slot_keys] > 0
+            candidates, candidate_seminars, slot_keys = candidates[has_room], candidate_seminars[has_room], slot_keys[has_room]
+            order_in_slot = rank_within_groups(slot_keys,
+                                               problem.weights_of(evicted_students[candidates], candidate_seminars),
+                                               self.rng.random(len(candidates)))
+            granted = order_in_slot < free_slots[slot_keys]
+            population[evicted_rows[candidates[granted]], evicted_students[candidates[granted]]] = candidate_seminars[granted]
+            free_slots -= np.bincount(slot_keys[granted], minlength=len(free_slots))
+            pending[candidates[granted]] = False
+        reinserted = int(np.count_nonzero(~pending))
+        logger.debug(f"AssignmentOperators: 定員修復: {len(evicted_students)} 人を追い出し、{reinserted} 人を再割り当てしました。")
+        return population, len(evicted_students), reinserted
+
+    def repair_vector(self, vector: np.ndarray) -> np.ndarray:
+        """1つの割り当てベクトルの定員超過を修復する (repair の1行版)。"""
+        return self.repair(np.asarray(vector)[np.newaxis, :])[0][0]
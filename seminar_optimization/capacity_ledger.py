@@ -0,0 +1,140 @@
+# seminar_optimization/capacity_ledger.py
+"""
+定員管理のための台帳 (CapacityLedger) を定義します。
+
+セミナーごとの割り当て人数、空きのあるセミナーの集合、未割り当て・割り当て済みの学生の集合を
+保持し、定員チェック・追加・削除・ランダムな要素の取り出しをすべて O(1) で行います。
+割り当て全体を走査して人数を数え直す処理を、局所探索や突然変異のループから取り除くために使います。
+"""
+import random
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+# ロギングは logger_config.py で一元的に設定されるため、ここではロガーの取得のみ
+from seminar_optimization.logger_config import logger
+from seminar_optimization.problem_data import UNASSIGNED
+
+
+class IndexedPool:
+    """
+    整数の集合。リストと位置の辞書で管理し、追加・削除・所属判定・ランダムな要素の選択を O(1) で行う。
+    削除は末尾の要素と入れ替えてから取り除くため、要素の順序は保たれない。
+    """
+    def __init__(self, items: Iterable[int] = ()):
+        self._items: List[int] = []
+        self._positions: Dict[int, int] = {}
+        for item in items:
+            self.add(item)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, item: int) -> bool:
+        return item in self._positions
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(list(self._items))
+
+    def add(self, item: int):
+        if item in self._positions:
+            return
+        self._positions[item] = len(self._items)
+        self._items.append(item)
+
+    def remove(self, item: int):
+        position = self._positions.pop(item, None)
+        if position is None:
+            return
+        last = self._items.pop()
+        if position < len(self._items):
+            self._items[position] = last
+            self._positions[last] = position
+
+    def choice(self, rng: random.Random = random) -> Optional[int]:
+        """ランダムな要素を1つ返す (空の場合は None)。"""
+        if not self._items:
+            return None
+        return self._items[rng.randrange(len(self._items))]
+
+
+class CapacityLedger:
+    """
+    割り当てベクトルに対するセミナーの定員台帳。
+
+    - load / remaining / has_room: セミナーの人数・残り定員・空きの有無
+    - open_seminars: 空きのあるセミナーの集合 (IndexedPool)
+    - unassigned / assigned: 未割り当て・割り当て済みの学生の集合 (IndexedPool)
+    - move(student, from, to): 学生の割り当て変更を反映する
+
+    台帳は学生ごとの割り当て先を保持しないため、呼び出し側が現在の割り当て先を渡す。
+    """
+    def __init__(self, capacities: Sequence[int], assignment_vector: np.ndarray):
+        self._capacities: List[int] = [int(c) for c in capacities]
+        assignment = np.asarray(assignment_vector)
+        assigned_seminars = assignment[assignment >= 0]
+        self._loads: List[int] = np.bincount(assigned_seminars, minlength=len(self._capacities)).tolist()
+        self.open_seminars = IndexedPool(
+            s for s, (load, cap) in enumerate(zip(self._loads, self._capacities)) if load < cap
+        )
+        self.unassigned = IndexedPool(np.flatnonzero(assignment < 0).tolist())
+        self.assigned = IndexedPool(np.flatnonzero(assignment >= 0).tolist())
+        logger.debug(f"CapacityLedger: 初期化しました。空きのあるセミナー数: {len(self.open_seminars)}, 未割り当て学生数: {len(self.unassigned)}")
+
+    # --- 参照 ---
+
+    def load(self, seminar_idx: int) -> int:
+        """セミナーの現在の割り当て人数を返す。"""
+        return self._loads[seminar_idx]
+
+    def capacity(self, seminar_idx: int) -> int:
+        return self._capacities[seminar_idx]
+
+    def remaining(self, seminar_idx: int) -> int:
+        """セミナーの残り定員 (定員超過の場合は負) を返す。"""
+        return self._capacities[seminar_idx] - self._loads[seminar_idx]
+
+    def has_room(self, seminar_idx: int) -> bool:
+        """セミナーに空きがあるか (未割り当て -1 は常に True) を返す。"""
+        return seminar_idx < 0 or self._loads[seminar_idx] < self._capacities[seminar_idx]
+
+    def random_unassigned(self, rng: random.Random = random) -> Optional[int]:
+        """未割り当ての学生をランダムに1人返す (いない場合は None)。"""
+        return self.unassigned.choice(rng)
+
+    def random_assigned(self, rng: random.Random = random) -> Optional[int]:
+        """割り当て済みの学生をランダムに1人返す (いない場合は None)。"""
+        return self.assigned.choice(rng)
+
+    def random_open_seminar(self, rng: random.Random = random) -> Optional[int]:
+        """空きのあるセミナーをランダムに1つ返す (ない場合は None)。"""
+        return self.open_seminars.choice(rng)
+
+    # --- 更新 ---
+
+    def add(self, student_idx: int, seminar_idx: int):
+        """未割り当ての学生をセミナーに追加する。"""
+        self.move(student_idx, UNASSIGNED, seminar_idx)
+
+    def remove(self, student_idx: int, seminar_idx: int):
+        """学生をセミナーから外し、未割り当てにする。"""
+        self.move(student_idx, seminar_idx, UNASSIGNED)
+
+    def move(self, student_idx: int, from_seminar: int, to_seminar: int):
+        """学生の割り当て先を from_seminar から to_seminar (-1 は未割り当て) に変更する。"""
+        if from_seminar == to_seminar:
+            return
+        if from_seminar >= 0:
+            self._loads[from_seminar] -= 1
+            if self._loads[from_seminar] < self._capacities[from_seminar]:
+                self.open_seminars.add(from_seminar)
+        else:
+            self.unassigned.remove(student_idx)
+            self.assigned.add(student_idx)
+        if to_seminar >= 0:
+            self._loads[to_seminar] += 1
+            if self._loads[to_seminar] >= self._capacities[to_seminar]:
+                self.open_seminars.remove(to_seminar)
+        else:
+            self.assigned.remove(student_idx)
+            self.unassigned.add(student_idx)
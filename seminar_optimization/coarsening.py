@@ -0,0 +1,306 @@
+# seminar_optimization/coarsening.py
+"""
+多段階最適化 (V サイクル) のための学生の粗視化と、粗い解の射影・改善を定義します。
+
+- 最も細かい段 (段0) では、希望リストが同一の学生を1つのノードにまとめる (重みが同じなので損失はない)
+- 段を上がるごとに、希望リストの先頭 L 件 (L を1つずつ減らす) が一致するノードを1つのノードにまとめる。
+  ノードの (セミナーごとの) 1人あたりの重みは、含まれる学生の重みの平均とする
+- 最も粗い段の輸送問題を厳密に解き、得られたノード×セミナーの人数を1段ずつ細かい段へ射影し、
+  各段で空き枠の充填・上位希望への移動・セミナー間の交換による安価な改善を行う
+
+ノードと (ノード, セミナー) の組はすべて NumPy 配列で表し、射影と改善は希望順位の数だけのループで済ませます。
+"""
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# ロギングは logger_config.py で一元的に設定されるため、ここではロガーの取得のみ
+from seminar_optimization.logger_config import logger
+from seminar_optimization.problem_data import ProblemData, UNASSIGNED
+
+
+@dataclass(frozen=True)
+class CoarseLevel:
+    """
+    粗視化の1段。
+
+    Attributes:
+        node_counts: ノードごとの学生数 (M,)。
+        pair_nodes: (ノード, セミナー) の組のノード。ノード順、同じノード内は重みの降順に並ぶ。
+        pair_seminars: 組のセミナー。
+        pair_weights: 組の1人あたりの重み。
+        pair_ranks: 組のノード内での順位 (0 が最も重い)。
+        parents: ノード -> 1段粗い段のノード (最も粗い段では None)。
+    """
+    node_counts: np.ndarray
+    pair_nodes: np.ndarray
+    pair_seminars: np.ndarray
+    pair_weights: np.ndarray
+    pair_ranks: np.ndarray
+    parents: Optional[np.ndarray]
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.node_counts)
+
+
+def _make_level(node_counts: np.ndarray, pair_nodes: np.ndarray, pair_seminars: np.ndarray,
+                pair_weights: np.ndarray, parents: Optional[np.ndarray] = None) -> CoarseLevel:
+    """組をノード順・重みの降順に並べ替え、ノード内の順位を付けて CoarseLevel を作る。"""
+    order = np.lexsort((pair_seminars, -pair_weights, pair_nodes))
+    pair_nodes, pair_seminars, pair_weights = pair_nodes[order], pair_seminars[order], pair_weights[order]
+    starts = np.searchsorted(pair_nodes, np.arange(len(node_counts)))
+    pair_ranks = np.arange(len(pair_nodes)) - starts[pair_nodes]
+    return CoarseLevel(node_counts.astype(np.int64), pair_nodes.astype(np.int64), pair_seminars.astype(np.int64),
+                       pair_weights.astype(np.float64), pair_ranks.astype(np.int64), parents)
+
+
+def build_hierarchy(problem_data: ProblemData, coarse_size: int) -> Tuple[np.ndarray, List[CoarseLevel]]:
+    """
+    学生を粗視化した段のリスト (細かい順) と、学生 -> 段0のノードの対応を返す。
+    段のノード数が coarse_size 以下になるか、希望リストの先頭1件でまとめた段に達した時点で止める。
+    ノード数が減らない段は作らない。
+    """
+    num_seminars = problem_data.num_seminars
+    preference_matrix = problem_data.preference_matrix
+    # 希望リストの先頭 L 件ごとのラベル。先頭 L-1 件のラベルと L 件目のセミナーを1つの整数にまとめて1次元で一意化する
+    prefix_labels = [np.zeros(problem_data.num_students, dtype=np.int64)]
+    for column in range(preference_matrix.shape[1]):
+        keys = prefix_labels[-1] * (num_seminars + 1) + (preference_matrix[:, column].astype(np.int64) + 1)
+        prefix_labels.append(np.unique(keys, return_inverse=True)[1].reshape(-1).astype(np.int64))
+
+    # 段0: 希望リスト全体が同一の学生をまとめたノード (プロファイル)
+    student_nodes = prefix_labels[-1]
+    _, representatives, counts = np.unique(student_nodes, return_index=True, return_counts=True)
+    profiles = preference_matrix[representatives]
+    profile_rows, rank_cols = np.nonzero(profiles >= 0)
+    base_seminars = profiles[profile_rows, rank_cols].astype(np.int64)
+    base_weights = problem_data.preference_weights[representatives[profile_rows], rank_cols]
+    base_nodes = profile_rows.astype(np.int64)
+    base_counts = counts.astype(np.int64)
+
+    # 各段について、段0のノード -> その段のノードの対応を求める
+    labels_by_level = [np.arange(len(base_counts), dtype=np.int64)]
+    prefix_length = preference_matrix.shape[1]
+    while labels_by_level[-1].max(initial=-1) + 1 > coarse_size and prefix_length > 1:
+        prefix_length -= 1
+        labels = np.unique(prefix_labels[prefix_length][representatives], return_inverse=True)[1].reshape(-1).astype(np.int64)
+        if labels.max(initial=-1) < labels_by_level[-1].max(initial=-1):
+            labels_by_level.append(labels)
+
+    levels: List[CoarseLevel] = []
+    for k, labels in enumerate(labels_by_level):
+        num_nodes = int(labels.max(initial=-1)) + 1
+        node_counts = np.bincount(labels, weights=base_counts, minlength=num_nodes).astype(np.int64)
+        # (ノード, セミナー) ごとに学生の重みを合計し、ノードの人数で割って1人あたりの重みにする
+        keys = labels[base_nodes] * num_seminars + base_seminars
+        unique_keys, key_inverse = np.unique(keys, return_inverse=True)
+        totals = np.bincount(key_inverse.reshape(-1), weights=base_weights * base_counts[base_nodes], minlength=len(unique_keys))
+        pair_nodes = unique_keys // num_seminars
+        parents = None
+        if k + 1 < len(labels_by_level):
+            parents = np.empty(num_nodes, dtype=np.int64)
+            parents[labels] = labels_by_level[k + 1]
+        levels.append(_make_level(node_counts, pair_nodes, unique_keys % num_seminars,
+                                  totals / node_counts[pair_nodes], parents))
+    logger.info(f"coarsening: 学生 {problem_data.num_students} 人を {len(levels)} 段に粗視化しました。各段のノード数: {[level.num_nodes for level in levels]}")
+    return student_nodes, levels
+
+
+def _allocate(groups: np.ndarray, priorities: np.ndarray, demands: np.ndarray, supplies: np.ndarray) -> np.ndarray:
+    """
+    各要素が groups の供給 (supplies[group]) から demands だけ欲しいとき、
+    同じグループ内では priorities の降順に先着で配分した量を返す。
+    """
+    if len(groups) == 0:
+        return np.zeros(0, dtype=np.int64)
+    order = np.lexsort((-priorities, groups))
+    sorted_groups = groups[order]
+    sorted_demands = demands[order]
+    cumulative = np.cumsum(sorted_demands)
+    is_start = np.ones(len(order), dtype=bool)
+    is_start[1:] = sorted_groups[1:] != sorted_groups[:-1]
+    group_offsets = np.repeat(cumulative[is_start] - sorted_demands[is_start], np.diff(np.append(np.flatnonzero(is_start), len(order))))
+    before = cumulative - sorted_demands - group_offsets # 同じグループで先に配分される量
+    granted = np.clip(supplies[sorted_groups] - before, 0, sorted_demands)
+    result = np.empty(len(order), dtype=np.int64)
+    result[order] = granted
+    return result
+
+
+def project(fine: CoarseLevel, coarse: CoarseLevel, coarse_amounts: np.ndarray) -> np.ndarray:
+    """
+    粗い段の組ごとの人数を細かい段の組ごとの人数に射影する。
+    粗いノード P がセミナー s に得た人数を、P の子ノードのうち s を希望するものへ、
+    希望順位の高い組から順に (同じ順位では1人あたりの重みが大きい子から) 配分する。
+    """
+    num_seminars = int(max(fine.pair_seminars.max(initial=-1), coarse.pair_seminars.max(initial=-1))) + 1
+    coarse_keys = coarse.pair_nodes * num_seminars + coarse.pair_seminars
+    key_order = np.argsort(coarse_keys)
+    fine_keys = fine.parents[fine.pair_nodes] * num_seminars + fine.pair_seminars
+    coarse_pair_of = key_order[np.searchsorted(coarse_keys[key_order], fine_keys)]
+
+    quotas = np.asarray(coarse_amounts, dtype=np.int64).copy()
+    remaining = fine.node_counts.copy()
+    amounts = np.zeros(len(fine.pair_nodes), dtype=np.int64)
+    for rank in range(int(fine.pair_ranks.max(initial=-1)) + 1):
+        candidates = np.flatnonzero((fine.pair_ranks == rank) & (quotas[coarse_pair_of] > 0))
+        candidates = candidates[remaining[fine.pair_nodes[candidates]] > 0]
+        granted = _allocate(coarse_pair_of[candidates], fine.pair_weights[candidates],
+                            remaining[fine.pair_nodes[candidates]], quotas)
+        amounts[candidates] = granted
+        np.subtract.at(quotas, coarse_pair_of[candidates], granted)
+        remaining[fine.pair_nodes[candidates]] -= granted # 同じ順位ではノードは1回しか現れない
+    return amounts
+
+
+def _exchange(level: CoarseLevel, amounts: np.ndarray, remaining: np.ndarray, num_seminars: int) -> int:
+    """
+    2つのセミナー (未割り当てを num_seminars 番目の仮想セミナーとして含む) の間で人数を交換する改善を1回行う。
+    各ノードが保持している割り当て (組、または未割り当ての人数) から、同じノードの別の組 (または未割り当て) へ
+    1人移すときの利得を求め、セミナーの順序対 (s1, s2) ごとに最大の利得を選ぶ。
+    (s1, s2) と (s2, s1) の利得の和が正なら、両方の移動を同時に行っても定員は変わらず、スコアだけが増える。
+    利得の和が大きい対から順に、保持する割り当てが重ならないものを最大人数で実行する。
+    amounts と remaining をその場で更新し、移動した人数を返す。
+    """
+    unassigned = num_seminars
+    pair_starts = np.searchsorted(level.pair_nodes, np.arange(level.num_nodes + 1))
+    pair_counts = np.diff(pair_starts)
+
+    # 保持している割り当て: 人数が正の組と、未割り当ての人数が残るノード
+    held_pairs = np.flatnonzero(amounts > 0)
+    held_unassigned = np.flatnonzero(remaining > 0)
+    holder_nodes = np.concatenate([level.pair_nodes[held_pairs], held_unassigned])
+    holder_seminars = np.concatenate([level.pair_seminars[held_pairs], np.full(len(held_unassigned), unassigned)])
+    holder_weights = np.concatenate([level.pair_weights[held_pairs], np.zeros(len(held_unassigned))])
+    holder_amounts = np.concatenate([amounts[held_pairs], remaining[held_unassigned]])
+    holder_pairs = np.concatenate([held_pairs, np.full(len(held_unassigned), -1)]) # 未割り当ては -1
+
+    # 移動先: 同じノードの各組 (holder ごとに pair_counts 個) と、組からの場合は未割り当て
+    repeats = pair_counts[holder_nodes]
+    move_holders = np.repeat(np.arange(len(holder_nodes)), repeats)
+    move_targets = np.arange(len(move_holders)) - np.repeat(np.cumsum(repeats) - repeats, repeats) + pair_starts[holder_nodes[move_holders]]
+    move_seminars = level.pair_seminars[move_targets]
+    move_gains = level.pair_weights[move_targets] - holder_weights[move_holders]
+    assigned_holders = np.flatnonzero(holder_pairs >= 0)
+    move_holders = np.concatenate([move_holders, assigned_holders])
+    move_targets = np.concatenate([move_targets, np.full(len(assigned_holders), -1)])
+    move_seminars = np.concatenate([move_seminars, np.full(len(assigned_holders), unassigned)])
+    move_gains = np.concatenate([move_gains, -holder_weights[assigned_holders]])
+    keep = move_seminars != holder_seminars[move_holders]
+    move_holders, move_targets, move_seminars, move_gains = move_holders[keep], move_targets[keep], move_seminars[keep], move_gains[keep]
+    if len(move_holders) == 0:
+        return 0
+
+    # セミナーの順序対ごとに最大の利得の移動を選び、(S+1)×(S+1) の行列に並べる
+    size = num_seminars + 1
+    keys = holder_seminars[move_holders] * size + move_seminars
+    order = np.lexsort((move_gains, keys))
+    is_last = np.ones(len(order), dtype=bool)
+    is_last[:-1] = keys[order][1:] != keys[order][:-1]
+    best = order[is_last]
+    best_gains = np.full(size * size, -np.inf)
+    best_moves = np.full(size * size, -1, dtype=np.int64)
+    best_gains[keys[best]] = move_gains[best]
+    best_moves[keys[best]] = best
+    best_gains = best_gains.reshape(size, size)
+    best_moves = best_moves.reshape(size, size)
+
+    # (s1, s2) と (s2, s1) の利得の和が正の対を、和の大きい順に並べる
+    pair_gains = best_gains + best_gains.T
+    first, second = np.nonzero(np.triu(pair_gains > 1e-9, k=1))
+    order = np.argsort(-pair_gains[first, second], kind='stable')
+    exchanges = zip(best_moves[first[order], second[order]].tolist(), best_moves[second[order], first[order]].tolist())
+
+    moved = 0
+    used = set()
+    for forward, backward in exchanges:
+        holder_a, holder_b = int(move_holders[forward]), int(move_holders[backward])
+        if holder_a in used or holder_b in used:
+            continue
+        used.update((holder_a, holder_b))
+        count = int(min(holder_amounts[holder_a], holder_amounts[holder_b]))
+        for holder, target in ((holder_a, int(move_targets[forward])), (holder_b, int(move_targets[backward]))):
+            source = int(holder_pairs[holder])
+            if source >= 0:
+                amounts[source] -= count
+            else:
+                remaining[holder_nodes[holder]] -= count
+            if target >= 0:
+                amounts[target] += count
+            else:
+                remaining[holder_nodes[holder]] += count
+        moved += count
+    return moved
+
+
+def refine(level: CoarseLevel, amounts: np.ndarray, capacities: np.ndarray, passes: int = 5) -> np.ndarray:
+    """
+    段の組ごとの人数を安価に改善する (定員は守ったまま)。
+    1. 充填: 未割り当ての人数が残るノードを、希望順位の高い組から空き枠のあるセミナーへ入れる
+    2. 上位移動: ノードの最も重みの低い割り当てを、空き枠のあるより重みの大きい組へ移す
+    3. 交換: 2つのセミナー (未割り当てを含む) の間で、利得の和が正になる移動の組を同時に行う
+    これを変化がなくなるか passes 回まで繰り返す。
+    """
+    amounts = np.asarray(amounts, dtype=np.int64).copy()
+    num_seminars = len(capacities)
+    capacities = np.asarray(capacities, dtype=np.int64)
+    max_rank = int(level.pair_ranks.max(initial=-1)) + 1
+    pairs_by_rank = [np.flatnonzero(level.pair_ranks == rank) for rank in range(max_rank)]
+    for _ in range(passes):
+        changed = 0
+        free = capacities - np.bincount(level.pair_seminars, weights=amounts, minlength=num_seminars).astype(np.int64)
+        remaining = level.node_counts - np.bincount(level.pair_nodes, weights=amounts, minlength=level.num_nodes).astype(np.int64)
+        # 1. 充填
+        for candidates in pairs_by_rank:
+            candidates = candidates[(remaining[level.pair_nodes[candidates]] > 0) & (free[level.pair_seminars[candidates]] > 0)]
+            granted = _allocate(level.pair_seminars[candidates], level.pair_weights[candidates],
+                                remaining[level.pair_nodes[candidates]], free)
+            amounts[candidates] += granted
+            np.subtract.at(free, level.pair_seminars[candidates], granted)
+            remaining[level.pair_nodes[candidates]] -= granted
+            changed += int(granted.sum())
+        # 2. 上位移動: ノードごとに、人数が正の組のうち最も順位の低いものを移動元にする
+        # (移動元の人数は移動のたびに減るが、移動元は次の繰り返しで選び直す)
+        donors = np.full(level.num_nodes, -1, dtype=np.int64)
+        allocated = np.flatnonzero(amounts > 0)
+        donors[level.pair_nodes[allocated]] = allocated # 組は重みの降順なので、最後に書き込まれたものが最も重みが低い
+        for candidates in pairs_by_rank:
+            candidate_donors = donors[level.pair_nodes[candidates]]
+            movable = (candidate_donors >= 0) & (free[level.pair_seminars[candidates]] > 0)
+            movable[movable] &= amounts[candidate_donors[movable]] > 0
+            movable[movable] &= level.pair_weights[candidate_donors[movable]] < level.pair_weights[candidates[movable]]
+            candidates, candidate_donors = candidates[movable], candidate_donors[movable]
+            gains = level.pair_weights[candidates] - level.pair_weights[candidate_donors]
+            granted = _allocate(level.pair_seminars[candidates], gains, amounts[candidate_donors], free)
+            amounts[candidates] += granted
+            amounts[candidate_donors] -= granted
+            np.subtract.at(free, level.pair_seminars[candidates], granted)
+            np.add.at(free, level.pair_seminars[candidate_donors], granted)
+            changed += int(granted.sum())
+        # 3. 交換
+        changed += _exchange(level, amounts, remaining, num_seminars)
+        if changed == 0:
+            break
+    return amounts
+
+
+def expand(level: CoarseLevel, amounts: np.ndarray, student_nodes: np.ndarray) -> np.ndarray:
+    """
+    段0の組ごとの人数を学生ごとの割り当てベクトルに戻す。
+    段0のノードの学生は同じ重みを持つため、ノードの学生に組の順に人数分ずつセミナーを割り当てる。
+    """
+    vector = np.full(len(student_nodes), UNASSIGNED, dtype=np.int32)
+    # ノードごとに、割り当てるセミナーを組の順に人数分並べた列
+    seats = np.repeat(level.pair_seminars, amounts)
+    seat_nodes = np.repeat(level.pair_nodes, amounts)
+    seat_starts = np.searchsorted(seat_nodes, np.arange(level.num_nodes + 1))
+    members = np.argsort(student_nodes, kind='stable')
+    member_starts = np.concatenate([[0], np.cumsum(level.node_counts)])
+    positions = np.arange(len(members)) - member_starts[student_nodes[members]]
+    allocated = seat_starts[1:] - seat_starts[:-1]
+    has_seat = positions < allocated[student_nodes[members]]
+    seated = members[has_seat]
+    vector[seated] = seats[seat_starts[student_nodes[seated]] + positions[has_seat]]
+    return vector
@@ -0,0 +1,164 @@
+# seminar_optimization/cost_model.py
+"""
+戦略ごとの実行時間と達成スコアを、インスタンスの特徴量から予測する回帰モデル。
+
+学習データは StrategyStore に記録された過去の実行 (特徴量、スコア、実行時間) です。
+予測に基づいて、時間予算内で最も良いスコアが見込める戦略と、その戦略に与える時間予算を最初に決めます。
+時間予算は、ソルバーの時間制限 (budgeted_config) と、予算切れでキャンセルを伝える TimeBudget で守らせます。
+"""
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+# ロギングは logger_config.py で一元的に設定されるため、ここではロガーの取得のみ
+from seminar_optimization.logger_config import logger
+from seminar_optimization.instance_features import feature_vector
+from seminar_optimization.problem_data import ProblemData
+
+
+def budgeted_config(config: Dict[str, Any], budget: float) -> Dict[str, Any]:
+    """
+    ソルバー自身が時間制限を持つ戦略 (ILP, CP) の時間制限を budget 秒以内に収めた設定のコピーを返す。
+    それ以外の戦略の予算は TimeBudget で打ち切って守らせる。
+    """
+    limited = dict(config)
+    for key in ("ilp_time_limit", "cp_time_limit"):
+        limited[key] = max(1, int(min(config.get(key) or budget, budget)))
+    return limited
+
+
+class TimeBudget:
+    """
+    戦略の実行を時間予算で打ち切るためのキャンセルイベント。
+    is_set() は、予算 (budget 秒) を使い切ったとき、または元のキャンセルイベントが設定されたときに True を返す。
+    戦略はどれもキャンセルイベントを確認しながら進むため、レースの締め切りと同じく、予算切れはキャンセルとして伝わる。
+    予算切れで打ち切られた結果は finish() で実行可能な解として扱い直す。
+    """
+    def __init__(self, budget: float, cancel_event: Optional[Any] = None):
+        self.budget = budget
+        self.cancel_event = cancel_event
+        self.deadline = time.monotonic() + budget
+        self._event = threading.Event()
+
+    @property
+    def expired(self) -> bool:
+        """元のキャンセルではなく、予算切れで打ち切られる状態かどうか。"""
+        return time.monotonic() >= self.deadline and not (self.cancel_event is not None and self.cancel_event.is_set())
+
+    def is_set(self) -> bool:
+        return (self._event.is_set() or time.monotonic() >= self.deadline
+                or (self.cancel_event is not None and self.cancel_event.is_set()))
+
+    def set(self):
+        self._event.set()
+
+    def finish(self, result: Any, problem_data: ProblemData) -> Any:
+        """
+        予算切れで CANCELLED になった結果が定員を守る割り当てを持っていれば、FEASIBLE の結果に直して返す。
+        ユーザーによるキャンセルや、割り当てのない結果はそのまま返す。
+        """
+        if not (self.expired and result.status == "CANCELLED" and result.best_assignment):
+            return result
+        vector = problem_data.encode(result.best_assignment)
+        if not problem_data.is_feasible(vector):
+            return result
+        logger.info(f"TimeBudget: 時間予算 ({self.budget:.1f}秒) に達したため、その時点の最良解を結果とします。")
+        result.status = "FEASIBLE"
+        result.message = f"時間予算 ({self.budget:.1f}秒) に達したため、その時点の最良解で打ち切りました。"
+        result.best_score = problem_data.score(vector)
+        assigned = set(result.best_assignment)
+        result.unassigned_students = [student_id for student_id in problem_data.student_ids if student_id not in assigned]
+        return result
+
+
+class StrategyCostModel:
+    """
+    戦略ごとに、特徴量から (log(1 + 実行時間), 達成率) を予測するランダムフォレスト回帰モデル。
+    達成率はスコアをスコアの自明な上界 (特徴量 max_score) で割った値で、解が得られなかった実行は 0 とする。
+    学習データが min_samples 件未満の戦略は予測の対象にしない。
+    """
+    def __init__(self, min_samples: int = 5, random_state: Optional[int] = None):
+        self.min_samples = min_samples
+        self.random_state = random_state
+        self.models: Dict[str, RandomForestRegressor] = {}
+
+    @property
+    def strategies(self) -> List[str]:
+        """予測できる戦略の名前のリスト。"""
+        return sorted(self.models)
+
+    def fit(self, rows: Iterable[Dict[str, Any]]) -> "StrategyCostModel":
+        """
+        StrategyStore.training_rows の形式の履歴から、戦略ごとのモデルを学習する。
+        """
+        samples: Dict[str, Tuple[List[np.ndarray], List[Tuple[float, float]]]] = {}
+        for row in rows:
+            features = row["features"]
+            max_score = features.get("max_score", 0.0)
+            score = row["score"]
+            quality = min(max(score / max_score, 0.0), 1.0) if score is not None and max_score > 0 else 0.0
+            X, y = samples.setdefault(row["strategy"], ([], []))
+            X.append(feature_vector(features))
+            y.append((np.log1p(max(row["duration"], 0.0)), quality))
+
+        self.models = {}
+        for strategy, (X, y) in samples.items():
+            if len(X) < self.min_samples:
+                continue
+            model = RandomForestRegressor(n_estimators=50, min_samples_leaf=2, random_state=self.random_state)
+            model.fit(np.array(X), np.array(y))
+            self.models[strategy] = model
+        logger.info(f"StrategyCostModel: {len(self.models)} 個の戦略のモデルを学習しました: {self.strategies}")
+        return self
+
+    def predict(self, features: Dict[str, float]) -> Dict[str, Tuple[float, float]]:
+        """
+        戦略ごとの (予測実行時間 [秒], 予測スコア) を返す。
+        """
+        x = feature_vector(features)[np.newaxis, :]
+        max_score = features.get("max_score", 0.0)
+        predictions: Dict[str, Tuple[float, float]] = {}
+        for strategy, model in self.models.items():
+            log_runtime, quality = model.predict(x)[0]
+            predictions[strategy] = (float(np.expm1(max(log_runtime, 0.0))), float(np.clip(quality, 0.0, 1.0) * max_score))
+        return predictions
+
+    def plan(self,
+             features: Dict[str, float],
+             max_time: float,
+             candidates: Optional[Iterable[str]] = None,
+             quality_tolerance: float = 0.005,
+             budget_factor: float = 2.0) -> Optional[Tuple[str, float, Dict[str, Tuple[float, float]]]]:
+        """
+        最初に実行する戦略と時間予算を決め、(戦略名, 時間予算 [秒], 全戦略の予測) を返す。
+        予測実行時間が max_time 以内の戦略のうち、予測スコアが最良から quality_tolerance (上界に対する割合) 以内の
+        ものの中で最も速い戦略を選ぶ (max_time 以内の戦略がなければ最も速い戦略)。
+        時間予算は予測実行時間の budget_factor 倍 (1秒以上、max_time 以下)。予測できる戦略がなければ None。
+        """
+        predictions = self.predict(features)
+        if candidates is not None:
+            allowed = set(candidates)
+            predictions = {name: value for name, value in predictions.items() if name in allowed}
+        if not predictions:
+            return None
+        in_time = {name: value for name, value in predictions.items() if value[0] <= max_time}
+        if in_time:
+            best_score = max(score for _, score in in_time.values())
+            tolerance = quality_tolerance * features.get("max_score", 0.0)
+            eligible = [name for name, (_, score) in in_time.items() if score >= best_score - tolerance]
+        else:
+            eligible = list(predictions)
+        strategy = min(sorted(eligible), key=lambda name: predictions[name][0])
+        budget = min(max_time, max(1.0, budget_factor * predictions[strategy][0]))
+        return strategy, budget, predictions
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]], min_samples: int = 5, random_state: Optional[int] = None) -> Optional["StrategyCostModel"]:
+        """
+        履歴からモデルを学習して返す。予測できる戦略が1つもなければ None。
+        """
+        model = cls(min_samples, random_state).fit(rows)
+        return model if model.models else None
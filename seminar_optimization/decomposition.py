@@ -0,0 +1,192 @@
+# seminar_optimization/decomposition.py
+"""
+学生–セミナーの希望グラフを連結成分に分解するためのユーティリティ。
+
+学生とセミナーを頂点、希望を辺とする二部グラフが複数の連結成分に分かれる場合
+(例えば学部ごとに希望先が閉じている場合)、各成分は定員もスコアも共有しないため、
+独立に解いた結果を合わせたものが全体の解になります。
+"""
+from typing import Dict, List, Any, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+# ロギングは logger_config.py で一元的に設定されるため、ここではロガーの取得のみ
+from seminar_optimization.logger_config import logger
+from seminar_optimization.problem_data import ProblemData
+from seminar_optimization.utils import OptimizationResult
+
+# 結果のステータスの優先順位 (左ほど悪い)。統合後のステータスは最も悪いものになる
+_STATUS_SEVERITY = ["FAILED", "MODEL_INVALID", "INFEASIBLE", "NO_SOLUTION_FOUND", "CANCELLED", "RUNNING",
+                    "TIME_LIMIT_EXCEEDED", "FEASIBLE", "OPTIMAL"]
+
+
+def find_components(problem_data: ProblemData) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    希望グラフの連結成分を (学生インデックス, セミナーインデックス) の組のリストとして返す。
+    希望が1つもない学生と、誰にも希望されていないセミナーはどの成分にも含めない
+    (そのような学生はどこに割り当ててもスコアが 0 のため)。
+    成分は辺 (希望) の数が多い順に並べる。
+    """
+    num_students = problem_data.num_students
+    num_seminars = problem_data.num_seminars
+    student_rows, rank_cols = np.nonzero(problem_data.preference_matrix >= 0)
+    pair_seminars = problem_data.preference_matrix[student_rows, rank_cols].astype(np.int64)
+
+    # 頂点: 学生 0..N-1, セミナー N..N+S-1
+    num_nodes = num_students + num_seminars
+    graph = csr_matrix(
+        (np.ones(len(student_rows), dtype=np.int8), (student_rows, num_students + pair_seminars)),
+        shape=(num_nodes, num_nodes)
+    )
+    num_components, labels = connected_components(graph, directed=False)
+
+    student_labels = labels[:num_students]
+    seminar_labels = labels[num_students:]
+    has_preference = np.zeros(num_students, dtype=bool)
+    has_preference[student_rows] = True
+    edge_counts = np.bincount(student_labels[student_rows], minlength=num_components)
+
+    components: List[Tuple[np.ndarray, np.ndarray]] = []
+    for label in np.argsort(-edge_counts, kind='stable').tolist():
+        if edge_counts[label] == 0:
+            continue
+        students = np.flatnonzero((student_labels == label) & has_preference)
+        seminars = np.flatnonzero(seminar_labels == label)
+        components.append((students, seminars))
+    logger.info(f"decomposition: 希望グラフを {len(components)} 個の連結成分に分解しました。")
+    return components
+
+
+def group_components(components: List[Tuple[np.ndarray, np.ndarray]], num_groups: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    連結成分を num_groups 個以下のグループにまとめる。
+    小さな成分ごとにプロセスを起動するオーバーヘッドを避けるため、学生数が最も少ないグループに
+    大きい成分から順に詰める。独立な成分をまとめても、それぞれ独立な部分問題のままである。
+    """
+    num_groups = max(1, min(num_groups, len(components)))
+    groups: List[List[Tuple[np.ndarray, np.ndarray]]] = [[] for _ in range(num_groups)]
+    group_sizes = [0] * num_groups
+    for students, seminars in sorted(components, key=lambda c: len(c[0]), reverse=True):
+        lightest = group_sizes.index(min(group_sizes))
+        groups[lightest].append((students, seminars))
+        group_sizes[lightest] += len(students)
+    return [
+        (np.sort(np.concatenate([c[0] for c in group])), np.sort(np.concatenate([c[1] for c in group])))
+        for group in groups if group
+    ]
+
+
+def build_subproblem(seminars: List[Dict[str, Any]],
+                     students: List[Dict[str, Any]],
+                     component: Tuple[np.ndarray, np.ndarray]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    成分に含まれるセミナーと学生のデータだけを取り出した部分問題を返す。
+    """
+    student_indices, seminar_indices = component
+    return [seminars[s] for s in seminar_indices.tolist()], [students[i] for i in student_indices.tolist()]
+
+
+def cluster_demand(problem_data: ProblemData, labels: np.ndarray, num_clusters: int) -> np.ndarray:
+    """
+    クラスタ c の学生がセミナー s を希望している人数を (クラスタ数, セミナー数) の行列で返す。
+    """
+    student_rows, rank_cols = np.nonzero(problem_data.preference_matrix >= 0)
+    pair_seminars = problem_data.preference_matrix[student_rows, rank_cols].astype(np.int64)
+    num_seminars = problem_data.num_seminars
+    flat = np.asarray(labels, dtype=np.int64)[student_rows] * num_seminars + pair_seminars
+    return np.bincount(flat, minlength=num_clusters * num_seminars).reshape(num_clusters, num_seminars)
+
+
+def split_capacities(capacities: np.ndarray, demand: np.ndarray) -> np.ndarray:
+    """
+    各セミナーの定員を、クラスタごとの希望人数 demand (クラスタ数, セミナー数) に比例してクラスタへ配分する。
+    端数は最大剰余法で配り (同点はクラスタ番号の小さい順)、各列の合計は定員に一致する。
+    誰にも希望されていないセミナーの定員はどのクラスタにも配らない (割り当てる学生がいないため)。
+    """
+    capacities = np.asarray(capacities, dtype=np.int64)
+    demand = np.asarray(demand, dtype=np.int64)
+    total_demand = demand.sum(axis=0)
+    wanted = total_demand > 0
+    exact = np.zeros(demand.shape, dtype=np.float64)
+    exact[:, wanted] = demand[:, wanted] * (capacities[wanted] / total_demand[wanted])
+    quotas = np.floor(exact).astype(np.int64)
+
+    leftover = np.where(wanted, capacities - quotas.sum(axis=0), 0)
+    # 剰余の大きい順 (安定ソートなので同点はクラスタ番号順) に、残りの定員を1ずつ配る
+    order = np.argsort(-(exact - quotas), axis=0, kind='stable')
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(demand.shape[0])[:, None], axis=0)
+    quotas += ranks < leftover[None, :]
+    return quotas
+
+
+def _is_time_limited_solution(result: OptimizationResult) -> bool:
+    """時間制限で打ち切られたが、有効なスコアの割り当てを返している結果かどうか。"""
+    return (result.status == "TIME_LIMIT_EXCEEDED" and bool(result.best_assignment)
+            and np.isfinite(result.best_score))
+
+
+def _merge_details(results: List[OptimizationResult]) -> Dict[str, Any]:
+    """
+    部分問題の details をまとめる。リストの値 (chains, islands, race など) は、辞書の要素に部分問題の番号
+    (component) を付けて連結する。それ以外の値は、その値を持つ最初の部分問題のものを使う。
+    部分問題ごとの details は details["components"] に部分問題の順で残す。
+    """
+    merged: Dict[str, Any] = {}
+    for component, result in enumerate(results):
+        for key, value in result.details.items():
+            if isinstance(value, list):
+                merged.setdefault(key, []).extend(
+                    dict(item, component=component) if isinstance(item, dict) else item for item in value
+                )
+            else:
+                merged.setdefault(key, value)
+    merged["components"] = [
+        {"component": component, "status": result.status, "score": result.best_score, "details": result.details}
+        for component, result in enumerate(results)
+    ]
+    return merged
+
+
+def merge_results(results: List[OptimizationResult],
+                  seminars: List[Dict[str, Any]],
+                  students: List[Dict[str, Any]],
+                  optimization_strategy: str) -> OptimizationResult:
+    """
+    部分問題の OptimizationResult を1つの結果に統合する。
+    割り当ては和集合、スコアは合計、ステータスは最も悪いものとする。
+    時間制限で打ち切られた部分問題 (TIME_LIMIT_EXCEEDED) も、有効なスコアの割り当てを返していれば FEASIBLE として扱う。
+    部分問題の details は details["components"] にそのまま残し、_merge_details で結果の details にもまとめる。
+    """
+    time_limited = sum(1 for r in results if _is_time_limited_solution(r))
+    statuses = ["FEASIBLE" if _is_time_limited_solution(r) else r.status for r in results]
+    status = min(statuses, key=lambda s: _STATUS_SEVERITY.index(s) if s in _STATUS_SEVERITY else 0, default="NO_SOLUTION_FOUND")
+    best_assignment: Dict[str, str] = {}
+    for result in results:
+        best_assignment.update(result.best_assignment)
+
+    if status in ("OPTIMAL", "FEASIBLE"):
+        best_score = float(sum(r.best_score for r in results))
+        message = f"{len(results)} 個の独立な部分問題に分解して最適化しました。"
+        if time_limited:
+            message += f" (うち {time_limited} 個は時間制限で打ち切った時点の解)"
+    else:
+        best_score = -float('inf')
+        failed_messages = [r.message for r, s in zip(results, statuses) if s == status]
+        message = f"部分問題の最適化が成功しませんでした ({status}): {failed_messages[0] if failed_messages else ''}"
+        if status in ("CANCELLED", "FAILED"):
+            best_assignment = {}
+
+    assigned = set(best_assignment)
+    return OptimizationResult(
+        status=status,
+        message=message,
+        best_score=best_score,
+        best_assignment=best_assignment,
+        seminar_capacities={s['id']: s['capacity'] for s in seminars},
+        unassigned_students=[s['id'] for s in students if s['id'] not in assigned],
+        optimization_strategy=optimization_strategy,
+        details=_merge_details(results)
+    )
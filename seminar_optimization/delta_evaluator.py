@@ -0,0 +1,149 @@
+# seminar_optimization/delta_evaluator.py
+"""
+移動 (move) と交換 (swap) 近傍のための差分スコア評価器を定義します。
+
+現在の割り当て・セミナーごとの割り当て人数・現在のスコアを状態として保持し、
+近傍解のスコア差分を割り当て全体をコピー・再計算せずに O(1) で求めます。
+"""
+import random
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# ロギングは logger_config.py で一元的に設定されるため、ここではロガーの取得のみ
+from seminar_optimization.logger_config import logger
+from seminar_optimization.problem_data import ProblemData, UNASSIGNED
+from seminar_optimization.capacity_ledger import CapacityLedger
+from seminar_optimization.fitness_cache import ZobristHasher
+
+
+class DeltaEvaluator:
+    """
+    割り当てベクトルを状態として持つ差分評価器。
+
+    - delta_move(student, seminar): 学生を seminar (-1 は未割り当て) へ移したときのスコア差分
+    - delta_swap(a, b): 学生 a と b の割り当てを交換したときのスコア差分
+    - apply_move / apply_swap: 上記の操作を状態に反映し、スコア・人数・定員超過数を更新する
+
+    いずれも割り当て全体を走査しないため、局所探索の1ステップを O(1) で評価できる。
+    セミナーごとの人数と未割り当て学生の集合は CapacityLedger (self.ledger) で管理する。
+    hasher を渡すと、割り当ての Zobrist ハッシュ (self.hash) も移動・交換のたびに O(1) で更新する。
+    """
+    def __init__(self, problem_data: ProblemData, assignment_vector: np.ndarray, hasher: Optional[ZobristHasher] = None):
+        self.problem_data = problem_data
+        self._assignment: List[int] = [int(s) for s in assignment_vector.tolist()]
+        self.ledger = CapacityLedger(problem_data.capacities, np.asarray(assignment_vector))
+        self.score: float = problem_data.score(np.asarray(assignment_vector))
+        # 定員超過人数の合計 (0 なら実行可能)
+        self.overload: int = sum(max(0, -self.ledger.remaining(s)) for s in range(problem_data.num_seminars))
+        self.hasher = hasher
+        self.hash: Optional[int] = hasher.hash_vector(assignment_vector) if hasher is not None else None
+        logger.debug(f"DeltaEvaluator: 初期化しました。スコア: {self.score:.2f}, 定員超過: {self.overload}, 未割り当て: {self.unassigned_count}")
+
+    # --- 状態の参照 ---
+
+    def seminar_of(self, student_idx: int) -> int:
+        """学生の現在の割り当て先セミナーのインデックス (未割り当ては -1) を返す。"""
+        return self._assignment[student_idx]
+
+    @property
+    def unassigned_count(self) -> int:
+        """未割り当て学生数を返す。"""
+        return len(self.ledger.unassigned)
+
+    def load(self, seminar_idx: int) -> int:
+        """セミナーの現在の割り当て人数を返す。"""
+        return self.ledger.load(seminar_idx)
+
+    def has_room(self, seminar_idx: int) -> bool:
+        """セミナーに空きがあるか (未割り当て -1 は常に True) を返す。"""
+        return self.ledger.has_room(seminar_idx)
+
+    def can_move(self, student_idx: int, seminar_idx: int) -> bool:
+        """移動後も移動先の定員を超えないかを返す。"""
+        return seminar_idx == self._assignment[student_idx] or self.has_room(seminar_idx)
+
+    def is_feasible(self) -> bool:
+        return self.overload == 0
+
+    def vector(self) -> np.ndarray:
+        """現在の割り当てベクトルのコピーを返す。"""
+        return np.array(self._assignment, dtype=np.int32)
+
+    def unassigned_students(self) -> List[int]:
+        """未割り当ての学生インデックスのリストを返す。"""
+        return list(self.ledger.unassigned)
+
+    def random_unassigned_student(self, rng: random.Random = random) -> Optional[int]:
+        """未割り当ての学生をランダムに1人返す (いない場合は None)。"""
+        return self.ledger.random_unassigned(rng)
+
+    def random_assigned_student(self, rng: random.Random = random) -> Optional[int]:
+        """割り当て済みの学生をランダムに1人返す (いない場合は None)。"""
+        return self.ledger.random_assigned(rng)
+
+    # --- 差分の計算 ---
+
+    def delta_move(self, student_idx: int, seminar_idx: int) -> float:
+        """学生を seminar_idx へ移動したときのスコア差分を返す。"""
+        weight_of = self.problem_data.weight_of
+        return weight_of(student_idx, seminar_idx) - weight_of(student_idx, self._assignment[student_idx])
+
+    def delta_swap(self, student_a: int, student_b: int) -> float:
+        """学生 a と b の割り当てを交換したときのスコア差分を返す。"""
+        weight_of = self.problem_data.weight_of
+        seminar_a = self._assignment[student_a]
+        seminar_b = self._assignment[student_b]
+        return (weight_of(student_a, seminar_b) + weight_of(student_b, seminar_a)
+                - weight_of(student_a, seminar_a) - weight_of(student_b, seminar_b))
+
+    def move_effect(self, student_idx: int, seminar_idx: int) -> Tuple[float, int, int]:
+        """
+        移動による (スコア差分, 定員超過数の差分, 未割り当て数の差分) を返す。
+        ペナルティ付きの適応度を使う呼び出し側向け。
+        """
+        current = self._assignment[student_idx]
+        if seminar_idx == current:
+            return 0.0, 0, 0
+        overload_delta = 0
+        if current >= 0 and self.ledger.remaining(current) < 0:
+            overload_delta -= 1
+        if seminar_idx >= 0 and self.ledger.remaining(seminar_idx) <= 0:
+            overload_delta += 1
+        unassigned_delta = (seminar_idx == UNASSIGNED) - (current == UNASSIGNED)
+        return self.delta_move(student_idx, seminar_idx), overload_delta, unassigned_delta
+
+    # --- 状態の更新 ---
+
+    def apply_move(self, student_idx: int, seminar_idx: int, delta: Optional[float] = None):
+        """
+        学生を seminar_idx へ移動する。delta に事前計算済みの差分を渡すと再計算を省略する。
+        """
+        current = self._assignment[student_idx]
+        if seminar_idx == current:
+            return
+        if delta is None:
+            delta = self.delta_move(student_idx, seminar_idx)
+        self.overload += self.move_effect(student_idx, seminar_idx)[1]
+        self.ledger.move(student_idx, current, seminar_idx)
+        self._assignment[student_idx] = seminar_idx
+        self.score += delta
+        if self.hasher is not None:
+            self.hash = self.hasher.update(self.hash, student_idx, current, seminar_idx)
+
+    def apply_swap(self, student_a: int, student_b: int, delta: Optional[float] = None):
+        """
+        学生 a と b の割り当てを交換する。セミナーごとの人数は変化しない。
+        一方が未割り当ての場合は、台帳の未割り当て・割り当て済みの集合も入れ替える。
+        """
+        if delta is None:
+            delta = self.delta_swap(student_a, student_b)
+        assignment = self._assignment
+        if (assignment[student_a] == UNASSIGNED) != (assignment[student_b] == UNASSIGNED):
+            self.ledger.move(student_a, assignment[student_a], assignment[student_b])
+            self.ledger.move(student_b, assignment[student_b], assignment[student_a])
+        if self.hasher is not None:
+            self.hash = self.hasher.update(self.hash, student_a, assignment[student_a], assignment[student_b])
+            self.hash = self.hasher.update(self.hash, student_b, assignment[student_b], assignment[student_a])
+        assignment[student_a], assignment[student_b] = assignment[student_b], assignment[student_a]
+        self.score += delta
@@ -0,0 +1,179 @@
+# seminar_optimization/fitness_cache.py
+"""
+割り当てベクトルの評価結果を再利用するための、Zobrist ハッシュをキーとする LRU キャッシュを定義します。
+
+- ZobristHasher: (学生, セミナー) ごとの 64 ビット乱数キーの XOR で割り当てをハッシュする。
+  1人の割り当てを変えたときは、古いキーと新しいキーを XOR するだけで O(1) で更新できる
+  (行列の場合は変化した要素の分だけ更新する)。
+- FitnessCache: ハッシュ値 -> (スコア, 定員超過人数, 未割り当て学生数) の上限付き LRU キャッシュ。
+  同じ割り当てを二度評価しないようにし、ヒット率の統計を保持する。
+
+キャッシュには適応度そのものではなく評価の元になる値を保存するため、適応度の定義が異なる
+GA と TSL で同じキャッシュを共有できます。
+ハッシュ値のみをキーとするため、異なる割り当ての衝突確率は 2^-64 程度です。
+"""
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# ロギングは logger_config.py で一元的に設定されるため、ここではロガーの取得のみ
+from seminar_optimization.logger_config import logger
+from seminar_optimization.problem_data import ProblemData
+
+_MASK64 = (1 << 64) - 1
+# splitmix64 の定数
+_GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+_MIX1 = 0xBF58476D1CE4E5B9
+_MIX2 = 0x94D049BB133111EB
+
+
+def _splitmix64_array(x: np.ndarray) -> np.ndarray:
+    """uint64 配列に splitmix64 の混合関数を適用する (オーバーフローは 2^64 を法として折り返す)。"""
+    x = x + np.uint64(_GOLDEN_GAMMA)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(_MIX1)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(_MIX2)
+    return x ^ (x >> np.uint64(31))
+
+
+def _splitmix64(x: int) -> int:
+    """整数1つに splitmix64 の混合関数を適用する (_splitmix64_array のスカラー版)。"""
+    x = (x + _GOLDEN_GAMMA) & _MASK64
+    x = ((x ^ (x >> 30)) * _MIX1) & _MASK64
+    x = ((x ^ (x >> 27)) * _MIX2) & _MASK64
+    return x ^ (x >> 31)
+
+
+class ZobristHasher:
+    """
+    割り当てベクトルの Zobrist ハッシュを計算する。
+    (学生 i, セミナー s) のキーは乱数表を持たず、i * (S + 1) + (s + 1) を splitmix64 で混合して求める
+    (未割り当て -1 も1つの割り当て先として扱う)。学生数×セミナー数の表を確保しないため、大規模な問題でもメモリを使わない。
+    """
+    def __init__(self, num_students: int, num_seminars: int):
+        self.num_students = num_students
+        self.stride = num_seminars + 1
+
+    def key(self, student_idx: int, seminar_idx: int) -> int:
+        """(学生, セミナー) の 64 ビットキーを返す。"""
+        return _splitmix64(student_idx * self.stride + seminar_idx + 1)
+
+    def keys(self, student_indices: np.ndarray, seminar_indices: np.ndarray) -> np.ndarray:
+        """(学生, セミナー) の組ごとの 64 ビットキーを uint64 配列で返す (key のベクトル版、ブロードキャスト可)。"""
+        offsets = np.asarray(student_indices, dtype=np.uint64) * np.uint64(self.stride)
+        return _splitmix64_array(offsets + (np.asarray(seminar_indices, dtype=np.int64) + 1).astype(np.uint64))
+
+    def hash_matrix(self, matrix: np.ndarray) -> np.ndarray:
+        """P×N の割り当て行列の各行のハッシュ値を uint64 配列で返す。"""
+        matrix = np.asarray(matrix)
+        if not matrix.shape[1]:
+            return np.zeros(matrix.shape[0], dtype=np.uint64)
+        keys = self.keys(np.arange(matrix.shape[1])[np.newaxis, :], matrix)
+        return np.bitwise_xor.reduce(keys, axis=1)
+
+    def update_matrix(self, hashes: np.ndarray, before: np.ndarray, after: np.ndarray) -> np.ndarray:
+        """
+        割り当て行列が before から after に変わったときの各行のハッシュ値を返す (update の行列版)。
+        変化した要素のキーだけを計算するため、交叉・突然変異・修復で少数の遺伝子だけが変わる場合は
+        hash_matrix で全体を計算し直すより速い。hashes は before の各行のハッシュ値で、書き換えない。
+        """
+        updated = np.array(hashes, dtype=np.uint64, copy=True)
+        rows, students = np.nonzero(before != after)
+        if len(rows) == 0:
+            return updated
+        deltas = self.keys(students, before[rows, students]) ^ self.keys(students, after[rows, students])
+        changed_rows, starts = np.unique(rows, return_index=True) # np.nonzero の行は昇順に並ぶ
+        updated[changed_rows] ^= np.bitwise_xor.reduceat(deltas, starts)
+        return updated
+
+    def hash_vector(self, vector: np.ndarray) -> int:
+        """割り当てベクトルのハッシュ値を返す。"""
+        return int(self.hash_matrix(np.asarray(vector)[np.newaxis, :])[0])
+
+    def update(self, hash_value: int, student_idx: int, old_seminar: int, new_seminar: int) -> int:
+        """学生の割り当てを old_seminar から new_seminar に変えたときのハッシュ値を O(1) で返す。"""
+        return hash_value ^ self.key(student_idx, old_seminar) ^ self.key(student_idx, new_seminar)
+
+
+class FitnessCache:
+    """
+    割り当てのハッシュ値をキーに、評価結果 (スコア, 定員超過人数, 未割り当て学生数) を保持する LRU キャッシュ。
+    max_size を超えると最も長く参照されていないエントリから破棄する (0 の場合は何も保持しない)。
+    """
+    def __init__(self, problem_data: ProblemData, max_size: int = 10000):
+        self.problem_data = problem_data
+        self.hasher = ZobristHasher(problem_data.num_students, problem_data.num_seminars)
+        self.max_size = max_size
+        self._entries: "OrderedDict[int, Tuple[float, int, int]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        logger.debug(f"FitnessCache: 初期化しました。最大エントリ数: {max_size}")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        """これまでの参照に対するヒットの割合を返す (参照がない場合は 0)。"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """ヒット数・ミス数・ヒット率・現在のエントリ数を返す。"""
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate, "size": len(self._entries)}
+
+    def _store(self, key: int, value: Tuple[float, int, int]):
+        if self.max_size <= 0:
+            return
+        self._entries[key] = value
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def evaluate_batch(self, matrix: np.ndarray, keys: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        P×N の割り当て行列を評価し、(スコア, 定員超過人数, 未割り当て学生数) の配列を返す。
+        キャッシュにない行 (同じ行列内の重複は1回だけ) を ProblemData.evaluate_batch でまとめて評価する。
+        keys に差分更新済みのハッシュ値を渡すと、ハッシュの再計算を省略する。
+        """
+        matrix = np.asarray(matrix)
+        keys = self.hasher.hash_matrix(matrix) if keys is None else np.asarray(keys, dtype=np.uint64)
+        num_rows = len(keys)
+        scores = np.empty(num_rows, dtype=np.float64)
+        overloads = np.empty(num_rows, dtype=np.int64)
+        unassigned_counts = np.empty(num_rows, dtype=np.int64)
+
+        missing_rows: List[int] = []
+        first_row_of_key: Dict[int, int] = {}
+        duplicate_rows: List[Tuple[int, int]] = []
+        for row, key in enumerate(keys.tolist()):
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                scores[row], overloads[row], unassigned_counts[row] = entry
+                self.hits += 1
+            elif key in first_row_of_key:
+                duplicate_rows.append((row, first_row_of_key[key]))
+                self.hits += 1
+            else:
+                first_row_of_key[key] = row
+                missing_rows.append(row)
+                self.misses += 1
+
+        if missing_rows:
+            evaluation = self.problem_data.evaluate_batch(matrix[missing_rows])
+            total_overloads = evaluation.total_overloads
+            scores[missing_rows] = evaluation.scores
+            overloads[missing_rows] = total_overloads
+            unassigned_counts[missing_rows] = evaluation.unassigned_counts
+            for row, score, overload, unassigned in zip(missing_rows, evaluation.scores.tolist(),
+                                                        total_overloads.tolist(), evaluation.unassigned_counts.tolist()):
+                self._store(int(keys[row]), (score, overload, unassigned))
+        for row, source_row in duplicate_rows:
+            scores[row], overloads[row], unassigned_counts[row] = scores[source_row], overloads[source_row], unassigned_counts[source_row]
+        return scores, overloads, unassigned_counts
+
+    def evaluate(self, vector: np.ndarray, key: Optional[int] = None) -> Tuple[float, int, int]:
+        """1つの割り当てベクトルを評価し、(スコア, 定員超過人数, 未割り当て学生数) を返す。"""
+        scores, overloads, unassigned_counts = self.evaluate_batch(
+            np.asarray(vector)[np.newaxis, :], None if key is None else np.array([key], dtype=np.uint64))
+        return float(scores[0]), int(overloads[0]), int(unassigned_counts[0])
@@ -0,0 +1,86 @@
+# seminar_optimization/instance_features.py
+"""
+セミナー割り当て問題のインスタンスの特徴量を計算するモジュール。
+
+特徴量は ProblemData の配列に対するベクトル演算だけで求めるため、学生数が多くても
+最適化そのものに比べて無視できる時間で計算できます。戦略の履歴のバケット分け
+(strategy_store) と、実行時間・スコアの予測モデル (cost_model) の入力に使います。
+"""
+import math
+from typing import Dict
+
+import numpy as np
+
+from seminar_optimization.problem_data import ProblemData
+
+# 特徴量の名前 (feature_vector の並び順)
+FEATURE_NAMES = (
+    "num_students",             # 学生数
+    "num_seminars",             # セミナー数
+    "capacity_ratio",           # 定員の合計 / 学生数
+    "mean_preferences",         # 学生1人あたりの有効な希望数の平均
+    "std_preferences",          # 有効な希望数の標準偏差
+    "max_demand_ratio",         # セミナーごとの (希望する学生数 / 定員) の最大値
+    "mean_demand_ratio",        # セミナーごとの (希望する学生数 / 定員) の平均
+    "first_choice_contention",  # 第1希望が定員を超えて集中しているセミナーを第1希望とする学生の割合
+    "max_first_choice_ratio",   # セミナーごとの (第1希望とする学生数 / 定員) の最大値
+    "profile_entropy",          # 希望リスト (プロファイル) の分布のエントロピー (log(学生数) で正規化、0〜1)
+    "duplicate_profiles",       # 他の学生と同一の希望リストを持つ学生の数 (学生数 - プロファイルの種類数)
+    "max_score",                # スコアの自明な上界 (各学生が最も重みの大きい希望に割り当てられた場合)
+)
+
+
+def extract_features(problem_data: ProblemData) -> Dict[str, float]:
+    """
+    インスタンスの特徴量を FEATURE_NAMES の名前をキーとする辞書で返す。
+    """
+    num_students = problem_data.num_students
+    num_seminars = problem_data.num_seminars
+    preference_matrix = problem_data.preference_matrix
+    valid = preference_matrix >= 0
+    capacities = problem_data.capacities.astype(np.float64)
+    safe_capacities = np.maximum(capacities, 1.0)
+    preference_counts = valid.sum(axis=1)
+
+    # セミナーごとの希望人数 (全順位) と第1希望の人数
+    demand = np.bincount(preference_matrix[valid], minlength=num_seminars)
+    first_choices = preference_matrix[:, 0][valid[:, 0]] if valid.shape[1] else np.zeros(0, dtype=np.int32)
+    first_demand = np.bincount(first_choices, minlength=num_seminars)
+    oversubscribed = first_demand > capacities
+
+    # 希望リストごとにラベルを付ける (列ごとに (これまでのラベル, 次の希望) を1次元のキーにまとめる)
+    profile_labels = np.zeros(num_students, dtype=np.int64)
+    for column in range(preference_matrix.shape[1]):
+        keys = profile_labels * (num_seminars + 1) + (preference_matrix[:, column].astype(np.int64) + 1)
+        profile_labels = np.unique(keys, return_inverse=True)[1].reshape(-1).astype(np.int64)
+    profile_counts = np.bincount(profile_labels) if num_students else np.zeros(0, dtype=np.int64)
+    profile_counts = profile_counts[profile_counts > 0]
+    probabilities = profile_counts / max(num_students, 1)
+    entropy = float(-(probabilities * np.log(probabilities)).sum()) if num_students > 1 else 0.0
+
+    return {
+        "num_students": float(num_students),
+        "num_seminars": float(num_seminars),
+        "capacity_ratio": float(capacities.sum()) / num_students if num_students else 1.0,
+        "mean_preferences": float(preference_counts.mean()) if num_students else 0.0,
+        "std_preferences": float(preference_counts.std()) if num_students else 0.0,
+        "max_demand_ratio": float((demand / safe_capacities).max(initial=0.0)),
+        "mean_demand_ratio": float((demand / safe_capacities).mean()) if num_seminars else 0.0,
+        "first_choice_contention": float(first_demand[oversubscribed].sum()) / num_students if num_students else 0.0,
+        "max_first_choice_ratio": float((first_demand / safe_capacities).max(initial=0.0)),
+        "profile_entropy": entropy / math.log(num_students) if num_students > 1 else 0.0,
+        "duplicate_profiles": float(num_students - len(profile_counts)),
+        "max_score": float(problem_data.preference_weights.max(axis=1, initial=0.0).sum()),
+    }
+
+
+def feature_vector(features: Dict[str, float]) -> np.ndarray:
+    """
+    特徴量の辞書を FEATURE_NAMES の順の配列にする。件数を表す特徴量は桁が大きく異なるため log1p で圧縮する。
+    存在しない特徴量は 0 とする。
+    """
+    values = np.array([features.get(name, 0.0) for name in FEATURE_NAMES], dtype=np.float64)
+    for name in ("num_students", "num_seminars", "duplicate_profiles", "max_score"):
+        index = FEATURE_NAMES.index(name)
+        values[index] = math.log1p(max(values[index], 0.0))
+    return values
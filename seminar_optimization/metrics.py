@@ -0,0 +1,140 @@
+# seminar_optimization/metrics.py
+"""
+割り当ての品質指標を、割り当てベクトルに対する1回のベクトル演算でまとめて計算するモジュール。
+
+希望順位ごとの人数、未割り当て数、セミナーごとの人数と充足率、負荷の標準偏差、学生の満足度の合計と最小値を
+同じ計算から求めます。適応型最適化の報酬、CSV/PDF レポート、GUI の結果表示はすべてここで計算した値を使います。
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+# ロギングは logger_config.py で一元的に設定されるため、ここではロガーの取得のみ
+from seminar_optimization.logger_config import logger
+from seminar_optimization.problem_data import ProblemData
+
+
+def satisfaction_by_rank(preference_weights: Dict[str, float], num_ranks: int) -> np.ndarray:
+    """
+    {"1st": 5.0, "2nd": 2.0, "3rd": 1.0, "4th": ...} 形式の満足度の重みから、希望順位ごとの満足度の配列 (長さ num_ranks) を作る。
+    指定のない順位の満足度は 0。
+    """
+    rank_keys = ["1st", "2nd", "3rd"] + [f"{i+1}th" for i in range(3, num_ranks)]
+    return np.array([float(preference_weights.get(key, 0.0)) for key in rank_keys[:num_ranks]], dtype=np.float64)
+
+
+@dataclass(frozen=True)
+class AssignmentMetrics:
+    """
+    1つの割り当ての品質指標。
+
+    Attributes:
+        student_ranks: 学生ごとの希望順位 (N,)。0 始まりで、希望外・未割り当ては -1。
+        rank_counts: 希望順位ごとの人数 (R,)。rank_counts[0] が第1希望に割り当てられた人数。
+        unpreferred_count: 希望外のセミナーに割り当てられた学生数。
+        unassigned_count: 未割り当ての学生数。
+        seminar_loads: セミナーごとの割り当て人数 (S,)。
+        capacities: セミナーごとの定員 (S,)。
+        load_std: 1人以上割り当てられたセミナーの人数の標準偏差 (該当するセミナーがなければ 0)。
+        total_satisfaction: 学生の満足度の合計。
+        min_satisfaction: 学生の満足度の最小値 (学生がいなければ 0)。
+    """
+    student_ranks: np.ndarray
+    rank_counts: np.ndarray
+    unpreferred_count: int
+    unassigned_count: int
+    seminar_loads: np.ndarray
+    capacities: np.ndarray
+    load_std: float
+    total_satisfaction: float
+    min_satisfaction: float
+
+    @property
+    def num_students(self) -> int:
+        return len(self.student_ranks)
+
+    @property
+    def assigned_count(self) -> int:
+        return self.num_students - self.unassigned_count
+
+    @property
+    def seminar_fill(self) -> np.ndarray:
+        """セミナーごとの充足率 (割り当て人数 / 定員、定員 0 のセミナーは 0) (S,)。"""
+        return np.divide(self.seminar_loads, self.capacities,
+                         out=np.zeros(len(self.capacities), dtype=np.float64), where=self.capacities > 0)
+
+    def satisfaction_summary(self) -> Dict[str, int]:
+        """
+        レポートの概要統計の表 (項目名 -> 人数) を返す。第4希望以降は "Assigned to Other Preferred" にまとめる。
+        """
+        return {
+            "Total Students": self.num_students,
+            "Assigned Students": self.assigned_count,
+            "Unassigned Students": self.unassigned_count,
+            "Assigned to 1st Choice": int(self.rank_counts[0]) if len(self.rank_counts) > 0 else 0,
+            "Assigned to 2nd Choice": int(self.rank_counts[1]) if len(self.rank_counts) > 1 else 0,
+            "Assigned to 3rd Choice": int(self.rank_counts[2]) if len(self.rank_counts) > 2 else 0,
+            "Assigned to Other Preferred": int(self.rank_counts[3:].sum()),
+            "Assigned to Unpreferred": self.unpreferred_count,
+        }
+
+    def to_dict(self, problem_data: ProblemData) -> Dict[str, Any]:
+        """
+        学生ごとの順位を除いた指標を、JSON にできる辞書で返す (セミナーごとの値はセミナーIDをキーとする)。
+        """
+        return {
+            "rank_counts": self.rank_counts.tolist(),
+            "unpreferred_count": self.unpreferred_count,
+            "unassigned_count": self.unassigned_count,
+            "load_std": self.load_std,
+            "total_satisfaction": self.total_satisfaction,
+            "min_satisfaction": self.min_satisfaction,
+            "seminar_loads": dict(zip(problem_data.seminar_ids, self.seminar_loads.tolist())),
+            "seminar_fill": dict(zip(problem_data.seminar_ids, self.seminar_fill.tolist())),
+        }
+
+
+def compute_metrics(problem_data: ProblemData,
+                    vector: np.ndarray,
+                    satisfaction_weights: Optional[np.ndarray] = None) -> AssignmentMetrics:
+    """
+    割り当てベクトル (未割り当ては -1) の品質指標を計算する。
+    satisfaction_weights は希望順位ごとの満足度 (satisfaction_by_rank を参照) で、省略した場合は
+    スコアの希望順位ごとの重み (problem_data.rank_weights) を使う。希望外・未割り当ての満足度は 0。
+    """
+    vector = np.asarray(vector)
+    num_ranks = problem_data.preference_matrix.shape[1]
+    if satisfaction_weights is None:
+        satisfaction_weights = problem_data.rank_weights
+    satisfaction_weights = np.asarray(satisfaction_weights, dtype=np.float64)
+
+    ranks = problem_data.ranks_of(np.arange(problem_data.num_students), vector)
+    assigned = vector >= 0
+    # 順位 -1 (希望外・未割り当て) を列 0 に寄せて数える
+    rank_counts = np.bincount(ranks + 1, minlength=num_ranks + 1)[1:]
+    unassigned_count = int(np.count_nonzero(~assigned))
+    unpreferred_count = int(np.count_nonzero(assigned & (ranks < 0)))
+
+    loads = problem_data.seminar_loads(vector)
+    active_loads = loads[loads > 0]
+    load_std = float(np.std(active_loads)) if active_loads.size else 0.0
+
+    # 末尾の 0 は希望外・未割り当て (rank == -1) 用
+    satisfaction_table = np.zeros(num_ranks + 1, dtype=np.float64)
+    satisfaction_table[:min(num_ranks, len(satisfaction_weights))] = satisfaction_weights[:num_ranks]
+    satisfaction = satisfaction_table[ranks]
+
+    metrics = AssignmentMetrics(
+        student_ranks=ranks,
+        rank_counts=rank_counts,
+        unpreferred_count=unpreferred_count,
+        unassigned_count=unassigned_count,
+        seminar_loads=loads,
+        capacities=np.asarray(problem_data.capacities),
+        load_std=load_std,
+        total_satisfaction=float(satisfaction.sum()),
+        min_satisfaction=float(satisfaction.min()) if satisfaction.size else 0.0,
+    )
+    logger.debug(f"metrics: 希望順位ごとの人数: {rank_counts.tolist()}, 希望外: {unpreferred_count}, 未割り当て: {unassigned_count}, 負荷の標準偏差: {load_std:.2f}")
+    return metrics
@@ -17,6 +17,8 @@ from reportlab.pdfbase.ttfonts import TTFont # 日本語フォント対応のた
 
 # ロギングは logger_config.py で一元的に設定されるため、ここではロガーの取得のみ
 from seminar_optimization.logger_config import logger
+from seminar_optimization.problem_data import ProblemData
+from seminar_optimization.metrics import AssignmentMetrics, compute_metrics
 
 def find_font_file(font_filename="ipaexg.ttf", search_root=None):
     """
@@ -61,91 +63,56 @@ def register_japanese_font_auto():
 JAPANESE_FONT_REGISTERED = register_japanese_font_auto()
 
 
-def _calculate_satisfaction_stats(students_data: List[Dict[str, Any]], final_assignment: Dict[str, str]) -> Dict[str, Any]:
+def _report_metrics(config: Dict[str, Any],
+                    final_assignment: Dict[str, str],
+                    problem_data: Optional[ProblemData] = None) -> Tuple[ProblemData, AssignmentMetrics]:
     """
-    学生の希望満足度に関する統計を計算する。
+    レポートに載せる品質指標 (希望順位ごとの人数、セミナーごとの人数など) を計算する。
+    problem_data を省略した場合は、config のレポート用データ (students_data_for_report, seminars_data_for_report) から構築する。
     """
-    logger.debug("満足度統計の計算を開始します。")
-    total_students = len(students_data)
-    assigned_students = len(final_assignment)
-    unassigned_students_count = total_students - assigned_students
-
-    first_choice_count = 0
-    second_choice_count = 0
-    third_choice_count = 0
-    other_preference_count = 0
-    assigned_to_unpreferred_count = 0
-
-    student_preferences_map = {s['id']: s['preferences'] for s in students_data}
-
-    for student_id, assigned_seminar_id in final_assignment.items():
-        preferences = student_preferences_map.get(student_id, [])
-        try:
-            rank = preferences.index(assigned_seminar_id) + 1
-            if rank == 1:
-                first_choice_count += 1
-            elif rank == 2:
-                second_choice_count += 1
-            elif rank == 3:
-                third_choice_count += 1
-            else:
-                other_preference_count += 1
-        except ValueError:
-            assigned_to_unpreferred_count += 1 # 希望リストにないセミナーに割り当てられた場合
-
-    logger.info(f"満足度統計: 第1希望: {first_choice_count}, 第2希望: {second_choice_count}, 第3希望: {third_choice_count}, その他希望: {other_preference_count}, 希望外: {assigned_to_unpreferred_count}, 未割り当て: {unassigned_students_count}")
-
-    return {
-        "Total Students": total_students,
-        "Assigned Students": assigned_students,
-        "Unassigned Students": unassigned_students_count,
-        "Assigned to 1st Choice": first_choice_count,
-        "Assigned to 2nd Choice": second_choice_count,
-        "Assigned to 3rd Choice": third_choice_count,
-        "Assigned to Other Preferred": other_preference_count,
-        "Assigned to Unpreferred": assigned_to_unpreferred_count
-    }
-
-def _get_seminar_assignment_details(seminars_data: List[Dict[str, Any]], final_assignment: Dict[str, str], seminar_capacities: Dict[str, int]) -> List[Dict[str, Any]]:
+    if problem_data is None:
+        problem_data = ProblemData.from_lists(config.get('seminars_data_for_report', []),
+                                              config.get('students_data_for_report', []), config)
+    metrics = compute_metrics(problem_data, problem_data.encode(final_assignment))
+    logger.info(f"満足度統計: {metrics.satisfaction_summary()}")
+    return problem_data, metrics
+
+def _get_seminar_assignment_details(problem_data: ProblemData, metrics: AssignmentMetrics) -> List[Dict[str, Any]]:
     """
     各セミナーの割り当て詳細（割り当て数、残り定員など）を取得する。
     """
     logger.debug("セミナー割り当て詳細の取得を開始します。")
-    seminar_counts: Dict[str, int] = {s['id']: 0 for s in seminars_data}
-    seminar_magnifications: Dict[str, float] = {s['id']: s.get('magnification', 1.0) for s in seminars_data}
-
-    for assigned_seminar_id in final_assignment.values():
-        if assigned_seminar_id in seminar_counts:
-            seminar_counts[assigned_seminar_id] += 1
-
-    details = []
-    for seminar in seminars_data:
-        seminar_id = seminar['id']
-        capacity = seminar_capacities.get(seminar_id, 0)
-        assigned_count = seminar_counts.get(seminar_id, 0)
-        remaining_capacity = capacity - assigned_count
-        magnification = seminar_magnifications.get(seminar_id, 1.0) # 倍率を取得
-
-        details.append({
+    details = [
+        {
             "seminar_id": seminar_id,
             "capacity": capacity,
             "assigned_students_count": assigned_count,
-            "remaining_capacity": remaining_capacity,
+            "remaining_capacity": capacity - assigned_count,
             "magnification": magnification
-        })
-        logger.debug(f"セミナー {seminar_id}: 定員 {capacity}, 割り当て {assigned_count}, 残り {remaining_capacity}, 倍率 {magnification}")
-
+        }
+        for seminar_id, capacity, assigned_count, magnification in zip(
+            problem_data.seminar_ids, metrics.capacities.tolist(), metrics.seminar_loads.tolist(), problem_data.magnifications.tolist())
+    ]
     logger.info("セミナー割り当て詳細の取得が完了しました。")
     return details
 
+def _student_rank(problem_data: ProblemData, metrics: AssignmentMetrics, student_id: str) -> Optional[int]:
+    """学生の割り当て先の希望順位 (1始まり) を返す。希望外の場合は None。"""
+    student_idx = problem_data.student_index.get(student_id)
+    if student_idx is None or metrics.student_ranks[student_idx] < 0:
+        return None
+    return int(metrics.student_ranks[student_idx]) + 1
+
 def save_pdf_report(
     config: Dict[str, Any],
     final_assignment: Dict[str, str],
     optimization_strategy: str,
-    is_intermediate: bool = False
+    is_intermediate: bool = False,
+    problem_data: Optional[ProblemData] = None
 ):
     """
     最適化結果をPDFレポートとして保存する。
+    problem_data (構築済みの問題表現) を渡すと、レポート用データから作り直さずに使う。
     """
     logger.info("PDFレポートの生成を開始します。")
 
@@ -222,12 +189,8 @@ def save_pdf_report(
 
     # 概要統計
     story.append(Paragraph("概要統計", heading2_style))
-    students_data = config.get('students_data_for_report', [])
-    seminars_data = config.get('seminars_data_for_report', [])
-    seminar_capacities_for_report = {s['id']: s['capacity'] for s in seminars_data}
-
-    satisfaction_stats = _calculate_satisfaction_stats(students_data, final_assignment)
-    stats_data = [[key, str(value)] for key, value in satisfaction_stats.items()]
+    problem_data, metrics = _report_metrics(config, final_assignment, problem_data)
+    stats_data = [[key, str(value)] for key, value in metrics.satisfaction_summary().items()]
     stats_table = Table(stats_data, colWidths=[6*cm, 3*cm])
     stats_table.setStyle(TableStyle([
         ('BACKGROUND', (0,0), (-1,0), colors.grey),
@@ -243,7 +206,7 @@ def save_pdf_report(
 
     # セミナー割り当て詳細
     story.append(Paragraph("セミナー割り当て詳細", heading2_style))
-    seminar_details = _get_seminar_assignment_details(seminars_data, final_assignment, seminar_capacities_for_report)
+    seminar_details = _get_seminar_assignment_details(problem_data, metrics)
     seminar_table_data = [["セミナーID", "定員", "割り当て数", "残り定員", "倍率"]]
     for detail in seminar_details:
         seminar_table_data.append([
@@ -269,20 +232,15 @@ def save_pdf_report(
     # 学生ごとの割り当て
     story.append(Paragraph("学生ごとの割り当て", heading2_style))
     student_assignment_data = [["学生ID", "割り当てセミナー", "希望順位"]]
-    student_preferences_map = {s['id']: s['preferences'] for s in students_data}
 
     for student_id in sorted(final_assignment.keys()): # 学生IDでソート
         assigned_seminar_id = final_assignment[student_id]
-        preferences = student_preferences_map.get(student_id, [])
-        try:
-            rank = preferences.index(assigned_seminar_id) + 1
-            rank_str = f"第{rank}希望"
-        except ValueError:
-            rank_str = "希望外"
+        rank = _student_rank(problem_data, metrics, student_id)
+        rank_str = f"第{rank}希望" if rank is not None else "希望外"
         student_assignment_data.append([student_id, assigned_seminar_id, rank_str])
 
     # 未割り当て学生の追加
-    all_student_ids = {s['id'] for s in students_data}
+    all_student_ids = set(problem_data.student_ids)
     assigned_student_ids = set(final_assignment.keys())
     unassigned_students_list = sorted(list(all_student_ids - assigned_student_ids))
     if unassigned_students_list:
@@ -331,10 +289,12 @@ def save_csv_results(
     config: Dict[str, Any],
     final_assignment: Dict[str, str],
     optimization_strategy: str,
-    is_intermediate: bool = False
+    is_intermediate: bool = False,
+    problem_data: Optional[ProblemData] = None
 ):
     """
     最適化結果をCSVファイルとして保存する。
+    problem_data (構築済みの問題表現) を渡すと、レポート用データから作り直さずに使う。
     """
     logger.info("CSVレポートの生成を開始します。")
 
@@ -346,9 +306,7 @@ def save_csv_results(
     output_filename_assignment = os.path.join(output_dir, f"seminar_assignment_{optimization_strategy}_{report_type}_{timestamp}.csv")
     output_filename_summary = os.path.join(output_dir, f"seminar_summary_{optimization_strategy}_{report_type}_{timestamp}.csv")
 
-    students_data = config.get('students_data_for_report', [])
-    seminars_data = config.get('seminars_data_for_report', [])
-    seminar_capacities_for_report = {s['id']: s['capacity'] for s in seminars_data}
+    problem_data, metrics = _report_metrics(config, final_assignment, problem_data)
 
     # 学生割り当てCSV
     with open(output_filename_assignment, 'w', newline='', encoding='utf-8') as f:
@@ -356,20 +314,14 @@ def save_csv_results(
         writer.writerow(['student_id', 'assigned_seminar_id', 'preferred_rank'])
         logger.debug(f"CSV割り当てレポート '{output_filename_assignment}' のヘッダーを書き込みました。")
 
-        student_preferences_map = {s['id']: s['preferences'] for s in students_data}
-
         for student_id in sorted(final_assignment.keys()):
             assigned_seminar_id = final_assignment[student_id]
-            preferences = student_preferences_map.get(student_id, [])
-            try:
-                rank = preferences.index(assigned_seminar_id) + 1
-                rank_str = str(rank)
-            except ValueError:
-                rank_str = "unpreferred" # 希望リストにないセミナーに割り当てられた場合
+            rank = _student_rank(problem_data, metrics, student_id)
+            rank_str = str(rank) if rank is not None else "unpreferred" # 希望リストにないセミナーに割り当てられた場合
             writer.writerow([student_id, assigned_seminar_id, rank_str])
         
         # 未割り当て学生の追加
-        all_student_ids = {s['id'] for s in students_data}
+        all_student_ids = set(problem_data.student_ids)
         assigned_student_ids = set(final_assignment.keys())
         unassigned_students_list = sorted(list(all_student_ids - assigned_student_ids))
         for student_id in unassigned_students_list:
@@ -383,8 +335,7 @@ def save_csv_results(
         writer.writerow(['Statistic', 'Value'])
         logger.debug(f"CSV概要レポート '{output_filename_summary}' のヘッダーを書き込みました。")
 
-        satisfaction_stats = _calculate_satisfaction_stats(students_data, final_assignment)
-        for key, value in satisfaction_stats.items():
+        for key, value in metrics.satisfaction_summary().items():
             writer.writerow([key, value])
             logger.debug(f"概要統計: {key} = {value}")
         
@@ -392,7 +343,7 @@ def save_csv_results(
         writer.writerow(['Seminar ID', 'Capacity', 'Assigned Count', 'Remaining Capacity', 'Magnification'])
         logger.debug("概要統計: セミナー詳細のヘッダーを書き込みました。")
 
-        seminar_details = _get_seminar_assignment_details(seminars_data, final_assignment, seminar_capacities_for_report)
+        seminar_details = _get_seminar_assignment_details(problem_data, metrics)
         for detail in seminar_details:
             writer.writerow([
                 detail['seminar_id'],
@@ -0,0 +1,398 @@
+# seminar_optimization/problem_data.py
+"""
+セミナー割り当て問題の整数インデックス化・配列化された表現を定義します。
+
+セミナーデータと学生データのリストから一度だけ構築し、すべての最適化アルゴリズムで共有します。
+学生IDとセミナーIDは 0 から始まる連続した整数に写像され、割り当ては長さ N の整数ベクトル
+（値はセミナーのインデックス、-1 は未割り当て）として扱います。
+
+構築後の ProblemData は変更されない (配列は書き込み不可) ため、スレッド間でそのまま共有できます。
+別プロセスへ渡すときは基本の配列だけを pickle し、受け取った側で派生した表を作り直します。
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+# ロギングは logger_config.py で一元的に設定されるため、ここではロガーの取得のみ
+from seminar_optimization.logger_config import logger
+
+# 未割り当てを表すインデックス
+UNASSIGNED = -1
+
+# 希望順位ごとのデフォルトのスコア重み (BaseOptimizer._calculate_score と同じ)
+DEFAULT_SCORE_WEIGHTS = {
+    "1st_choice": 3.0,
+    "2nd_choice": 2.0,
+    "3rd_choice": 1.0,
+    "other_preference": 0.5
+}
+
+# 学生×(セミナー+1) の密な重みテーブルを作成するセル数の上限。
+# これを超える規模では、ソート済みキーに対する二分探索で重みを引く。
+DENSE_WEIGHT_TABLE_MAX_CELLS = 10_000_000
+
+
+def _rank_weights_from_config(config: Dict[str, Any], num_ranks: int) -> np.ndarray:
+    """
+    設定の score_weights から希望順位ごとの重み配列 (長さ num_ranks) を作成する。
+    """
+    score_weights = config.get("score_weights", DEFAULT_SCORE_WEIGHTS)
+    # GUIの設定では "other" キーが使われる場合があるため、それも受け付ける
+    other = score_weights.get("other_preference", score_weights.get("other", DEFAULT_SCORE_WEIGHTS["other_preference"]))
+    head = [
+        score_weights.get("1st_choice", DEFAULT_SCORE_WEIGHTS["1st_choice"]),
+        score_weights.get("2nd_choice", DEFAULT_SCORE_WEIGHTS["2nd_choice"]),
+        score_weights.get("3rd_choice", DEFAULT_SCORE_WEIGHTS["3rd_choice"]),
+    ]
+    weights = np.full(num_ranks, float(other), dtype=np.float64)
+    weights[:min(3, num_ranks)] = head[:min(3, num_ranks)]
+    return weights
+
+
+def _encode_preferences(students: List[Dict[str, Any]],
+                        seminar_index: Dict[str, int],
+                        num_ranks: int) -> Tuple[np.ndarray, int]:
+    """
+    学生の希望リストを学生×希望順位のセミナーインデックス行列 (空き・不明なセミナーは -1) に変換する。
+    戻り値は (希望行列, 存在しないセミナーを指す希望の件数)。
+    """
+    preference_matrix = np.full((len(students), num_ranks), UNASSIGNED, dtype=np.int32)
+    unknown_count = 0
+    for i, student in enumerate(students):
+        seen = set()
+        for rank, seminar_id in enumerate(student['preferences']):
+            seminar_idx = seminar_index.get(seminar_id)
+            if seminar_idx is None:
+                unknown_count += 1
+                continue
+            if seminar_idx in seen:
+                continue # 重複した希望は最初の順位のみ有効
+            seen.add(seminar_idx)
+            preference_matrix[i, rank] = seminar_idx
+    return preference_matrix, unknown_count
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+@dataclass(frozen=True)
+class BatchEvaluation:
+    """
+    P 個の割り当てベクトル (P×N 行列) をまとめて評価した結果。
+
+    Attributes:
+        scores: 割り当てごとの合計スコア (P,)。
+        loads: 割り当て×セミナーの割り当て人数 (P, S)。
+        overloads: 割り当て×セミナーの定員超過人数 (P, S)。
+        unassigned_counts: 割り当てごとの未割り当て学生数 (P,)。
+    """
+    scores: np.ndarray
+    loads: np.ndarray
+    overloads: np.ndarray
+    unassigned_counts: np.ndarray
+
+    @property
+    def total_overloads(self) -> np.ndarray:
+        """割り当てごとの定員超過人数の合計 (P,)。"""
+        return self.overloads.sum(axis=1)
+
+    @property
+    def feasible(self) -> np.ndarray:
+        """割り当てごとに定員制約を満たしているかのマスク (P,)。"""
+        return self.total_overloads == 0
+
+
+@dataclass(frozen=True, eq=False)
+class ProblemData:
+    """
+    整数インデックス化されたセミナー割り当て問題。
+
+    Attributes:
+        student_ids: インデックス順の学生IDのタプル。
+        seminar_ids: インデックス順のセミナーIDのタプル。
+        student_index: 学生ID -> 学生インデックスの辞書。
+        seminar_index: セミナーID -> セミナーインデックスの辞書。
+        capacities: セミナーごとの定員 (S,)。
+        magnifications: セミナーごとの倍率 (S,)。
+        preference_matrix: 学生×希望順位のセミナーインデックス行列 (N, R)。空き・不明なセミナーは -1。
+        preference_weights: preference_matrix と同じ形の重み行列 (希望順位の重み × 倍率)。
+        rank_weights: 希望順位ごとの重み (R,)。
+        preference_lists: 学生ごとの希望セミナーインデックスのタプル (スカラー処理用)。
+        weight_table: 学生×(セミナー+1) の重みテーブル。最後の列 (インデックス -1) は未割り当てで 0。
+            規模が大きい場合は None で、ソート済みキーによる検索を使う。
+
+    インスタンスは共有を前提とするため、辞書も含めて変更してはならない。
+    """
+    student_ids: Tuple[str, ...]
+    seminar_ids: Tuple[str, ...]
+    student_index: Dict[str, int]
+    seminar_index: Dict[str, int]
+    capacities: np.ndarray
+    magnifications: np.ndarray
+    preference_matrix: np.ndarray
+    preference_weights: np.ndarray
+    rank_weights: np.ndarray
+    preference_lists: Tuple[Tuple[int, ...], ...]
+    weight_table: Optional[np.ndarray]
+    _pair_keys: np.ndarray
+    _pair_ranks: np.ndarray
+    _pair_weights: np.ndarray
+
+    @classmethod
+    def from_lists(cls,
+                   seminars: List[Dict[str, Any]],
+                   students: List[Dict[str, Any]],
+                   config: Dict[str, Any]) -> "ProblemData":
+        """
+        セミナーと学生のリストから ProblemData を構築する。
+        """
+        seminar_ids = tuple(s['id'] for s in seminars)
+        student_ids = tuple(s['id'] for s in students)
+        seminar_index = {seminar_id: i for i, seminar_id in enumerate(seminar_ids)}
+        student_index = {student_id: i for i, student_id in enumerate(student_ids)}
+        num_students = len(student_ids)
+        num_seminars = len(seminar_ids)
+
+        capacities = np.array([s['capacity'] for s in seminars], dtype=np.int64)
+        magnifications = np.array([s.get('magnification', 1.0) for s in seminars], dtype=np.float64)
+
+        num_ranks = max((len(s['preferences']) for s in students), default=0)
+        preference_matrix, unknown_count = _encode_preferences(students, seminar_index, num_ranks)
+        if unknown_count:
+            logger.warning(f"ProblemData: 存在しないセミナーを指す希望が {unknown_count} 件ありました。これらは無視されます。")
+
+        return cls.from_arrays(student_ids, seminar_ids, capacities, magnifications, preference_matrix,
+                               _rank_weights_from_config(config, num_ranks))
+
+    @classmethod
+    def from_arrays(cls,
+                    student_ids: Tuple[str, ...],
+                    seminar_ids: Tuple[str, ...],
+                    capacities: np.ndarray,
+                    magnifications: np.ndarray,
+                    preference_matrix: np.ndarray,
+                    rank_weights: np.ndarray) -> "ProblemData":
+        """
+        基本の配列 (ID、定員、倍率、希望行列、希望順位ごとの重み) から ProblemData を構築する。
+        IDの写像、重み行列、希望リスト、重みテーブルなどの派生した表はここで作る。
+        """
+        student_ids = tuple(student_ids)
+        seminar_ids = tuple(seminar_ids)
+        seminar_index = {seminar_id: i for i, seminar_id in enumerate(seminar_ids)}
+        student_index = {student_id: i for i, student_id in enumerate(student_ids)}
+        num_students = len(student_ids)
+        num_seminars = len(seminar_ids)
+        capacities = np.array(capacities, dtype=np.int64)
+        magnifications = np.array(magnifications, dtype=np.float64)
+        preference_matrix = np.array(preference_matrix, dtype=np.int32)
+        rank_weights = np.array(rank_weights, dtype=np.float64)
+        num_ranks = preference_matrix.shape[1]
+
+        valid = preference_matrix >= 0
+        preference_lists = tuple(tuple(row[row >= 0].tolist()) for row in preference_matrix)
+        preference_weights = np.where(
+            valid,
+            rank_weights[np.newaxis, :] * magnifications[np.where(valid, preference_matrix, 0)],
+            0.0
+        ) if num_ranks else np.zeros((num_students, 0), dtype=np.float64)
+
+        # (学生, セミナー) ペアのソート済みキー。キー = 学生 * (S+1) + セミナー
+        student_rows, rank_cols = np.nonzero(valid)
+        pair_seminars = preference_matrix[student_rows, rank_cols].astype(np.int64)
+        keys = student_rows.astype(np.int64) * (num_seminars + 1) + pair_seminars
+        order = np.argsort(keys, kind='stable')
+        pair_keys = keys[order]
+        pair_ranks = rank_cols[order].astype(np.int32)
+        pair_weights = preference_weights[student_rows, rank_cols][order]
+
+        weight_table: Optional[np.ndarray] = None
+        if num_students * (num_seminars + 1) <= DENSE_WEIGHT_TABLE_MAX_CELLS:
+            weight_table = np.zeros((num_students, num_seminars + 1), dtype=np.float64)
+            weight_table[student_rows, pair_seminars] = preference_weights[student_rows, rank_cols]
+            _read_only(weight_table)
+        else:
+            logger.info(f"ProblemData: 問題規模が大きいため ({num_students}×{num_seminars})、密な重みテーブルは作成しません。")
+
+        logger.info(f"ProblemData: 学生数={num_students}, セミナー数={num_seminars}, 最大希望数={num_ranks} で構築しました。")
+        return cls(
+            student_ids=student_ids,
+            seminar_ids=seminar_ids,
+            student_index=student_index,
+            seminar_index=seminar_index,
+            capacities=_read_only(capacities),
+            magnifications=_read_only(magnifications),
+            preference_matrix=_read_only(preference_matrix),
+            preference_weights=_read_only(preference_weights),
+            rank_weights=_read_only(rank_weights),
+            preference_lists=preference_lists,
+            weight_table=weight_table,
+            _pair_keys=_read_only(pair_keys),
+            _pair_ranks=_read_only(pair_ranks),
+            _pair_weights=_read_only(pair_weights),
+        )
+
+    def __reduce__(self):
+        # 派生した表 (重みテーブル、ソート済みキー、IDの写像など) は pickle せず、受け取った側で作り直す
+        return (ProblemData.from_arrays, (self.student_ids, self.seminar_ids, self.capacities, self.magnifications,
+                                          self.preference_matrix, self.rank_weights))
+
+    @staticmethod
+    def fingerprint(seminars: List[Dict[str, Any]],
+                    students: List[Dict[str, Any]],
+                    config: Dict[str, Any]) -> int:
+        """
+        ProblemData の内容を決める入力 (ID、定員、倍率、希望、希望順位の重み) のハッシュ値を返す。
+        構築済みの ProblemData を同じ入力に対して再利用してよいかの判定に使う。
+        """
+        num_ranks = max((len(s['preferences']) for s in students), default=0)
+        return hash((
+            tuple((s['id'], s['capacity'], s.get('magnification', 1.0)) for s in seminars),
+            tuple((s['id'], tuple(s['preferences'])) for s in students),
+            tuple(_rank_weights_from_config(config, num_ranks).tolist()),
+        ))
+
+    def is_compatible(self,
+                      seminars: List[Dict[str, Any]],
+                      students: List[Dict[str, Any]],
+                      config: Dict[str, Any]) -> bool:
+        """
+        この ProblemData を、与えられた入力の問題表現として使えるかを判定する。
+        学生ID・セミナーID (順序を含む)、定員、倍率、希望順位の重み、希望の内容がすべて一致する場合に True。
+        安い比較から順に行い、希望の内容は派生した表を作らずに希望行列だけを作り直して比較する。
+        """
+        if self.student_ids != tuple(s['id'] for s in students) or self.seminar_ids != tuple(s['id'] for s in seminars):
+            return False
+        if not np.array_equal(self.capacities, np.array([s['capacity'] for s in seminars], dtype=np.int64)):
+            return False
+        if not np.array_equal(self.magnifications,
+                              np.array([s.get('magnification', 1.0) for s in seminars], dtype=np.float64)):
+            return False
+        num_ranks = max((len(s['preferences']) for s in students), default=0)
+        if num_ranks != self.preference_matrix.shape[1]:
+            return False
+        if not np.array_equal(self.rank_weights, _rank_weights_from_config(config, num_ranks)):
+            return False
+        preference_matrix, _ = _encode_preferences(students, self.seminar_index, num_ranks)
+        return np.array_equal(self.preference_matrix, preference_matrix)
+
+    @property
+    def num_students(self) -> int:
+        return len(self.student_ids)
+
+    @property
+    def num_seminars(self) -> int:
+        return len(self.seminar_ids)
+
+    # --- 割り当てベクトルと辞書の相互変換 ---
+
+    def encode(self, assignment: Dict[str, str]) -> np.ndarray:
+        """
+        学生ID -> セミナーID の辞書を割り当てベクトル (N,) に変換する。
+        存在しない学生IDは無視し、存在しないセミナーIDは未割り当て (-1) として扱う。
+        """
+        vector = np.full(self.num_students, UNASSIGNED, dtype=np.int32)
+        for student_id, seminar_id in assignment.items():
+            student_idx = self.student_index.get(student_id)
+            if student_idx is None:
+                continue
+            vector[student_idx] = self.seminar_index.get(seminar_id, UNASSIGNED)
+        return vector
+
+    def decode(self, vector: np.ndarray) -> Dict[str, str]:
+        """
+        割り当てベクトルを学生ID -> セミナーID の辞書に変換する (未割り当ての学生は含まない)。
+        """
+        assigned = np.flatnonzero(vector >= 0)
+        return {self.student_ids[i]: self.seminar_ids[s] for i, s in zip(assigned.tolist(), vector[assigned].tolist())}
+
+    # --- 重み・順位の参照 ---
+
+    def _pair_positions(self, student_indices: np.ndarray, seminar_indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """ソート済みキー上の位置と、そのペアが希望に含まれるかのマスクを返す。"""
+        keys = np.asarray(student_indices, dtype=np.int64) * (self.num_seminars + 1) + np.asarray(seminar_indices, dtype=np.int64)
+        positions = np.searchsorted(self._pair_keys, keys)
+        positions = np.minimum(positions, max(len(self._pair_keys) - 1, 0))
+        if len(self._pair_keys) == 0:
+            return positions, np.zeros(keys.shape, dtype=bool)
+        found = (self._pair_keys[positions] == keys) & (np.asarray(seminar_indices) >= 0)
+        return positions, found
+
+    def weights_of(self, student_indices: np.ndarray, seminar_indices: np.ndarray) -> np.ndarray:
+        """
+        (学生, セミナー) ペアの重みをまとめて返す。セミナーが -1 (未割り当て) や希望外の場合は 0。
+        student_indices と seminar_indices はブロードキャスト可能な形であればよい。
+        """
+        if self.weight_table is not None:
+            return self.weight_table[student_indices, seminar_indices]
+        student_indices, seminar_indices = np.broadcast_arrays(student_indices, seminar_indices)
+        positions, found = self._pair_positions(student_indices, seminar_indices)
+        return np.where(found, self._pair_weights[positions] if len(self._pair_weights) else 0.0, 0.0)
+
+    def ranks_of(self, student_indices: np.ndarray, seminar_indices: np.ndarray) -> np.ndarray:
+        """
+        (学生, セミナー) ペアの希望順位 (0始まり) をまとめて返す。希望外・未割り当ては -1。
+        """
+        student_indices, seminar_indices = np.broadcast_arrays(student_indices, seminar_indices)
+        positions, found = self._pair_positions(student_indices, seminar_indices)
+        return np.where(found, self._pair_ranks[positions] if len(self._pair_ranks) else UNASSIGNED, UNASSIGNED)
+
+    def weight_of(self, student_idx: int, seminar_idx: int) -> float:
+        """単一の (学生, セミナー) ペアの重みを返す。"""
+        if seminar_idx < 0:
+            return 0.0
+        if self.weight_table is not None:
+            return float(self.weight_table[student_idx, seminar_idx])
+        preferences = self.preference_lists[student_idx]
+        if seminar_idx not in preferences:
+            return 0.0
+        rank = int(np.flatnonzero(self.preference_matrix[student_idx] == seminar_idx)[0])
+        return float(self.preference_weights[student_idx, rank])
+
+    # --- 割り当てベクトルの評価 ---
+
+    def score(self, vector: np.ndarray) -> float:
+        """割り当てベクトルの合計スコアを返す。"""
+        return float(self.weights_of(np.arange(self.num_students), vector).sum())
+
+    def seminar_loads(self, vector: np.ndarray) -> np.ndarray:
+        """セミナーごとの割り当て人数 (S,) を返す。"""
+        assigned = vector[vector >= 0]
+        return np.bincount(assigned, minlength=self.num_seminars)
+
+    def is_feasible(self, vector: np.ndarray) -> bool:
+        """割り当てベクトルが定員制約を満たしているかを返す。"""
+        return bool(np.all(self.seminar_loads(vector) <= self.capacities))
+
+    def evaluate_batch(self, matrix: np.ndarray) -> BatchEvaluation:
+        """
+        P×N の割り当て行列 (各行が割り当てベクトル、-1 は未割り当て) をまとめて評価する。
+        重みテーブルからの一括参照と、行ごとにずらしたインデックスの bincount で
+        スコア・セミナーごとの人数・定員超過・未割り当て数を行ループなしで求める。
+        """
+        matrix = np.asarray(matrix)
+        if matrix.ndim != 2 or matrix.shape[1] != self.num_students:
+            raise ValueError(f"割り当て行列の形が不正です: {matrix.shape} (期待: (P, {self.num_students}))")
+        num_rows = matrix.shape[0]
+        num_seminars = self.num_seminars
+
+        scores = self.weights_of(np.arange(self.num_students)[np.newaxis, :], matrix).sum(axis=1)
+        # 未割り当て (-1) は列 S に数え、行 p のインデックスを p*(S+1) だけずらして一度に数える
+        columns = np.where(matrix >= 0, matrix, num_seminars).astype(np.int64)
+        offsets = np.arange(num_rows, dtype=np.int64)[:, np.newaxis] * (num_seminars + 1)
+        counts = np.bincount((columns + offsets).ravel(), minlength=num_rows * (num_seminars + 1))
+        counts = counts.reshape(num_rows, num_seminars + 1)
+        loads = counts[:, :num_seminars]
+        overloads = np.maximum(loads - self.capacities[np.newaxis, :], 0)
+        return BatchEvaluation(
+            scores=scores,
+            loads=loads,
+            overloads=overloads,
+            unassigned_counts=counts[:, num_seminars],
+        )
+
+    def unassigned_indices(self, vector: np.ndarray) -> np.ndarray:
+        """未割り当ての学生インデックスを返す。"""
+        return np.flatnonzero(vector < 0)
@@ -50,7 +50,7 @@ CONFIG_SCHEMA = {
         "max_preferences": {"type": "integer", "minimum": 1},
         "preference_distribution": {"type": "string", "enum": ["random", "uniform", "biased"]},
         "random_seed": {"type": ["integer", "null"]},
-        "optimization_strategy": {"type": "string", "enum": ["Greedy_LS", "GA_LS", "ILP", "CP", "Multilevel", "Adaptive"]},
+        "optimization_strategy": {"type": "string", "enum": ["Greedy_LS", "GA_LS", "ILP", "CP", "Multilevel", "Adaptive", "Flow", "Auto"]},
         "ga_population_size": {"type": "integer", "minimum": 1},
         "ga_generations": {"type": "integer", "minimum": 1},
         "ga_mutation_rate": {"type": "number", "minimum": 0, "maximum": 1},
@@ -58,8 +58,35 @@ CONFIG_SCHEMA = {
         "ga_no_improvement_limit": {"type": "integer", "minimum": 1},
         "ilp_time_limit": {"type": "integer", "minimum": 1},
         "cp_time_limit": {"type": "integer", "minimum": 1},
+        "flow_weight_scale": {"type": "integer", "minimum": 1},
+        "warm_start": {"type": "boolean"},
+        "warm_start_hint": {"type": "boolean"},
+        "fix_and_polish": {"type": "boolean"},
+        "polish_fix_ratio": {"type": "number", "minimum": 0, "maximum": 1},
+        "polish_time_ratio": {"type": "number", "minimum": 0, "maximum": 1},
+        "aggregate_profiles": {"type": "boolean"},
+        "decompose_components": {"type": "boolean"},
+        "decompose_min_students": {"type": "integer", "minimum": 0},
+        "greedy_ls_multi_start": {"type": "boolean"},
+        "ga_engine": {"type": "string", "enum": ["vectorized", "legacy"]},
+        "ga_selection": {"type": "string", "enum": ["tournament", "sus"]},
+        "ga_crossover": {"type": "string", "enum": ["uniform", "one_point"]},
+        "ga_tournament_size": {"type": "integer", "minimum": 1},
+        "ga_repair": {"type": "boolean"},
+        "ga_islands": {"type": "integer", "minimum": 1},
+        "ga_migration_interval": {"type": "integer", "minimum": 1},
+        "ga_migration_size": {"type": "integer", "minimum": 1},
+        "fitness_cache_size": {"type": "integer", "minimum": 0},
+        "tsl_memory_size": {"type": "integer", "minimum": 1},
+        "tsl_memory_min_distance_ratio": {"type": "number", "minimum": 0, "maximum": 1},
+        "tsl_relink_sample": {"type": "integer", "minimum": 1},
         "max_workers": {"type": "integer", "minimum": 1},
         "multilevel_clusters": {"type": "integer", "minimum": 1},
+        "multilevel_mode": {"type": "string", "enum": ["vcycle", "cluster"]},
+        "multilevel_coarse_size": {"type": "integer", "minimum": 1},
+        "multilevel_refine_passes": {"type": "integer", "minimum": 0},
+        "multilevel_auto_temperature": {"type": "boolean"},
+        "multilevel_initial_acceptance": {"type": "number", "exclusiveMinimum": 0, "exclusiveMaximum": 1},
         "greedy_ls_iterations": {"type": "integer", "minimum": 1},
         "local_search_iterations": {"type": "integer", "minimum": 1},
         "early_stop_no_improvement_limit": {"type": "integer", "minimum": 1},
@@ -90,6 +117,20 @@ CONFIG_SCHEMA = {
         "adaptive_unassigned_weight": {"type": "number", "minimum": 0, "maximum": 1},
         "adaptive_time_weight": {"type": "number", "minimum": 0, "maximum": 1},
         "max_time_for_normalization": {"type": "number", "minimum": 1},
+        "adaptive_max_total_time": {"type": "number", "minimum": 1},
+        "adaptive_warm_start": {"type": "boolean"},
+        "adaptive_history_db": {"type": ["string", "null"]},
+        "cost_model_min_samples": {"type": "integer", "minimum": 1},
+        "cost_model_quality_tolerance": {"type": "number", "minimum": 0, "maximum": 1},
+        "cost_model_budget_factor": {"type": "number", "minimum": 1},
+        "adaptive_mode": {"type": "string", "enum": ["sequential", "race"]},
+        "adaptive_race_strategies": {
+            "type": "array",
+            "items": {"type": "string", "enum": ["Greedy_LS", "GA_LS", "ILP", "CP", "Multilevel", "Flow"]},
+            "minItems": 1
+        },
+        "adaptive_race_target_score": {"type": ["number", "null"]},
+        "adaptive_race_target_gap": {"type": ["number", "null"], "minimum": 0, "maximum": 1},
         "config_file_path":{"type": "string"},
         "data_directory":{"type": "string"},
         "data_input_method":{"type": "string"},
@@ -0,0 +1,136 @@
+# seminar_optimization/strategy_store.py
+"""
+適応型最適化の戦略ごとの報酬 (パフォーマンススコア) を、実行をまたいで SQLite に保存するストア。
+
+報酬はインスタンスの特徴を粗く離散化したバケットごとに記録し、次の実行では
+最も近いバケットの履歴を事前分布として戦略選択を始めます。
+"""
+import json
+import math
+import sqlite3
+import time
+from contextlib import closing
+from typing import Any, Dict, List, Optional, Tuple
+
+# ロギングは logger_config.py で一元的に設定されるため、ここではロガーの取得のみ
+from seminar_optimization.logger_config import logger
+
+# バケットの各成分の名前 (テーブルの列名)
+BUCKET_FIELDS = ("students", "seminars", "slack", "preferences", "contention")
+
+
+def instance_bucket(features: Dict[str, float]) -> Tuple[int, ...]:
+    """
+    インスタンスの特徴量 (instance_features.extract_features) を離散化したバケットを返す。各成分は次のとおり。
+        students    : 学生数の log2 (四捨五入)
+        seminars    : セミナー数の log2 (四捨五入)
+        slack       : 定員の合計 / 学生数 の log2 を 0.5 刻みにしたもの (×2 して整数化)
+        preferences : 学生1人あたりの有効な希望数の平均 (四捨五入)
+        contention  : 第1希望が定員を超えて集中しているセミナーを第1希望とする学生の割合 (0.1 刻み、×10 して整数化)
+    """
+    return (
+        int(round(math.log2(max(features["num_students"], 1)))),
+        int(round(math.log2(max(features["num_seminars"], 1)))),
+        int(round(2 * math.log2(max(features["capacity_ratio"], 1e-6)))),
+        int(round(features["mean_preferences"])),
+        int(round(10 * features["first_choice_contention"])),
+    )
+
+
+class StrategyStore:
+    """
+    戦略ごとの報酬の履歴を保存する SQLite ストア。
+    操作ごとに接続を開いて閉じるため、複数のプロセスやスレッドから同じファイルを使ってもよい。
+    """
+    def __init__(self, path: str):
+        self.path = path
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS strategy_rewards ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                + ", ".join(f"{field} INTEGER NOT NULL" for field in BUCKET_FIELDS) +
+                ", strategy TEXT NOT NULL, reward REAL NOT NULL, score REAL, duration REAL, created_at REAL NOT NULL, features TEXT)"
+            )
+            # features 列がない古いストアには列を追加する
+            columns = [row[1] for row in connection.execute("PRAGMA table_info(strategy_rewards)")]
+            if "features" not in columns:
+                connection.execute("ALTER TABLE strategy_rewards ADD COLUMN features TEXT")
+            connection.execute(
+                f"CREATE INDEX IF NOT EXISTS strategy_rewards_bucket ON strategy_rewards ({', '.join(BUCKET_FIELDS)}, strategy)"
+            )
+        logger.debug(f"StrategyStore: {path} を開きました。")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def record(self, bucket: Tuple[int, ...], strategy: str, reward: float,
+               score: Optional[float] = None, duration: Optional[float] = None,
+               features: Optional[Dict[str, float]] = None):
+        """
+        バケット bucket のインスタンスで戦略 strategy が得た報酬を1件記録する。
+        features (インスタンスの特徴量) は実行時間・スコアの予測モデルの学習に使う。
+        """
+        if score is not None and not math.isfinite(score):
+            score = None
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                f"INSERT INTO strategy_rewards ({', '.join(BUCKET_FIELDS)}, strategy, reward, score, duration, created_at, features) "
+                f"VALUES ({', '.join('?' * (len(BUCKET_FIELDS) + 6))})",
+                (*bucket, strategy, float(reward), score, duration, time.time(),
+                 json.dumps(features) if features is not None else None)
+            )
+
+    def training_rows(self) -> List[Dict[str, Any]]:
+        """
+        特徴量と実行時間が記録された履歴を、{"strategy", "features", "score", "duration"} の辞書のリストで返す。
+        スコアが記録されていない (解が得られなかった) 実行の score は None。
+        """
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                "SELECT strategy, features, score, duration FROM strategy_rewards "
+                "WHERE features IS NOT NULL AND duration IS NOT NULL ORDER BY id"
+            ).fetchall()
+        return [
+            {"strategy": strategy, "features": json.loads(features), "score": score, "duration": duration}
+            for strategy, features, score, duration in rows
+        ]
+
+    def nearest_bucket(self, bucket: Tuple[int, ...]) -> Optional[Tuple[int, ...]]:
+        """
+        履歴のあるバケットのうち、bucket に最も近い (成分ごとの差の絶対値の和が最小の) ものを返す。
+        同じ距離のバケットが複数ある場合は記録件数の多いものを選ぶ。履歴がなければ None。
+        """
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                f"SELECT {', '.join(BUCKET_FIELDS)}, COUNT(*) FROM strategy_rewards GROUP BY {', '.join(BUCKET_FIELDS)}"
+            ).fetchall()
+        if not rows:
+            return None
+        best = min(rows, key=lambda row: (sum(abs(a - b) for a, b in zip(row[:-1], bucket)), -row[-1], row[:-1]))
+        return tuple(best[:-1])
+
+    def recent_rewards(self, bucket: Tuple[int, ...], limit: int) -> Dict[str, List[float]]:
+        """
+        バケット bucket の戦略ごとの直近 limit 件の報酬を、古い順のリストで返す。
+        """
+        where = " AND ".join(f"{field} = ?" for field in BUCKET_FIELDS)
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                f"SELECT strategy, reward FROM ("
+                f"SELECT strategy, reward, id, ROW_NUMBER() OVER (PARTITION BY strategy ORDER BY id DESC) AS recency "
+                f"FROM strategy_rewards WHERE {where}) WHERE recency <= ? ORDER BY id",
+                (*bucket, limit)
+            ).fetchall()
+        rewards: Dict[str, List[float]] = {}
+        for strategy, reward in rows:
+            rewards.setdefault(strategy, []).append(reward)
+        return rewards
+
+    def prior(self, bucket: Tuple[int, ...], limit: int) -> Tuple[Optional[Tuple[int, ...]], Dict[str, List[float]]]:
+        """
+        bucket に最も近いバケットと、その戦略ごとの直近 limit 件の報酬を返す (履歴がなければ (None, {}))。
+        """
+        nearest = self.nearest_bucket(bucket)
+        if nearest is None:
+            return None, {}
+        return nearest, self.recent_rewards(nearest, limit)
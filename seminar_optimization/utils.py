@@ -8,6 +8,8 @@ import numpy as np
 # ロガーの設定を強化
 # ロギングは logger_config.py で一元的に設定されるため、ここではロガーの取得のみ
 from seminar_optimization.logger_config import logger # <-- 修正: 相対インポート
+from seminar_optimization.problem_data import ProblemData, UNASSIGNED
+from seminar_optimization.fitness_cache import FitnessCache
 
 
 class OptimizationResult:
@@ -15,13 +17,14 @@ class OptimizationResult:
     最適化結果を格納するためのデータクラス。
     """
     def __init__(self,
-                 status: Literal["OPTIMAL", "FEASIBLE", "INFEASIBLE", "NO_SOLUTION_FOUND", "MODEL_INVALID", "CANCELLED", "FAILED", "RUNNING"],
+                 status: Literal["OPTIMAL", "FEASIBLE", "INFEASIBLE", "NO_SOLUTION_FOUND", "MODEL_INVALID", "CANCELLED", "FAILED", "RUNNING", "TIME_LIMIT_EXCEEDED"],
                  message: str,
                  best_score: float,
                  best_assignment: Dict[str, str],
                  seminar_capacities: Dict[str, int],
                  unassigned_students: List[str],
-                 optimization_strategy: str):
+                 optimization_strategy: str,
+                 details: Optional[Dict[str, Any]] = None):
         logger.debug(f"OptimizationResult: 新しい結果オブジェクトが作成されました。ステータス: {status}, スコア: {best_score:.2f}")
         self.status = status
         self.message = message
@@ -30,6 +33,7 @@ class OptimizationResult:
         self.seminar_capacities = seminar_capacities
         self.unassigned_students = unassigned_students
         self.optimization_strategy = optimization_strategy
+        self.details = details if details is not None else {} # 戦略固有の補足情報 (例: マルチスタートの各チェーンの要約)
         logger.debug(f"OptimizationResult: 未割り当て学生数: {len(self.unassigned_students)}")
 
     def to_dict(self) -> Dict[str, Any]:
@@ -42,7 +46,8 @@ class OptimizationResult:
             "best_assignment": self.best_assignment,
             "seminar_capacities": self.seminar_capacities,
             "unassigned_students": self.unassigned_students,
-            "optimization_strategy": self.optimization_strategy
+            "optimization_strategy": self.optimization_strategy,
+            "details": self.details
         }
 
 class BaseOptimizer:
@@ -54,12 +59,18 @@ class BaseOptimizer:
                  seminars: List[Dict[str, Any]],
                  students: List[Dict[str, Any]],
                  config: Dict[str, Any],
-                 progress_callback: Optional[Callable[[str], None]] = None):
+                 progress_callback: Optional[Callable[[str], None]] = None,
+                 initial_assignment: Optional[Dict[str, str]] = None,
+                 problem_data: Optional[ProblemData] = None):
         logger.debug("BaseOptimizer: 初期化を開始シマス。")
         self.seminars = seminars
         self.students = students
         self.config = config
         self.progress_callback = progress_callback
+        # ウォームスタートに使う割り当て (学生ID -> セミナーID)。各戦略は探索の開始点としてこれを使う
+        self.initial_assignment = initial_assignment
+        # 最良スコアが更新されるたびに呼ばれるコールバック (適応型最適化のレースで進捗を集めるために使う)
+        self.best_score_callback: Optional[Callable[[float], None]] = None
 
         # 乱数シードを初期化
         random_seed = config.get("random_seed")
@@ -76,6 +87,14 @@ class BaseOptimizer:
         self.student_preferences: Dict[str, List[str]] = {s['id']: s['preferences'] for s in students}
         self.student_ids: List[str] = [s['id'] for s in students]
         self.seminar_ids: List[str] = [s['id'] for s in seminars]
+        # 整数インデックス化された問題表現 (スコア計算や制約チェックはこちらを使う)
+        # 同じデータに対して構築済みのもの (problem_data) が渡された場合は作り直さずに共有する
+        if problem_data is not None and not problem_data.is_compatible(seminars, students, config):
+            logger.warning("BaseOptimizer: 渡された ProblemData が入力データと一致しないため、作り直します。")
+            problem_data = None
+        self.problem_data = problem_data if problem_data is not None else ProblemData.from_lists(seminars, students, config)
+        # 同じ割り当てを二度評価しないための適応度キャッシュ (GA と TSL の評価で共有する)
+        self.fitness_cache = FitnessCache(self.problem_data, config.get("fitness_cache_size", 10000))
 
         logger.info(f"BaseOptimizer: 学生数={len(self.student_ids)}, セミナー数={len(self.seminar_ids)} で初期化されました。")
         logger.debug(f"BaseOptimizer: セミナー定員: {self.seminar_capacities}")
@@ -91,6 +110,13 @@ class BaseOptimizer:
             self.progress_callback(message)
         logger.debug(f"_log: メッセージ '{message}' (レベル: {logging.getLevelName(level)}) が処理されました。")
 
+    def _report_best_score(self, score: float):
+        """
+        最良スコアの更新を best_score_callback に通知する (設定されていない場合は何もしない)。
+        """
+        if self.best_score_callback:
+            self.best_score_callback(float(score))
+
     def _calculate_score(self, assignment: Dict[str, str]) -> float:
         """
         与えられた割り当ての合計スコアを計算する。
@@ -110,49 +136,13 @@ class BaseOptimizer:
         Returns:
             float: 計算された合計スコア。
         """
-        score = 0.0
         logger.debug(f"_calculate_score: 割り当てのスコア計算を開始シマス。割り当て数: {len(assignment)}")
-        
-        # スコア計算の重み付けをconfigから取得、デフォルト値を設定
-        score_weights = self.config.get("score_weights", {
-            "1st_choice": 3.0,
-            "2nd_choice": 2.0,
-            "3rd_choice": 1.0,
-            "other_preference": 0.5
-        })
-        logger.debug(f"_calculate_score: スコア重み: {score_weights}")
-
-        for student_id, assigned_seminar_id in assignment.items():
-            if student_id not in self.student_preferences:
+        for student_id in assignment:
+            if student_id not in self.problem_data.student_index:
                 logger.warning(f"_calculate_score: 学生ID '{student_id}' の希望が見つかりませんでした。スキップシマス。")
-                continue
-
-            preferences = self.student_preferences[student_id]
-            magnification = self.seminar_magnifications.get(assigned_seminar_id, 1.0) # 倍率を取得、デフォルトは1.0
-            
-            student_score_added = 0.0 # この学生に加算されるスコア
-
-            try:
-                rank = preferences.index(assigned_seminar_id) + 1 # 0-indexed to 1-indexed
-                if rank == 1:
-                    student_score_added = score_weights["1st_choice"] * magnification
-                elif rank == 2:
-                    student_score_added = score_weights["2nd_choice"] * magnification
-                elif rank == 3:
-                    student_score_added = score_weights["3rd_choice"] * magnification
-                else:
-                    # 4位以下の場合も希望リストに含まれていれば0.5点
-                    student_score_added = score_weights["other_preference"] * magnification
-                
-                score += student_score_added
-                logger.debug(f"学生 {student_id}: セミナー {assigned_seminar_id} (第{rank}希望) に割り当て。スコア +{student_score_added:.2f} (合計: {score:.2f})")
-
-            except ValueError:
-                # 希望リストにないセミナーに割り当てられた場合（または未割り当て）
-                # スコアは加算されない（初期値0のまま）
-                logger.debug(f"学生 {student_id}: 希望外のセミナー ({assigned_seminar_id}) に割り当てられたか、未割り当てです。スコア変更なし。")
-                pass # スコアは0点のまま
 
+        # 希望リストにないセミナーへの割り当てや未割り当ては重みテーブル上で0点になる
+        score = self.problem_data.score(self.problem_data.encode(assignment))
         logger.info(f"_calculate_score: 合計スコア: {score:.2f}")
         return score
 
@@ -161,28 +151,54 @@ class BaseOptimizer:
         与えられた割り当てが定員制約を満たしているかチェックする。
         """
         logger.debug(f"_is_feasible_assignment: 定員制約チェックを開始シマス。割り当て数: {len(assignment)}")
-        seminar_counts: Dict[str, int] = {s_id: 0 for s_id in self.seminar_ids}
-        
-        # 割り当てられた学生数をカウント
-        for student_id, seminar_id in assignment.items():
-            if seminar_id in seminar_counts:
-                seminar_counts[seminar_id] += 1
-                logger.debug(f"学生 {student_id} がセミナー {seminar_id} に割り当てられました。現在のカウント: {seminar_counts[seminar_id]}")
-            else:
+        for seminar_id in assignment.values():
+            if seminar_id not in self.problem_data.seminar_index:
                 logger.warning(f"_is_feasible_assignment: 不正なセミナーID '{seminar_id}' が割り当てに存在シマス。無効な割り当てです。")
                 return False # 存在しないセミナーIDへの割り当ては不正
 
         # 定員と比較
-        for seminar_id, count in seminar_counts.items():
-            capacity = self.seminar_capacities.get(seminar_id, 0)
-            if count > capacity:
-                logger.warning(f"_is_feasible_assignment: 制約違反: セミナー '{seminar_id}' の定員 ({capacity}) を超えています ({count}人割り当て)。")
-                return False
-            else:
-                logger.debug(f"セミナー '{seminar_id}': 割り当て数 {count} / 定員 {capacity} (OK)")
+        seminar_loads = self.problem_data.seminar_loads(self.problem_data.encode(assignment))
+        over_capacity = np.flatnonzero(seminar_loads > self.problem_data.capacities)
+        if over_capacity.size:
+            for seminar_idx in over_capacity.tolist():
+                logger.warning(f"_is_feasible_assignment: 制約違反: セミナー '{self.seminar_ids[seminar_idx]}' の定員 ({self.problem_data.capacities[seminar_idx]}) を超えています ({seminar_loads[seminar_idx]}人割り当て)。")
+            return False
         logger.info("_is_feasible_assignment: すべての定員制約を満たしています。割り当ては実行可能です。")
         return True
 
+    def _greedy_assignment_vector(self, student_order: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        学生を student_order の順に処理し、定員に空きがある中で最も希望順位の高いセミナーに割り当てる（貪欲法）。
+        student_order を省略した場合はランダムな順序で処理する。
+        割り当てベクトル (未割り当ては -1) を返す。
+        """
+        problem = self.problem_data
+        if student_order is None:
+            student_order = np.random.permutation(problem.num_students)
+        vector = np.full(problem.num_students, UNASSIGNED, dtype=np.int32)
+        remaining = problem.capacities.tolist()
+        preference_lists = problem.preference_lists
+        for student_idx in student_order.tolist():
+            for seminar_idx in preference_lists[student_idx]:
+                if remaining[seminar_idx] > 0:
+                    vector[student_idx] = seminar_idx
+                    remaining[seminar_idx] -= 1
+                    break
+        return vector
+
+    def _initial_assignment_vector(self) -> Optional[np.ndarray]:
+        """
+        ウォームスタート用の割り当て (initial_assignment) を割り当てベクトルにして返す。
+        与えられていない場合、または定員制約を満たさない場合は None。
+        """
+        if not self.initial_assignment:
+            return None
+        vector = self.problem_data.encode(self.initial_assignment)
+        if not self.problem_data.is_feasible(vector):
+            logger.warning("BaseOptimizer: ウォームスタート用の割り当てが定員制約を満たしていないため、使用しません。")
+            return None
+        return vector
+
     def _get_unassigned_students(self, assignment: Dict[str, str]) -> List[str]:
         """
         割り当てられていない学生のリストを返す。
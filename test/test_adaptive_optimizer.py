@@ -0,0 +1,161 @@
+import unittest
+import sys
+import os
+import threading
+import queue
+from unittest import mock
+
+# プロジェクトのルートディレクトリをsys.pathに追加
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from optimizers import adaptive_optimizer
+from optimizers.adaptive_optimizer import AdaptiveOptimizer
+from optimizers.cp_sat_optimizer import CPSATOptimizer
+from optimizers.genetic_algorithm_optimizer import GeneticAlgorithmOptimizer
+from optimizers.greedy_ls_optimizer import GreedyLSOptimizer
+from optimizers.flow_optimizer import FlowOptimizer
+from optimizers.multilevel_optimizer import MultilevelOptimizer
+from optimizers.tsl_optimizer import TSLOptimizer
+
+
+class TestAdaptiveRace(unittest.TestCase):
+    """
+    AdaptiveOptimizer のポートフォリオ・レース (adaptive_mode = "race") をテストする。
+    """
+    def setUp(self):
+        self.seminars_data = [{"id": f"Sem{s}", "capacity": 3} for s in range(5)]
+        self.students_data = [
+            {"id": f"S{i}", "preferences": [f"Sem{(i * 7 + k) % 5}" for k in range(3)]}
+            for i in range(16)
+        ]
+        self.config = {"random_seed": 1, "greedy_ls_iterations": 2000, "early_stop_no_improvement_limit": 500}
+
+    def test_best_score_callback_reports_improvements(self):
+        optimizer = GreedyLSOptimizer(self.seminars_data, self.students_data, self.config)
+        reported = []
+        optimizer.best_score_callback = reported.append
+        result = optimizer.optimize(cancel_event=threading.Event())
+        self.assertTrue(reported)
+        self.assertEqual(reported, sorted(reported)) # 最良スコアは単調に増える
+        self.assertLessEqual(reported[-1], result.best_score + 1e-9)
+
+    def test_score_streamer_defers_instead_of_dropping(self):
+        score_queue = queue.Queue()
+        streamer = adaptive_optimizer._ScoreStreamer("Greedy_LS", score_queue, interval=60)
+        for score in (1.0, 2.0, 3.0):
+            streamer(score)
+        self.assertEqual(score_queue.get_nowait(), ("Greedy_LS", 1.0))
+        self.assertTrue(score_queue.empty()) # 間隔内の更新は保留される
+        streamer.close()
+        self.assertEqual(score_queue.get_nowait(), ("Greedy_LS", 3.0)) # 保留中の最新の値は終了時に送られる
+
+        timed = adaptive_optimizer._ScoreStreamer("GA_LS", score_queue, interval=0.05)
+        timed(1.0)
+        timed(5.0)
+        self.assertEqual(score_queue.get(timeout=1), ("GA_LS", 1.0))
+        self.assertEqual(score_queue.get(timeout=1), ("GA_LS", 5.0)) # 次の呼び出しがなくてもタイマーで送られる
+        timed.close()
+
+    def test_reaches_target(self):
+        optimizer = AdaptiveOptimizer(self.seminars_data, self.students_data,
+                                      dict(self.config, adaptive_race_target_gap=0.1))
+        self.assertTrue(optimizer._reaches_target("Flow", "OPTIMAL", 1.0, 100.0)) # 厳密解法の最適性の証明
+        self.assertFalse(optimizer._reaches_target("Greedy_LS", "OPTIMAL", 1.0, 100.0))
+        self.assertTrue(optimizer._reaches_target("Greedy_LS", None, 90.0, 100.0))
+        self.assertFalse(optimizer._reaches_target("Greedy_LS", None, 89.0, 100.0))
+
+    def test_score_upper_bound_is_valid_and_tighter_than_trivial_bound(self):
+        optimizer = AdaptiveOptimizer(self.seminars_data, self.students_data, self.config)
+        flow = FlowOptimizer(self.seminars_data, self.students_data, self.config).optimize()
+        trivial = optimizer._score_upper_bound(iterations=0)
+        upper_bound = optimizer._score_upper_bound()
+        self.assertGreaterEqual(upper_bound, flow.best_score - 1e-9)
+        self.assertLessEqual(upper_bound, trivial)
+
+    def test_race_cancels_losers_once_exact_solver_wins(self):
+        config = dict(self.config, adaptive_mode="race", adaptive_race_strategies=["Flow", "GA_LS"],
+                      ga_generations=100000, ga_no_improvement_limit=100000, adaptive_max_total_time=60)
+        optimizer = AdaptiveOptimizer(self.seminars_data, self.students_data, config)
+        result = optimizer.optimize(cancel_event=threading.Event())
+        flow = FlowOptimizer(self.seminars_data, self.students_data, self.config).optimize()
+        self.assertEqual(result.details["winner"], "Flow")
+        self.assertAlmostEqual(result.best_score, flow.best_score)
+        self.assertTrue(optimizer._is_feasible_assignment(result.best_assignment))
+        summaries = {summary["strategy"]: summary for summary in result.details["race"]}
+        self.assertFalse(summaries["Flow"]["cancelled"])
+        self.assertTrue(summaries["GA_LS"]["cancelled"]) # 勝者が決まった時点で打ち切られる
+        self.assertLess(summaries["GA_LS"]["duration"], 30)
+
+
+class TestWarmStart(unittest.TestCase):
+    """
+    共通のウォームスタート (initial_assignment) と、AdaptiveOptimizer での最良解の引き継ぎをテストする。
+    """
+    def setUp(self):
+        # 短い探索だけでは最適解に届かないインスタンス (最適解から始めたときにだけ最適スコアになる)
+        self.seminars_data = [{"id": f"Sem{s}", "capacity": 4} for s in range(10)]
+        self.students_data = [
+            {"id": f"S{i}", "preferences": [f"Sem{(i * i + 3 * k * i + k) % 10}" for k in range(3)]}
+            for i in range(40)
+        ]
+        self.config = {"random_seed": 1, "greedy_ls_iterations": 20, "early_stop_no_improvement_limit": 10,
+                       "local_search_iterations": 10, "multilevel_mode": "cluster", "ga_population_size": 4,
+                       "ga_generations": 2, "tsl_max_iterations": 2, "cp_time_limit": 5, "max_workers": 1}
+        self.optimum = FlowOptimizer(self.seminars_data, self.students_data, self.config).optimize()
+
+    def test_every_strategy_keeps_an_optimal_warm_start(self):
+        for optimizer_class in (GreedyLSOptimizer, GeneticAlgorithmOptimizer, MultilevelOptimizer, TSLOptimizer, CPSATOptimizer):
+            with self.subTest(optimizer=optimizer_class.__name__):
+                optimizer = optimizer_class(self.seminars_data, self.students_data, self.config,
+                                            progress_callback=lambda message: None,
+                                            initial_assignment=self.optimum.best_assignment)
+                result = optimizer.optimize(cancel_event=threading.Event())
+                self.assertAlmostEqual(result.best_score, self.optimum.best_score)
+                self.assertTrue(optimizer._is_feasible_assignment(result.best_assignment))
+
+    def test_infeasible_warm_start_is_ignored(self):
+        overloaded = {student["id"]: "Sem0" for student in self.students_data}
+        optimizer = GreedyLSOptimizer(self.seminars_data, self.students_data, self.config, initial_assignment=overloaded)
+        self.assertIsNone(optimizer._initial_assignment_vector())
+        result = optimizer.optimize(cancel_event=threading.Event())
+        self.assertTrue(optimizer._is_feasible_assignment(result.best_assignment))
+
+    def test_adaptive_passes_incumbent_to_next_strategy(self):
+        received = []
+
+        class RecordingOptimizer(GreedyLSOptimizer):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                received.append(self.initial_assignment)
+
+        with mock.patch.dict(adaptive_optimizer.OPTIMIZER_MAP, {"Greedy_LS": RecordingOptimizer}, clear=True):
+            optimizer = AdaptiveOptimizer(self.seminars_data, self.students_data,
+                                          dict(self.config, adaptive_max_iterations=3))
+            result = optimizer.optimize(cancel_event=threading.Event())
+        self.assertEqual(len(received), 3)
+        self.assertIsNone(received[0])
+        self.assertTrue(received[1]) # 2回目以降はそれまでの最良の割り当てから始める
+        self.assertGreaterEqual(optimizer._calculate_score(result.best_assignment),
+                                optimizer._calculate_score(received[-1]) - 1e-9)
+
+    def test_adaptive_shares_problem_data_with_strategies(self):
+        shared = []
+
+        class RecordingOptimizer(GreedyLSOptimizer):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                shared.append(self.problem_data)
+
+        with mock.patch.dict(adaptive_optimizer.OPTIMIZER_MAP, {"Greedy_LS": RecordingOptimizer}, clear=True):
+            optimizer = AdaptiveOptimizer(self.seminars_data, self.students_data,
+                                          dict(self.config, adaptive_max_iterations=2))
+            optimizer.optimize(cancel_event=threading.Event())
+        self.assertEqual(len(shared), 2)
+        self.assertTrue(all(problem_data is optimizer.problem_data for problem_data in shared)) # 作り直さずに共有する
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,58 @@
+import unittest
+import sys
+import os
+import random
+
+import numpy as np
+
+# プロジェクトのルートディレクトリをsys.pathに追加
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from seminar_optimization.capacity_ledger import CapacityLedger, IndexedPool
+from seminar_optimization.problem_data import UNASSIGNED
+
+
+class TestCapacityLedger(unittest.TestCase):
+    """
+    CapacityLedger (定員台帳) と IndexedPool をテストする。
+    """
+    def test_indexed_pool_add_remove_and_choice(self):
+        """IndexedPool の追加・削除・ランダム選択をテストする。"""
+        pool = IndexedPool([3, 5, 7])
+        pool.add(5) # 重複は無視される
+        pool.remove(3)
+        pool.remove(42) # 存在しない要素の削除は何もしない
+        self.assertEqual(sorted(pool), [5, 7])
+        self.assertIn(7, pool)
+        self.assertNotIn(3, pool)
+        rng = random.Random(0)
+        self.assertIn(pool.choice(rng), (5, 7))
+        self.assertIsNone(IndexedPool().choice(rng))
+
+    def test_ledger_tracks_loads_and_pools(self):
+        """移動に応じて人数・空きセミナー・未割り当て集合が更新されることをテストする。"""
+        vector = np.array([0, 0, 1, UNASSIGNED], dtype=np.int32)
+        ledger = CapacityLedger([2, 1, 1], vector)
+        self.assertEqual([ledger.load(s) for s in range(3)], [2, 1, 0])
+        self.assertEqual(sorted(ledger.open_seminars), [2])
+        self.assertEqual(sorted(ledger.unassigned), [3])
+        self.assertFalse(ledger.has_room(0))
+        self.assertTrue(ledger.has_room(UNASSIGNED))
+
+        ledger.add(3, 2)
+        self.assertEqual(len(ledger.open_seminars), 0)
+        self.assertIsNone(ledger.random_unassigned())
+        ledger.remove(0, 0)
+        self.assertEqual(sorted(ledger.open_seminars), [0])
+        self.assertEqual(sorted(ledger.unassigned), [0])
+        self.assertEqual(sorted(ledger.assigned), [1, 2, 3])
+        ledger.move(1, 0, 2) # 定員超過
+        self.assertEqual(ledger.remaining(2), -1)
+        self.assertEqual(sorted(ledger.open_seminars), [0])
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,87 @@
+import unittest
+import sys
+import os
+import threading
+import numpy as np
+
+# プロジェクトのルートディレクトリをsys.pathに追加
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from seminar_optimization.problem_data import ProblemData
+from seminar_optimization.coarsening import build_hierarchy, project, refine, expand
+from optimizers.multilevel_optimizer import MultilevelOptimizer
+from optimizers.flow_optimizer import FlowOptimizer
+
+
+class TestCoarsening(unittest.TestCase):
+    """
+    多段階最適化 (V サイクル) の粗視化・射影・改善をテストする。
+    """
+    def setUp(self):
+        rng = np.random.default_rng(4)
+        self.seminars_data = [{"id": f"Sem{s}", "capacity": int(c)} for s, c in enumerate(rng.integers(2, 6, size=12))]
+        self.students_data = [
+            {"id": f"S{i}", "preferences": [f"Sem{s}" for s in rng.choice(12, size=3, replace=False, p=np.linspace(2, 1, 12) / 18)]}
+            for i in range(60)
+        ]
+        self.problem = ProblemData.from_lists(self.seminars_data, self.students_data, {})
+
+    def test_hierarchy_levels_nest_and_preserve_students(self):
+        student_nodes, levels = build_hierarchy(self.problem, coarse_size=5)
+        self.assertGreater(len(levels), 1)
+        # 段0のノードの学生は同じ希望リストを持つ
+        for node in range(levels[0].num_nodes):
+            members = np.flatnonzero(student_nodes == node)
+            self.assertEqual(len(members), levels[0].node_counts[node])
+            self.assertEqual(len({tuple(self.problem.preference_matrix[i]) for i in members}), 1)
+        for fine, coarse in zip(levels[:-1], levels[1:]):
+            self.assertLess(coarse.num_nodes, fine.num_nodes)
+            np.testing.assert_array_equal(np.bincount(fine.parents, weights=fine.node_counts), coarse.node_counts)
+        self.assertIsNone(levels[-1].parents)
+
+    def test_projection_and_refinement_keep_capacities(self):
+        student_nodes, levels = build_hierarchy(self.problem, coarse_size=5)
+        # 最も粗い段の人数: 各ノードをそのノード内の順に、定員を守って貪欲に割り当てる
+        coarsest = levels[-1]
+        free = self.problem.capacities.astype(np.int64).copy()
+        remaining = coarsest.node_counts.copy()
+        amounts = np.zeros(len(coarsest.pair_nodes), dtype=np.int64)
+        for k, (node, seminar) in enumerate(zip(coarsest.pair_nodes.tolist(), coarsest.pair_seminars.tolist())):
+            amounts[k] = min(remaining[node], free[seminar])
+            remaining[node] -= amounts[k]
+            free[seminar] -= amounts[k]
+        for k in range(len(levels) - 2, -1, -1):
+            projected = project(levels[k], levels[k + 1], amounts)
+            refined = refine(levels[k], projected, self.problem.capacities)
+            for level_amounts in (projected, refined):
+                self.assertTrue(np.all(level_amounts >= 0))
+                self.assertTrue(np.all(np.bincount(levels[k].pair_nodes, weights=level_amounts, minlength=levels[k].num_nodes) <= levels[k].node_counts))
+                self.assertTrue(np.all(np.bincount(levels[k].pair_seminars, weights=level_amounts, minlength=self.problem.num_seminars) <= self.problem.capacities))
+            # 改善でスコアは下がらない
+            self.assertGreaterEqual(np.dot(levels[k].pair_weights, refined), np.dot(levels[k].pair_weights, projected) - 1e-9)
+            amounts = refined
+        vector = expand(levels[0], amounts, student_nodes)
+        self.assertTrue(self.problem.is_feasible(vector))
+        self.assertAlmostEqual(self.problem.score(vector), float(np.dot(levels[0].pair_weights, amounts)))
+
+    def test_v_cycle_matches_flow_when_not_coarsened(self):
+        config = {"random_seed": 1, "local_search_iterations": 100}
+        flow_result = FlowOptimizer(self.seminars_data, self.students_data, config).optimize(threading.Event())
+        optimizer = MultilevelOptimizer(self.seminars_data, self.students_data, config)
+        result = optimizer.optimize(cancel_event=threading.Event())
+        self.assertEqual(result.details["level_sizes"], [result.details["level_sizes"][0]]) # 粗視化は段0のみ
+        self.assertAlmostEqual(result.details["initial_score"], flow_result.best_score)
+
+        # 粗視化しても実行可能な解を返す
+        optimizer = MultilevelOptimizer(self.seminars_data, self.students_data, dict(config, multilevel_coarse_size=5))
+        result = optimizer.optimize(cancel_event=threading.Event())
+        self.assertGreater(len(result.details["level_sizes"]), 1)
+        self.assertTrue(optimizer._is_feasible_assignment(result.best_assignment))
+        self.assertLessEqual(result.best_score, flow_result.best_score + 1e-9)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,132 @@
+import unittest
+import sys
+import os
+import threading
+import numpy as np
+
+# プロジェクトのルートディレクトリをsys.pathに追加
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from ortools.sat.python import cp_model
+
+from seminar_optimization.problem_data import ProblemData
+from optimizers.cp_model_builder import SparseAssignmentModel, AggregatedAssignmentModel
+from optimizers.cp_sat_optimizer import CPSATOptimizer
+from optimizers.ilp_optimizer import ILPOptimizer
+from optimizers.flow_optimizer import FlowOptimizer
+
+
+class TestSparseAssignmentModel(unittest.TestCase):
+    """
+    SparseAssignmentModel (疎な CP-SAT モデル) をテストする。
+    """
+    def setUp(self):
+        self.seminars_data = [
+            {"id": "SemA", "capacity": 1, "magnification": 1.5},
+            {"id": "SemB", "capacity": 2},
+            {"id": "SemC", "capacity": 1}
+        ]
+        self.students_data = [
+            {"id": "S1", "preferences": ["SemA", "SemB"]},
+            {"id": "S2", "preferences": ["SemA", "SemX"]}, # 存在しないセミナーを含む
+            {"id": "S3", "preferences": ["SemA", "SemB", "SemC"]},
+            {"id": "S4", "preferences": ["SemB"]},
+        ]
+        self.config = {"random_seed": 0, "max_workers": 1}
+
+    def test_variables_only_for_preferred_pairs(self):
+        problem = ProblemData.from_lists(self.seminars_data, self.students_data, self.config)
+        sparse_model = SparseAssignmentModel(problem)
+        self.assertEqual(len(sparse_model.variables), 7)
+        self.assertEqual(set(zip(sparse_model.pair_students.tolist(), sparse_model.pair_seminars.tolist())),
+                         {(0, 0), (0, 1), (1, 0), (2, 0), (2, 1), (2, 2), (3, 1)})
+
+    def test_ilp_and_cp_match_flow_optimum(self):
+        flow_result = FlowOptimizer(self.seminars_data, self.students_data, self.config).optimize()
+        for optimizer_class in (ILPOptimizer, CPSATOptimizer):
+            optimizer = optimizer_class(self.seminars_data, self.students_data, self.config, progress_callback=lambda message: None)
+            result = optimizer.optimize(cancel_event=threading.Event())
+            self.assertEqual(result.status, "OPTIMAL")
+            self.assertAlmostEqual(result.best_score, flow_result.best_score)
+            self.assertTrue(optimizer._is_feasible_assignment(result.best_assignment))
+
+    def test_warm_start_with_fix_and_polish_keeps_optimum(self):
+        """与えられた割り当てをヒントにし、fix-and-polish を使っても最適値が得られることをテストする。"""
+        flow_result = FlowOptimizer(self.seminars_data, self.students_data, self.config).optimize()
+        config = dict(self.config, warm_start_hint=True, fix_and_polish=True, polish_fix_ratio=0.5)
+        initial_assignment = {"S1": "SemB", "S3": "SemA"}
+        optimizer = CPSATOptimizer(self.seminars_data, self.students_data, config,
+                                   progress_callback=lambda message: None, initial_assignment=initial_assignment)
+        result = optimizer.optimize(cancel_event=threading.Event())
+        self.assertEqual(result.status, "OPTIMAL")
+        self.assertAlmostEqual(result.best_score, flow_result.best_score)
+
+    def test_fix_and_polish_selection_follows_rng(self):
+        """fix-and-polish で固定する学生が、渡した乱数生成器のシードで再現されることをテストする。"""
+        problem = ProblemData.from_lists(self.seminars_data, self.students_data, self.config)
+        incumbent = problem.encode({"S1": "SemB", "S4": "SemB"})
+        selections = []
+
+        class RecordingModel(SparseAssignmentModel):
+            def add_fixing(self, vector, students):
+                selections.append(students.tolist())
+                return super().add_fixing(vector, students)
+
+        for seed in (7, 7):
+            RecordingModel(problem).solve(cp_model.CpSolver(), warm_start_vector=incumbent, fix_and_polish=True,
+                               polish_fix_ratio=0.5, rng=np.random.default_rng(seed))
+        self.assertEqual(len(selections[0]), problem.num_students // 2)
+        self.assertEqual(selections[0], selections[1])
+
+    def test_greedy_warm_start_follows_optimizer_seed(self):
+        """貪欲法のウォームスタートが、グローバルな乱数ではなく random_seed から作る学生順を使うことをテストする。"""
+        for optimizer_class in (ILPOptimizer, CPSATOptimizer):
+            vectors = []
+            for _ in range(2):
+                optimizer = optimizer_class(self.seminars_data, self.students_data, self.config, progress_callback=lambda message: None)
+                np.random.seed(0)
+                global_state = np.random.get_state()[1].copy()
+                vectors.append(optimizer._warm_start_vector())
+                np.testing.assert_array_equal(np.random.get_state()[1], global_state) # グローバルな乱数には触れない
+            np.testing.assert_array_equal(vectors[0], vectors[1])
+
+    def test_solve_falls_back_to_incumbent(self):
+        """ソルバーが解を見つけられない場合に暫定解を返すことをテストする。"""
+        problem = ProblemData.from_lists(self.seminars_data, self.students_data, self.config)
+        sparse_model = SparseAssignmentModel(problem)
+        # 矛盾する制約を追加し、ソルバーが解を見つけられないようにする
+        sparse_model.model.Add(sparse_model.variables[0] == 1)
+        sparse_model.model.Add(sparse_model.variables[0] == 0)
+        incumbent = problem.encode({"S1": "SemB", "S4": "SemB"})
+        status, vector = sparse_model.solve(cp_model.CpSolver(), warm_start_vector=incumbent)
+        self.assertEqual(status, cp_model.FEASIBLE)
+        self.assertEqual(problem.decode(vector), {"S1": "SemB", "S4": "SemB"})
+
+    def test_aggregated_model_matches_flow_optimum(self):
+        """希望リストが同一の学生を集約したモデルが、集約前と同じ最適値を返すことをテストする。"""
+        students_data = self.students_data + [
+            {"id": "S5", "preferences": ["SemA", "SemB"]},
+            {"id": "S6", "preferences": ["SemA", "SemB"]},
+            {"id": "S7", "preferences": ["SemB"]},
+        ]
+        problem = ProblemData.from_lists(self.seminars_data, students_data, self.config)
+        aggregated_model = AggregatedAssignmentModel(problem)
+        self.assertEqual(len(aggregated_model.profile_counts), 4)
+        self.assertEqual(len(aggregated_model.variables), 7)
+
+        flow_result = FlowOptimizer(self.seminars_data, students_data, self.config).optimize()
+        for extra in ({}, {"warm_start_hint": True, "fix_and_polish": True}):
+            config = dict(self.config, aggregate_profiles=True, **extra)
+            optimizer = CPSATOptimizer(self.seminars_data, students_data, config, progress_callback=lambda message: None)
+            result = optimizer.optimize(cancel_event=threading.Event())
+            self.assertEqual(result.status, "OPTIMAL")
+            self.assertAlmostEqual(result.best_score, flow_result.best_score)
+            self.assertAlmostEqual(optimizer._calculate_score(result.best_assignment), flow_result.best_score)
+            self.assertTrue(optimizer._is_feasible_assignment(result.best_assignment))
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,125 @@
+import unittest
+import sys
+import os
+import threading
+import numpy as np
+
+# プロジェクトのルートディレクトリをsys.pathに追加
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from seminar_optimization.problem_data import ProblemData
+from seminar_optimization.decomposition import find_components, group_components, build_subproblem, merge_results, cluster_demand, split_capacities
+from optimizers.flow_optimizer import FlowOptimizer
+from optimizers.optimizer_service import OptimizerService
+
+
+class TestDecomposition(unittest.TestCase):
+    """
+    希望グラフの連結成分分解と、部分問題の結果の統合をテストする。
+    """
+    def setUp(self):
+        # 学部 A (SemA1, SemA2) と学部 B (SemB1) の希望が互いに閉じている
+        self.seminars_data = [
+            {"id": "SemA1", "capacity": 1},
+            {"id": "SemB1", "capacity": 1},
+            {"id": "SemA2", "capacity": 2},
+            {"id": "SemZ", "capacity": 1}, # 誰にも希望されていない
+        ]
+        self.students_data = [
+            {"id": "S1", "preferences": ["SemA1", "SemA2"]},
+            {"id": "S2", "preferences": ["SemB1"]},
+            {"id": "S3", "preferences": ["SemA1"]},
+            {"id": "S4", "preferences": ["SemB1"]},
+            {"id": "S5", "preferences": []}, # 希望なし
+        ]
+        self.config = {"random_seed": 0}
+
+    def test_find_components(self):
+        problem = ProblemData.from_lists(self.seminars_data, self.students_data, self.config)
+        components = find_components(problem)
+        self.assertEqual([(c[0].tolist(), c[1].tolist()) for c in components],
+                         [([0, 2], [0, 2]), ([1, 3], [1])])
+        grouped = group_components(components, 1)
+        self.assertEqual([(g[0].tolist(), g[1].tolist()) for g in grouped], [([0, 1, 2, 3], [0, 1, 2])])
+
+    def test_merged_result_matches_full_solve(self):
+        problem = ProblemData.from_lists(self.seminars_data, self.students_data, self.config)
+        results = []
+        for component in find_components(problem):
+            sub_seminars, sub_students = build_subproblem(self.seminars_data, self.students_data, component)
+            results.append(FlowOptimizer(sub_seminars, sub_students, self.config).optimize())
+        merged = merge_results(results, self.seminars_data, self.students_data, "Flow")
+        full = FlowOptimizer(self.seminars_data, self.students_data, self.config).optimize()
+        self.assertEqual(merged.status, "OPTIMAL")
+        self.assertAlmostEqual(merged.best_score, full.best_score)
+        self.assertEqual(len(merged.best_assignment), len(full.best_assignment))
+        self.assertIn("S5", merged.unassigned_students)
+        self.assertEqual(merged.seminar_capacities, full.seminar_capacities)
+
+    def test_time_limited_components_are_merged_as_feasible(self):
+        problem = ProblemData.from_lists(self.seminars_data, self.students_data, self.config)
+        results = []
+        for component in find_components(problem):
+            sub_seminars, sub_students = build_subproblem(self.seminars_data, self.students_data, component)
+            results.append(FlowOptimizer(sub_seminars, sub_students, self.config).optimize())
+        # Adaptive は時間切れでも有効な割り当てを TIME_LIMIT_EXCEEDED で返す
+        results[0].status = "TIME_LIMIT_EXCEEDED"
+        merged = merge_results(results, self.seminars_data, self.students_data, "Adaptive")
+        self.assertEqual(merged.status, "FEASIBLE")
+        self.assertAlmostEqual(merged.best_score, results[0].best_score + results[1].best_score)
+        self.assertEqual(len(merged.best_assignment), len(results[0].best_assignment) + len(results[1].best_assignment))
+
+        # 割り当てのない時間切れは成功として扱わない
+        results[0].best_assignment = {}
+        results[0].best_score = -float('inf')
+        merged = merge_results(results, self.seminars_data, self.students_data, "Adaptive")
+        self.assertEqual(merged.status, "TIME_LIMIT_EXCEEDED")
+        self.assertEqual(merged.best_score, -float('inf'))
+
+    def test_merged_result_keeps_component_details(self):
+        problem = ProblemData.from_lists(self.seminars_data, self.students_data, self.config)
+        results = []
+        for component in find_components(problem):
+            sub_seminars, sub_students = build_subproblem(self.seminars_data, self.students_data, component)
+            results.append(FlowOptimizer(sub_seminars, sub_students, self.config).optimize())
+        results[0].details = {"chains": [{"chain": 0, "score": 1.0}], "fitness_cache": {"hits": 3}}
+        results[1].details = {"chains": [{"chain": 0, "score": 2.0}, {"chain": 1, "score": 1.5}]}
+        merged = merge_results(results, self.seminars_data, self.students_data, "Greedy_LS")
+        self.assertEqual([(c["component"], c["chain"]) for c in merged.details["chains"]], [(0, 0), (1, 0), (1, 1)])
+        self.assertEqual(merged.details["fitness_cache"], {"hits": 3})
+        self.assertEqual([c["details"] for c in merged.details["components"]], [results[0].details, results[1].details])
+
+    def test_service_solves_components_in_parallel(self):
+        config = dict(self.config, max_workers=2, decompose_min_students=0)
+        service = OptimizerService()
+        subproblems = service._find_subproblems(self.seminars_data, self.students_data, config)
+        self.assertEqual(len(subproblems), 2)
+        # 小さな問題はプロセスを起動せずに全体を解く
+        self.assertEqual(service._find_subproblems(self.seminars_data, self.students_data,
+                                                   dict(config, decompose_min_students=6)), [])
+        self.assertEqual(service._find_subproblems(self.seminars_data, self.students_data, self.config), [])
+        result = service._optimize_decomposed("Flow", subproblems, self.seminars_data, self.students_data,
+                                              config, cancel_event=threading.Event())
+        full = FlowOptimizer(self.seminars_data, self.students_data, self.config).optimize()
+        self.assertEqual(result.status, "OPTIMAL")
+        self.assertAlmostEqual(result.best_score, full.best_score)
+        self.assertEqual(service._find_subproblems(self.seminars_data, self.students_data,
+                                                   dict(config, decompose_components=False)), [])
+
+    def test_capacities_split_in_proportion_to_cluster_demand(self):
+        problem = ProblemData.from_lists(self.seminars_data, self.students_data, self.config)
+        labels = np.array([0, 1, 1, 0, 1])
+        demand = cluster_demand(problem, labels, 2)
+        self.assertEqual(demand.tolist(), [[1, 1, 1, 0], [1, 1, 0, 0]])
+        quotas = split_capacities(problem.capacities, demand)
+        # 端数は剰余の大きい順 (同点はクラスタ番号順) に配る。誰も希望しない SemZ は配らない
+        self.assertEqual(quotas.tolist(), [[1, 1, 2, 0], [0, 0, 0, 0]])
+        quotas = split_capacities(np.array([5, 3]), np.array([[1, 0], [2, 1], [2, 0]]))
+        self.assertEqual(quotas.tolist(), [[1, 0], [2, 3], [2, 0]])
+        self.assertEqual(quotas.sum(axis=0).tolist(), [5, 3])
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,88 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# プロジェクトのルートディレクトリをsys.pathに追加
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from seminar_optimization.problem_data import ProblemData, UNASSIGNED
+from seminar_optimization.delta_evaluator import DeltaEvaluator
+
+
+class TestDeltaEvaluator(unittest.TestCase):
+    """
+    DeltaEvaluator (差分スコア評価器) が全体再計算と一致することをテストする。
+    """
+    def setUp(self):
+        seminars_data = [
+            {"id": "SemA", "capacity": 1, "magnification": 1.5},
+            {"id": "SemB", "capacity": 2},
+            {"id": "SemC", "capacity": 1}
+        ]
+        students_data = [
+            {"id": "S1", "preferences": ["SemA", "SemB"]},
+            {"id": "S2", "preferences": ["SemB", "SemC"]},
+            {"id": "S3", "preferences": ["SemC", "SemA", "SemB"]},
+            {"id": "S4", "preferences": ["SemA"]},
+        ]
+        self.problem = ProblemData.from_lists(seminars_data, students_data, {})
+        self.evaluator = DeltaEvaluator(self.problem, np.array([0, 1, 2, UNASSIGNED], dtype=np.int32))
+
+    def assert_state_consistent(self):
+        vector = self.evaluator.vector()
+        loads = self.problem.seminar_loads(vector)
+        self.assertAlmostEqual(self.evaluator.score, self.problem.score(vector))
+        self.assertEqual(self.evaluator.overload, int(np.maximum(loads - self.problem.capacities, 0).sum()))
+        self.assertEqual(self.evaluator.unassigned_count, int(np.count_nonzero(vector < 0)))
+        for seminar_idx in range(self.problem.num_seminars):
+            self.assertEqual(self.evaluator.load(seminar_idx), loads[seminar_idx])
+
+    def test_delta_move_matches_full_rescore(self):
+        """移動の差分とその適用結果が全体再計算と一致することをテストする。"""
+        before = self.evaluator.score
+        delta = self.evaluator.delta_move(2, 1)
+        self.assertTrue(self.evaluator.has_room(1))
+        self.evaluator.apply_move(2, 1, delta)
+        self.assertAlmostEqual(self.evaluator.score, before + delta)
+        self.assert_state_consistent()
+
+        self.evaluator.apply_move(0, UNASSIGNED)
+        self.assert_state_consistent()
+        self.assertEqual(sorted(self.evaluator.unassigned_students()), [0, 3])
+
+    def test_overload_tracking_and_move_effect(self):
+        """定員超過の発生・解消が move_effect と apply_move で追跡されることをテストする。"""
+        self.assertFalse(self.evaluator.has_room(0))
+        score_delta, overload_delta, unassigned_delta = self.evaluator.move_effect(3, 0)
+        self.assertEqual((overload_delta, unassigned_delta), (1, -1))
+        self.evaluator.apply_move(3, 0)
+        self.assertAlmostEqual(self.evaluator.delta_move(3, 0), 0.0)
+        self.assertFalse(self.evaluator.is_feasible())
+        self.assert_state_consistent()
+
+        self.evaluator.apply_move(0, 1)
+        self.assertTrue(self.evaluator.is_feasible())
+        self.assert_state_consistent()
+
+    def test_delta_swap_matches_full_rescore(self):
+        """交換の差分とその適用結果が全体再計算と一致することをテストする。"""
+        before = self.evaluator.score
+        delta = self.evaluator.delta_swap(0, 2)
+        self.evaluator.apply_swap(0, 2, delta)
+        self.assertAlmostEqual(self.evaluator.score, before + delta)
+        self.assertEqual(self.evaluator.seminar_of(0), 2)
+        self.assert_state_consistent()
+
+        # 未割り当ての学生との交換では、台帳の未割り当て学生の集合も入れ替わる
+        self.evaluator.apply_swap(3, 0)
+        self.assertEqual(self.evaluator.unassigned_students(), [0])
+        self.assert_state_consistent()
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,74 @@
+import unittest
+import sys
+import os
+import numpy as np
+
+# プロジェクトのルートディレクトリをsys.pathに追加
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from seminar_optimization.problem_data import ProblemData
+from seminar_optimization.delta_evaluator import DeltaEvaluator
+from seminar_optimization.fitness_cache import FitnessCache
+
+
+class TestFitnessCache(unittest.TestCase):
+    """
+    Zobrist ハッシュと LRU 適応度キャッシュをテストする。
+    """
+    def setUp(self):
+        seminars_data = [{"id": "SemA", "capacity": 1}, {"id": "SemB", "capacity": 2}, {"id": "SemC", "capacity": 1}]
+        students_data = [
+            {"id": "S1", "preferences": ["SemA", "SemB"]},
+            {"id": "S2", "preferences": ["SemB", "SemC"]},
+            {"id": "S3", "preferences": ["SemC", "SemA"]},
+            {"id": "S4", "preferences": ["SemB"]},
+        ]
+        self.problem = ProblemData.from_lists(seminars_data, students_data, {})
+
+    def test_incremental_hash_matches_full_hash(self):
+        cache = FitnessCache(self.problem)
+        evaluator = DeltaEvaluator(self.problem, np.array([0, 1, -1, 1], dtype=np.int32), cache.hasher)
+        evaluator.apply_move(2, 2)
+        evaluator.apply_swap(0, 1)
+        evaluator.apply_move(3, -1)
+        self.assertEqual(evaluator.hash, cache.hasher.hash_vector(evaluator.vector()))
+        self.assertNotEqual(evaluator.hash, cache.hasher.hash_vector(np.array([0, 1, -1, 1], dtype=np.int32)))
+
+    def test_matrix_update_matches_full_hash(self):
+        hasher = FitnessCache(self.problem).hasher
+        before = np.array([[0, 1, -1, 1], [1, 1, 2, 1], [2, 2, 2, 2]], dtype=np.int32)
+        after = before.copy()
+        after[0, 2] = 2
+        after[0, 3] = -1
+        after[2, 0] = 0
+        hashes = hasher.hash_matrix(before)
+        updated = hasher.update_matrix(hashes, before, after)
+        np.testing.assert_array_equal(updated, hasher.hash_matrix(after))
+        np.testing.assert_array_equal(hashes, hasher.hash_matrix(before)) # 元のハッシュ値は書き換えない
+        self.assertEqual(int(updated[0]), hasher.update(hasher.update(int(hashes[0]), 2, -1, 2), 3, 1, -1))
+
+    def test_cache_hits_and_lru_eviction(self):
+        cache = FitnessCache(self.problem, max_size=2)
+        matrix = np.array([[0, 1, 2, 1], [0, 1, 2, 1], [1, 1, 1, -1]], dtype=np.int32)
+        scores, overloads, unassigned_counts = cache.evaluate_batch(matrix)
+        evaluation = self.problem.evaluate_batch(matrix)
+        np.testing.assert_allclose(scores, evaluation.scores)
+        np.testing.assert_array_equal(overloads, evaluation.total_overloads)
+        np.testing.assert_array_equal(unassigned_counts, evaluation.unassigned_counts)
+        # 同じ行列内の重複はヒットとして数え、一度しか評価しない
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (1, 2, 2))
+
+        self.assertEqual(cache.evaluate(matrix[0]), (scores[0], overloads[0], unassigned_counts[0]))
+        self.assertEqual(cache.hits, 2)
+        # 新しい割り当てを追加すると、最も長く参照されていない [1, 1, 1, -1] が破棄される
+        cache.evaluate(np.array([-1, -1, -1, -1], dtype=np.int32))
+        cache.evaluate(matrix[2])
+        self.assertEqual(cache.misses, 4)
+        self.assertAlmostEqual(cache.hit_rate, 2 / 6)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
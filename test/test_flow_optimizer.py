@@ -0,0 +1,52 @@
+import unittest
+import sys
+import os
+import itertools
+
+# プロジェクトのルートディレクトリをsys.pathに追加
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from optimizers.flow_optimizer import FlowOptimizer
+
+
+class TestFlowOptimizer(unittest.TestCase):
+    """
+    FlowOptimizer (最小費用流) が全探索と同じ最適スコアを返すことをテストする。
+    """
+    def setUp(self):
+        self.seminars_data = [
+            {"id": "SemA", "capacity": 1, "magnification": 1.5},
+            {"id": "SemB", "capacity": 2},
+            {"id": "SemC", "capacity": 1, "magnification": 0.7}
+        ]
+        self.students_data = [
+            {"id": "S1", "preferences": ["SemA", "SemB"]},
+            {"id": "S2", "preferences": ["SemA", "SemC"]},
+            {"id": "S3", "preferences": ["SemA", "SemB", "SemC"]},
+            {"id": "S4", "preferences": ["SemB"]},
+            {"id": "S5", "preferences": ["SemB", "SemA"]},
+        ]
+        self.config = {"random_seed": 0}
+
+    def test_matches_brute_force_optimum(self):
+        optimizer = FlowOptimizer(self.seminars_data, self.students_data, self.config)
+        result = optimizer.optimize()
+        self.assertEqual(result.status, "OPTIMAL")
+        self.assertTrue(optimizer._is_feasible_assignment(result.best_assignment))
+        self.assertAlmostEqual(result.best_score, optimizer._calculate_score(result.best_assignment))
+
+        # 各学生について「未割り当て」またはいずれかのセミナーを選ぶ全組み合わせを調べる
+        choices = [None, "SemA", "SemB", "SemC"]
+        best_score = -float('inf')
+        for combination in itertools.product(choices, repeat=len(self.students_data)):
+            assignment = {s["id"]: c for s, c in zip(self.students_data, combination) if c is not None}
+            if optimizer._is_feasible_assignment(assignment):
+                best_score = max(best_score, optimizer._calculate_score(assignment))
+        self.assertAlmostEqual(result.best_score, best_score)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
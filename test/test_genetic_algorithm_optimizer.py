@@ -0,0 +1,155 @@
+import unittest
+import sys
+import os
+import threading
+import random
+from unittest import mock
+import numpy as np
+
+# プロジェクトのルートディレクトリをsys.pathに追加
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from optimizers.genetic_algorithm_optimizer import GeneticAlgorithmOptimizer
+
+
+class TestVectorizedGA(unittest.TestCase):
+    """
+    GeneticAlgorithmOptimizer のベクトル化エンジン (P×N 行列の個体群) をテストする。
+    """
+    def setUp(self):
+        self.seminars_data = [{"id": f"Sem{s}", "capacity": 4} for s in range(5)]
+        self.students_data = [
+            {"id": f"S{i}", "preferences": [f"Sem{(i + k) % 5}" for k in range(i % 3 + 1)]}
+            for i in range(20)
+        ]
+        self.config = {"random_seed": 3, "ga_population_size": 12, "ga_generations": 20,
+                       "ga_mutation_rate": 0.2, "local_search_iterations": 10}
+
+    def test_crossover_only_exchanges_parent_genes(self):
+        for method in ("uniform", "one_point"):
+            optimizer = GeneticAlgorithmOptimizer(self.seminars_data, self.students_data,
+                                                  dict(self.config, ga_crossover=method, ga_crossover_rate=1.0))
+            parents1 = np.zeros((6, 20), dtype=np.int32)
+            parents2 = np.ones((6, 20), dtype=np.int32)
+            child1, child2 = optimizer._crossover_matrix(parents1, parents2)
+            # 各遺伝子はどちらかの親から来ており、2つの子は互いに補完的になる
+            np.testing.assert_array_equal(child1 + child2, np.ones((6, 20), dtype=np.int32))
+            if method == "one_point":
+                self.assertTrue(np.all(np.diff(child1, axis=1) >= 0))
+
+    def test_mutation_uses_preferences_or_unassigned(self):
+        optimizer = GeneticAlgorithmOptimizer(self.seminars_data, self.students_data, dict(self.config, ga_mutation_rate=1.0))
+        population = optimizer._mutate_matrix(optimizer._initial_population_matrix())
+        preference_matrix = optimizer.problem_data.preference_matrix
+        for row in population:
+            for student_idx, seminar_idx in enumerate(row.tolist()):
+                self.assertTrue(seminar_idx == -1 or seminar_idx in preference_matrix[student_idx])
+
+    def test_selection_methods_return_valid_indices(self):
+        fitnesses = np.array([-5.0, 0.0, 10.0, 3.0])
+        for method in ("tournament", "sus"):
+            optimizer = GeneticAlgorithmOptimizer(self.seminars_data, self.students_data, dict(self.config, ga_selection=method))
+            selected = optimizer._select_indices(fitnesses, 100)
+            self.assertEqual(selected.shape, (100,))
+            self.assertTrue(np.all((selected >= 0) & (selected < 4)))
+            # 最も適応度の高い個体が最も多く選ばれる
+            self.assertEqual(int(np.argmax(np.bincount(selected, minlength=4))), 2)
+
+    def test_repair_removes_overloads(self):
+        seminars_data = [{"id": "SemA", "capacity": 1}, {"id": "SemB", "capacity": 1}, {"id": "SemC", "capacity": 2}]
+        students_data = [
+            {"id": "S1", "preferences": ["SemA", "SemB"]},
+            {"id": "S2", "preferences": ["SemB", "SemA"]}, # SemA は2番目の希望 (重みが低い)
+            {"id": "S3", "preferences": ["SemC"]},
+            {"id": "S4", "preferences": ["SemA"]},
+        ]
+        optimizer = GeneticAlgorithmOptimizer(seminars_data, students_data, self.config)
+        # SemA に3人が割り当てられ、定員を2人超過している
+        population = np.array([[0, 0, 2, 0], [0, 1, 2, -1]], dtype=np.int32)
+        repaired = optimizer._repair_matrix(population.copy())
+        evaluation = optimizer.problem_data.evaluate_batch(repaired)
+        self.assertTrue(np.all(evaluation.feasible))
+        # 重みの低い S2 は SemA から追い出され、空きのある第1希望 SemB に入れ直される
+        self.assertEqual(repaired[0, 1], 1)
+        self.assertEqual(int(np.count_nonzero(repaired[0] == 0)), 1)
+        self.assertIn(repaired[0, 3], (0, -1))
+        # 実行可能な個体は変更されない
+        np.testing.assert_array_equal(repaired[1], population[1])
+
+    def test_next_generation_keeps_row_hashes_in_sync(self):
+        optimizer = GeneticAlgorithmOptimizer(self.seminars_data, self.students_data,
+                                              dict(self.config, ga_crossover_rate=1.0, ga_mutation_rate=0.3))
+        hasher = optimizer.fitness_cache.hasher
+        population = optimizer._initial_population_matrix()
+        keys = hasher.hash_matrix(population)
+        for _ in range(5):
+            fitnesses = optimizer._evaluate_matrix(population, keys)
+            elite = population[int(np.argmax(fitnesses))].copy()
+            population, keys = optimizer._next_generation(population, fitnesses, elite, keys, hasher.hash_vector(elite))
+            # 差分更新したハッシュ値は、行列全体から計算し直した値と一致する
+            np.testing.assert_array_equal(keys, hasher.hash_matrix(population))
+
+    def test_vectorized_engine_returns_feasible_assignment(self):
+        optimizer = GeneticAlgorithmOptimizer(self.seminars_data, self.students_data, self.config)
+        result = optimizer.optimize(cancel_event=threading.Event())
+        self.assertEqual(result.status, "OPTIMAL")
+        self.assertTrue(optimizer._is_feasible_assignment(result.best_assignment))
+        self.assertAlmostEqual(result.best_score, optimizer._calculate_score(result.best_assignment))
+
+
+    def test_local_search_uses_optimizer_rng(self):
+        start = np.full(20, -1, dtype=np.int32)
+        start[:15] = np.arange(15) % 5
+        vectors = []
+        for _ in range(2):
+            optimizer = GeneticAlgorithmOptimizer(self.seminars_data, self.students_data, self.config)
+            random.seed(0)
+            global_state = random.getstate()
+            vectors.append(optimizer._local_search_vector(start.copy(), iterations=30)[0])
+            self.assertEqual(random.getstate(), global_state) # グローバルな乱数には触れない
+        np.testing.assert_array_equal(vectors[0], vectors[1])
+
+    def test_island_model_migrates_and_is_reproducible(self):
+        config = dict(self.config, ga_islands=3, ga_migration_interval=2, ga_migration_size=2,
+                      ga_generations=10, ga_no_improvement_limit=100)
+        results = []
+        for _ in range(2):
+            optimizer = GeneticAlgorithmOptimizer(self.seminars_data, self.students_data, config)
+            results.append(optimizer.optimize(cancel_event=threading.Event()))
+            self.assertTrue(optimizer._is_feasible_assignment(results[-1].best_assignment))
+
+        islands = results[0].details["islands"]
+        self.assertEqual(len(islands), 3)
+        self.assertTrue(all(island["immigrants_received"] > 0 for island in islands))
+        self.assertEqual(results[0].best_score, max(island["score"] for island in islands))
+        self.assertEqual(results[0].best_assignment, results[1].best_assignment)
+
+    def test_island_model_finishes_when_an_island_fails_to_start(self):
+        config = dict(self.config, ga_islands=3, ga_migration_interval=2, ga_generations=10, ga_no_improvement_limit=100)
+        optimizer = GeneticAlgorithmOptimizer(self.seminars_data, self.students_data, config)
+        seed_sequence = np.random.SeedSequence(optimizer.random_seed)
+        failing_seed = int(seed_sequence.spawn(3)[1].generate_state(1)[0])
+        original_init = GeneticAlgorithmOptimizer.__init__
+
+        def failing_init(self, seminars, students, config, *args, **kwargs):
+            if config.get("random_seed") == failing_seed:
+                raise RuntimeError("島の構築に失敗")
+            original_init(self, seminars, students, config, *args, **kwargs)
+
+        # 島は fork したプロセスで構築されるため、差し替えた __init__ が子プロセスでも使われる
+        with mock.patch.object(GeneticAlgorithmOptimizer, "__init__", failing_init):
+            result = optimizer.optimize(cancel_event=threading.Event())
+        islands = {island["island"]: island for island in result.details["islands"]}
+        self.assertEqual(len(islands), 3)
+        self.assertIn("RuntimeError", islands[1]["error"])
+        self.assertEqual(islands[1]["generations"], 0)
+        self.assertNotIn("error", islands[0])
+        self.assertTrue(optimizer._is_feasible_assignment(result.best_assignment))
+        self.assertNotEqual(result.details["best_island"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
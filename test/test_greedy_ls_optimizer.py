@@ -0,0 +1,66 @@
+import unittest
+import sys
+import os
+import threading
+
+# プロジェクトのルートディレクトリをsys.pathに追加
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from seminar_optimization.cost_model import TimeBudget
+from optimizers.greedy_ls_optimizer import GreedyLSOptimizer
+
+
+class TestGreedyLSMultiStart(unittest.TestCase):
+    """
+    GreedyLSOptimizer のマルチスタート (プロセスプール) をテストする。
+    """
+    def setUp(self):
+        self.seminars_data = [{"id": f"Sem{s}", "capacity": 3} for s in range(5)]
+        self.students_data = [
+            {"id": f"S{i}", "preferences": [f"Sem{(i + k) % 5}" for k in range(3)]}
+            for i in range(20)
+        ]
+        self.config = {"random_seed": 7, "max_workers": 3, "greedy_ls_multi_start": True,
+                       "greedy_ls_iterations": 500, "early_stop_no_improvement_limit": 100}
+
+    def test_multi_start_is_reproducible(self):
+        results = []
+        for _ in range(2):
+            optimizer = GreedyLSOptimizer(self.seminars_data, self.students_data, self.config)
+            results.append(optimizer.optimize(cancel_event=threading.Event()))
+            self.assertTrue(optimizer._is_feasible_assignment(results[-1].best_assignment))
+
+        first, second = results
+        chains = first.details["chains"]
+        self.assertEqual(len(chains), 3)
+        self.assertEqual(len({c["seed"] for c in chains}), 3) # チェーンごとに異なるシード
+        self.assertEqual(first.best_score, max(c["score"] for c in chains))
+        self.assertEqual([c["seed"] for c in chains], [c["seed"] for c in second.details["chains"]])
+        self.assertEqual([c["score"] for c in chains], [c["score"] for c in second.details["chains"]])
+        self.assertEqual(first.best_assignment, second.best_assignment)
+
+    def test_multi_start_under_time_budget_keeps_best_chain(self):
+        seminars_data = [{"id": f"Sem{s}", "capacity": 10} for s in range(30)]
+        students_data = [
+            {"id": f"S{i}", "preferences": [f"Sem{(i * i + 7 * k) % 30}" for k in range(3)]}
+            for i in range(300)
+        ]
+        config = dict(self.config, max_workers=4, greedy_ls_iterations=10**9, early_stop_no_improvement_limit=10**9)
+        optimizer = GreedyLSOptimizer(seminars_data, students_data, config)
+        budget = TimeBudget(1.0, threading.Event())
+        result = budget.finish(optimizer.optimize(cancel_event=budget), optimizer.problem_data)
+        chains = result.details["chains"]
+        self.assertEqual(len(chains), 4)
+        # 予算切れで打ち切られたチェーンも、途中までの最良解のスコアで比べる
+        self.assertTrue(all(c["status"] == "CANCELLED" and c["score"] > -float('inf') for c in chains))
+        self.assertEqual(result.status, "FEASIBLE")
+        self.assertAlmostEqual(result.best_score, max(c["score"] for c in chains))
+        self.assertEqual(result.details["best_chain"], max(chains, key=lambda c: c["score"])["chain"])
+        self.assertTrue(optimizer._is_feasible_assignment(result.best_assignment))
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
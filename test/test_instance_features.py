@@ -0,0 +1,95 @@
+import unittest
+import sys
+import os
+import math
+import threading
+import time
+
+# プロジェクトのルートディレクトリをsys.pathに追加
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from seminar_optimization.problem_data import ProblemData
+from seminar_optimization.instance_features import FEATURE_NAMES, extract_features, feature_vector
+from seminar_optimization.cost_model import StrategyCostModel, TimeBudget, budgeted_config
+from optimizers.greedy_ls_optimizer import GreedyLSOptimizer
+
+
+class TestInstanceFeatures(unittest.TestCase):
+    """
+    インスタンスの特徴量と、それを使う実行時間・スコアの予測モデルをテストする。
+    """
+    def setUp(self):
+        self.seminars_data = [{"id": "Sem0", "capacity": 1}, {"id": "Sem1", "capacity": 4}, {"id": "Sem2", "capacity": 3}]
+        self.students_data = [
+            {"id": f"S{i}", "preferences": ["Sem0", "Sem1"] if i < 4 else ["Sem1", "Sem2"]}
+            for i in range(8)
+        ]
+        self.config = {"score_weights": {"1st_choice": 3.0, "2nd_choice": 2.0, "3rd_choice": 1.0, "other_preference": 0.5}}
+
+    def test_extract_features(self):
+        features = extract_features(ProblemData.from_lists(self.seminars_data, self.students_data, self.config))
+        self.assertEqual(set(features), set(FEATURE_NAMES))
+        self.assertEqual(features["num_students"], 8)
+        self.assertEqual(features["capacity_ratio"], 1.0)
+        self.assertEqual(features["mean_preferences"], 2.0)
+        self.assertEqual(features["max_demand_ratio"], 4.0) # Sem0: 4人 / 定員1
+        self.assertEqual(features["first_choice_contention"], 0.5) # Sem0 を第1希望とする4人
+        self.assertEqual(features["max_first_choice_ratio"], 4.0)
+        self.assertEqual(features["duplicate_profiles"], 6) # 希望リストは2種類
+        self.assertAlmostEqual(features["profile_entropy"], math.log(2) / math.log(8))
+        self.assertEqual(features["max_score"], 24.0)
+        self.assertEqual(feature_vector(features).shape, (len(FEATURE_NAMES),))
+
+    def test_cost_model_plans_fast_strategy_with_enough_quality(self):
+        rows = []
+        for size in (100, 200, 400, 800, 1600, 3200):
+            features = {"num_students": size, "num_seminars": size / 20, "capacity_ratio": 1.1, "max_score": 3.0 * size}
+            rows.append({"strategy": "Flow", "features": features, "score": 2.5 * size, "duration": size / 1000})
+            rows.append({"strategy": "CP", "features": features, "score": 2.5 * size, "duration": size / 10})
+            rows.append({"strategy": "Greedy_LS", "features": features, "score": 2.0 * size, "duration": size / 2000})
+        model = StrategyCostModel.from_rows(rows, min_samples=5, random_state=0)
+        self.assertEqual(model.strategies, ["CP", "Flow", "Greedy_LS"])
+
+        features = {"num_students": 1000, "num_seminars": 50, "capacity_ratio": 1.1, "max_score": 3000.0}
+        strategy, budget, predictions = model.plan(features, max_time=60)
+        self.assertEqual(strategy, "Flow") # CP と同じスコアが見込め、より速い
+        self.assertGreaterEqual(budget, 1.0)
+        self.assertLess(predictions["Greedy_LS"][1], predictions["Flow"][1])
+        # 候補を絞ると、その中から選ぶ。時間内に終わる見込みがなければ速い戦略を選ぶ
+        self.assertEqual(model.plan(features, max_time=1000, candidates=["Greedy_LS", "CP"])[0], "CP")
+        self.assertEqual(model.plan(features, max_time=5, candidates=["Greedy_LS", "CP"])[0], "Greedy_LS")
+        self.assertIsNone(StrategyCostModel.from_rows(rows[:3]))
+
+        limited = budgeted_config({"cp_time_limit": 300}, 12.5)
+        self.assertEqual((limited["cp_time_limit"], limited["ilp_time_limit"]), (12, 12))
+        self.assertNotIn("tsl_time_limit", limited)
+
+    def test_time_budget_stops_strategy_without_time_limit(self):
+        seminars_data = [{"id": f"Sem{s}", "capacity": 5} for s in range(10)]
+        students_data = [{"id": f"S{i}", "preferences": [f"Sem{(i * 3 + k) % 10}" for k in range(3)]} for i in range(60)]
+        config = {"random_seed": 0, "greedy_ls_iterations": 10**9, "early_stop_no_improvement_limit": 10**9}
+        optimizer = GreedyLSOptimizer(seminars_data, students_data, config)
+        budget = TimeBudget(0.5, threading.Event())
+        start = time.monotonic()
+        result = budget.finish(optimizer.optimize(cancel_event=budget), optimizer.problem_data)
+        self.assertLess(time.monotonic() - start, 10)
+        # 予算切れはキャンセルとして伝わるが、その時点の最良解は実行可能な結果として残る
+        self.assertEqual(result.status, "FEASIBLE")
+        self.assertTrue(optimizer._is_feasible_assignment(result.best_assignment))
+        self.assertAlmostEqual(result.best_score, optimizer._calculate_score(result.best_assignment))
+
+        # ユーザーによるキャンセルはそのまま
+        cancel_event = threading.Event()
+        cancel_event.set()
+        cancelled = TimeBudget(60, cancel_event)
+        self.assertTrue(cancelled.is_set())
+        self.assertFalse(cancelled.expired)
+        result = cancelled.finish(optimizer.optimize(cancel_event=cancelled), optimizer.problem_data)
+        self.assertEqual(result.status, "CANCELLED")
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
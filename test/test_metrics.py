@@ -0,0 +1,86 @@
+import unittest
+import sys
+import os
+import csv
+import tempfile
+
+import numpy as np
+
+# プロジェクトのルートディレクトリをsys.pathに追加
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from seminar_optimization.metrics import compute_metrics, satisfaction_by_rank
+from seminar_optimization.output_generator import save_csv_results
+from seminar_optimization.problem_data import ProblemData
+
+
+class TestAssignmentMetrics(unittest.TestCase):
+    """
+    品質指標 (metrics.compute_metrics) と、それを使う CSV レポートをテストする。
+    """
+    def setUp(self):
+        self.seminars_data = [
+            {"id": "SemA", "capacity": 2},
+            {"id": "SemB", "capacity": 2},
+            {"id": "SemC", "capacity": 4}
+        ]
+        self.students_data = [
+            {"id": "S1", "preferences": ["SemA", "SemB", "SemC"]},
+            {"id": "S2", "preferences": ["SemA", "SemB"]},
+            {"id": "S3", "preferences": ["SemB", "SemA", "SemC", "SemX"]},
+            {"id": "S4", "preferences": ["SemC", "SemA"]},
+            {"id": "S5", "preferences": ["SemA"]},
+        ]
+        self.config = {}
+        self.problem = ProblemData.from_lists(self.seminars_data, self.students_data, self.config)
+        # S1: 第1希望, S2: 第2希望, S3: 第3希望, S4: 希望外, S5: 未割り当て
+        self.assignment = {"S1": "SemA", "S2": "SemB", "S3": "SemC", "S4": "SemB"}
+
+    def test_metrics_match_per_student_computation(self):
+        weights = satisfaction_by_rank({"1st": 5.0, "2nd": 2.0, "3rd": 1.0}, self.problem.preference_matrix.shape[1])
+        metrics = compute_metrics(self.problem, self.problem.encode(self.assignment), weights)
+        np.testing.assert_array_equal(metrics.student_ranks, [0, 1, 2, -1, -1])
+        np.testing.assert_array_equal(metrics.rank_counts, [1, 1, 1, 0])
+        self.assertEqual(metrics.unpreferred_count, 1)
+        self.assertEqual(metrics.unassigned_count, 1)
+        self.assertEqual(metrics.assigned_count, 4)
+        np.testing.assert_array_equal(metrics.seminar_loads, [1, 2, 1])
+        np.testing.assert_allclose(metrics.seminar_fill, [0.5, 1.0, 0.25])
+        self.assertAlmostEqual(metrics.load_std, float(np.std([1, 2, 1])))
+        self.assertAlmostEqual(metrics.total_satisfaction, 8.0)
+        self.assertAlmostEqual(metrics.min_satisfaction, 0.0)
+        self.assertEqual(metrics.satisfaction_summary(), {
+            "Total Students": 5, "Assigned Students": 4, "Unassigned Students": 1,
+            "Assigned to 1st Choice": 1, "Assigned to 2nd Choice": 1, "Assigned to 3rd Choice": 1,
+            "Assigned to Other Preferred": 0, "Assigned to Unpreferred": 1,
+        })
+        self.assertEqual(metrics.to_dict(self.problem)["seminar_loads"], {"SemA": 1, "SemB": 2, "SemC": 1})
+
+    def test_empty_assignment(self):
+        metrics = compute_metrics(self.problem, self.problem.encode({}))
+        self.assertEqual(metrics.unassigned_count, 5)
+        self.assertEqual(metrics.load_std, 0.0)
+        self.assertEqual(metrics.total_satisfaction, 0.0)
+
+    def test_csv_report_uses_metrics(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            config = {"output_directory": output_dir,
+                      "students_data_for_report": self.students_data,
+                      "seminars_data_for_report": self.seminars_data}
+            save_csv_results(config, self.assignment, "Test")
+            files = sorted(os.listdir(output_dir))
+            with open(os.path.join(output_dir, next(f for f in files if f.startswith("seminar_assignment_"))), encoding='utf-8') as f:
+                rows = list(csv.reader(f))
+            with open(os.path.join(output_dir, next(f for f in files if f.startswith("seminar_summary_"))), encoding='utf-8') as f:
+                summary = list(csv.reader(f))
+        self.assertEqual(rows[1:], [["S1", "SemA", "1"], ["S2", "SemB", "2"], ["S3", "SemC", "3"],
+                                    ["S4", "SemB", "unpreferred"], ["S5", "unassigned", "N/A"]])
+        self.assertIn(["Assigned to Unpreferred", "1"], summary)
+        self.assertIn(["SemB", "2", "2", "0", "1.0"], summary)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,85 @@
+import unittest
+import sys
+import os
+import threading
+import math
+import numpy as np
+
+# プロジェクトのルートディレクトリをsys.pathに追加
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from optimizers.multilevel_optimizer import MultilevelOptimizer
+from seminar_optimization.delta_evaluator import DeltaEvaluator
+from seminar_optimization.capacity_ledger import IndexedPool
+
+
+class TestMultilevelAnnealing(unittest.TestCase):
+    """
+    MultilevelOptimizer の焼きなまし法 (メトロポリス法) による局所探索をテストする。
+    """
+    def setUp(self):
+        self.seminars_data = [{"id": f"Sem{s}", "capacity": 2} for s in range(4)]
+        self.students_data = [
+            {"id": f"S{i}", "preferences": [f"Sem{(i + k) % 4}" for k in range(2)]}
+            for i in range(10)
+        ]
+        self.config = {"random_seed": 3, "multilevel_clusters": 2, "local_search_iterations": 3000,
+                       "early_stop_no_improvement_limit": 500}
+
+    def test_annealing_improves_a_poor_start_and_stays_feasible(self):
+        optimizer = MultilevelOptimizer(self.seminars_data, self.students_data, self.config)
+        # 全員を第2希望に (定員内で) 割り当てた解から開始する
+        start = {}
+        for i in range(8):
+            start[f"S{i}"] = f"Sem{(i + 1) % 4}"
+        assignment, score = optimizer._local_search_multilevel(start, cancel_event=threading.Event())
+        self.assertTrue(optimizer._is_feasible_assignment(assignment))
+        self.assertAlmostEqual(score, optimizer._calculate_score(assignment))
+        self.assertGreater(score, optimizer._calculate_score(start))
+        # 希望外のセミナーには割り当てない
+        for student_id, seminar_id in assignment.items():
+            self.assertIn(seminar_id, optimizer.student_preferences[student_id])
+
+    def test_initial_temperature_is_calibrated_from_worsening_moves(self):
+        optimizer = MultilevelOptimizer(self.seminars_data, self.students_data,
+                                        dict(self.config, multilevel_initial_acceptance=0.5))
+        problem = optimizer.problem_data
+        vector = problem.encode({f"S{i}": f"Sem{i % 4}" for i in range(8)})
+        evaluator = DeltaEvaluator(problem, vector)
+        members = [IndexedPool(np.flatnonzero(vector == s).tolist()) for s in range(problem.num_seminars)]
+        temperature = optimizer._calibrate_temperature(evaluator, members, samples=500)
+        # 第1希望 -> 第2希望・未割り当ての悪化量の平均が確率 0.5 で受け入れられる温度
+        weights = problem.preference_weights[0]
+        self.assertGreater(temperature, (weights[0] - weights[1]) / math.log(2) - 1e-9)
+        self.assertLess(temperature, weights[0] / math.log(2) + 1e-9)
+        # 提案のみで状態は変えない
+        self.assertEqual(evaluator.vector().tolist(), vector.tolist())
+
+        # 自動設定を無効にすると initial_temperature を使う
+        optimizer = MultilevelOptimizer(self.seminars_data, self.students_data,
+                                        dict(self.config, multilevel_auto_temperature=False, initial_temperature=0.0))
+        result = optimizer.optimize(cancel_event=threading.Event())
+        self.assertTrue(optimizer._is_feasible_assignment(result.best_assignment))
+
+
+    def test_cluster_mode_solves_clusters_with_capacity_quotas(self):
+        config = dict(self.config, multilevel_mode="cluster")
+        optimizer = MultilevelOptimizer(self.seminars_data, self.students_data, config)
+        labels = optimizer._cluster_labels()
+        self.assertEqual(sorted(set(labels.tolist())), [0, 1])
+        sequential = optimizer.optimize(cancel_event=threading.Event())
+        self.assertTrue(optimizer._is_feasible_assignment(sequential.best_assignment))
+        self.assertEqual(sum(cluster["students"] for cluster in sequential.details["clusters"]), 10)
+
+        # ワーカープロセスで並列に解いても、同じシードなら同じ初期解になる
+        parallel = MultilevelOptimizer(self.seminars_data, self.students_data, dict(config, max_workers=2))
+        result = parallel.optimize(cancel_event=threading.Event())
+        self.assertEqual(result.details["initial_score"], sequential.details["initial_score"])
+        self.assertEqual(result.details["clusters"], sequential.details["clusters"])
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
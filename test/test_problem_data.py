@@ -0,0 +1,163 @@
+import unittest
+import sys
+import os
+import pickle
+
+import numpy as np
+
+# プロジェクトのルートディレクトリをsys.pathに追加
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from seminar_optimization import problem_data as problem_data_module
+from seminar_optimization.problem_data import ProblemData, UNASSIGNED
+from optimizers.greedy_ls_optimizer import GreedyLSOptimizer
+
+
+class TestProblemData(unittest.TestCase):
+    """
+    ProblemData (整数インデックス化された問題表現) をテストする。
+    """
+    def setUp(self):
+        self.seminars_data = [
+            {"id": "SemA", "capacity": 2, "magnification": 1.2},
+            {"id": "SemB", "capacity": 1, "magnification": 1.0},
+            {"id": "SemC", "capacity": 3}
+        ]
+        self.students_data = [
+            {"id": "S1", "preferences": ["SemA", "SemB", "SemC"]},
+            {"id": "S2", "preferences": ["SemB", "SemA"]},
+            {"id": "S3", "preferences": ["SemX", "SemC"]}, # 存在しないセミナーを含む
+            {"id": "S4", "preferences": ["SemC", "SemC", "SemA", "SemB"]}, # 重複を含む
+        ]
+        self.config = {
+            "score_weights": {
+                "1st_choice": 3.0,
+                "2nd_choice": 2.0,
+                "3rd_choice": 1.0,
+                "other_preference": 0.5
+            }
+        }
+        self.problem = ProblemData.from_lists(self.seminars_data, self.students_data, self.config)
+
+    def test_index_maps_and_arrays(self):
+        """IDの写像と配列の形をテストする。"""
+        self.assertEqual(self.problem.student_index["S3"], 2)
+        self.assertEqual(self.problem.seminar_index["SemC"], 2)
+        np.testing.assert_array_equal(self.problem.capacities, [2, 1, 3])
+        np.testing.assert_allclose(self.problem.magnifications, [1.2, 1.0, 1.0])
+        self.assertEqual(self.problem.preference_matrix.shape, (4, 4))
+        # 存在しないセミナーと重複した希望は -1 になり、順位の位置は保たれる
+        np.testing.assert_array_equal(self.problem.preference_matrix[2], [UNASSIGNED, 2, UNASSIGNED, UNASSIGNED])
+        np.testing.assert_array_equal(self.problem.preference_matrix[3], [2, UNASSIGNED, 0, 1])
+        self.assertFalse(self.problem.capacities.flags.writeable)
+
+    def test_weights_and_ranks(self):
+        """(学生, セミナー) ペアの重みと順位の参照をテストする。"""
+        self.assertAlmostEqual(self.problem.weight_of(0, 0), 3.0 * 1.2)
+        self.assertAlmostEqual(self.problem.weight_of(2, 2), 2.0) # 第2希望
+        self.assertAlmostEqual(self.problem.weight_of(3, 1), 0.5) # 第4希望
+        self.assertAlmostEqual(self.problem.weight_of(1, 2), 0.0) # 希望外
+        self.assertAlmostEqual(self.problem.weight_of(1, UNASSIGNED), 0.0)
+        ranks = self.problem.ranks_of(np.array([0, 1, 2, 3]), np.array([1, 2, 2, UNASSIGNED]))
+        np.testing.assert_array_equal(ranks, [1, UNASSIGNED, 1, UNASSIGNED])
+
+    def test_sparse_lookup_matches_dense_table(self):
+        """密な重みテーブルを使わない大規模向けの検索が同じ結果を返すことをテストする。"""
+        original_limit = problem_data_module.DENSE_WEIGHT_TABLE_MAX_CELLS
+        problem_data_module.DENSE_WEIGHT_TABLE_MAX_CELLS = 0
+        try:
+            sparse_problem = ProblemData.from_lists(self.seminars_data, self.students_data, self.config)
+        finally:
+            problem_data_module.DENSE_WEIGHT_TABLE_MAX_CELLS = original_limit
+        self.assertIsNone(sparse_problem.weight_table)
+        students = np.repeat(np.arange(4), 4)
+        seminars = np.tile(np.array([0, 1, 2, UNASSIGNED]), 4)
+        np.testing.assert_allclose(sparse_problem.weights_of(students, seminars), self.problem.weights_of(students, seminars))
+        self.assertAlmostEqual(sparse_problem.weight_of(3, 1), 0.5)
+
+    def test_encode_decode_score_and_feasibility(self):
+        """割り当て辞書とベクトルの相互変換、スコア、定員チェックをテストする。"""
+        assignment = {"S1": "SemA", "S2": "SemB", "S3": "SemC", "S9": "SemA"}
+        vector = self.problem.encode(assignment)
+        np.testing.assert_array_equal(vector, [0, 1, 2, UNASSIGNED])
+        self.assertEqual(self.problem.decode(vector), {"S1": "SemA", "S2": "SemB", "S3": "SemC"})
+        self.assertAlmostEqual(self.problem.score(vector), 3.0 * 1.2 + 3.0 * 1.0 + 2.0)
+        self.assertTrue(self.problem.is_feasible(vector))
+        np.testing.assert_array_equal(self.problem.unassigned_indices(vector), [3])
+
+        overloaded = np.array([1, 1, 2, 2], dtype=np.int32)
+        np.testing.assert_array_equal(self.problem.seminar_loads(overloaded), [0, 2, 2])
+        self.assertFalse(self.problem.is_feasible(overloaded))
+
+    def test_evaluate_batch_matches_single_evaluation(self):
+        """割り当て行列の一括評価が行ごとの評価と一致することをテストする。"""
+        matrix = np.array([
+            [0, 1, 2, UNASSIGNED],
+            [1, 1, 2, 2],
+            [UNASSIGNED, UNASSIGNED, UNASSIGNED, UNASSIGNED],
+        ], dtype=np.int32)
+        evaluation = self.problem.evaluate_batch(matrix)
+        for row, vector in enumerate(matrix):
+            self.assertAlmostEqual(evaluation.scores[row], self.problem.score(vector))
+            np.testing.assert_array_equal(evaluation.loads[row], self.problem.seminar_loads(vector))
+            self.assertEqual(evaluation.unassigned_counts[row], len(self.problem.unassigned_indices(vector)))
+            self.assertEqual(evaluation.feasible[row], self.problem.is_feasible(vector))
+        np.testing.assert_array_equal(evaluation.overloads[1], [0, 1, 0])
+        np.testing.assert_array_equal(evaluation.total_overloads, [0, 1, 0])
+        with self.assertRaises(ValueError):
+            self.problem.evaluate_batch(np.zeros((2, 3), dtype=np.int32))
+
+    def test_pickle_rebuilds_derived_tables(self):
+        """pickle は基本の配列だけを送り、受け取った側で同じ問題表現を作り直すことをテストする。"""
+        restored = pickle.loads(pickle.dumps(self.problem))
+        self.assertEqual(restored.student_index, self.problem.student_index)
+        self.assertEqual(restored.preference_lists, self.problem.preference_lists)
+        np.testing.assert_array_equal(restored.weight_table, self.problem.weight_table)
+        np.testing.assert_array_equal(restored.preference_weights, self.problem.preference_weights)
+        self.assertFalse(restored.capacities.flags.writeable)
+        vector = np.array([0, 1, 2, 2], dtype=np.int32)
+        self.assertAlmostEqual(restored.score(vector), self.problem.score(vector))
+        self.assertLess(len(pickle.dumps(self.problem)), len(pickle.dumps(self.problem.__dict__)))
+
+    def test_fingerprint_and_compatibility(self):
+        """入力のハッシュ値と、構築済みの問題表現を再利用できるかの判定をテストする。"""
+        fingerprint = ProblemData.fingerprint(self.seminars_data, self.students_data, self.config)
+        self.assertEqual(fingerprint, ProblemData.fingerprint(list(self.seminars_data), list(self.students_data), dict(self.config)))
+        changed = [dict(self.seminars_data[0], capacity=5)] + self.seminars_data[1:]
+        self.assertNotEqual(fingerprint, ProblemData.fingerprint(changed, self.students_data, self.config))
+        other_weights = {"score_weights": dict(self.config["score_weights"], **{"1st_choice": 5.0})}
+        self.assertNotEqual(fingerprint, ProblemData.fingerprint(self.seminars_data, self.students_data, other_weights))
+        self.assertTrue(self.problem.is_compatible(self.seminars_data, self.students_data, self.config))
+        self.assertFalse(self.problem.is_compatible(self.seminars_data, self.students_data, other_weights))
+        self.assertFalse(self.problem.is_compatible(self.seminars_data, self.students_data[:2], self.config))
+
+    def test_compatibility_compares_contents_not_shape(self):
+        """学生数・セミナー数が同じでも、ID・定員・倍率・希望が異なれば再利用しないことをテストする。"""
+        renamed_students = [dict(s, id=f"P{i}") for i, s in enumerate(self.students_data)]
+        self.assertFalse(self.problem.is_compatible(self.seminars_data, renamed_students, self.config))
+        renamed_seminars = [dict(s, id=s['id'] + "X") for s in self.seminars_data]
+        self.assertFalse(self.problem.is_compatible(renamed_seminars, self.students_data, self.config))
+        other_capacity = [dict(self.seminars_data[0], capacity=5)] + self.seminars_data[1:]
+        self.assertFalse(self.problem.is_compatible(other_capacity, self.students_data, self.config))
+        other_magnification = [dict(self.seminars_data[0], magnification=2.0)] + self.seminars_data[1:]
+        self.assertFalse(self.problem.is_compatible(other_magnification, self.students_data, self.config))
+        swapped = [dict(self.students_data[0], preferences=list(reversed(self.students_data[0]['preferences'])))] + self.students_data[1:]
+        self.assertFalse(self.problem.is_compatible(self.seminars_data, swapped, self.config))
+        copied = [dict(s, preferences=list(s['preferences'])) for s in self.students_data]
+        self.assertTrue(self.problem.is_compatible(list(self.seminars_data), copied, dict(self.config)))
+
+    def test_optimizer_rebuilds_mismatched_problem_data(self):
+        """形が同じで ID の異なる ProblemData を渡しても、入力どおりの学生IDで結果を返すことをテストする。"""
+        renamed_students = [dict(s, id=f"P{i}") for i, s in enumerate(self.students_data)]
+        config = dict(self.config, local_search_iterations=10)
+        optimizer = GreedyLSOptimizer(self.seminars_data, renamed_students, config, problem_data=self.problem)
+        self.assertIsNot(optimizer.problem_data, self.problem)
+        result = optimizer.optimize()
+        self.assertTrue(set(result.best_assignment) <= {s['id'] for s in renamed_students})
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,72 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# プロジェクトのルートディレクトリをsys.pathに追加
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from seminar_optimization.problem_data import ProblemData
+from seminar_optimization.strategy_store import StrategyStore, instance_bucket
+from seminar_optimization.instance_features import extract_features
+from optimizers.adaptive_optimizer import AdaptiveOptimizer
+
+
+class TestStrategyStore(unittest.TestCase):
+    """
+    戦略ごとの報酬を実行をまたいで保存する StrategyStore と、AdaptiveOptimizer での事前分布の利用をテストする。
+    """
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "history.sqlite3")
+        self.seminars_data = [{"id": "Sem0", "capacity": 1}, {"id": "Sem1", "capacity": 4}, {"id": "Sem2", "capacity": 3}]
+        self.students_data = [
+            {"id": f"S{i}", "preferences": ["Sem0", "Sem1"] if i < 4 else ["Sem1", "Sem2"]}
+            for i in range(8)
+        ]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_instance_bucket(self):
+        problem = ProblemData.from_lists(self.seminars_data, self.students_data, {})
+        # 学生 8 人 (log2 = 3)、セミナー 3 (log2 ≈ 1.6)、定員/学生 = 1 (log2 = 0)、希望数 2、
+        # 第1希望が定員超過のセミナー (Sem0: 4人/定員1, Sem1: 4人/定員4 は超過しない) を選ぶ学生は 4/8
+        self.assertEqual(instance_bucket(extract_features(problem)), (3, 2, 0, 2, 5))
+
+    def test_prior_comes_from_nearest_bucket(self):
+        store = StrategyStore(self.db_path)
+        self.assertEqual(store.prior((3, 2, 0, 2, 5), 5), (None, {}))
+        for reward in (0.2, 0.4, 0.6):
+            store.record((3, 2, 0, 2, 5), "Flow", reward, 10.0, 0.1)
+        store.record((3, 2, 0, 2, 5), "GA_LS", 0.1, float('-inf'), 2.0)
+        store.record((10, 6, 0, 3, 0), "Greedy_LS", 0.9)
+        nearest, rewards = store.prior((4, 2, 0, 2, 4), 2)
+        self.assertEqual(nearest, (3, 2, 0, 2, 5))
+        self.assertEqual(rewards, {"Flow": [0.4, 0.6], "GA_LS": [0.1]}) # 直近 2 件を古い順に
+
+    def test_adaptive_starts_from_historical_prior(self):
+        bucket = instance_bucket(extract_features(ProblemData.from_lists(self.seminars_data, self.students_data, {})))
+        store = StrategyStore(self.db_path)
+        store.record(bucket, "Flow", 0.8)
+        store.record(bucket, "GA_LS", 0.3)
+        config = {"random_seed": 0, "adaptive_history_db": self.db_path, "adaptive_exploration_epsilon": 0.0}
+        optimizer = AdaptiveOptimizer(self.seminars_data, self.students_data, config)
+        self.assertAlmostEqual(optimizer.strategy_scores["Flow"], 0.8)
+        self.assertEqual(optimizer._select_strategy(), "Flow")
+
+        # 実行結果は履歴に追記される
+        optimizer.max_iterations = 1
+        optimizer.optimize()
+        self.assertEqual(len(StrategyStore(self.db_path).recent_rewards(bucket, 10)["Flow"]), 2)
+        # 特徴量付きの記録だけが予測モデルの学習データになる
+        rows = StrategyStore(self.db_path).training_rows()
+        self.assertEqual([row["strategy"] for row in rows], ["Flow"])
+        self.assertEqual(rows[0]["features"], optimizer.instance_features)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,107 @@
+import unittest
+import sys
+import os
+import threading
+import numpy as np
+
+# プロジェクトのルートディレクトリをsys.pathに追加
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from optimizers.tsl_optimizer import TSLOptimizer, SeminarProblem, BalancedStudent, Teacher
+
+
+class TestTSLOptimizer(unittest.TestCase):
+    """
+    TSLOptimizer の生徒が定員を守った割り当てベクトルで学習することをテストする。
+    """
+    def setUp(self):
+        self.seminars_data = [{"id": f"Sem{s}", "capacity": 2} for s in range(4)]
+        self.students_data = [
+            {"id": f"S{i}", "preferences": [f"Sem{(i + k) % 4}" for k in range(2)]}
+            for i in range(12)
+        ]
+        self.config = {"random_seed": 5, "tsl_max_iterations": 20,
+                       "tsl_num_exploratory_students": 3, "tsl_num_local_students": 3, "tsl_num_balanced_students": 3}
+
+    def test_perturbation_keeps_assignments_feasible(self):
+        problem = SeminarProblem(self.seminars_data, self.students_data, self.config)
+        preference_matrix = problem.problem_data.preference_matrix
+        vector = problem.get_initial_vector()
+        for _ in range(50):
+            vector = problem.operators.perturb(vector, 0.5)
+            self.assertTrue(problem.problem_data.is_feasible(vector))
+            # 割り当て先は希望セミナーか未割り当てのみ
+            for student_idx, seminar_idx in enumerate(vector.tolist()):
+                self.assertTrue(seminar_idx == -1 or seminar_idx in preference_matrix[student_idx])
+
+    def test_learners_only_produce_feasible_candidates(self):
+        optimizer = TSLOptimizer(self.seminars_data, self.students_data, self.config)
+        problem = optimizer.problem
+        self.assertTrue(all(np.isfinite(student.current_fitness) for student in optimizer.students))
+        for iteration in range(10):
+            for student in optimizer.students:
+                student.learn(optimizer.teacher.global_best_vector, iteration, 10, "Execution")
+            fitnesses = problem.evaluate_vectors(np.stack([student.current_vector for student in optimizer.students]))
+            self.assertTrue(np.all(np.isfinite(fitnesses)))
+
+        balanced = next(student for student in optimizer.students if isinstance(student, BalancedStudent))
+        # 全体最良解と個人最良解を混ぜても、修復により定員を守る
+        balanced.personal_best_vector = np.array([0, 0, 0, 0, 1, 1, 1, 1, 2, 2, 2, 2], dtype=np.int32) % 4
+        balanced.learn(np.full(12, 3, dtype=np.int32), 10, 10, "Review")
+        self.assertTrue(problem.problem_data.is_feasible(balanced.current_vector))
+
+    def test_elite_archive_admission_and_path_relinking(self):
+        problem = SeminarProblem(self.seminars_data, self.students_data, self.config)
+        teacher = Teacher(problem, max_memory_size=2, min_distance=3)
+        first = np.array([0, 1, 2, 3, 0, 1, 2, -1, -1, -1, -1, -1], dtype=np.int32)
+        fitness = problem.evaluate_vector(first)
+        self.assertTrue(teacher.add_to_memory(first, fitness))
+        self.assertFalse(teacher.add_to_memory(first.copy(), fitness)) # 同じ解 (ハッシュが一致) は追加しない
+        worse = first.copy()
+        worse[0] = -1
+        self.assertFalse(teacher.add_to_memory(worse, problem.evaluate_vector(worse))) # 近くて悪い解は拒否
+        better = first.copy()
+        better[7] = 3 # S7 を第1希望の Sem3 の空き枠へ
+        self.assertTrue(teacher.add_to_memory(better, problem.evaluate_vector(better)))
+        self.assertEqual(len(teacher.memory), 1) # 近くて良い解は置き換えとして受け入れる
+        np.testing.assert_array_equal(teacher.get_best_from_memory(), better)
+
+        far = np.array([1, 2, 3, 0, 1, 2, 3, 0, -1, -1, -1, -1], dtype=np.int32)
+        self.assertTrue(teacher.add_to_memory(far, problem.evaluate_vector(far)))
+        self.assertEqual(len(teacher.memory), 2)
+
+        vector, relinked_fitness = teacher.path_relink(better, far)
+        self.assertTrue(problem.problem_data.is_feasible(vector))
+        self.assertAlmostEqual(relinked_fitness, problem.evaluate_vector(vector))
+        distance = int(np.count_nonzero(better != far))
+        self.assertTrue(0 < np.count_nonzero(vector != better) < distance) # 両端を除く中間解
+
+    def test_path_relinking_under_full_capacity(self):
+        # 全セミナーが満員の2つの解の間: 各ステップで席を空けながら進む必要がある
+        seminars_data = [{"id": f"Sem{s}", "capacity": 10} for s in range(20)]
+        students_data = [
+            {"id": f"S{i}", "preferences": [f"Sem{(i + k) % 20}" for k in range(3)]}
+            for i in range(200)
+        ]
+        problem = SeminarProblem(seminars_data, students_data, self.config)
+        teacher = Teacher(problem, relink_sample=4)
+        initiating = (np.arange(200) % 20).astype(np.int32)
+        guiding = ((np.arange(200) + 7) % 20).astype(np.int32)
+        vector, relinked_fitness = teacher.path_relink(initiating, guiding)
+        self.assertTrue(problem.problem_data.is_feasible(vector))
+        self.assertAlmostEqual(relinked_fitness, problem.evaluate_vector(vector))
+        self.assertTrue(np.any(vector != initiating))
+
+    def test_optimize_returns_feasible_assignment(self):
+        optimizer = TSLOptimizer(self.seminars_data, self.students_data, self.config)
+        result = optimizer.optimize(cancel_event=threading.Event())
+        self.assertEqual(result.status, "OPTIMAL")
+        self.assertTrue(optimizer._is_feasible_assignment(result.best_assignment))
+        self.assertAlmostEqual(result.best_score, optimizer._calculate_score(result.best_assignment))
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)